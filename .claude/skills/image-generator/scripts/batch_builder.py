@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Batch API 요청 JSONL 스트리밍 빌더 — prepare_batch_requests 대체
+
+기존에는 요청 전체(레퍼런스 base64 포함)를 메모리에서 만든 뒤 JSONL을 한 번에 썼다.
+여기서는
+  1. 요청 계획(템플릿 프롬프트 + 레퍼런스 경로)만 메인 프로세스에서 정하고
+  2. 레퍼런스 읽기/base64/JSON 직렬화는 프로세스 풀에서 (동시에 처리 중인 요청은 window개까지만)
+  3. 끝난 줄은 순서대로 바로 파일에 씀 — batch.build_compress면 줄마다 gzip 멤버로 압축
+     (압축도 워커에서, 이어 붙인 멤버들은 그대로 하나의 유효한 .gz)
+  4. flush_every건마다 request map(.map.jsonl)에 키/pair/파일 위치를 기록
+
+그래서 max_batch_size가 커져도 최대 메모리는 window × 요청 1건 크기로 일정하고,
+빌드 중에 죽으면 같은 pair 목록으로 다시 부를 때 마지막 기록 지점부터 이어서 만든다.
+
+batch.streaming_build는 기본 꺼짐 — 프롬프트는 pair의 relation/template_id를 그대로 쓰고
+(없는 자리는 비우고 공백 정리), 결과 수거(download_batch_results)와의 형식 호환은
+prepare_batch_requests 쪽 출력과 대조한 뒤 켠다.
+
+사용:
+  jsonl_path, request_map = build_batch_requests(pairs, board_names, recent_pins, model)
+"""
+import base64
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import random
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+CONFIG_DIR = BASE_DIR / "config"
+SETTINGS_FILE = CONFIG_DIR / "settings.json"
+TEMPLATES_FILE = CONFIG_DIR / "prompt-templates.json"
+BOARDS_DIR = CONFIG_DIR / "boards"
+BUILD_DIR = BASE_DIR / "output" / "batch"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "word-manager" / "scripts"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "pin-tracker" / "scripts"))
+
+DEFAULT_BUILD = {
+    "build_workers": 0,       # 0 = CPU 수
+    "build_window": 0,        # 동시에 처리 중인 요청 수. 0 = workers × 2
+    "build_flush_every": 20,  # 이 건수마다 JSONL flush + map 기록 (재개 단위)
+    "build_compress": False,
+}
+
+
+def _load_build_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    batch = settings.get("batch", {})
+    gen = settings.get("generation", {})
+    cfg = {k: batch.get(k, v) for k, v in DEFAULT_BUILD.items()}
+    cfg["ref_images_per_request"] = gen.get("ref_images_per_request", 5)
+    cfg["min_ref_images"] = gen.get("min_ref_images", 3)
+    cfg["max_inline_mb"] = gen.get("max_inline_mb", 20)
+    return cfg
+
+
+def _load_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+_SPACES = re.compile(r"[ \t]{2,}")
+
+
+class _Blank(dict):
+    def __missing__(self, key):
+        return ""
+
+
+def _prompt_fields(pair: dict) -> dict:
+    """템플릿 치환값. 영어 설명이 비어 있으면 단어 사전(vocab_store)에서 채움"""
+    if pair.get("word1_en") and pair.get("word2_en"):
+        return pair
+    from vocab_store import get_vocab
+    vocab = get_vocab()
+    return {
+        **pair,
+        "word1_en": pair.get("word1_en") or vocab.gloss(pair.get("word1", ""), "word1"),
+        "word2_en": pair.get("word2_en") or vocab.gloss(pair.get("word2", ""), "word2"),
+    }
+
+
+# ── 요청 계획 (메인 프로세스) ───────────────────────────
+class RequestPlanner:
+    """pair → (프롬프트, 레퍼런스 경로들). 최근 쓴 핀은 피해서 고름
+    pin_index가 있으면 스타일 벡터로 coherent/diverse 세트, 없으면 (또는 pin_index=False) 무작위"""
+
+    def __init__(self, board_names, recent_pins=None, cfg: dict = None, rng=None, pin_index=None):
+        from pin_cache import get_pin_usage
+        from pin_dedup import get_pin_dedup
+        from pin_index import get_pin_index, pin_cache_path
+        self.cfg = cfg or _load_build_config()
+        self.rng = rng or random.Random()
+        self.templates = {t["id"]: t for t in _load_json(TEMPLATES_FILE, {}).get("templates", [])}
+        self.recent = list(recent_pins or [])
+        self.board_names = list(board_names or [])
+        pins = []
+        for name in self.board_names:
+            board = _load_json(BOARDS_DIR / f"{name}.json", {})
+            for pin in board.get("pins", []):
+                path = pin_cache_path(name, pin)
+                if path:
+                    pins.append((name, pin["pin_id"], path))
+        # 여러 보드에 같은 이미지가 있으면 한 번만 (한 요청에 같은 그림 두 장 방지)
+        dedup = get_pin_dedup() if pin_index is not False else None
+        if dedup is not None:
+            pins = dedup.filter(pins)
+        self.pins = [(pin_id, path) for _, pin_id, path in pins]
+        self.index = pin_index if pin_index is not None else get_pin_index()
+        # 고른 핀의 선택 시각/횟수 — tmp/pins 캐시 축출 순서 (pin_cache)
+        self.usage = get_pin_usage() if pin_index is not False else None
+
+    def _choose_template(self) -> str:
+        """좋아요/달러 기준 Thompson sampling (bandit_selector). 비활성이면 무작위"""
+        from bandit_selector import get_bandit
+        return get_bandit().choose_template(list(self.templates), self.rng)
+
+    def plan(self, pair: dict) -> dict:
+        template = self.templates.get(pair.get("template_id")) or (
+            self.templates[self._choose_template()] if self.templates else {"id": None, "text": ""})
+        prompt = template["text"].format_map(_Blank(_prompt_fields(pair)))
+        prompt = _SPACES.sub(" ", prompt).replace(" .", ".").strip()  # 빈 {relation} 자리
+        k = self.cfg["ref_images_per_request"]
+        chosen = self.index.select(k, boards=self.board_names, exclude=self.recent, rng=self.rng) if self.index else []
+        chosen = [c for c in chosen if os.path.exists(c[1])]  # 인덱스 갱신 전에 캐시에서 지워진 핀
+        if len(chosen) < min(k, len(self.pins)):
+            fresh = [p for p in self.pins if p[0] not in self.recent]
+            pool = fresh if len(fresh) >= k else self.pins
+            chosen = self.rng.sample(pool, min(k, len(pool)))
+        self.recent = (self.recent + [pid for pid, _ in chosen])[-50:]
+        if self.usage is not None:
+            self.usage.touch([pid for pid, _ in chosen])
+        return {
+            "template_id": template["id"],
+            "prompt": prompt,
+            "ref_pin_ids": [pid for pid, _ in chosen],
+            "ref_paths": [path for _, path in chosen],
+        }
+
+
+# ── 요청 인코딩 (워커 프로세스) ─────────────────────────
+def _encode_request(job: tuple) -> tuple:
+    """(key, prompt, ref_paths, max_inline_bytes, min_refs, compress) → (key, JSONL 줄 bytes 또는 None, 레퍼런스 수, 오류)"""
+    key, prompt, ref_paths, max_inline_bytes, min_refs, compress = job
+    parts = [{"text": prompt}]
+    total = 0
+    for path in ref_paths:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if total + len(data) > max_inline_bytes:
+            break
+        total += len(data)
+        mime = mimetypes.guess_type(path)[0] or "image/jpeg"
+        parts.append({"inline_data": {"mime_type": mime, "data": base64.b64encode(data).decode("ascii")}})
+    n_refs = len(parts) - 1
+    if n_refs < min_refs:
+        return key, None, n_refs, f"레퍼런스 {n_refs}장 < 최소 {min_refs}장"
+    line = json.dumps({
+        "key": key,
+        "request": {
+            "contents": [{"role": "user", "parts": parts}],
+            "generation_config": {"response_modalities": ["TEXT", "IMAGE"]},
+        },
+    }, ensure_ascii=False).encode("utf-8") + b"\n"
+    return key, gzip.compress(line, compresslevel=1) if compress else line, n_refs, None
+
+
+class _Inline:
+    """workers=1일 때 풀 없이 같은 인터페이스"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+
+# ── 재개 상태 ───────────────────────────────────────────
+def build_paths(out_dir=BUILD_DIR, compress: bool = False) -> tuple:
+    out_dir = Path(out_dir)
+    jsonl = out_dir / ("batch-requests.jsonl.gz" if compress else "batch-requests.jsonl")
+    return jsonl, out_dir / "batch-requests.map.jsonl"
+
+
+def _build_id(pairs, model) -> str:
+    """pair 집합 기준 (순서 무관) — bandit 정렬이 실행마다 달라도 같은 pair들이면 이어서 빌드"""
+    h = hashlib.sha1(model.encode("utf-8"))
+    for cid in sorted(str(p["combo_id"]) for p in pairs):
+        h.update(b"\x1f" + cid.encode("utf-8"))
+    return h.hexdigest()
+
+
+def pending_build(out_dir=BUILD_DIR) -> list:
+    """중단된 빌드의 combo_id 목록 (없으면 []) — 다음 실행에서 같은 pair를 먼저 점유해 이어서 빌드"""
+    _, map_path = build_paths(out_dir)
+    try:
+        with open(map_path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+    except (OSError, ValueError):
+        return []
+    return list(header.get("combo_ids") or [])
+
+
+def _load_resume(map_path: Path, jsonl_path: Path, build_id: str) -> tuple:
+    """(마지막 checkpoint까지 확정된 map 기록, 그 시점 JSONL 위치) — 다른 빌드거나 없으면 ([], 0)
+    checkpoint 뒤에 기록된 항목은 JSONL에 확정되지 않았을 수 있으므로 버리고 다시 만든다"""
+    try:
+        f = open(map_path, encoding="utf-8")
+    except OSError:
+        return [], 0
+    valid, pending, offset = [], [], 0
+    with f:
+        header = None
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # 쓰다 만 마지막 줄
+            if header is None:
+                header = rec
+                if rec.get("build_id") != build_id or not jsonl_path.exists():
+                    return [], 0
+            elif "checkpoint" in rec:
+                valid += pending
+                pending = []
+                offset = rec["checkpoint"]
+            else:
+                pending.append(rec)
+    return valid, offset
+
+
+def clear_build_state(out_dir=BUILD_DIR):
+    """제출이 끝나면 (batch_state.json에 request_map 저장 후) 빌드 재개 파일 정리"""
+    _, map_path = build_paths(out_dir)
+    if map_path.exists():
+        map_path.unlink()
+
+
+# ── 빌드 ────────────────────────────────────────────────
+def build_batch_requests(pairs, board_names, recent_pins, model, out_dir=BUILD_DIR,
+                         planner: RequestPlanner = None, cfg: dict = None) -> tuple:
+    """prepare_batch_requests와 같은 반환값 (jsonl_path, request_map)"""
+    cfg = cfg or _load_build_config()
+    compress = bool(cfg["build_compress"])
+    jsonl_path, map_path = build_paths(out_dir, compress)
+    jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+    build_id = _build_id(pairs, model)
+
+    records, offset = _load_resume(map_path, jsonl_path, build_id)
+    request_map = {r["key"]: r["pair"] for r in records if r.get("key")}
+    done = {r["combo_id"] for r in records}
+    if done:
+        print(f"[BATCH] 빌드 재개: {len(done)}/{len(pairs)}건 완료 지점부터")
+        with open(jsonl_path, "r+b") as f:
+            f.truncate(offset)
+    else:
+        open(jsonl_path, "wb").close()
+    # map도 확정된 지점까지만 남기고 다시 씀
+    with open(map_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"build_id": build_id, "model": model, "count": len(pairs),
+                            "combo_ids": [p["combo_id"] for p in pairs]}, ensure_ascii=False) + "\n")
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        if records:
+            f.write(json.dumps({"checkpoint": offset}) + "\n")
+
+    planner = planner or RequestPlanner(board_names, recent_pins, cfg)
+    workers = int(cfg["build_workers"]) or (os.cpu_count() or 2)
+    window = int(cfg["build_window"]) or workers * 2
+    flush_every = max(1, int(cfg["build_flush_every"]))
+    max_inline = int(cfg["max_inline_mb"] * 1024 * 1024)
+    todo = [(i, p) for i, p in enumerate(pairs) if p["combo_id"] not in done]
+    pool_cls = ProcessPoolExecutor if workers > 1 and len(todo) > 1 else _Inline
+    skipped = 0
+
+    out = open(jsonl_path, "ab")
+    mapf = open(map_path, "a", encoding="utf-8")
+    pending_recs = []
+
+    def _checkpoint():
+        out.flush()
+        os.fsync(out.fileno())
+        for rec in pending_recs:
+            mapf.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        mapf.write(json.dumps({"checkpoint": out.tell()}) + "\n")
+        mapf.flush()
+        pending_recs.clear()
+
+    try:
+        with pool_cls(max_workers=workers) as pool:
+            inflight = []
+            it = iter(todo)
+
+            def _fill():
+                while len(inflight) < window:
+                    try:
+                        i, pair = next(it)
+                    except StopIteration:
+                        return
+                    plan = planner.plan(pair)
+                    pair = {**pair, "template_id": plan["template_id"], "ref_pin_ids": plan["ref_pin_ids"]}
+                    key = f"req_{i:04d}_{pair['combo_id']}"
+                    job = (key, plan["prompt"], plan["ref_paths"], max_inline, cfg["min_ref_images"], compress)
+                    inflight.append((pair, pool.submit(_encode_request, job)))
+
+            _fill()
+            while inflight:
+                pair, fut = inflight.pop(0)
+                key, line, n_refs, error = fut.result()
+                _fill()
+                if line is None:
+                    skipped += 1
+                    print(f"[WARN] {pair['combo_id']} 요청 제외: {error}")
+                    pending_recs.append({"combo_id": pair["combo_id"], "key": None, "error": error})
+                else:
+                    out.write(line)
+                    request_map[key] = pair
+                    pending_recs.append({"combo_id": pair["combo_id"], "key": key, "pair": pair})
+                if len(pending_recs) >= flush_every:
+                    _checkpoint()
+        _checkpoint()
+    finally:
+        out.close()
+        mapf.close()
+
+    if planner.usage is not None:
+        planner.usage.flush()
+    if skipped:
+        print(f"[BATCH] 레퍼런스 부족으로 {skipped}건 제외")
+    return str(jsonl_path), request_map
+
+
+if __name__ == "__main__":
+    # python batch_builder.py <pairs.json> <board1,board2> <model>
+    if len(sys.argv) < 4:
+        print("사용: python batch_builder.py pairs.json board1,board2 model")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        pairs = json.load(f)
+    path, rmap = build_batch_requests(pairs, sys.argv[2].split(","), [], sys.argv[3])
+    print(f"[OK] {len(rmap)}건 → {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+배치 결과 수거 — 적응형 polling + 고아 배치 자동 복구
+
+polling:
+  고정 30초 대신 경과 시간에 비례해 간격을 늘리고(poll_backoff_fraction, poll_min~max_seconds),
+  지난 배치 소요 시간(output/logs/batch-durations.json)으로 예상 완료 구간(p10~p90)을 잡아
+  그 구간에서는 poll_min_seconds 간격으로 촘촘히 확인 → 완료 후 수거까지 지연 감소.
+
+고아 배치:
+  polling 타임아웃/Ctrl+C 후에도 서버의 배치는 계속 돌고 비용도 나간다.
+  다음 시작 때 batch_state.json을 output/batch/orphans/{job}.json으로 옮기고
+  (새 배치 제출이 batch_state.json을 덮어써도 잃지 않게) 백그라운드 스레드에서 polling → 결과 수거.
+  고아 파일마다 파일 락을 잡으므로 여러 워커가 동시에 시작해도 한 곳에서만 수거한다.
+  제출한 워커는 polling~수거 동안 소유 락(output/batch/owners/{job}.lock)을 잡고 있고,
+  그 락이 잡혀 있는 batch_state.json은 아직 살아 있는 워커/데몬 것이므로 고아로 옮기지 않는다.
+  제출 때 잡은 비용 예약은 owners/{job}.reservation.json에 두고 고아 기록으로 옮겨,
+  수거 스레드가 그 예약을 연장(budget_ledger.adopt)하고 결과를 그 예약에 확정한다.
+
+사용:
+  python batch_recovery.py           # 남은 고아 배치 목록
+"""
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "session-controller" / "scripts"))
+
+from file_lock import FileLock
+
+CONFIG_DIR = BASE_DIR / "config"
+SETTINGS_FILE = CONFIG_DIR / "settings.json"
+DURATIONS_FILE = BASE_DIR / "output" / "logs" / "batch-durations.json"
+ORPHAN_DIR = BASE_DIR / "output" / "batch" / "orphans"
+OWNER_DIR = BASE_DIR / "output" / "batch" / "owners"
+
+DEFAULT_POLL = {
+    "adaptive_poll": True,
+    "poll_min_seconds": 10,
+    "poll_max_seconds": 60,
+    "poll_backoff_fraction": 0.05,  # 간격 = 경과 시간 × 이 비율 (min~max)
+    "orphan_timeout_hours": 48,
+}
+
+SUCCEEDED = {"JOB_STATE_SUCCEEDED", "SUCCEEDED", "BATCH_STATE_SUCCEEDED"}
+TERMINAL = SUCCEEDED | {
+    "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED",
+    "FAILED", "CANCELLED", "EXPIRED",
+    "BATCH_STATE_FAILED", "BATCH_STATE_CANCELLED", "BATCH_STATE_EXPIRED",
+}
+
+KEEP_DURATIONS = 50
+
+
+def _load_poll_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            batch = json.load(f).get("batch", {})
+    except (OSError, ValueError):
+        batch = {}
+    return {k: batch.get(k, v) for k, v in DEFAULT_POLL.items()}
+
+
+def job_state(job) -> str:
+    state = getattr(job, "state", None)
+    return state.name if hasattr(state, "name") else str(state)
+
+
+def _ts(value):
+    """BatchJob create_time/end_time (datetime 또는 문자열) → epoch 또는 None"""
+    if value is None:
+        return None
+    if hasattr(value, "timestamp"):
+        return value.timestamp()
+    try:
+        from datetime import datetime
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+# ── 적응형 polling ──────────────────────────────────────
+class AdaptivePoller:
+    def __init__(self, cfg: dict = None, durations_file=None):
+        self.cfg = cfg or _load_poll_config()
+        self.durations_file = Path(durations_file or DURATIONS_FILE)
+        try:
+            with open(self.durations_file, encoding="utf-8") as f:
+                self.durations = [float(d) for d in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            self.durations = []
+
+    def window(self):
+        """지난 배치 소요 시간 기준 예상 완료 구간 (p10, p90). 기록이 3건 미만이면 None"""
+        if len(self.durations) < 3:
+            return None
+        s = sorted(self.durations)
+        lo = s[int(0.1 * (len(s) - 1))]
+        hi = s[int(round(0.9 * (len(s) - 1)))]
+        return lo * 0.9, hi * 1.2
+
+    def next_interval(self, elapsed: float) -> float:
+        lo, hi = self.cfg["poll_min_seconds"], self.cfg["poll_max_seconds"]
+        window = self.window()
+        if window and window[0] <= elapsed <= window[1]:
+            return lo
+        interval = min(hi, max(lo, elapsed * self.cfg["poll_backoff_fraction"]))
+        if window and elapsed < window[0]:
+            # 예상 구간 시작을 넘겨 자지 않게
+            interval = min(interval, max(lo, window[0] - elapsed))
+        return interval
+
+    def record(self, duration: float):
+        if duration <= 0:
+            return
+        self.durations = (self.durations + [round(duration, 1)])[-KEEP_DURATIONS:]
+        self.durations_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.durations_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.durations, f)
+        os.replace(tmp, self.durations_file)
+
+
+def get_batch_job(batch_job_name: str):
+    from google import genai
+    from deadline import make_http_options
+    from reference_media import batch_api_key
+    client = genai.Client(api_key=batch_api_key()["api_key"], http_options=make_http_options())
+    return client.batches.get(name=batch_job_name)
+
+
+def poll_adaptive(batch_job_name: str, timeout: float, get_job=None, clock=time, started: float = None,
+                  token=None, poller: AdaptivePoller = None, label: str = "BATCH"):
+    """종료 상태가 될 때까지 polling → batch job. timeout/취소면 None
+    started: 제출 시각 (고아 배치는 원래 제출 시각 — 경과 시간 기준으로 간격 결정)"""
+    get_job = get_job or get_batch_job
+    poller = poller or AdaptivePoller()
+    began = clock.time()
+    started = started or began
+    last_state = None
+    polls = 0
+    while True:
+        try:
+            job = get_job(batch_job_name)
+            polls += 1
+        except Exception as e:
+            job = None
+            print(f"  [{label}] 상태 조회 실패: {str(e)[:80]}")
+        now = clock.time()
+        if job is not None:
+            if polls == 1:
+                created = _ts(getattr(job, "create_time", None))
+                started = created or started
+            state = job_state(job)
+            if state != last_state:
+                print(f"  [{label}] {state} ({(now - started) / 60:.1f}분 경과)")
+                last_state = state
+            if state in TERMINAL:
+                if state in SUCCEEDED:
+                    end, create = _ts(getattr(job, "end_time", None)), _ts(getattr(job, "create_time", None))
+                    poller.record(end - create if end and create else now - started)
+                print(f"  [{label}] 조회 {polls}회")
+                return job
+        if now - began >= timeout:
+            return None
+        wait = min(poller.next_interval(now - started), max(0.0, timeout - (now - began)))
+        if token is not None:
+            if token.wait(wait):
+                return None
+        else:
+            clock.sleep(wait)
+
+
+# ── 고아 배치 ───────────────────────────────────────────
+def _orphan_path(batch_job_name: str) -> Path:
+    return ORPHAN_DIR / (batch_job_name.replace("/", "_") + ".json")
+
+
+def owner_lock(batch_job_name: str) -> FileLock:
+    """제출한 워커가 polling~수거 동안 잡는 락 (프로세스가 죽으면 OS가 풀어줌)"""
+    return FileLock(OWNER_DIR / (batch_job_name.replace("/", "_") + ".lock"))
+
+
+def _reservation_path(batch_job_name: str) -> Path:
+    return OWNER_DIR / (batch_job_name.replace("/", "_") + ".reservation.json")
+
+
+def save_reservation(batch_job_name: str, reservation: dict):
+    """제출한 배치의 비용 예약 (batch_state.json 옆) — 고아가 되면 수거 스레드가 이어받음"""
+    path = _reservation_path(batch_job_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(reservation, f)
+    os.replace(tmp, path)
+
+
+def load_reservation(batch_job_name: str):
+    try:
+        with open(_reservation_path(batch_job_name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_reservation(batch_job_name: str):
+    try:
+        _reservation_path(batch_job_name).unlink()
+    except OSError:
+        pass
+
+
+def adopt_saved_state(state) -> dict:
+    """batch_state.json 내용을 고아 파일로 옮김 → 고아 기록 (없으면 None). 호출 쪽에서 batch_state를 지움
+    소유 워커가 아직 polling 중이면 (소유 락이 잡혀 있으면) None — batch_state를 지우면 안 됨"""
+    if isinstance(state, (list, tuple)) and len(state) >= 2:
+        state = {"batch_job_name": state[0], "request_map": state[1], "model": state[2] if len(state) > 2 else None}
+    if not isinstance(state, dict):
+        return None
+    name = state.get("batch_job_name") or state.get("job_name") or state.get("name")
+    if not name:
+        return None
+    owner = owner_lock(name)
+    if not owner.acquire(blocking=False):
+        print(f"[ORPHAN] {name}: 다른 워커가 아직 수거 중 — 건너뜀")
+        return None
+    try:
+        return _write_orphan(name, state)
+    finally:
+        owner.release()
+
+
+def _write_orphan(name: str, state: dict) -> dict:
+    path = _orphan_path(name)
+    record = {
+        "batch_job_name": name,
+        "request_map": state.get("request_map", {}),
+        "model": state.get("model"),
+        "submitted_at": state.get("submitted_at") or state.get("saved_at") or time.time(),
+        "reservation": state.get("reservation") or load_reservation(name),
+        "adopted_at": time.time(),
+    }
+    if path.exists():
+        return record
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return record
+
+
+def list_orphans() -> list:
+    orphans = []
+    for path in sorted(ORPHAN_DIR.glob("*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                orphans.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return orphans
+
+
+def _recover_one(orphan: dict, ingest, on_claim=None, get_job=None, token=None, cfg: dict = None):
+    """고아 1건: 락 → on_claim(orphan, 남은 시간) → polling → ingest(job, orphan) → 고아 파일 삭제.
+    다른 워커가 처리 중이면 바로 반환"""
+    cfg = cfg or _load_poll_config()
+    name = orphan["batch_job_name"]
+    path = _orphan_path(name)
+    lock = FileLock(path.with_suffix(".lock"))
+    if not lock.acquire(blocking=False):
+        return
+    try:
+        if not path.exists():  # 다른 워커가 이미 수거
+            return
+        submitted = float(orphan.get("submitted_at") or time.time())
+        remaining = cfg["orphan_timeout_hours"] * 3600 - (time.time() - submitted)
+        if on_claim:
+            on_claim(orphan, max(remaining, 0) + 600)
+        job = None
+        if remaining > 0:
+            job = poll_adaptive(name, remaining, get_job=get_job, started=submitted, token=token, label="ORPHAN")
+        if job is None:
+            if token is not None and token.cancelled:
+                return  # 종료 중 — 다음 시작 때 이어서
+            print(f"[ORPHAN] {name}: {cfg['orphan_timeout_hours']}시간 내 완료 안 됨 — 포기")
+            ingest(None, orphan)
+        else:
+            ingest(job, orphan)
+        path.unlink()
+    except Exception as e:
+        print(f"[ORPHAN] {name} 수거 실패 (다음 실행 때 재시도): {e}")
+    finally:
+        lock.release()
+
+
+def start_orphan_recovery(ingest, on_claim=None, get_job=None, token=None) -> list:
+    """남은 고아 배치마다 백그라운드 스레드 → 스레드 목록 (daemon — 프로세스가 끝나면 다음 시작 때 이어서)"""
+    threads = []
+    for orphan in list_orphans():
+        t = threading.Thread(target=_recover_one, args=(orphan, ingest, on_claim, get_job, token),
+                             name=f"orphan-{orphan['batch_job_name'][-12:]}", daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
+
+
+if __name__ == "__main__":
+    orphans = list_orphans()
+    if not orphans:
+        print("[INFO] 고아 배치 없음")
+    for o in orphans:
+        age = (time.time() - float(o.get("submitted_at") or time.time())) / 3600
+        print(f"[INFO] {o['batch_job_name']} | {len(o.get('request_map', {}))}건 | {o.get('model')} | 제출 {age:.1f}시간 전")
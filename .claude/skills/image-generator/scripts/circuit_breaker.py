@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+(키, 모델)별 서킷 브레이커 — Pro/Flash 전환 판단용
+
+상태:
+  closed    : 정상. 용량 오류(429/503/timeout)가 연속 failure_threshold회면 open
+  open      : 차단. 생성 사이클이 session.flash_pro_retry_interval회 지나면 half_open
+  half_open : 시험 요청 1회 허용. 성공 → closed, 실패 → open
+
+Flash로 내려간 뒤에도 half_open이 된 Pro 키가 생기면 바로 Pro로 되돌려서
+세션 끝까지 Flash에 머무르지 않게 한다.
+"""
+import json
+import threading
+import time
+from pathlib import Path
+
+from model_probe import classify_error
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 브레이커를 여는 오류 분류 (안전 차단/이미지 없음은 키·모델 상태와 무관)
+TRIP_STATUSES = ("rate_limited", "unavailable", "timeout")
+
+
+def is_capacity_error(error: str) -> bool:
+    text = str(error or "")
+    if "timeout" in text.lower() or "timed out" in text.lower():
+        return True
+    return classify_error(Exception(text)) in TRIP_STATUSES
+
+
+class CircuitBreaker:
+    def __init__(self, key: str, model: str, failure_threshold: int = 3, retry_interval: int = 10):
+        self.key = key
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self.state = CLOSED
+        self.failures = 0
+        self.cycles_open = 0
+        self.opened_at = None
+        self.trips = 0
+        self.last_error = ""
+
+    def on_success(self):
+        prev = self.state
+        self.state = CLOSED
+        self.failures = 0
+        self.cycles_open = 0
+        self.opened_at = None
+        return prev
+
+    def on_failure(self, error: str):
+        prev = self.state
+        self.last_error = str(error or "")[:120]
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self.cycles_open = 0
+            self.opened_at = time.time()
+        return prev
+
+    def force_open(self, reason: str):
+        prev = self.state
+        if self.state != OPEN:
+            self.trips += 1
+        self.last_error = reason
+        self.state = OPEN
+        self.cycles_open = 0
+        self.opened_at = time.time()
+        return prev
+
+    def tick(self):
+        """생성 사이클 1회 경과"""
+        prev = self.state
+        if self.state == OPEN:
+            self.cycles_open += 1
+            if self.cycles_open >= self.retry_interval:
+                self.state = HALF_OPEN
+        return prev
+
+    def allows(self) -> bool:
+        return self.state != OPEN
+
+    def describe(self) -> str:
+        s = f"{self.key}/{self.model} {self.state.upper()}"
+        if self.state == OPEN and self.opened_at:
+            s += f" ({int((time.time() - self.opened_at) // 60)}m, {self.cycles_open}/{self.retry_interval})"
+        return s
+
+
+class BreakerBoard:
+    """전체 (키, 모델) 브레이커 모음. 상태 변화는 listener(breaker, prev, new)로 전달"""
+
+    def __init__(self, failure_threshold: int = None, retry_interval: int = None):
+        cfg = {}
+        try:
+            with open(SETTINGS_FILE, encoding="utf-8") as f:
+                cfg = json.load(f).get("session", {})
+        except (OSError, ValueError):
+            pass
+        self.failure_threshold = failure_threshold or cfg.get("breaker_failure_threshold", 3)
+        self.retry_interval = retry_interval or cfg.get("flash_pro_retry_interval", 10)
+        self.breakers = {}
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def get(self, key: str, model: str) -> CircuitBreaker:
+        k = (key or "default", model or "")
+        b = self.breakers.get(k)
+        if b is None:
+            b = self.breakers[k] = CircuitBreaker(k[0], k[1], self.failure_threshold, self.retry_interval)
+        return b
+
+    def _emit(self, breaker, prev):
+        if prev != breaker.state:
+            for fn in self.listeners:
+                fn(breaker, prev, breaker.state)
+
+    def record(self, key: str, model: str, success: bool, error: str = ""):
+        """생성 결과 반영. 용량 오류가 아닌 실패는 브레이커에 영향 없음"""
+        with self._lock:
+            b = self.get(key, model)
+            if success:
+                prev = b.on_success()
+            elif is_capacity_error(error):
+                prev = b.on_failure(error)
+            else:
+                return
+        self._emit(b, prev)
+
+    def force_open(self, key: str, model: str, reason: str):
+        """외부 판단(예: rate limiter가 Flash로 전환)으로 차단"""
+        with self._lock:
+            b = self.get(key, model)
+            if b.state == OPEN:
+                return
+            prev = b.force_open(reason)
+        self._emit(b, prev)
+
+    def tick(self):
+        with self._lock:
+            changed = [(b, b.tick()) for b in self.breakers.values()]
+        for b, prev in changed:
+            self._emit(b, prev)
+
+    def allows(self, key: str, model: str) -> bool:
+        with self._lock:
+            return self.get(key, model).allows()
+
+    def healthy_keys(self, model: str) -> list:
+        """model에 대해 요청 가능한(closed/half_open) 키"""
+        with self._lock:
+            return [b.key for (k, m), b in self.breakers.items() if m == model and b.allows()]
+
+    def retry_due(self, model: str) -> bool:
+        """Flash 사용 중 Pro를 다시 시도할 때인지 — half_open인 Pro 브레이커가 있으면 True"""
+        with self._lock:
+            return any(b.state == HALF_OPEN for (k, m), b in self.breakers.items() if m == model)
+
+    def summary(self) -> str:
+        with self._lock:
+            items = sorted(self.breakers.values(), key=lambda b: (b.model, b.key))
+            return " | ".join(b.describe() for b in items)
+
+
+_board = None
+
+
+def get_breaker_board() -> BreakerBoard:
+    global _board
+    if _board is None:
+        _board = BreakerBoard()
+    return _board
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+요청 deadline + 협조적 취소 + watchdog
+
+- connect/read timeout : HTTP 클라이언트에 넘기는 소켓 단위 timeout (make_http_options)
+- request deadline     : 요청 1건 전체 상한. 바이트를 조금씩 흘려보내는 응답처럼
+                         소켓 timeout으로 못 잡는 경우도 여기서 끊는다
+- CancelToken          : Ctrl+C/SIGTERM 또는 deadline 초과 시 set.
+                         생성 코드는 단계 사이에서 check_cancelled()로 중단 지점을 둘 수 있다
+- Watchdog             : deadline을 넘긴 호출을 output/logs/stalls.jsonl에 기록하고
+                         키를 바꿔 stall_retries회까지 다시 시도
+
+파이썬 스레드는 강제 종료할 수 없고 generate_image는 취소 지점이 없으므로, deadline을 넘긴 호출도
+끝까지 돌며 과금될 수 있다. 그래서 버린 호출은 그 호출이 쓰던 키와 함께 남겨 두고, 재시도는 기다리지 않고
+바로 다른 키로 보낸다. 버린 호출이 아직 돌고 있는 키로는 보내지 않으며 (같은 키의 동시 과금,
+rate limiter 공유 방지), 남은 키가 모두 그런 상태일 때만 그 키의 호출이 끝나길 abandon_wait_seconds까지
+기다린다. 호출 쪽은 after_abandoned()로 버린 호출이 실제로 끝날 때 비용을 확정/해제한다.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+STALL_LOG = BASE_DIR / "output" / "logs" / "stalls.jsonl"
+
+DEFAULT_DEADLINES = {
+    "connect_timeout_seconds": 10,
+    "read_timeout_seconds": 120,
+    "request_deadline_seconds": 180,
+    "stall_retries": 1,
+    "abandon_wait_seconds": 300,  # 모든 키에 버린 호출이 남아 있을 때 그 호출이 끝나길 기다리는 최대 시간
+}
+
+_local = threading.local()
+
+
+class Cancelled(Exception):
+    """협조적 취소 — check_cancelled()에서 발생"""
+
+
+class CancelToken:
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self.parent = parent
+        self.reason = ""
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or bool(self.parent and self.parent.cancelled)
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled(self.reason or (self.parent.reason if self.parent else ""))
+
+    def wait(self, seconds: float) -> bool:
+        """seconds 동안 대기. 도중에 취소되면 True"""
+        return self._event.wait(seconds) or self.cancelled
+
+
+def load_deadline_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            gen = json.load(f).get("generation", {})
+    except (OSError, ValueError):
+        gen = {}
+    return {k: gen.get(k, v) for k, v in DEFAULT_DEADLINES.items()}
+
+
+def make_http_options(cfg: dict = None):
+    """google-genai Client(http_options=...)용 — read timeout(ms) + httpx connect/read timeout"""
+    from google import genai
+    cfg = cfg or load_deadline_config()
+    read_ms = int(cfg["read_timeout_seconds"] * 1000)
+    try:
+        import httpx
+        timeout = httpx.Timeout(cfg["read_timeout_seconds"], connect=cfg["connect_timeout_seconds"])
+        return genai.types.HttpOptions(timeout=read_ms, client_args={"timeout": timeout})
+    except (ImportError, TypeError, ValueError):
+        # client_args 미지원 SDK — 전체 timeout만 적용
+        return genai.types.HttpOptions(timeout=read_ms)
+
+
+def current_token():
+    """현재 스레드에서 실행 중인 요청의 CancelToken (없으면 None)"""
+    return getattr(_local, "token", None)
+
+
+def check_cancelled():
+    """생성 코드 안의 취소 지점 — 요청이 deadline을 넘겼거나 세션이 중단됐으면 Cancelled"""
+    token = current_token()
+    if token:
+        token.check()
+
+
+class _Call:
+    """별도 스레드에서 실행 중인 호출 1건"""
+
+    def __init__(self, fn, kwargs: dict, token: CancelToken = None):
+        self.token = CancelToken(parent=token)
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self._exit_lock = threading.Lock()
+        self._on_exit = []
+        self.key = None  # 이 호출이 쓴 키 id (Watchdog이 기록)
+        self.thread = threading.Thread(target=self._run, args=(fn, kwargs), name="generate-call", daemon=True)
+        self.thread.start()
+
+    def _run(self, fn, kwargs):
+        _local.token = self.token
+        try:
+            self.result = fn(**kwargs)
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self._exit_lock:
+                self.done.set()
+                callbacks, self._on_exit = self._on_exit, []
+            for fn in callbacks:
+                try:
+                    fn(self.late_result())
+                except Exception as e:
+                    print(f"  [WARN] 버려진 호출 정리 실패: {e}")
+
+    def late_result(self):
+        return self.result if self.error is None else {"status": "failed", "error": str(self.error)}
+
+    def on_exit(self, fn):
+        """호출이 끝나면 fn(결과) — 이미 끝났으면 바로"""
+        with self._exit_lock:
+            if not self.done.is_set():
+                self._on_exit.append(fn)
+                return
+        fn(self.late_result())
+
+    def wait(self, timeout: float, token: CancelToken = None) -> bool:
+        """버려진 뒤 끝나길 최대 timeout초 기다림 (token 취소 시 중단) → 끝났으면 True"""
+        end = time.monotonic() + timeout
+        while not self.done.is_set():
+            remaining = end - time.monotonic()
+            if remaining <= 0 or (token is not None and token.cancelled):
+                return False
+            self.done.wait(min(remaining, 0.5))
+        return True
+
+    def join(self, deadline: float) -> bool:
+        """완료되면 True. deadline 초과나 상위 token 취소 시 이 호출을 취소하고 False"""
+        end = time.monotonic() + deadline
+        while not self.done.is_set():
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                self.token.cancel("deadline exceeded")
+                return False
+            if self.token.cancelled:
+                self.token.cancel("session cancelled")
+                return False
+            self.done.wait(min(remaining, 0.5))
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+def run_with_deadline(fn, deadline: float, token: CancelToken = None, **kwargs):
+    """fn(**kwargs)를 별도 스레드에서 실행 → (완료 여부, 결과).
+    deadline 초과 또는 token 취소 시 (False, None)을 바로 반환하고 호출은 버린다.
+    fn에서 난 예외는 그대로 다시 발생"""
+    call = _Call(fn, kwargs, token)
+    return (True, call.result) if call.join(deadline) else (False, None)
+
+
+class Watchdog:
+    """generate 호출을 deadline 안에서 실행하고, 넘긴 호출은 기록 후 다른 키로 바로 재시도"""
+
+    def __init__(self, token: CancelToken = None, cfg: dict = None, on_stall=None, log_path=STALL_LOG,
+                 key_of=None):
+        self.cfg = cfg or load_deadline_config()
+        self.token = token or CancelToken()
+        self.on_stall = on_stall  # on_stall(attempt) — 키 전환 등
+        self.key_of = key_of  # key_of() — 다음 호출이 쓸 키 id. 없으면 모든 호출을 한 키로 봄
+        self.log_path = Path(log_path)
+        self.stalls = 0
+        self.abandoned = []
+        self._stalled = []  # 마지막 call()에서 버린 호출
+
+    @property
+    def deadline(self) -> float:
+        return float(self.cfg["request_deadline_seconds"])
+
+    @property
+    def abandon_wait(self) -> float:
+        return float(self.cfg.get("abandon_wait_seconds", DEFAULT_DEADLINES["abandon_wait_seconds"]))
+
+    @property
+    def max_call_seconds(self) -> float:
+        """call() 1번의 최대 소요 — 시도마다 버린 호출 대기 + deadline (비용 예약 TTL 산정용)"""
+        return (int(self.cfg["stall_retries"]) + 1) * (self.abandon_wait + self.deadline)
+
+    def _record(self, label: str, attempt: int, elapsed: float, key=None):
+        self.stalls += 1
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "label": label, "attempt": attempt, "key": key,
+            "elapsed": round(elapsed, 2), "deadline": self.deadline,
+        }
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+    def _key(self):
+        return self.key_of() if self.key_of else None
+
+    def pending_abandoned(self) -> int:
+        """버려졌지만 아직 끝나지 않은 호출 수"""
+        self.abandoned = [c for c in self.abandoned if not c.done.is_set()]
+        return len(self.abandoned)
+
+    def late_calls(self) -> int:
+        """마지막 call()에서 버린 호출 중 아직 실행 중인 수 — 재시도가 성공해도 늦게 과금될 수 있음"""
+        return sum(1 for c in self._stalled if not c.done.is_set())
+
+    def after_abandoned(self, fn):
+        """마지막 call()에서 버린 호출이 끝날 때마다 fn(결과) — 비용 예약 확정/해제용. 버린 호출이 없으면 fn(None)"""
+        if not self._stalled:
+            fn(None)
+        for c in self._stalled:
+            c.on_exit(fn)
+
+    def _free_key(self, attempt: int) -> bool:
+        """다음 호출이 쓸 키에 버린 호출이 남아 있으면 다른 키로 돌림. 모든 키가 그렇다면
+        지금 키의 버린 호출이 끝나길 abandon_wait까지 기다림 → 보낼 수 있으면 True"""
+        self.pending_abandoned()
+        busy = {c.key for c in self.abandoned}
+        key = self._key()
+        if key not in busy:
+            return True
+        seen = {key}
+        while key is not None and self.on_stall:
+            self.on_stall(attempt)
+            key = self._key()
+            if key not in busy:
+                return True
+            if key in seen:
+                break
+            seen.add(key)
+        end = time.monotonic() + self.abandon_wait
+        for c in [c for c in self.abandoned if c.key == key]:
+            if not c.wait(max(0.0, end - time.monotonic()), self.token):
+                return False
+        return True
+
+    def call(self, fn, label: str = "", **kwargs) -> dict:
+        """fn(**kwargs) 결과 dict. 모든 시도가 deadline을 넘기면 timeout 실패 결과.
+        버린 호출이 아직 돌고 있으면 "abandoned": True (예약 유지, after_abandoned로 확정),
+        보낼 키가 없어 시작도 못 했으면 "busy": True"""
+        retries = int(self.cfg["stall_retries"])
+        self._stalled = []
+        for attempt in range(retries + 1):
+            if self.token.cancelled:
+                return {"status": "failed", "abandoned": bool(self._stalled),
+                        "error": f"cancelled: {self.token.reason}"}
+            if not self._free_key(attempt):
+                error = f"busy: 버려진 호출 {self.pending_abandoned()}건이 아직 실행 중"
+                if self._stalled:
+                    return {"status": "failed", "abandoned": True, "error": f"timeout: {error}"}
+                return {"status": "failed", "busy": True, "error": error}
+            t0 = time.monotonic()
+            call = _Call(fn, kwargs, self.token)
+            call.key = self._key()
+            if call.join(self.deadline):
+                return call.result
+            elapsed = time.monotonic() - t0
+            self.abandoned.append(call)
+            self._stalled.append(call)
+            if self.token.cancelled:
+                return {"status": "failed", "abandoned": True, "error": f"cancelled: {self.token.reason}"}
+            self._record(label, attempt, elapsed, call.key)
+            print(f" [STALL] {elapsed:.0f}s deadline 초과 (시도 {attempt + 1}/{retries + 1})", end="", flush=True)
+            # 버린 호출은 기다리지 않음 — 키를 바꿔 바로 재시도 (그 키는 호출이 끝날 때까지 _free_key가 피함)
+            if attempt < retries and self.on_stall:
+                self.on_stall(attempt)
+        return {"status": "failed", "abandoned": True,
+                "error": f"timeout: 요청 deadline {self.deadline:.0f}s 초과 ({retries + 1}회), 호출이 아직 실행 중"}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+API 응답 이미지 저장 — 복사/재인코딩 없이 memoryview로 바로 디스크에 기록
+
+- part.inline_data.data(bytes)를 memoryview 조각으로 os.write → 중간 bytes 복사 없음
+- 해상도(928x1152 등)는 PNG IHDR / JPEG SOF / WebP 헤더에서 읽음 (전체 디코드 없음)
+- 같은 조각으로 sha256도 계산 (파일을 다시 읽지 않음)
+- tmp 파일에 쓴 뒤 os.replace → 중간에 죽어도 반쯤 쓴 이미지가 남지 않음
+"""
+import base64
+import hashlib
+import os
+import struct
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 20
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG SOF 마커 (DHT C4, JPG C8, DAC CC 제외)
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def parse_image_header(buf) -> tuple:
+    """(format, width, height). 알 수 없는 형식이면 (None, 0, 0)"""
+    mv = memoryview(buf)
+    if len(mv) >= 24 and mv[:8] == PNG_SIGNATURE and mv[12:16] == b"IHDR":
+        w, h = struct.unpack(">II", mv[16:24])
+        return "png", w, h
+    if len(mv) >= 4 and mv[0] == 0xFF and mv[1] == 0xD8:
+        return _parse_jpeg(mv)
+    if len(mv) >= 30 and mv[:4] == b"RIFF" and mv[8:12] == b"WEBP":
+        return _parse_webp(mv)
+    return None, 0, 0
+
+
+def _parse_jpeg(mv) -> tuple:
+    i, n = 2, len(mv)
+    while i + 4 <= n:
+        if mv[i] != 0xFF:
+            i += 1
+            continue
+        marker = mv[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # 길이 없는 마커
+            i += 2
+            continue
+        seg_len = struct.unpack(">H", mv[i + 2:i + 4])[0]
+        if marker in JPEG_SOF and i + 9 <= n:
+            h, w = struct.unpack(">HH", mv[i + 5:i + 9])
+            return "jpeg", w, h
+        if marker == 0xDA:  # SOS 이후는 엔트로피 데이터
+            break
+        i += 2 + seg_len
+    return "jpeg", 0, 0
+
+
+def _parse_webp(mv) -> tuple:
+    chunk = bytes(mv[12:16])
+    if chunk == b"VP8X":
+        w = int.from_bytes(mv[24:27], "little") + 1
+        h = int.from_bytes(mv[27:30], "little") + 1
+        return "webp", w, h
+    if chunk == b"VP8 " and len(mv) >= 30:
+        w, h = struct.unpack("<HH", mv[26:30])
+        return "webp", w & 0x3FFF, h & 0x3FFF
+    if chunk == b"VP8L" and len(mv) >= 25:
+        b = int.from_bytes(mv[21:25], "little")
+        return "webp", (b & 0x3FFF) + 1, ((b >> 14) & 0x3FFF) + 1
+    return "webp", 0, 0
+
+
+def save_image_bytes(data, path, chunk_size: int = CHUNK_SIZE, fix_extension: bool = True) -> dict:
+    """이미지 버퍼를 path에 저장 → {file_path, format, width, height, resolution, bytes, sha256}
+    fix_extension이면 헤더 형식에 맞게 확장자 교체 (JPEG인데 .png로 저장되는 일 방지)"""
+    if isinstance(data, str):
+        # 일부 SDK 경로는 base64 문자열 — 이 경우만 디코드 복사가 생김
+        data = base64.b64decode(data)
+    mv = memoryview(data).cast("B")
+    fmt, w, h = parse_image_header(mv)
+    path = Path(path)
+    if fix_extension and fmt and path.suffix.lower() not in (EXTENSIONS[fmt], ".jpeg" if fmt == "jpeg" else ""):
+        path = path.with_suffix(EXTENSIONS[fmt])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        offset, total = 0, len(mv)
+        while offset < total:
+            piece = mv[offset:offset + chunk_size]
+            digest.update(piece)
+            written = 0
+            while written < len(piece):
+                written += os.write(fd, piece[written:])
+            offset += len(piece)
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+    return {
+        "file_path": str(path),
+        "format": fmt,
+        "width": w,
+        "height": h,
+        "resolution": f"{w}x{h}" if w and h else "?",
+        "bytes": len(mv),
+        "sha256": digest.hexdigest(),
+    }
+
+
+def describe_image_file(path, chunk_size: int = CHUNK_SIZE) -> dict:
+    """이미 저장된 이미지 → save_image_bytes와 같은 dict. 해상도는 첫 조각 헤더에서, sha256은 한 번 읽으며"""
+    digest = hashlib.sha256()
+    fmt, w, h, total = None, 0, 0, 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if not total:
+                fmt, w, h = parse_image_header(chunk)
+            digest.update(chunk)
+            total += len(chunk)
+    return {
+        "file_path": str(path),
+        "format": fmt,
+        "width": w,
+        "height": h,
+        "resolution": f"{w}x{h}" if w and h else "?",
+        "bytes": total,
+        "sha256": digest.hexdigest(),
+    }
+
+
+def save_inline_part(part, path, **kwargs) -> dict:
+    """응답 part(inline_data 있는 것)를 저장. inline_data가 없으면 None"""
+    inline = getattr(part, "inline_data", None)
+    if not inline or not inline.data:
+        return None
+    info = save_image_bytes(inline.data, path, **kwargs)
+    info["mime_type"] = getattr(inline, "mime_type", None) or MIME_TYPES.get(info["format"])
+    return info
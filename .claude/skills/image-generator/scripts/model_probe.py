@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+모델 가용성 probe — 이미지 생성 없이 저비용 호출로 확인
+
+1. models.get        : 키/모델 메타데이터 (무료)
+2. count_tokens      : 모델 서빙 경로 확인 (무료)
+3. minimal request   : 텍스트 1토큰 생성 (설정 probe.minimal_request, 이미지 1장 대비 무시 가능한 비용)
+
+결과는 output/logs/model-health.json에 짧은 TTL로 캐시 → run_batch.py, scheduled_*.py가 공유.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from deadline import make_http_options
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+CONFIG_DIR = BASE_DIR / "config"
+SETTINGS_FILE = CONFIG_DIR / "settings.json"
+API_KEYS_FILE = CONFIG_DIR / "api-keys.json"
+HEALTH_FILE = BASE_DIR / "output" / "logs" / "model-health.json"
+
+DEFAULT_PROBE = {
+    "ttl_seconds": 300,
+    "minimal_request": True,
+}
+
+
+def _load_probe_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_PROBE, **json.load(f).get("probe", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_PROBE)
+
+
+def classify_error(e) -> str:
+    """API 예외 → 상태 분류 (rate_limited / unavailable / not_found / auth / error)"""
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    text = str(e)
+    if code == 429 or "429" in text or "RESOURCE_EXHAUSTED" in text:
+        return "rate_limited"
+    if code in (500, 502, 503, 504) or "503" in text or "UNAVAILABLE" in text or "overloaded" in text.lower():
+        return "unavailable"
+    if code == 404 or "NOT_FOUND" in text:
+        return "not_found"
+    if code in (401, 403) or "PERMISSION_DENIED" in text or "API_KEY_INVALID" in text:
+        return "auth"
+    return "error"
+
+
+def _make_client():
+    from google import genai
+    with open(API_KEYS_FILE, encoding="utf-8") as f:
+        api_key = json.load(f)["keys"][0]["api_key"]
+    return genai.Client(api_key=api_key, http_options=make_http_options())
+
+
+def probe_model(model: str, client=None, minimal_request: bool = None) -> dict:
+    """저비용 probe 실행 (캐시 사용 안 함)"""
+    cfg = _load_probe_config()
+    if minimal_request is None:
+        minimal_request = cfg["minimal_request"]
+
+    result = {"model": model, "ok": False, "status": "error", "checks": {}, "detail": "", "checked_at": time.time()}
+    t0 = time.perf_counter()
+    try:
+        client = client or _make_client()
+
+        client.models.get(model=model)
+        result["checks"]["metadata"] = True
+
+        client.models.count_tokens(model=model, contents="ping")
+        result["checks"]["count_tokens"] = True
+
+        if minimal_request:
+            from google import genai
+            client.models.generate_content(
+                model=model,
+                contents="Reply with OK.",
+                config=genai.types.GenerateContentConfig(
+                    response_modalities=["TEXT"],
+                    max_output_tokens=1,
+                ),
+            )
+            result["checks"]["minimal_request"] = True
+
+        result["ok"] = True
+        result["status"] = "healthy"
+    except Exception as e:
+        result["status"] = classify_error(e)
+        result["detail"] = str(e)[:200]
+    result["latency"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def load_health() -> dict:
+    try:
+        with open(HEALTH_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_health(entry: dict):
+    data = load_health()
+    data[entry["model"]] = entry
+    HEALTH_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = HEALTH_FILE.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, HEALTH_FILE)
+
+
+def get_model_health(model: str, max_age: float = None, client=None, refresh: bool = True) -> dict:
+    """캐시가 max_age(기본 probe.ttl_seconds) 이내면 재사용, 아니면 probe 후 저장.
+    refresh=False면 캐시만 보고, 없거나 오래됐으면 None"""
+    if max_age is None:
+        max_age = _load_probe_config()["ttl_seconds"]
+    entry = load_health().get(model)
+    if entry and time.time() - entry.get("checked_at", 0) <= max_age:
+        return {**entry, "cached": True}
+    if not refresh:
+        return None
+    entry = probe_model(model, client=client)
+    save_health(entry)
+    return {**entry, "cached": False}
+
+
+def format_health(entry: dict) -> str:
+    if not entry:
+        return "unknown"
+    age = int(time.time() - entry.get("checked_at", 0))
+    src = f"cache {age}s" if entry.get("cached") else f"{entry.get('latency', 0):.1f}s"
+    detail = f" — {entry['detail'][:60]}" if entry.get("detail") else ""
+    return f"{entry['model']}: {entry['status']} ({src}){detail}"
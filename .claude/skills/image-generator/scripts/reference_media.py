@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+레퍼런스 이미지 Files API 재사용 — Batch JSONL에서 같은 핀을 매번 base64로 넣지 않기
+
+요청 200개 × 레퍼런스 5장이면 인기 핀이 수십 번씩 inline_data로 들어가 JSONL이 수백 MB가 된다.
+prepare_batch_requests가 만든 JSONL을 한 줄씩 읽어서
+  inline_data(base64) → 내용 해시 → 처음 보는 이미지만 Files API 업로드 → file_data(URI)로 교체
+한 새 JSONL을 쓴다. URI는 만료 시각과 함께 output/logs/reference-files.json에 캐시해서
+다음 배치에서도 재사용 (Files API 파일은 48시간 후 삭제).
+
+배치가 큐에서 기다리는 동안 만료되지 않도록 남은 수명이 batch.reference_min_remaining_hours
+미만인 URI는 다시 업로드한다.
+
+Files API 파일은 업로드한 키의 프로젝트에서만 보이므로 배치를 제출/조회하는 키
+(batch.batch_key_id, 비우면 api-keys.json의 첫 키)로 올리고, 캐시 항목도 그 키 것만 재사용한다.
+"""
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+CONFIG_DIR = BASE_DIR / "config"
+SETTINGS_FILE = CONFIG_DIR / "settings.json"
+API_KEYS_FILE = CONFIG_DIR / "api-keys.json"
+CACHE_FILE = BASE_DIR / "output" / "logs" / "reference-files.json"
+
+DEFAULT_REFERENCE = {
+    "reference_upload": "files_api",
+    "reference_min_remaining_hours": 26,
+    "reference_upload_workers": 4,
+    "batch_key_id": "",
+}
+
+FILE_TTL_SECONDS = 48 * 3600
+
+
+def _load_reference_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            batch = json.load(f).get("batch", {})
+    except (OSError, ValueError):
+        batch = {}
+    return {k: batch.get(k, v) for k, v in DEFAULT_REFERENCE.items()}
+
+
+def batch_api_key(key_id: str = None) -> dict:
+    """배치 제출/조회/레퍼런스 업로드에 쓰는 키 항목 ({"id", "api_key", ...}). 키 파일이 없으면 None"""
+    key_id = key_id if key_id is not None else _load_reference_config()["batch_key_id"]
+    try:
+        with open(API_KEYS_FILE, encoding="utf-8") as f:
+            keys = json.load(f)["keys"]
+    except (OSError, ValueError, KeyError):
+        return None
+    for k in keys:
+        if key_id and k.get("id") == key_id:
+            return k
+    return keys[0] if keys else None
+
+
+def _make_client(key_id: str = None):
+    from google import genai
+    return genai.Client(api_key=batch_api_key(key_id)["api_key"])
+
+
+def _expiry_ts(value) -> float:
+    """Files API expiration_time (datetime 또는 RFC3339 문자열) → epoch"""
+    if value is None:
+        return time.time() + FILE_TTL_SECONDS
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time() + FILE_TTL_SECONDS
+
+
+class ReferenceCache:
+    """내용 해시 → 업로드된 파일 URI (만료 시각 포함)"""
+
+    def __init__(self, client=None, cache_file=CACHE_FILE, cfg: dict = None):
+        self.cfg = cfg or _load_reference_config()
+        self._client = client
+        self.cache_file = Path(cache_file)
+        self.min_remaining = self.cfg["reference_min_remaining_hours"] * 3600
+        key = batch_api_key(self.cfg["batch_key_id"]) if client is None else None
+        self.key_id = key.get("id") if key else None
+        self.entries = {}
+        self.uploads = 0
+        self.upload_bytes = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = _make_client(self.cfg["batch_key_id"])
+        return self._client
+
+    def save(self):
+        now = time.time()
+        live = {k: v for k, v in self.entries.items() if v.get("expires_at", 0) > now}
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(live, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.cache_file)
+
+    def _valid(self, entry) -> bool:
+        if not entry or entry.get("key_id", self.key_id) != self.key_id:
+            return False  # 다른 키(프로젝트)로 올린 파일은 이 배치에서 안 보임
+        return entry.get("expires_at", 0) - time.time() >= self.min_remaining
+
+    def _upload(self, digest: str, data: bytes, mime_type: str) -> dict:
+        f = self.client.files.upload(
+            file=io.BytesIO(data),
+            config={"mime_type": mime_type, "display_name": f"ref-{digest[:16]}"},
+        )
+        return {
+            "name": f.name,
+            "uri": f.uri,
+            "mime_type": getattr(f, "mime_type", None) or mime_type,
+            "expires_at": _expiry_ts(getattr(f, "expiration_time", None)),
+            "size": len(data),
+            "key_id": self.key_id,
+        }
+
+    def get(self, digest: str, load_bytes, mime_type: str) -> dict:
+        """digest에 해당하는 업로드 항목. 없거나 곧 만료되면 load_bytes()로 읽어 업로드.
+        같은 digest를 여러 스레드가 동시에 요청해도 업로드는 한 번.
+        먼저 올리던 스레드가 실패하면 기다리던 스레드가 한 번 더 올려 봄"""
+        waits = 0
+        while True:
+            with self._lock:
+                entry = self.entries.get(digest)
+                if self._valid(entry):
+                    self.reused += 1
+                    return entry
+                event = self._inflight.get(digest)
+                owner = event is None
+                if owner and waits >= 2:
+                    raise RuntimeError(f"레퍼런스 업로드 실패 (다른 스레드에서 재시도도 실패): {digest[:16]}")
+                if owner:
+                    event = self._inflight[digest] = threading.Event()
+            if owner:
+                break
+            event.wait()
+            waits += 1
+        try:
+            data = load_bytes()
+            entry = self._upload(digest, data, mime_type)
+            with self._lock:
+                self.entries[digest] = entry
+                self.uploads += 1
+                self.upload_bytes += len(data)
+            return entry
+        finally:
+            with self._lock:
+                self._inflight.pop(digest, None)
+            event.set()
+
+    def summary(self) -> str:
+        return f"업로드 {self.uploads}개 ({self.upload_bytes / 1e6:.1f} MB), 재사용 {self.reused}회"
+
+
+def _inline_parts(request: dict):
+    """request 안의 inline_data part들 (snake_case/camelCase 모두)"""
+    for content in request.get("contents", []) or []:
+        for part in content.get("parts", []) or []:
+            for key in ("inline_data", "inlineData"):
+                if isinstance(part.get(key), dict):
+                    yield part, key
+
+
+def _open_text(path: Path, mode: str):
+    """.jsonl.gz(batch.build_compress)도 같은 방식으로"""
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=1) if "w" in mode \
+            else gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def externalize_references(jsonl_path, cache: ReferenceCache = None, out_path=None) -> dict:
+    """inline_data → file_data(URI)로 바꾼 JSONL 작성 → {path, before_bytes, after_bytes, parts, unique}
+    원본은 한 줄씩 읽고 쓰므로 메모리는 요청 1건 크기만 사용"""
+    cache = cache or ReferenceCache()
+    jsonl_path = Path(jsonl_path)
+    if out_path is None:
+        name = jsonl_path.name.replace(".jsonl", ".files.jsonl", 1)
+        out_path = jsonl_path.with_name(name if name != jsonl_path.name else name + ".files")
+    out_path = Path(out_path)
+    workers = max(1, int(cache.cfg["reference_upload_workers"]))
+    parts_total = 0
+    digests = set()
+
+    with _open_text(jsonl_path, "r") as src, _open_text(out_path, "w") as dst, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        for line in src:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            request = item.get("request", item)
+            jobs = []
+            for part, key in _inline_parts(request):
+                inline = part[key]
+                b64 = inline.get("data", "")
+                mime = inline.get("mime_type") or inline.get("mimeType") or "image/jpeg"
+                # base64 텍스트 그대로 해시 — 디코드는 업로드할 때만
+                digest = hashlib.sha256(b64.encode("ascii")).hexdigest()
+                digests.add(digest)
+                jobs.append((part, key, pool.submit(cache.get, digest, lambda b=b64: base64.b64decode(b), mime)))
+            for part, key, fut in jobs:
+                entry = fut.result()
+                del part[key]
+                if key == "inlineData":
+                    part["fileData"] = {"fileUri": entry["uri"], "mimeType": entry["mime_type"]}
+                else:
+                    part["file_data"] = {"file_uri": entry["uri"], "mime_type": entry["mime_type"]}
+            parts_total += len(jobs)
+            dst.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    cache.save()
+    return {
+        "path": str(out_path),
+        "before_bytes": jsonl_path.stat().st_size,
+        "after_bytes": out_path.stat().st_size,
+        "parts": parts_total,
+        "unique": len(digests),
+    }
+
+
+_cache = None
+
+
+def get_reference_cache() -> ReferenceCache:
+    global _cache
+    if _cache is None:
+        _cache = ReferenceCache()
+    return _cache
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+재시도 정책 — 실패를 분류해서 분류별 재시도 횟수/백오프 적용 + 전체 재시도 토큰 예산
+
+분류:
+  rate_limited : 429 / RESOURCE_EXHAUSTED
+  unavailable  : 503 / UNAVAILABLE / overloaded
+  empty_image  : 응답에 이미지 없음
+  safety       : 안전 필터 차단 (같은 프롬프트는 다시 보내도 같은 결과)
+  timeout      : 요청 deadline/소켓 timeout
+  other        : 그 외 (재시도 안 함)
+
+예산: 성공 1회마다 budget_ratio 토큰 적립, 재시도 1회에 1토큰 소모 (최대 budget_max).
+재시도 호출이 성공 호출의 budget_ratio 비율을 넘지 않으므로
+API 과사용을 사후에 감지해서 중단하기 전에 미리 막는다.
+
+설정: config/settings.json "retry"
+"""
+import json
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+
+EMPTY_IMAGE_ERROR = "응답에 이미지 없음"
+
+DEFAULT_CLASSES = {
+    "rate_limited": {"max_retries": 2, "backoff_seconds": 30, "backoff_max_seconds": 120},
+    "unavailable": {"max_retries": 2, "backoff_seconds": 20, "backoff_max_seconds": 120},
+    "empty_image": {"max_retries": 1, "backoff_seconds": 5, "backoff_max_seconds": 5},
+    "safety": {"max_retries": 0, "backoff_seconds": 0, "backoff_max_seconds": 0},
+    "timeout": {"max_retries": 1, "backoff_seconds": 10, "backoff_max_seconds": 30},
+    "other": {"max_retries": 0, "backoff_seconds": 0, "backoff_max_seconds": 0},
+}
+
+DEFAULT_RETRY = {
+    "budget_ratio": 0.2,
+    "budget_initial": 5,
+    "budget_max": 20,
+}
+
+
+def classify_failure(error: str) -> str:
+    text = str(error or "")
+    low = text.lower()
+    if "429" in text or "RESOURCE_EXHAUSTED" in text or "rate limit" in low:
+        return "rate_limited"
+    if "503" in text or "UNAVAILABLE" in text or "overloaded" in low:
+        return "unavailable"
+    if EMPTY_IMAGE_ERROR in text or "no image" in low:
+        return "empty_image"
+    if "safety" in low or "blocked" in low or "PROHIBITED_CONTENT" in text or "안전" in text:
+        return "safety"
+    if "timeout" in low or "timed out" in low or "deadline" in low:
+        return "timeout"
+    return "other"
+
+
+def load_retry_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            cfg = json.load(f).get("retry", {})
+    except (OSError, ValueError):
+        cfg = {}
+    classes = {k: {**v, **cfg.get("classes", {}).get(k, {})} for k, v in DEFAULT_CLASSES.items()}
+    return {**DEFAULT_RETRY, **{k: v for k, v in cfg.items() if k != "classes"}, "classes": classes}
+
+
+class RetryBudget:
+    """토큰 버킷 — 성공이 적립하고 재시도가 소모"""
+
+    def __init__(self, ratio: float, initial: float, maximum: float):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = min(initial, maximum)
+        self._lock = threading.Lock()
+
+    def on_success(self):
+        with self._lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class RetryDecision:
+    def __init__(self, retry: bool, cls: str, delay: float = 0.0, max_retries: int = 0, reason: str = ""):
+        self.retry = retry
+        self.cls = cls
+        self.delay = delay
+        self.max_retries = max_retries
+        self.reason = reason
+
+
+class RetryEngine:
+    def __init__(self, cfg: dict = None):
+        self.cfg = cfg or load_retry_config()
+        self.budget = RetryBudget(self.cfg["budget_ratio"], self.cfg["budget_initial"], self.cfg["budget_max"])
+        self.stats = {}  # cls -> {"failures", "retries", "denied"}
+
+    def _stat(self, cls: str) -> dict:
+        return self.stats.setdefault(cls, {"failures": 0, "retries": 0, "denied": 0})
+
+    def on_success(self):
+        self.budget.on_success()
+
+    def decide(self, error: str, attempt: int) -> RetryDecision:
+        """attempt번째(0부터) 재시도를 할지. 하기로 하면 예산 토큰 1개 소모"""
+        cls = classify_failure(error)
+        policy = self.cfg["classes"].get(cls, DEFAULT_CLASSES["other"])
+        stat = self._stat(cls)
+        if attempt == 0:
+            stat["failures"] += 1
+        if attempt >= policy["max_retries"]:
+            return RetryDecision(False, cls, max_retries=policy["max_retries"], reason="max retries")
+        if not self.budget.try_acquire():
+            stat["denied"] += 1
+            return RetryDecision(False, cls, max_retries=policy["max_retries"], reason="budget exhausted")
+        stat["retries"] += 1
+        delay = min(policy["backoff_seconds"] * (2 ** attempt), policy["backoff_max_seconds"])
+        return RetryDecision(True, cls, delay, policy["max_retries"])
+
+    def summary(self) -> str:
+        parts = [f"{cls} 실패 {s['failures']}/재시도 {s['retries']}" + (f"/예산거부 {s['denied']}" if s["denied"] else "")
+                 for cls, s in sorted(self.stats.items())]
+        return f"{' | '.join(parts) or '없음'} (예산 {self.budget.tokens:.1f})"
+
+
+_engine = None
+
+
+def get_retry_engine() -> RetryEngine:
+    """프로세스 공용 엔진 — generate.py 내부 재시도도 같은 예산을 쓰도록"""
+    global _engine
+    if _engine is None:
+        _engine = RetryEngine()
+    return _engine
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+비동기 Slack 알림 큐 — 웹훅이 느려도 생성 루프가 멈추지 않게, 연속 실패 때 채널이 도배되지 않게
+
+slack_notify의 send_slack / notify_* 와 같은 이름·인자의 함수를 제공한다.
+호출은 큐에 넣고 바로 반환, 전송은 백그라운드 스레드가 slack_notify의 원래 함수로 한다.
+
+  묶기     같은 종류(coalesce key)는 첫 건만 바로 보내고, 창(coalesce_seconds) 안의 나머지는
+           마지막 인자 한 건으로 합쳐 창이 끝날 때 전송 (send_slack은 "(외 N건)" 표시)
+  속도     분당 rate_per_minute건 (토큰 버킷, burst rate_burst)
+  재시도   실패(예외 또는 False 반환)는 지수 백오프로 max_retries까지.
+           재시도 대기분은 프로세스별 output/logs/slack-spool.{pid}.json에 남겨 다음 실행 때 이어서 전송.
+           시작할 때 주인 프로세스가 끝난(락이 풀린) spool만 가져옴 — 여러 워커가 같은 알림을 다시 보내지 않게
+  종료     atexit에서 flush_timeout_seconds 안에 남은 알림 전송, 못 보낸 것은 spool로
+  검사     넣을 때 slack_notify 원래 함수의 시그니처에 인자를 맞춰 봄 — 안 맞으면 호출한 쪽에서 TypeError
+           (전송 스레드에서 실패해 경고만 남고 묻히지 않게. slack_notify를 못 불러오면 검사 생략)
+
+사용:
+  from slack_queue import send_slack, notify_cost_limit, flush
+"""
+import atexit
+import importlib
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "session-controller" / "scripts"))
+
+from file_lock import FileLock
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+SPOOL_FILE = BASE_DIR / "output" / "logs" / "slack-spool.json"
+
+DEFAULT_QUEUE = {
+    "enabled": True,
+    "queue_size": 200,
+    "rate_per_minute": 10,
+    "rate_burst": 5,
+    "max_retries": 5,
+    "retry_base_seconds": 5,
+    "flush_timeout_seconds": 10,
+    # 종류별 묶기 창 (초). send_slack은 이모지별로 ("send_slack:⏰")
+    "coalesce_seconds": {
+        "default": 0,
+        "notify_consecutive_errors": 300,
+        "notify_model_switch": 120,
+        "notify_cost_limit": 600,
+        "send_slack:⏰": 600,
+        "send_slack:❌": 300,
+    },
+}
+
+
+def _load_queue_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            queue = json.load(f).get("notifications", {}).get("queue", {})
+    except (OSError, ValueError):
+        queue = {}
+    cfg = {k: queue.get(k, v) for k, v in DEFAULT_QUEUE.items()}
+    cfg["coalesce_seconds"] = {**DEFAULT_QUEUE["coalesce_seconds"], **queue.get("coalesce_seconds", {})}
+    return cfg
+
+
+def _default_resolve(kind: str):
+    return getattr(importlib.import_module("slack_notify"), kind)
+
+
+class _Item:
+    __slots__ = ("kind", "key", "args", "kwargs", "count", "due", "attempts", "durable")
+
+    def __init__(self, kind, key, args, kwargs, due, count=1, attempts=0, durable=False):
+        self.kind = kind
+        self.key = key
+        self.args = list(args)
+        self.kwargs = dict(kwargs)
+        self.count = count
+        self.due = due
+        self.attempts = attempts
+        self.durable = durable  # spool에 있음 — 전송되면 spool에서도 지움
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "key": self.key, "args": self.args, "kwargs": self.kwargs,
+                "count": self.count, "attempts": self.attempts}
+
+
+class SlackQueue:
+    def __init__(self, cfg: dict = None, resolve=None, spool_file=None, clock=time):
+        self.cfg = cfg or _load_queue_config()
+        self.resolve = resolve or _default_resolve
+        base = Path(spool_file or SPOOL_FILE)
+        self.spool_base = base
+        self.spool_file = base.with_name(f"{base.stem}.{os.getpid()}{base.suffix}")
+        self.clock = clock
+        self.items = []          # 전송 대기 (due 순서 무관, 작음)
+        self.last_sent = {}      # key -> 마지막 전송(예정) 시각 (묶기 창 시작)
+        self.tokens = float(self.cfg["rate_burst"])
+        self.token_at = clock.time()
+        self.stats = {"queued": 0, "sent": 0, "coalesced": 0, "dropped": 0, "retried": 0, "failed": 0}
+        self._cond = threading.Condition()
+        self._sending = 0
+        self._closed = False
+        self._flushing = False
+        self._thread = None
+        # 살아 있는 동안 잡고 있는 락 — 다른 프로세스는 이 락이 풀린 spool만 가져감
+        self._spool_lock = FileLock(self.spool_file.with_suffix(".lock"))
+        self._spool_lock.acquire(blocking=False)
+        self._spool_owner = threading.current_thread()
+        self._load_spool()
+
+    # ── 넣기 ────────────────────────────────────────────
+    def _key(self, kind: str, args, kwargs) -> str:
+        if kind == "send_slack":
+            emoji = args[1] if len(args) > 1 else kwargs.get("emoji", "")
+            return f"send_slack:{emoji}"
+        return kind
+
+    def _check_args(self, kind: str, args, kwargs):
+        """원래 함수에 넘길 수 있는 인자인지 — 안 맞으면 TypeError"""
+        try:
+            sig = inspect.signature(self.resolve(kind))
+        except (ImportError, AttributeError, TypeError, ValueError):
+            return
+        try:
+            sig.bind(*args, **kwargs)
+        except TypeError as e:
+            raise TypeError(f"{kind}: {e}") from None
+
+    def post(self, kind: str, *args, **kwargs):
+        """알림 1건을 큐에 넣고 바로 반환. 인자가 원래 함수와 안 맞으면 TypeError"""
+        self._check_args(kind, args, kwargs)
+        key = self._key(kind, args, kwargs)
+        window = self.cfg["coalesce_seconds"].get(key, self.cfg["coalesce_seconds"].get("default", 0))
+        with self._cond:
+            now = self.clock.time()
+            self.stats["queued"] += 1
+            if window > 0:
+                for item in self.items:
+                    if item.key == key and item.attempts == 0:
+                        # 창 안의 같은 종류 — 마지막 인자로 합침 (due는 그대로)
+                        item.args, item.kwargs = list(args), dict(kwargs)
+                        item.count += 1
+                        self.stats["coalesced"] += 1
+                        return
+                started = self.last_sent.get(key)
+                due = started + window if started is not None and now - started < window else now
+                self.last_sent[key] = due  # 다음 창은 이 건을 보내는 시점부터
+            else:
+                due = now
+            if len(self.items) >= self.cfg["queue_size"]:
+                oldest = min(self.items, key=lambda i: i.due)
+                self.items.remove(oldest)
+                self.stats["dropped"] += 1
+            self.items.append(_Item(kind, key, args, kwargs, due))
+            self._ensure_thread()
+            self._cond.notify()
+
+    # ── 전송 스레드 ─────────────────────────────────────
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="slack-queue", daemon=True)
+            self._thread.start()
+
+    def _take_token(self, now: float) -> float:
+        """토큰이 있으면 0, 없으면 다음 토큰까지 대기 시간"""
+        rate = self.cfg["rate_per_minute"] / 60.0
+        self.tokens = min(float(self.cfg["rate_burst"]), self.tokens + (now - self.token_at) * rate)
+        self.token_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+    def _next(self):
+        """보낼 항목 또는 (None, 대기 시간). 락 안에서 호출"""
+        if self._closed or not self.items:
+            return None, None
+        now = self.clock.time()
+        item = min(self.items, key=lambda i: i.due)
+        if item.due > now:
+            return None, item.due - now
+        wait = 0.0 if self._flushing else self._take_token(now)
+        if wait > 0:
+            return None, wait
+        self.items.remove(item)
+        return item, 0.0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                item, wait = self._next()
+                while item is None:
+                    if self._closed:
+                        return
+                    self._cond.wait(wait)
+                    item, wait = self._next()
+                self._sending += 1
+            ok = self._send(item)
+            with self._cond:
+                self._sending -= 1
+                if ok:
+                    self.stats["sent"] += 1
+                    if item.durable:
+                        self._save_spool()
+                else:
+                    self._retry(item)
+                self._cond.notify_all()
+
+    def _send(self, item: _Item) -> bool:
+        args = list(item.args)
+        if item.kind == "send_slack" and item.count > 1 and args:
+            args[0] = f"{args[0]} (외 {item.count - 1}건)"
+        try:
+            return self.resolve(item.kind)(*args, **item.kwargs) is not False
+        except Exception as e:
+            print(f"[WARN] Slack 전송 실패 ({item.kind}): {str(e)[:80]}")
+            return False
+
+    def _retry(self, item: _Item):
+        item.attempts += 1
+        if item.attempts > self.cfg["max_retries"]:
+            self.stats["failed"] += 1
+            print(f"[WARN] Slack {item.kind} {self.cfg['max_retries']}회 재시도 실패 — 버림")
+        else:
+            self.stats["retried"] += 1
+            item.due = self.clock.time() + self.cfg["retry_base_seconds"] * (2 ** (item.attempts - 1))
+            item.durable = True
+            self.items.append(item)
+        # 닫힌 뒤 끝난 전송이면 남은 전부를, 아니면 재시도 대기분을 spool로
+        self._save_spool(self.items if self._closed else None)
+
+    # ── spool (재시도 대기분 디스크 보관) ─────────────────
+    def _read_spool(self, path: Path) -> list:
+        """spool 파일을 읽고 지움 (가져간 뒤에는 이 프로세스 spool로 다시 기록)"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            path.unlink()
+        except (OSError, ValueError):
+            return []
+        return saved if isinstance(saved, list) else []
+
+    def _claim_spools(self) -> list:
+        """이 프로세스 것(같은 pid였던 지난 실행) + 주인이 끝난 다른 spool. 예전 공용 파일(slack-spool.json) 포함"""
+        base = self.spool_base
+        saved = self._read_spool(self.spool_file)
+        for path in [base] + sorted(base.parent.glob(f"{base.stem}.*{base.suffix}")):
+            if path == self.spool_file or not path.exists():
+                continue
+            owner = FileLock(path.with_suffix(".lock"))
+            if not owner.acquire(blocking=False):
+                continue  # 아직 실행 중인 워커 — 그 워커가 직접 재시도
+            try:
+                saved += self._read_spool(path)
+                path.with_suffix(".lock").unlink()
+            except OSError:
+                pass
+            finally:
+                owner.release()
+        return saved
+
+    def _load_spool(self):
+        saved = self._claim_spools()
+        now = self.clock.time()
+        for d in saved[-self.cfg["queue_size"]:]:
+            self.items.append(_Item(d["kind"], d["key"], d.get("args", []), d.get("kwargs", {}), now,
+                                    d.get("count", 1), d.get("attempts", 0), durable=True))
+        if self.items:
+            print(f"[SLACK] 지난 실행에서 못 보낸 알림 {len(self.items)}건 재전송")
+            self._save_spool()
+            self._ensure_thread()
+
+    def _save_spool(self, items=None):
+        """락 안에서 호출. durable 항목(종료 시에는 남은 전부)을 기록, 없으면 파일 삭제"""
+        pending = [i for i in self.items if i.durable] if items is None else list(items)
+        try:
+            if not pending:
+                if self.spool_file.exists():
+                    self.spool_file.unlink()
+                return
+            self.spool_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.spool_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump([i.to_dict() for i in pending], f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.spool_file)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[WARN] Slack spool 기록 실패: {e}")
+
+    # ── 종료 ────────────────────────────────────────────
+    def flush(self, timeout: float = None) -> int:
+        """묶기 창/속도 제한을 무시하고 남은 알림을 timeout 안에 전송 → 못 보낸 건수"""
+        timeout = self.cfg["flush_timeout_seconds"] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            now = self.clock.time()
+            for item in self.items:
+                if item.attempts == 0:
+                    item.due = min(item.due, now)
+            self._flushing = True
+            if self.items:
+                self._ensure_thread()
+            self._cond.notify_all()
+            while (any(i.due <= self.clock.time() for i in self.items) or self._sending) \
+                    and time.monotonic() < deadline:
+                self._cond.wait(min(0.1, max(0.0, deadline - time.monotonic())))
+            self._flushing = False
+            return len(self.items)
+
+    def close(self, timeout: float = None) -> int:
+        """flush 후 전송 스레드 종료. 못 보낸 알림(진행 중이다 실패한 것 포함)은 spool로 → 다음 실행 때 전송"""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._save_spool(self.items)
+            self._cond.notify_all()
+            left = len(self.items)
+        if threading.current_thread() is self._spool_owner:  # 다른 스레드면 프로세스 종료 때 OS가 풂
+            if not left and self._spool_lock.locked:
+                try:
+                    self._spool_lock.path.unlink()
+                except OSError:
+                    pass
+            self._spool_lock.release()
+        return left
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"전송 {s['sent']} | 묶음 {s['coalesced']} | 재시도 {s['retried']} | "
+                f"버림 {s['dropped'] + s['failed']} | 대기 {len(self.items)}")
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_slack_queue() -> SlackQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = SlackQueue()
+            atexit.register(_queue.close)
+    return _queue
+
+
+_enabled = None
+
+
+def _post(kind: str, *args, **kwargs):
+    """큐를 끈 경우(notifications.queue.enabled=false)에는 기존처럼 바로 전송"""
+    global _enabled
+    if _enabled is None:
+        _enabled = bool(_load_queue_config()["enabled"])
+    if not _enabled:
+        return _default_resolve(kind)(*args, **kwargs)
+    get_slack_queue().post(kind, *args, **kwargs)
+
+
+def flush(timeout: float = None) -> int:
+    return get_slack_queue().flush(timeout) if _queue is not None else 0
+
+
+# ── slack_notify와 같은 이름의 비동기 함수 ──────────────
+def send_slack(*args, **kwargs):
+    _post("send_slack", *args, **kwargs)
+
+
+def notify_consecutive_errors(*args, **kwargs):
+    _post("notify_consecutive_errors", *args, **kwargs)
+
+
+def notify_model_switch(*args, **kwargs):
+    _post("notify_model_switch", *args, **kwargs)
+
+
+def notify_cost_limit(*args, **kwargs):
+    _post("notify_cost_limit", *args, **kwargs)
+
+
+def notify_session_complete(*args, **kwargs):
+    _post("notify_session_complete", *args, **kwargs)
+
+
+def notify_batch_submitted(*args, **kwargs):
+    _post("notify_batch_submitted", *args, **kwargs)
+
+
+def notify_batch_complete(*args, **kwargs):
+    _post("notify_batch_complete", *args, **kwargs)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+이미지 특징 로컬 추출 — 좋아요/생성 이미지를 CPU(NumPy)로 분석 (API 비용 0)
+
+취향 분석(enhance_phase2)은 유료 비전 LLM 추출(output/likes_analysis/extracted_gpt4o.json,
+extracted_gemini.json)에 기대고 있었다. 같은 스키마({"id", "analysis": {...}})를
+output/likes_analysis/extracted_local.json으로 만든다.
+
+측정값 (작은 썸네일에서, 프로세스 풀로 병렬)
+  palette           3비트/채널 색 구간 상위 N개 (hex, 비율)
+  brightness/contrast/saturation   밝기 평균, RMS 대비, HSV 채도 평균
+  cct_kelvin, warmth               평균색 CCT (McCamy), 채도 가중 R-B
+  edge_density                     Sobel 기울기 > 문턱 비율
+  saliency_*                       spectral residual 돌출 맵의 중심/퍼짐/집중도
+  sharpness_ratio                  돌출 영역 vs 주변 Laplacian 분산 비
+LLM 스키마 라벨은 위 측정값의 문턱값 규칙 (color_temperature, depth_of_field, dimension,
+render_quality, emotional_appeal). has_nature/has_architecture/has_character 같은
+피사체 의미는 픽셀 통계로 알 수 없어 null.
+
+결과는 이미지 sha256 기준으로 output/likes_analysis/local-features-cache.json에 캐시 —
+파일 (mtime, size)가 그대로면 다시 읽지도 않는다. FEATURE_VERSION을 올리면 다시 계산.
+
+NumPy/Pillow는 이 모듈을 쓸 때만 필요 (생성 루프와 무관): pip install numpy pillow
+
+사용:
+  python image_features.py              # 좋아요 + 생성 이미지 전체
+  python image_features.py --liked-only --workers 4
+"""
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+LIKES_DIR = BASE_DIR / "output" / "likes"
+IMAGES_DIR = BASE_DIR / "output" / "images"
+INDEX_FILE = IMAGES_DIR / "index.sqlite3"
+ANALYSIS_DIR = BASE_DIR / "output" / "likes_analysis"
+CACHE_FILE = ANALYSIS_DIR / "local-features-cache.json"
+EXTRACTED_FILE = ANALYSIS_DIR / "extracted_local.json"
+
+FEATURE_VERSION = 1
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+DEFAULT_FEATURES = {
+    "workers": 0,         # 0 = CPU 수
+    "thumb_size": 256,    # 긴 변 기준 축소 크기
+    "palette_size": 5,
+    "chunksize": 4,       # 풀에 한 번에 넘기는 이미지 수
+}
+
+
+def _load_features_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_FEATURES, **json.load(f).get("features", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_FEATURES)
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+        from PIL import Image
+    except ImportError as e:
+        raise ImportError(f"이미지 특징 추출에는 numpy, pillow 필요 (pip install numpy pillow): {e}") from e
+    return np, Image
+
+
+# ── 특징 계산 (워커 프로세스) ───────────────────────────
+def _load_rgb(data: bytes, thumb_size: int):
+    """bytes → float32 RGB (H, W, 3) 0~1. JPEG는 draft로 축소 디코드"""
+    import io
+    np, Image = _require_numpy()
+    with Image.open(io.BytesIO(data)) as im:
+        im.draft("RGB", (thumb_size, thumb_size))
+        im = im.convert("RGB")
+        im.thumbnail((thumb_size, thumb_size), Image.BILINEAR)
+        return np.asarray(im, dtype=np.float32) / 255.0
+
+
+def _cct(rgb_mean) -> float:
+    """평균 sRGB → 상관 색온도 (McCamy 근사)"""
+    np, _ = _require_numpy()
+    c = np.where(rgb_mean <= 0.04045, rgb_mean / 12.92, ((rgb_mean + 0.055) / 1.055) ** 2.4)
+    x_, y_, z_ = (np.array([[0.4124, 0.3576, 0.1805], [0.2126, 0.7152, 0.0722], [0.0193, 0.1192, 0.9505]]) @ c)
+    total = x_ + y_ + z_
+    if total <= 1e-6:
+        return 0.0
+    x, y = x_ / total, y_ / total
+    n = (x - 0.3320) / (0.1858 - y)
+    return float(max(1000.0, min(40000.0, 449 * n ** 3 + 3525 * n ** 2 + 6823.3 * n + 5520.33)))
+
+
+def _box_blur(a, k: int = 3):
+    np, _ = _require_numpy()
+    pad = k // 2
+    p = np.pad(a, pad, mode="edge")
+    c = p.cumsum(0).cumsum(1)
+    c = np.pad(c, ((1, 0), (1, 0)))
+    return (c[k:, k:] - c[:-k, k:] - c[k:, :-k] + c[:-k, :-k]) / (k * k)
+
+
+def _saliency(luma):
+    """spectral residual (Hou & Zhang 2007) — 64px 축소 luma에서 돌출 맵 (합 1)"""
+    np, _ = _require_numpy()
+    h, w = luma.shape
+    step_y, step_x = max(1, h // 64), max(1, w // 64)
+    small = luma[::step_y, ::step_x]
+    spec = np.fft.fft2(small)
+    log_amp = np.log(np.abs(spec) + 1e-8)
+    residual = log_amp - _box_blur(log_amp, 3)
+    sal = np.abs(np.fft.ifft2(np.exp(residual + 1j * np.angle(spec)))) ** 2
+    sal = _box_blur(sal, 5)
+    total = sal.sum()
+    return sal / total if total > 0 else np.full_like(sal, 1.0 / sal.size)
+
+
+def _labels(f: dict) -> dict:
+    """측정값 → LLM 추출 스키마 라벨 (문턱값 규칙)"""
+    if f["warmth"] > 0.03 or f["cct_kelvin"] < 4500:
+        temp = "warm"
+    elif f["warmth"] < -0.03 or f["cct_kelvin"] > 7500:
+        temp = "cool"
+    else:
+        temp = "neutral"
+    dof = "shallow" if f["sharpness_ratio"] > 2.5 and f["saliency_concentration"] > 0.3 else "deep"
+    flat = f["flat_ratio"] > 0.55 and f["color_count"] < 120
+    dimension = "2d" if flat else "3d"
+    render = "stylized" if flat or f["saturation"] > 0.65 else "photorealistic"
+    if f["brightness"] < 0.3:
+        mood = "mysterious"
+    elif f["saturation"] > 0.5 and f["brightness"] > 0.55:
+        mood = "playful"
+    elif f["contrast"] < 0.18 and f["brightness"] > 0.55:
+        mood = "serene"
+    elif f["saturation"] < 0.25 and f["contrast"] > 0.22:
+        mood = "elegant"
+    else:
+        mood = "other"
+    return {"color_temperature": temp, "depth_of_field": dof, "dimension": dimension,
+            "render_quality": render, "emotional_appeal": mood,
+            "has_nature": None, "has_architecture": None, "has_character": None}
+
+
+def extract_features(data: bytes, thumb_size: int = 256, palette_size: int = 5) -> dict:
+    """이미지 bytes → analysis dict (측정값 + 라벨)"""
+    np, _ = _require_numpy()
+    rgb = _load_rgb(data, thumb_size)
+    h, w, _ = rgb.shape
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    luma = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    mx, mn = rgb.max(axis=2), rgb.min(axis=2)
+    sat = np.where(mx > 1e-6, (mx - mn) / np.maximum(mx, 1e-6), 0.0)
+
+    # 팔레트: 채널당 3비트(512칸) 히스토그램 상위 구간의 평균색
+    q = (rgb * 7.999).astype(np.int32)
+    bins = (q[..., 0] << 6 | q[..., 1] << 3 | q[..., 2]).ravel()
+    counts = np.bincount(bins, minlength=512)
+    flat_rgb = rgb.reshape(-1, 3)
+    sums = np.stack([np.bincount(bins, weights=flat_rgb[:, c], minlength=512) for c in range(3)], axis=1)
+    palette = []
+    for i in np.argsort(-counts)[:palette_size]:
+        if counts[i] == 0:
+            break
+        c = (sums[i] / counts[i] * 255).round().astype(int)
+        palette.append({"hex": "#%02x%02x%02x" % tuple(c), "share": round(float(counts[i] / bins.size), 4)})
+    q5 = (rgb * 31.999).astype(np.int32)
+    color_count = int(np.unique(q5[..., 0] << 10 | q5[..., 1] << 5 | q5[..., 2]).size)
+
+    # 기울기/가장자리 (Sobel), 평탄 영역
+    p = np.pad(luma, 1, mode="edge")
+    gx = (p[:-2, 2:] + 2 * p[1:-1, 2:] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[1:-1, :-2] + p[2:, :-2])
+    gy = (p[2:, :-2] + 2 * p[2:, 1:-1] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[:-2, 1:-1] + p[:-2, 2:])
+    grad = np.hypot(gx, gy) / 4
+    lap = np.abs(p[:-2, 1:-1] + p[2:, 1:-1] + p[1:-1, :-2] + p[1:-1, 2:] - 4 * luma)
+
+    # 돌출 맵 → 중심/퍼짐/집중도, 돌출 영역 vs 주변 선명도
+    sal = _saliency(luma)
+    sh, sw = sal.shape
+    ys, xs = np.mgrid[0:sh, 0:sw]
+    cy, cx = float((sal * ys).sum() / sh), float((sal * xs).sum() / sw)
+    spread = float(np.sqrt((sal * (((ys / sh) - cy) ** 2 + ((xs / sw) - cx) ** 2)).sum()))
+    top = np.sort(sal.ravel())[::-1]
+    concentration = float(top[:max(1, top.size // 10)].sum())
+    mask = np.repeat(np.repeat(sal >= np.quantile(sal, 0.8), max(1, h // 64), 0), max(1, w // 64), 1)
+    mask = np.pad(mask, ((0, max(0, h - mask.shape[0])), (0, max(0, w - mask.shape[1]))))[:h, :w]
+    fg = lap[mask].var() if mask.any() else 0.0
+    bg = lap[~mask].var() if (~mask).any() else 0.0
+
+    rgb_mean = rgb.reshape(-1, 3).mean(axis=0)
+    f = {
+        "width": int(w), "height": int(h),
+        "palette": palette,
+        "color_count": color_count,
+        "brightness": round(float(luma.mean()), 4),
+        "contrast": round(float(luma.std()), 4),
+        "saturation": round(float(sat.mean()), 4),
+        "cct_kelvin": round(_cct(rgb_mean)),
+        "warmth": round(float(((r - b) * sat).sum() / max(float(sat.sum()), 1e-6)), 4),
+        "edge_density": round(float((grad > 0.1).mean()), 4),
+        "flat_ratio": round(float((grad < 0.01).mean()), 4),
+        "saliency_center": [round(cx, 3), round(cy, 3)],
+        "saliency_spread": round(spread, 4),
+        "saliency_concentration": round(concentration, 4),
+        "sharpness_ratio": round(float(fg / bg) if bg > 1e-9 else 0.0, 3),
+    }
+    return {**_labels(f), **f}
+
+
+def _extract_file(job: tuple) -> tuple:
+    """(path, 알려진 sha256 집합에 있으면 건너뜀) → (path, sha256, analysis 또는 None, 오류)"""
+    path, known, thumb_size, palette_size = job
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return path, None, None, str(e)
+    sha = hashlib.sha256(data).hexdigest()
+    if sha in known:
+        return path, sha, None, None
+    try:
+        return path, sha, extract_features(data, thumb_size, palette_size), None
+    except Exception as e:
+        return path, sha, None, f"{type(e).__name__}: {e}"
+
+
+_known = frozenset()
+
+
+def _init_worker(known):
+    global _known
+    _known = known
+
+
+def _extract_in_worker(job: tuple) -> tuple:
+    return _extract_file((job[0], _known, job[1], job[2]))
+
+
+# ── 캐시 ────────────────────────────────────────────────
+class FeatureCache:
+    """sha256 → analysis, 파일 경로 → [mtime, size, sha256]"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path)
+        self.files = {}
+        self.features = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == FEATURE_VERSION:
+                self.files = data.get("files", {})
+                self.features = data.get("features", {})
+        except (OSError, ValueError):
+            pass
+
+    def sha_for(self, path: str):
+        """파일이 그대로면 이전 sha256 (다시 읽지 않음)"""
+        entry = self.files.get(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if entry and entry[:2] == [int(st.st_mtime), st.st_size] and entry[2] in self.features:
+            return entry[2]
+        return None
+
+    def put(self, path: str, sha: str, analysis: dict = None):
+        try:
+            st = os.stat(path)
+            self.files[path] = [int(st.st_mtime), st.st_size, sha]
+        except OSError:
+            pass
+        if analysis is not None:
+            self.features[sha] = analysis
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": FEATURE_VERSION, "files": self.files, "features": self.features}, f)
+        os.replace(tmp, self.path)
+
+
+def extract_batch(paths, cache: FeatureCache = None, workers: int = None, cfg: dict = None) -> dict:
+    """경로들 → {path: analysis}. 캐시에 있는 건 읽지 않고, 나머지는 프로세스 풀에서"""
+    cfg = cfg or _load_features_config()
+    cache = cache if cache is not None else FeatureCache()
+    results, todo = {}, []
+    for path in dict.fromkeys(str(p) for p in paths):
+        sha = cache.sha_for(path)
+        if sha:
+            results[path] = cache.features[sha]
+        else:
+            todo.append(path)
+    if not todo:
+        return results
+    workers = workers or int(cfg["workers"]) or (os.cpu_count() or 2)
+    known = frozenset(cache.features)
+    errors = 0
+    if workers <= 1 or len(todo) == 1:
+        out = (_extract_file((p, known, cfg["thumb_size"], cfg["palette_size"])) for p in todo)
+        errors = _collect(out, cache, results)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(known,)) as pool:
+            jobs = [(p, cfg["thumb_size"], cfg["palette_size"]) for p in todo]
+            errors = _collect(pool.map(_extract_in_worker, jobs, chunksize=max(1, int(cfg["chunksize"]))),
+                              cache, results)
+    if errors:
+        print(f"[WARN] 특징 추출 실패 {errors}건")
+    cache.save()
+    return results
+
+
+def _collect(out, cache: FeatureCache, results: dict) -> int:
+    errors = 0
+    for path, sha, analysis, err in out:
+        if err:
+            errors += 1
+            continue
+        cache.put(path, sha, analysis)
+        results[path] = cache.features.get(sha)
+    return errors
+
+
+# ── 대상 이미지 / 내보내기 ─────────────────────────────
+def _combo_id(path: str) -> str:
+    parts = os.path.basename(path).rsplit(".", 1)[0].split("_")
+    return parts[0] + "_" + parts[1] if len(parts) >= 2 else parts[0]
+
+
+def collect_images(liked_only: bool = False) -> list:
+    """[(id, path, liked)] — output/likes + 생성 이미지 (인덱스가 있으면 인덱스 경로)"""
+    items = {}
+    for ext in IMAGE_EXTS:
+        for f in glob.glob(str(LIKES_DIR / f"*{ext}")):
+            items.setdefault(_combo_id(f), (f, True))
+    if liked_only:
+        return [(cid, p, liked) for cid, (p, liked) in sorted(items.items())]
+    if INDEX_FILE.exists():
+        conn = sqlite3.connect(f"file:{INDEX_FILE}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT combo_id, path FROM images WHERE path IS NOT NULL").fetchall()
+        except sqlite3.Error:
+            rows = []
+        conn.close()
+        for cid, path in rows:
+            if cid not in items and os.path.exists(path):
+                items[cid] = (path, False)
+    else:
+        for ext in IMAGE_EXTS:
+            for f in glob.glob(str(IMAGES_DIR / "**" / f"*{ext}"), recursive=True):
+                if os.sep + "store" + os.sep not in f:
+                    items.setdefault(_combo_id(f), (f, False))
+    return [(cid, p, liked) for cid, (p, liked) in sorted(items.items())]
+
+
+def write_extracted(liked_only: bool = False, out_path=EXTRACTED_FILE, workers: int = None) -> dict:
+    """extracted_gpt4o.json과 같은 모양으로 저장 → 요약"""
+    items = collect_images(liked_only)
+    features = extract_batch([p for _, p, _ in items], workers=workers)
+    entries = [{"id": cid, "file": os.path.basename(p), "liked": liked, "source": "local",
+                "analysis": features[p]} for cid, p, liked in items if features.get(p)]
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out_path)
+    return {"images": len(items), "extracted": len(entries), "path": str(out_path)}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="이미지 특징 로컬 추출")
+    parser.add_argument("--liked-only", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    r = write_extracted(args.liked_only, workers=args.workers)
+    print(f"[OK] {r['extracted']}/{r['images']}장 → {r['path']}")
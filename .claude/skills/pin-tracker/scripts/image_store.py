@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+생성 이미지 저장소 — 해시로 분산 저장 + SQLite 메타데이터 인덱스
+
+  output/images/store/ab/cd/abcd….png      (sha256 앞 2+2자리로 샤딩, 같은 이미지는 한 번만)
+  output/images/index.sqlite3             (combo_id, 단어, 템플릿, 모델, 비용, 해상도, 좋아요, Drive ID)
+
+뷰어/분석/Drive 동기화는 디렉터리와 날짜별 metadata JSON을 다시 읽는 대신 인덱스를 조회한다.
+날짜별 metadata(track_pins.append_entry)는 기존 소비자를 위해 그대로 유지.
+
+store.mode (settings.json "store"):
+  link : 원본 위치는 두고 저장소에 하드링크 (다른 파일시스템이면 복사) — 기본
+  move : 원본을 저장소로 옮기고 result["file_path"]를 저장소 경로로 바꿈
+
+사용:
+  python image_store.py import     # 기존 metadata JSON + output/likes 를 인덱스로 가져오기
+  python image_store.py stats
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+IMAGES_DIR = BASE_DIR / "output" / "images"
+METADATA_DIR = IMAGES_DIR / "metadata"
+LIKES_DIR = BASE_DIR / "output" / "likes"
+
+DEFAULT_STORE = {
+    "root": "output/images/store",
+    "index": "output/images/index.sqlite3",
+    "mode": "link",
+}
+
+COLUMNS = [
+    "combo_id", "sha256", "path", "date", "word1", "word1_en", "word2", "word2_en",
+    "template_id", "model_used", "cost", "resolution", "width", "height", "bytes",
+    "liked", "drive_file_id", "created_at", "extra",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    combo_id      TEXT PRIMARY KEY,
+    sha256        TEXT,
+    path          TEXT,
+    date          TEXT,
+    word1         TEXT,
+    word1_en      TEXT,
+    word2         TEXT,
+    word2_en      TEXT,
+    template_id   TEXT,
+    model_used    TEXT,
+    cost          REAL,
+    resolution    TEXT,
+    width         INTEGER,
+    height        INTEGER,
+    bytes         INTEGER,
+    liked         INTEGER NOT NULL DEFAULT 0,
+    drive_file_id TEXT,
+    created_at    REAL,
+    extra         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images(sha256);
+CREATE INDEX IF NOT EXISTS idx_images_date ON images(date);
+CREATE INDEX IF NOT EXISTS idx_images_liked ON images(liked);
+CREATE INDEX IF NOT EXISTS idx_images_word1 ON images(word1);
+CREATE INDEX IF NOT EXISTS idx_images_word2 ON images(word2);
+CREATE INDEX IF NOT EXISTS idx_images_template ON images(template_id);
+"""
+
+
+def _load_store_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_STORE, **json.load(f).get("store", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_STORE)
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _parse_resolution(text) -> tuple:
+    try:
+        w, h = str(text).lower().split("x")
+        return int(w), int(h)
+    except ValueError:
+        return None, None
+
+
+class ImageStore:
+    def __init__(self, root=None, index_path=None, mode: str = None):
+        cfg = _load_store_config()
+        self.root = Path(root) if root else BASE_DIR / cfg["root"]
+        self.index_path = Path(index_path) if index_path else BASE_DIR / cfg["index"]
+        self.mode = mode or cfg["mode"]
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.index_path), timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ── 파일 ────────────────────────────────────────────
+    def path_for(self, sha256: str, ext: str = ".png") -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / f"{sha256}{ext}"
+
+    def put_file(self, src, sha256: str = None, mode: str = None) -> tuple:
+        """이미지 파일을 저장소로 → (저장소 경로, sha256). 같은 해시가 이미 있으면 복사하지 않음"""
+        src = Path(src)
+        sha256 = sha256 or file_sha256(src)
+        dest = self.path_for(sha256, src.suffix.lower() or ".png")
+        mode = mode or self.mode
+        if dest.exists():
+            if mode == "move" and src.resolve() != dest.resolve():
+                src.unlink()
+            return dest, sha256
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+        if mode == "move":
+            try:
+                os.replace(src, dest)
+                return dest, sha256
+            except OSError:
+                shutil.copy2(src, tmp)
+                os.replace(tmp, dest)
+                src.unlink()
+                return dest, sha256
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+        return dest, sha256
+
+    # ── 인덱스 ──────────────────────────────────────────
+    def upsert(self, record: dict):
+        row = {k: record.get(k) for k in COLUMNS}
+        if row["width"] is None and row["resolution"]:
+            row["width"], row["height"] = _parse_resolution(row["resolution"])
+        row["liked"] = int(bool(row["liked"]))
+        row["created_at"] = row["created_at"] or time.time()
+        extra = {k: v for k, v in record.items() if k not in COLUMNS and k != "file_path"}
+        row["extra"] = json.dumps(extra, ensure_ascii=False) if extra else None
+        cols = ", ".join(COLUMNS)
+        marks = ", ".join("?" for _ in COLUMNS)
+        # 같은 combo_id 재기록 시 새 값이 없는 컬럼은 기존 값 유지 (좋아요는 set_liked로만 해제)
+        updates = ", ".join(
+            f"{c}=MAX(excluded.{c}, {c})" if c == "liked"
+            else f"{c}=COALESCE({c}, excluded.{c})" if c == "created_at"
+            else f"{c}=COALESCE(excluded.{c}, {c})"
+            for c in COLUMNS if c != "combo_id"
+        )
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"INSERT INTO images ({cols}) VALUES ({marks}) ON CONFLICT(combo_id) DO UPDATE SET {updates}",
+                [row[c] for c in COLUMNS],
+            )
+
+    def add_result(self, result: dict, date: str) -> dict:
+        """생성 결과 1건 저장 + 인덱스. move 모드면 result["file_path"]를 저장소 경로로 바꿈"""
+        src = result.get("file_path")
+        path, sha = None, result.get("sha256")
+        if src and os.path.exists(src):
+            path, sha = self.put_file(src, sha)
+            if self.mode == "move":
+                result["file_path"] = str(path)
+        size = result.get("bytes") or (os.path.getsize(path) if path else None)
+        self.upsert({**result, "sha256": sha, "path": str(path) if path else src, "date": date, "bytes": size})
+        return result
+
+    def set_liked(self, combo_ids, liked: bool = True) -> int:
+        ids = [combo_ids] if isinstance(combo_ids, str) else list(combo_ids)
+        with self._lock, self.conn:
+            cur = self.conn.executemany("UPDATE images SET liked=? WHERE combo_id=?", [(int(liked), c) for c in ids])
+        return cur.rowcount
+
+    def set_drive_id(self, combo_id: str, drive_file_id: str):
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE images SET drive_file_id=? WHERE combo_id=?", (drive_file_id, combo_id))
+
+    def get(self, combo_id: str) -> dict:
+        row = self.conn.execute("SELECT * FROM images WHERE combo_id=?", (combo_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def query(self, where: str = "", params=(), order: str = "date, created_at") -> list:
+        """SQL WHERE 조건으로 조회 — 예: query("liked=1 AND word1=?", ("바다",))"""
+        sql = "SELECT * FROM images" + (f" WHERE {where}" if where else "") + (f" ORDER BY {order}" if order else "")
+        return [self._to_dict(r) for r in self.conn.execute(sql, params)]
+
+    def liked_ids(self) -> set:
+        return {r[0] for r in self.conn.execute("SELECT combo_id FROM images WHERE liked=1")}
+
+    def without_drive(self) -> list:
+        """Drive 업로드가 안 된 이미지 (Drive 동기화용)"""
+        return self.query("drive_file_id IS NULL AND path IS NOT NULL")
+
+    def iter_metadata(self):
+        """기존 날짜별 metadata JSON 항목 모양으로"""
+        for r in self.conn.execute("SELECT * FROM images ORDER BY date, created_at"):
+            yield self._to_dict(r)
+
+    def stats(self) -> dict:
+        row = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT sha256), SUM(liked), SUM(cost), SUM(bytes), "
+            "SUM(drive_file_id IS NOT NULL) FROM images"
+        ).fetchone()
+        return {"images": row[0], "unique": row[1], "liked": row[2] or 0, "cost": round(row[3] or 0, 2),
+                "bytes": row[4] or 0, "on_drive": row[5] or 0}
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        d = dict(row)
+        extra = d.pop("extra", None)
+        if extra:
+            d = {**json.loads(extra), **d}
+        d["file_path"] = d.get("path")
+        d["liked"] = bool(d.get("liked"))
+        return d
+
+    # ── 기존 파일 가져오기 ──────────────────────────────
+    def import_legacy(self, metadata_dir=METADATA_DIR, likes_dir=LIKES_DIR) -> dict:
+        """날짜별 metadata JSON + output/likes/*.png 파일명을 인덱스로 (이미지 파일이 있으면 저장소에도)"""
+        imported = 0
+        for f in sorted(glob.glob(os.path.join(str(metadata_dir), "26*_metadata.json"))):
+            if "backup" in f or "bak" in f:
+                continue
+            date = os.path.basename(f).split("_")[0]
+            with open(f, encoding="utf-8") as fh:
+                entries = json.load(fh)
+            for m in entries:
+                if m.get("combo_id"):
+                    self.add_result(dict(m), date)
+                    imported += 1
+        liked = set()
+        for f in glob.glob(os.path.join(str(likes_dir), "*.png")):
+            parts = os.path.basename(f).replace(".png", "").split("_")
+            if len(parts) >= 2:
+                liked.add(parts[0] + "_" + parts[1])
+        self.set_liked(liked)
+        return {"imported": imported, "liked": len(liked)}
+
+
+_store = None
+
+
+def get_image_store() -> ImageStore:
+    global _store
+    if _store is None:
+        _store = ImageStore()
+    return _store
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    store = ImageStore()
+    if cmd == "import":
+        r = store.import_legacy()
+        print(f"[OK] metadata {r['imported']}건, 좋아요 {r['liked']}건 → {store.index_path}")
+    s = store.stats()
+    print(f"[INFO] {s['images']}장 (고유 {s['unique']}) | 좋아요 {s['liked']} | Drive {s['on_drive']} | "
+          f"${s['cost']:.2f} | {s['bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+날짜별 생성 메타데이터 — append-only JSONL
+
+  output/images/metadata/{date}_metadata.jsonl   한 줄 = 이미지 1장 (추가만, 파일 재작성 없음)
+  output/images/metadata/{date}_metadata.json    기존 JSON 배열 (compact/export로 생성)
+
+JSON 배열에 1건 추가하려면 파일 전체를 다시 써야 해서 그날 장수만큼 느려진다.
+JSONL은 한 줄 append + fsync를 모아서(metadata.fsync_every건 또는 fsync_interval_seconds초마다) 처리.
+
+나중에 바뀌는 값(Drive ID, 좋아요 등)은 {"combo_id": ..., "_patch": true, ...} 줄로 추가하고
+compact 때 같은 combo_id끼리 합친다.
+
+사용:
+  python metadata_log.py compact 260219     # JSONL → 기존 JSON 배열
+  python metadata_log.py compact            # 모든 날짜
+"""
+import atexit
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "session-controller" / "scripts"))
+
+from file_lock import FileLock
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+METADATA_DIR = BASE_DIR / "output" / "images" / "metadata"
+
+DEFAULT_METADATA = {
+    "fsync_every": 10,
+    "fsync_interval_seconds": 30,
+}
+
+
+def _load_metadata_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_METADATA, **json.load(f).get("metadata", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_METADATA)
+
+
+def jsonl_path(date: str, metadata_dir=METADATA_DIR) -> Path:
+    return Path(metadata_dir) / f"{date}_metadata.jsonl"
+
+
+def legacy_path(date: str, metadata_dir=METADATA_DIR) -> Path:
+    return Path(metadata_dir) / f"{date}_metadata.json"
+
+
+class MetadataLog:
+    """한 날짜의 JSONL 로그. append는 OS까지 바로 쓰고 fsync만 모아서"""
+
+    def __init__(self, date: str, metadata_dir=METADATA_DIR, fsync_every: int = None, fsync_interval: float = None):
+        cfg = _load_metadata_config()
+        self.date = date
+        self.path = jsonl_path(date, metadata_dir)
+        self.fsync_every = fsync_every or cfg["fsync_every"]
+        self.fsync_interval = fsync_interval or cfg["fsync_interval_seconds"]
+        self._fd = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # O_APPEND: 여러 워커가 같은 파일에 써도 줄 단위로 끝에 붙음
+            self._fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+
+    def append(self, entry: dict):
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._open()
+            os.write(self._fd, line)
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def patch(self, combo_id: str, **fields):
+        """기존 항목 일부 갱신 (compact 때 합쳐짐)"""
+        self.append({"combo_id": combo_id, "_patch": True, **fields})
+
+    def _sync(self):
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+                os.close(self._fd)
+                self._fd = None
+
+
+def iter_jsonl(path):
+    """JSONL 스트림 읽기. 마지막 줄이 반쯤 쓰였으면(비정상 종료) 건너뜀"""
+    try:
+        f = open(path, encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def iter_entries(date: str, metadata_dir=METADATA_DIR):
+    """한 날짜의 항목 (기존 JSON 배열 + JSONL, patch 적용, combo_id 중복 제거) — 순서 유지"""
+    merged = {}
+    order = []
+
+    def _add(entry):
+        cid = entry.get("combo_id")
+        if cid is None:
+            order.append(entry)
+            return
+        if entry.get("_patch"):
+            if cid in merged:
+                merged[cid].update({k: v for k, v in entry.items() if k != "_patch"})
+            return
+        if cid not in merged:
+            order.append(cid)
+            merged[cid] = dict(entry)
+        else:
+            merged[cid].update(entry)
+
+    legacy = legacy_path(date, metadata_dir)
+    if legacy.exists():
+        try:
+            with open(legacy, encoding="utf-8") as f:
+                for entry in json.load(f):
+                    _add(entry)
+        except (OSError, ValueError):
+            pass
+    for entry in iter_jsonl(jsonl_path(date, metadata_dir)):
+        _add(entry)
+    for item in order:
+        yield merged[item] if isinstance(item, str) else item
+
+
+def compact(date: str, metadata_dir=METADATA_DIR) -> int:
+    """JSONL → 기존 JSON 배열 ({date}_metadata.json). 기존 소비자(뷰어/Drive 업로드/분석)용. 항목 수 반환
+    고아 배치 수거 스레드와 메인 루프가 같은 날짜를 동시에 compact할 수 있어 날짜별 락 안에서"""
+    dest = legacy_path(date, metadata_dir)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(dest.with_suffix(".lock")):
+        entries = list(iter_entries(date, metadata_dir))
+        if not entries:
+            return 0
+        tmp = dest.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, dest)
+    return len(entries)
+
+
+def all_dates(metadata_dir=METADATA_DIR) -> list:
+    dates = set()
+    for f in glob.glob(os.path.join(str(metadata_dir), "26*_metadata.json*")):
+        name = os.path.basename(f)
+        if "backup" in name or "bak" in name:
+            continue
+        dates.add(name.split("_")[0])
+    return sorted(dates)
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_metadata_log(date: str) -> MetadataLog:
+    with _logs_lock:
+        log = _logs.get(date)
+        if log is None:
+            log = _logs[date] = MetadataLog(date)
+        return log
+
+
+def append_entry(result: dict, date: str):
+    """track_pins.append_entry 대체 — 배열 파일 재작성 대신 JSONL 한 줄"""
+    get_metadata_log(date).append(result)
+
+
+def close_all():
+    with _logs_lock:
+        for log in _logs.values():
+            log.close()
+
+
+atexit.register(close_all)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "compact":
+        print("사용: python metadata_log.py compact [날짜...]")
+        sys.exit(1)
+    for d in sys.argv[2:] or all_dates():
+        print(f"[OK] {d}: {compact(d)}건 → {legacy_path(d).name}")
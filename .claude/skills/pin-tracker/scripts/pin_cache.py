@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+레퍼런스 핀 캐시(tmp/pins) 용량 관리 — 바이트 예산 + LRU/LFU 축출 (백그라운드, 조금씩)
+
+tmp/pins/<board>/는 보드 갱신/프리페치마다 늘기만 하고, 보드에서 빠졌거나 한 번도
+레퍼런스로 안 뽑힌 핀도 그대로 남는다. 여기서는
+  사용 기록   RequestPlanner가 고른 핀마다 (마지막 선택 시각, 선택 횟수) → output/logs/pin-usage.json
+  우선순위    보드에 없는 핀 → 점수 낮은 순
+              점수 = 마지막 선택 시각 (없으면 파일 mtime) + lfu_hours × log2(1 + 선택 횟수)
+  보호        대기 중인 배치가 참조하는 핀 (빌드 중 batch-requests.map.jsonl, batch_state.json,
+              output/batch/orphans/*.json의 ref_pin_ids) + 최근 protect_recent_minutes 안에 뽑힌 핀
+  축출        합계가 max_gb를 넘으면 max_gb × low_watermark까지 (반복 정리 방지용 여유)
+백그라운드 스레드가 한 단계에 보드 폴더 하나 스캔 / 파일 evict_per_step개 삭제만 하고
+step_interval_seconds 쉬므로 생성 루프의 디스크 I/O를 한 번에 막지 않는다.
+
+지워진 핀은 pin_index/pin_dedup 다음 갱신 때 빠지고 (캐시 파일이 없는 핀은 후보가 아님),
+다시 필요하면 핀 수집이 다시 받는다.
+
+사용:
+  python pin_cache.py stats
+  python pin_cache.py sweep [--dry-run]
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pin_index
+from pin_index import iter_board_pins
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+USAGE_FILE = BASE_DIR / "output" / "logs" / "pin-usage.json"
+BATCH_DIR = BASE_DIR / "output" / "batch"
+
+DEFAULT_PIN_CACHE = {
+    "enabled": True,
+    "max_gb": 2.0,
+    "low_watermark": 0.9,           # 넘으면 max_gb × 이 비율까지 지움
+    "lfu_hours": 24,                # 선택 횟수가 2배가 될 때마다 이만큼 더 최근에 쓴 것으로 취급
+    "protect_recent_minutes": 120,  # 이 안에 뽑힌 핀은 지우지 않음 (빌드/인코딩 중일 수 있음)
+    "step_interval_seconds": 1.0,
+    "evict_per_step": 50,
+    "pass_interval_minutes": 30,    # 예산 안이면 다음 스캔까지 대기
+}
+
+
+def _load_pin_cache_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_PIN_CACHE, **json.load(f).get("pin_cache", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_PIN_CACHE)
+
+
+# ── 사용 기록 ───────────────────────────────────────────
+class PinUsage:
+    """pin_id → [마지막 선택 시각, 선택 횟수]. touch()는 메모리만, flush()로 저장"""
+
+    def __init__(self, path=USAGE_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.pins = json.load(f)
+        except (OSError, ValueError):
+            self.pins = {}
+
+    def touch(self, pin_ids, now: float = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for pid in pin_ids:
+                last, count = self.pins.get(pid, (0, 0))
+                self.pins[pid] = [max(last, now), count + 1]
+            self._dirty = True
+
+    def get(self, pin_id: str) -> tuple:
+        return tuple(self.pins.get(pin_id, (0, 0)))
+
+    def recent(self, since: float) -> set:
+        with self._lock:
+            return {pid for pid, (last, _) in self.pins.items() if last >= since}
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self.pins, separators=(",", ":"))
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+
+_usage = None
+
+
+def get_pin_usage() -> PinUsage:
+    global _usage
+    if _usage is None:
+        _usage = PinUsage()
+    return _usage
+
+
+# ── 대기 중인 배치가 참조하는 핀 ───────────────────────
+def _ref_ids(request_map) -> set:
+    out = set()
+    for pair in (request_map or {}).values():
+        if isinstance(pair, dict):
+            out.update(pair.get("ref_pin_ids") or [])
+    return out
+
+
+def pending_pin_ids(batch_dir=BATCH_DIR, states=()) -> set:
+    """빌드 중 map + 고아 배치 + 넘겨받은 batch_state들의 ref_pin_ids"""
+    batch_dir = Path(batch_dir)
+    ids = set()
+    try:
+        with open(batch_dir / "batch-requests.map.jsonl", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                ids.update((rec.get("pair") or {}).get("ref_pin_ids") or [])
+    except OSError:
+        pass
+    for path in (batch_dir / "orphans").glob("*.json"):
+        try:
+            with open(path, encoding="utf-8") as f:
+                ids |= _ref_ids(json.load(f).get("request_map"))
+        except (OSError, ValueError):
+            continue
+    for state in states:
+        if isinstance(state, (list, tuple)) and len(state) >= 2:
+            ids |= _ref_ids(state[1])
+        elif isinstance(state, dict):
+            ids |= _ref_ids(state.get("request_map"))
+    return ids
+
+
+# ── 캐시 관리 ───────────────────────────────────────────
+class PinCache:
+    """tmp/pins 스캔/축출. step() 한 번 = 보드 폴더 하나 스캔 또는 파일 evict_per_step개 삭제"""
+
+    def __init__(self, root=None, usage: PinUsage = None, cfg: dict = None, pending=None, batch_dir=BATCH_DIR):
+        self.cfg = cfg or _load_pin_cache_config()
+        self.root = Path(root) if root else pin_index.PIN_CACHE_DIR
+        self.usage = usage or get_pin_usage()
+        self.pending = pending or (lambda: ())  # → batch_state 목록 (run_batch의 load_batch_state 등)
+        self.batch_dir = batch_dir
+        self.files = {}      # "board/name" → (size, mtime)
+        self.total = 0
+        self.queue = []      # 이번 패스에서 스캔할 보드 폴더
+        self.victims = []    # 이번 패스 축출 후보 (우선순위 높은 순으로 pop)
+        self.stats = {"passes": 0, "evicted": 0, "evicted_bytes": 0, "protected": 0, "skipped_recent": 0}
+        self._pass_started = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def budget(self) -> int:
+        return int(float(self.cfg["max_gb"]) * 1024 ** 3)
+
+    # ── 한 단계 ─────────────────────────────────────────
+    def step(self) -> str:
+        """→ "scan" | "evict" | "idle" (패스 끝 — 예산 안이거나 축출 완료)"""
+        if self.victims:
+            self._evict_some()
+            if self.victims:
+                return "evict"
+            self._pass_started = 0.0
+            return "idle"
+        if not self._pass_started:
+            self._start_pass()
+        if self.queue:
+            self._scan(self.queue.pop())
+            return "scan"
+        self._finish_pass()
+        if self.victims:
+            return "evict"
+        self._pass_started = 0.0
+        return "idle"
+
+    def _start_pass(self):
+        self._pass_started = time.time()
+        try:
+            self.queue = sorted((e.name for e in os.scandir(self.root) if e.is_dir()), reverse=True)
+        except OSError:
+            self.queue = []
+        seen = set(self.queue)
+        for key in [k for k in self.files if k.split("/", 1)[0] not in seen]:
+            self.total -= self.files.pop(key)[0]
+
+    def _scan(self, board: str):
+        prefix = board + "/"
+        fresh = {}
+        try:
+            with os.scandir(self.root / board) as it:
+                for e in it:
+                    if e.is_file() and not e.name.endswith(".tmp"):
+                        st = e.stat()
+                        fresh[prefix + e.name] = (st.st_size, st.st_mtime)
+        except OSError:
+            pass
+        for key in [k for k in self.files if k.startswith(prefix) and k not in fresh]:
+            self.total -= self.files.pop(key)[0]
+        for key, v in fresh.items():
+            self.total += v[0] - self.files.get(key, (0, 0))[0]
+            self.files[key] = v
+
+    def _finish_pass(self):
+        """스캔이 끝난 시점 합계가 예산을 넘으면 축출 후보 목록"""
+        self.stats["passes"] += 1
+        self.usage.flush()
+        if self.total <= self.budget:
+            return
+        need = self.total - int(self.budget * float(self.cfg["low_watermark"]))
+        on_board = {pin["pin_id"] for _, pin in iter_board_pins()}
+        lfu = float(self.cfg["lfu_hours"]) * 3600
+        ranked = []
+        for key, (size, mtime) in self.files.items():
+            pid = Path(key).stem
+            last, count = self.usage.get(pid)
+            score = (last or mtime) + lfu * math.log2(1 + count)
+            ranked.append((pid in on_board, score, key))
+        ranked.sort()
+        picked, freed = [], 0
+        protected = self._protected()
+        for _, _, key in ranked:
+            if freed >= need:
+                break
+            if Path(key).stem in protected:
+                self.stats["protected"] += 1
+                continue
+            picked.append(key)
+            freed += self.files[key][0]
+        self.victims = picked[::-1]
+
+    def _protected(self) -> set:
+        recent = time.time() - float(self.cfg["protect_recent_minutes"]) * 60
+        return self.usage.recent(recent) | pending_pin_ids(self.batch_dir, self.pending())
+
+    def _evict_some(self):
+        protected = self._protected()
+        for _ in range(min(int(self.cfg["evict_per_step"]), len(self.victims))):
+            key = self.victims.pop()
+            pid = Path(key).stem
+            # 후보를 고른 뒤 다시 뽑혔거나 대기 배치가 참조하게 됐으면 남김
+            if pid in protected or self.usage.get(pid)[0] >= self._pass_started:
+                self.stats["skipped_recent"] += 1
+                continue
+            try:
+                os.remove(self.root / key)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            size = self.files.pop(key, (0, 0))[0]
+            self.total -= size
+            self.stats["evicted"] += 1
+            self.stats["evicted_bytes"] += size
+        if not self.victims:
+            self.usage.flush()
+
+    # ── 동기 / 백그라운드 ───────────────────────────────
+    def sweep(self, dry_run: bool = False) -> dict:
+        """패스 한 번을 끝까지 (CLI/벤치용) → {"files", "bytes", "evicted", "evicted_bytes"}"""
+        self._start_pass()
+        while self.queue:
+            self._scan(self.queue.pop())
+        self._finish_pass()
+        plan = {"files": len(self.files), "bytes": self.total, "evict": len(self.victims),
+                "evict_bytes": sum(self.files[k][0] for k in self.victims)}
+        if dry_run:
+            self.victims = []
+        while self.victims:
+            self._evict_some()
+        self._pass_started = 0.0
+        return {**plan, "evicted": self.stats["evicted"], "evicted_bytes": self.stats["evicted_bytes"]}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                state = self.step()
+            except Exception as e:
+                print(f"  [WARN] 핀 캐시 정리 실패 (다음 패스에 재시도): {e}")
+                state = "idle"
+            wait = float(self.cfg["pass_interval_minutes"]) * 60 if state == "idle" else float(
+                self.cfg["step_interval_seconds"])
+            self._stop.wait(wait)
+        self.usage.flush()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="pin-cache", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def describe(self) -> str:
+        return (f"핀 캐시 {self.total / 1024 ** 3:.2f}/{self.budget / 1024 ** 3:.2f} GB ({len(self.files)}개) | "
+                f"축출 {self.stats['evicted']}개 {self.stats['evicted_bytes'] / 1e6:.1f} MB")
+
+
+_cache = None
+
+
+def start_pin_cache(pending=None):
+    """프로세스 공용 백그라운드 정리 시작. 비활성이면 None"""
+    global _cache
+    if _cache is None:
+        cfg = _load_pin_cache_config()
+        if not cfg["enabled"]:
+            return None
+        _cache = PinCache(cfg=cfg, pending=pending)
+    return _cache.start()
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = PinCache()
+    r = cache.sweep(dry_run=cmd != "sweep" or "--dry-run" in sys.argv)
+    print(f"[INFO] {r['files']}개 {r['bytes'] / 1024 ** 3:.2f} GB / 예산 {cache.budget / 1024 ** 3:.2f} GB")
+    if cmd == "sweep" and "--dry-run" not in sys.argv:
+        print(f"[OK] 축출 {r['evicted']}개, {r['evicted_bytes'] / 1e6:.1f} MB")
+    elif r["evict"]:
+        print(f"[DRY-RUN] 축출 예정 {r['evict']}개, {r['evict_bytes'] / 1e6:.1f} MB (지우려면 sweep)")
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+레퍼런스 핀 중복 제거 — 보드 간 같은/거의 같은 이미지를 대표 핀 하나로 묶음
+
+같은 이미지가 여러 보드에 있다 (prada/prada2, 2503/2503_02, object/object_2509 …).
+그래서 두 번 받고, 두 번 캐시하고, 한 요청의 레퍼런스 5장 중 2장이 같은 그림일 때도 있다.
+
+  URL 키      pinimg 원본 URL의 파일명(md5)이 같으면 받기 전에 이미 같은 이미지
+  dHash       64비트 차이 해시 (9×8 흑백 축소, 이웃 픽셀 밝기 비교) — 크기 조정/재압축에 강함
+  BK-tree     해밍 거리 ≤ max_distance 이웃 조회 (전체 비교 없이)
+
+대표 핀은 added_at이 가장 이른 핀 (같으면 보드/핀 ID 순). 대표가 아닌 핀은
+pin_index(스타일 벡터)와 batch_builder 레퍼런스 후보에서 빠지고, cached_for_url()로
+핀 수집 쪽이 이미 받은 파일을 재사용할 수 있다. prune은 중복 캐시 파일을 지운다 (명시적으로만).
+
+상태: output/logs/pin-dedup.json (핀별 해시 + 파일 mtime/size — 바뀐 파일만 다시 해시)
+
+사용:
+  python pin_dedup.py update
+  python pin_dedup.py stats
+  python pin_dedup.py prune [--apply]
+"""
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pin_index import iter_board_pins, pin_cache_path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+STATE_FILE = BASE_DIR / "output" / "logs" / "pin-dedup.json"
+
+DEFAULT_DEDUP = {
+    "enabled": True,
+    "max_distance": 6,   # dHash 64비트 중 다른 비트 수 ≤ 이 값이면 같은 이미지
+    "workers": 0,        # 0 = CPU 수
+}
+
+_URL_KEY = re.compile(r"/([0-9a-f]{32})\.(?:jpe?g|png|gif|webp)", re.I)
+
+
+def _load_dedup_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_DEDUP, **json.load(f).get("pin_dedup", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_DEDUP)
+
+
+def url_key(image_url: str):
+    """pinimg URL → 원본 md5 (크기별 경로 /originals/, /736x/ 와 무관). 모르는 형식이면 None"""
+    m = _URL_KEY.search(image_url or "")
+    return m.group(1).lower() if m else None
+
+
+def dhash(path: str) -> int:
+    """64비트 difference hash"""
+    from PIL import Image
+    with Image.open(path) as im:
+        im.draft("L", (64, 64))
+        small = im.convert("L").resize((9, 8), Image.BILINEAR)
+        px = small.tobytes()
+    bits = 0
+    for row in range(8):
+        base = row * 9
+        for col in range(8):
+            bits = (bits << 1) | (px[base + col] < px[base + col + 1])
+    return bits
+
+
+def _hash_job(job: tuple) -> tuple:
+    key, path = job
+    try:
+        return key, dhash(path), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+class BKTree:
+    """해밍 거리 BK-tree — 노드: [hash, item, {거리: 자식}]"""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, h: int, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [h, item, {}]
+            return
+        node = self.root
+        while True:
+            d = bin(h ^ node[0]).count("1")
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, item, {}]
+                return
+            node = child
+
+    def query(self, h: int, radius: int) -> list:
+        """[(거리, item)] — 삼각 부등식으로 |d - 거리| ≤ radius인 자식만 내려감"""
+        out = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = bin(h ^ node[0]).count("1")
+            if d <= radius:
+                out.append((d, node[1]))
+            for cd, child in node[2].items():
+                if d - radius <= cd <= d + radius:
+                    stack.append(child)
+        return sorted(out, key=lambda t: t[0])
+
+
+class PinDedup:
+    def __init__(self, path=STATE_FILE, cfg: dict = None):
+        self.cfg = cfg or _load_dedup_config()
+        self.path = Path(path)
+        self.pins = {}       # "board/pin_id" → {"hash", "sig", "path", "url_key", "added_at"}
+        self.canonical = {}  # "board/pin_id" → 대표 "board/pin_id" (대표 자신 포함)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("max_distance") == self.cfg["max_distance"]:
+                self.pins = data.get("pins", {})
+                self.canonical = data.get("canonical", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"max_distance": self.cfg["max_distance"], "pins": self.pins, "canonical": self.canonical},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # ── 갱신 ────────────────────────────────────────────
+    def update(self, workers: int = None) -> dict:
+        """모든 보드 핀: 바뀐 캐시 파일만 해시 → 대표 핀 다시 계산"""
+        seen, todo = {}, []
+        for board, pin in iter_board_pins():
+            key = f"{board}/{pin['pin_id']}"
+            path = pin_cache_path(board, pin)
+            entry = {"url_key": url_key(pin.get("image_url")), "added_at": pin.get("added_at") or "",
+                     "path": path, "sig": None, "hash": None}
+            if path:
+                try:
+                    st = os.stat(path)
+                    entry["sig"] = [int(st.st_mtime), st.st_size]
+                except OSError:
+                    entry["path"] = None
+            old = self.pins.get(key)
+            if old and old.get("sig") == entry["sig"] and old.get("path") == entry["path"]:
+                entry["hash"] = old.get("hash")
+            elif entry["path"]:
+                todo.append((key, entry["path"]))
+            seen[key] = entry
+
+        errors = 0
+        if todo:
+            workers = workers or int(self.cfg["workers"]) or (os.cpu_count() or 2)
+            if workers <= 1 or len(todo) < 64:
+                errors = self._collect(map(_hash_job, todo), seen)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    errors = self._collect(pool.map(_hash_job, todo, chunksize=32), seen)
+        removed = len(set(self.pins) - set(seen))
+        self.pins = seen
+        self._assign()
+        self.save()
+        return {"pins": len(seen), "hashed": len(todo) - errors, "removed": removed, "errors": errors,
+                **self._counts()}
+
+    @staticmethod
+    def _collect(results, seen: dict) -> int:
+        errors = 0
+        for key, h, err in results:
+            if err:
+                errors += 1
+            else:
+                seen[key]["hash"] = f"{h:016x}"
+        return errors
+
+    def _assign(self):
+        """added_at 순으로 보며 URL 키 → 해시 이웃 순으로 대표 찾기"""
+        order = sorted(self.pins, key=lambda k: (self.pins[k]["added_at"], k))
+        by_url, tree, canonical = {}, BKTree(), {}
+        radius = int(self.cfg["max_distance"])
+        for key in order:
+            e = self.pins[key]
+            rep = by_url.get(e["url_key"]) if e["url_key"] else None
+            if rep is None and e["hash"]:
+                near = tree.query(int(e["hash"], 16), radius)
+                rep = near[0][1] if near else None
+            if rep is None:
+                rep = key
+                if e["hash"]:
+                    tree.add(int(e["hash"], 16), key)
+            canonical[key] = rep
+            if e["url_key"]:
+                by_url.setdefault(e["url_key"], rep)
+        self.canonical = canonical
+
+    def _counts(self) -> dict:
+        dups = [k for k, rep in self.canonical.items() if rep != k]
+        dup_bytes = sum(self.pins[k]["sig"][1] for k in dups if self.pins[k]["sig"])
+        return {"duplicates": len(dups), "duplicate_bytes": dup_bytes,
+                "groups": len({self.canonical[k] for k in dups})}
+
+    # ── 조회 ────────────────────────────────────────────
+    def canonical_of(self, board: str, pin_id: str) -> str:
+        key = f"{board}/{pin_id}"
+        return self.canonical.get(key, key)
+
+    def is_duplicate(self, board: str, pin_id: str) -> bool:
+        key = f"{board}/{pin_id}"
+        return self.canonical.get(key, key) != key
+
+    def filter(self, pins) -> list:
+        """[(board, pin_id, ...)] → 대표가 같은 것 중 첫 번째만 (순서 유지)"""
+        out, reps = [], set()
+        for item in pins:
+            rep = self.canonical_of(item[0], item[1])
+            if rep not in reps:
+                reps.add(rep)
+                out.append(item)
+        return out
+
+    def cached_for_url(self, image_url: str):
+        """같은 원본(URL md5)을 이미 받아둔 캐시 파일 — 핀 수집 시 다운로드 대신 재사용"""
+        k = url_key(image_url)
+        if not k:
+            return None
+        for key, e in self.pins.items():
+            if e["url_key"] == k and e["path"] and self.canonical.get(key) == key and os.path.exists(e["path"]):
+                return e["path"]
+        return None
+
+    def prune(self, apply: bool = False) -> dict:
+        """대표가 아닌 핀의 캐시 파일 삭제 (대표 파일이 있을 때만) → {"files", "bytes"}"""
+        files, size = 0, 0
+        for key, rep in self.canonical.items():
+            e, r = self.pins[key], self.pins.get(rep, {})
+            if rep == key or not e["path"] or not r.get("path") or e["path"] == r["path"]:
+                continue
+            if not os.path.exists(r["path"]):
+                continue
+            files += 1
+            size += e["sig"][1] if e["sig"] else 0
+            if apply:
+                try:
+                    os.remove(e["path"])
+                except OSError:
+                    pass
+        return {"files": files, "bytes": size}
+
+    def stats(self) -> dict:
+        return {"pins": len(self.pins), "hashed": sum(1 for e in self.pins.values() if e["hash"]), **self._counts()}
+
+
+_dedup = None
+
+
+def get_pin_dedup(update: bool = False):
+    """프로세스 공용. 비활성이면 None"""
+    global _dedup
+    if _dedup is None:
+        cfg = _load_dedup_config()
+        if not cfg["enabled"]:
+            return None
+        _dedup = PinDedup(cfg=cfg)
+        if update or not _dedup.pins:
+            _dedup.update()
+    return _dedup
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    d = PinDedup()
+    if cmd == "update" or not d.pins:
+        r = d.update()
+        print(f"[OK] 해시 {r['hashed']} | 제거 {r['removed']} | 실패 {r['errors']}")
+    if cmd == "prune":
+        apply = "--apply" in sys.argv
+        r = d.prune(apply)
+        print(f"[{'OK' if apply else 'DRY-RUN'}] 중복 캐시 {r['files']}개, {r['bytes'] / 1e6:.1f} MB"
+              + ("" if apply else " (지우려면 --apply)"))
+    s = d.stats()
+    print(f"[INFO] 핀 {s['pins']} (해시 {s['hashed']}) | 중복 {s['duplicates']}개 / {s['groups']}묶음 | "
+          f"{s['duplicate_bytes'] / 1e6:.1f} MB")
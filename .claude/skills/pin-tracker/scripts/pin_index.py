@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+레퍼런스 핀 스타일 벡터 인덱스 — 색 히스토그램 + 저해상도 임베딩으로 최근접/최원점 선택
+
+요청마다 레퍼런스를 모든 보드에서 무작위로 뽑으면 (recent_pins만 피함) 색감/질감이 제각각인
+세트가 되거나, 캐시 파일이 없는 핀을 골라 "[WARN] ref pins 2 (min 3 recommended)"가 난다.
+캐시된 핀마다 벡터를 미리 계산해 output/logs/pin-index.npz에 두고
+  coherent  무작위 기준 핀 + 코사인 유사도 최근접 k-1개 → 한 가지 스타일 DNA
+  diverse   최원점 샘플링 (farthest-point) → 서로 가장 다른 k개
+를 행렬 연산 한 번으로 고른다. 인덱스에는 실제로 읽히는 캐시 파일만 있으므로 k장이 항상 채워진다.
+
+벡터 (176차원, float32, 블록별 L2 정규화 후 가중 — 내적 = 블록 코사인의 가중합)
+  RGB 4×4×4 히스토그램 (Hellinger: √비율)   가중 0.6
+  8×8 밝기 배치 (평균 제거)                  가중 0.25
+  4×4 색 배치 (평균 제거)                    가중 0.15
+
+보드 갱신(run_batch.refresh_pins) 뒤 update()는 (mtime, size)가 바뀐/새 파일만 프로세스 풀에서 계산하고
+보드에서 빠진 핀은 지운다. 다른 보드 핀의 중복(pin_dedup)은 select()가 그 세션 보드의 후보 안에서만 걸러
+(캐시 파일이 있는 핀 중 대표 우선) 대표 핀이 다른 보드에 있거나 캐시에서 지워져도 그림이 빠지지 않는다.
+NumPy/Pillow가 없으면 기존 무작위 선택을 그대로 쓴다.
+
+사용:
+  python pin_index.py update
+  python pin_index.py stats
+  python pin_index.py similar <pin_id> 8
+"""
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+BOARDS_DIR = BASE_DIR / "config" / "boards"
+PIN_CACHE_DIR = BASE_DIR / "tmp" / "pins"
+INDEX_FILE = BASE_DIR / "output" / "logs" / "pin-index.npz"
+
+DEFAULT_PIN_INDEX = {
+    "selection": "coherent",  # coherent | diverse | random
+    "workers": 0,             # 0 = CPU 수
+    "thumb_size": 64,
+}
+
+HIST_BINS = 4
+BLOCK_WEIGHTS = (0.6, 0.25, 0.15)
+DIM = HIST_BINS ** 3 + 64 + 48
+
+
+def _load_pin_index_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_PIN_INDEX, **json.load(f).get("pin_index", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_PIN_INDEX)
+
+
+def pin_cache_path(board: str, pin: dict):
+    """핀의 로컬 캐시 파일. board JSON의 local_cache가 다른 PC 경로(D:\\...)면 tmp/pins/<board>/에서 찾음"""
+    local = pin.get("local_cache")
+    if local and os.path.exists(local):
+        return local
+    name = (local or "").replace("\\", "/").rsplit("/", 1)[-1]
+    if name:
+        candidate = PIN_CACHE_DIR / board / name
+        if candidate.exists():
+            return str(candidate)
+    matches = glob.glob(str(PIN_CACHE_DIR / board / f"{pin.get('pin_id')}.*"))
+    return matches[0] if matches else None
+
+
+def iter_board_pins(boards=None):
+    """(보드 이름, pin dict) — boards가 None이면 config/boards/*.json 전체"""
+    names = boards if boards is not None else sorted(Path(f).stem for f in glob.glob(str(BOARDS_DIR / "*.json")))
+    for name in names:
+        try:
+            with open(BOARDS_DIR / f"{name}.json", encoding="utf-8") as f:
+                board = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for pin in board.get("pins", []):
+            if pin.get("pin_id"):
+                yield name, pin
+
+
+# ── 벡터 계산 (워커 프로세스) ───────────────────────────
+def style_vector(path: str, thumb_size: int = 64):
+    """이미지 파일 → float32 (DIM,)"""
+    import numpy as np
+    from PIL import Image
+    with Image.open(path) as im:
+        im.draft("RGB", (thumb_size, thumb_size))
+        im = im.convert("RGB")
+        im.thumbnail((thumb_size, thumb_size), Image.BILINEAR)
+        rgb = np.asarray(im, dtype=np.float32) / 255.0
+        layout = np.asarray(im.convert("L").resize((8, 8), Image.BILINEAR), dtype=np.float32).ravel() / 255.0
+        color = np.asarray(im.resize((4, 4), Image.BILINEAR), dtype=np.float32).ravel() / 255.0
+    q = np.minimum((rgb * HIST_BINS).astype(np.int32), HIST_BINS - 1)
+    bins = (q[..., 0] * HIST_BINS + q[..., 1]) * HIST_BINS + q[..., 2]
+    hist = np.sqrt(np.bincount(bins.ravel(), minlength=HIST_BINS ** 3) / bins.size).astype(np.float32)
+    blocks = []
+    for block, weight in zip((hist, layout - layout.mean(), color - color.mean()), BLOCK_WEIGHTS):
+        norm = float(np.linalg.norm(block))
+        blocks.append(block / norm * np.sqrt(weight) if norm > 1e-8 else np.zeros_like(block))
+    return np.concatenate(blocks).astype(np.float32)
+
+
+def _vector_job(job: tuple) -> tuple:
+    key, path, thumb_size = job
+    try:
+        return key, style_vector(path, thumb_size), None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+class PinIndex:
+    def __init__(self, path=INDEX_FILE, cfg: dict = None):
+        import numpy as np
+        self.np = np
+        self.cfg = cfg or _load_pin_index_config()
+        self.path = Path(path)
+        self.keys = []      # "board/pin_id"
+        self.pin_ids = []
+        self.boards = []
+        self.paths = []
+        self.sigs = np.zeros((0, 2), dtype=np.int64)
+        self.vectors = np.zeros((0, DIM), dtype=np.float32)
+        self._cand_cache = {}  # 보드 조합 → 중복 걸러낸 후보 행
+        self._load()
+
+    # ── 저장/로드 ───────────────────────────────────────
+    def _load(self):
+        np = self.np
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if data["vectors"].shape[1:] != (DIM,):
+                    return
+                meta = json.loads(str(data["meta"]))
+                self.vectors = data["vectors"]
+                self.sigs = data["sigs"]
+        except (OSError, KeyError, ValueError):
+            return
+        self.keys, self.pin_ids, self.boards, self.paths = (meta["keys"], meta["pin_ids"], meta["boards"], meta["paths"])
+
+    def save(self):
+        np = self.np
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        meta = json.dumps({"keys": self.keys, "pin_ids": self.pin_ids, "boards": self.boards, "paths": self.paths},
+                          ensure_ascii=False)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, vectors=self.vectors, sigs=self.sigs, meta=np.array(meta))
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ── 증분 갱신 ───────────────────────────────────────
+    def update(self, boards=None, workers: int = None) -> dict:
+        """board JSON 기준으로 새/바뀐 캐시 파일만 계산, 사라진 핀은 제거 → 건수 요약.
+        boards를 주면 그 보드들만 갱신하고 다른 보드 항목은 그대로 둠"""
+        np = self.np
+        current = {}
+        for board, pin in iter_board_pins(boards):
+            path = pin_cache_path(board, pin)
+            if not path:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            current[f"{board}/{pin['pin_id']}"] = (board, pin["pin_id"], path, (int(st.st_mtime), st.st_size))
+
+        scope = set(boards) if boards is not None else None
+        keep_rows = []
+        old = {k: i for i, k in enumerate(self.keys)}
+        for key, i in old.items():
+            if key in current:
+                if tuple(self.sigs[i]) == current[key][3] and self.paths[i] == current[key][2]:
+                    keep_rows.append(i)
+            elif scope is not None and self.boards[i] not in scope:
+                keep_rows.append(i)  # 이번 갱신 범위 밖 보드
+        kept = {self.keys[i] for i in keep_rows}
+        todo = [(k, v[2], self.cfg["thumb_size"]) for k, v in current.items() if k not in kept]
+        removed = sum(1 for k in old if k not in kept and k not in current)
+
+        new_rows, errors = [], 0
+        if todo:
+            workers = workers or int(self.cfg["workers"]) or (os.cpu_count() or 2)
+            if workers <= 1 or len(todo) < 8:
+                out = map(_vector_job, todo)
+                new_rows, errors = self._collect(out)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    new_rows, errors = self._collect(pool.map(_vector_job, todo, chunksize=16))
+
+        keys = [self.keys[i] for i in keep_rows] + [k for k, _ in new_rows]
+        meta = [(self.pin_ids[i], self.boards[i], self.paths[i]) for i in keep_rows]
+        meta += [(current[k][1], current[k][0], current[k][2]) for k, _ in new_rows]
+        sigs = [tuple(self.sigs[i]) for i in keep_rows] + [current[k][3] for k, _ in new_rows]
+        vectors = [self.vectors[keep_rows]] + ([np.stack([v for _, v in new_rows])] if new_rows else [])
+        self.keys = keys
+        self.pin_ids = [m[0] for m in meta]
+        self.boards = [m[1] for m in meta]
+        self.paths = [m[2] for m in meta]
+        self.sigs = np.array(sigs, dtype=np.int64).reshape(-1, 2)
+        self.vectors = np.concatenate(vectors).astype(np.float32)
+        self._cand_cache = {}
+        if new_rows or removed:
+            self.save()
+        return {"pins": len(self.keys), "computed": len(new_rows), "removed": removed, "errors": errors}
+
+    @staticmethod
+    def _collect(out) -> tuple:
+        rows, errors = [], 0
+        for key, vec, err in out:
+            if err:
+                errors += 1
+            else:
+                rows.append((key, vec))
+        return rows, errors
+
+    # ── 조회 ────────────────────────────────────────────
+    def _candidates(self, boards=None):
+        """boards의 행. 다른 보드에 같은/거의 같은 이미지가 있으면 이 후보 안에서 한 장만 (pin_dedup)"""
+        np = self.np
+        key = tuple(sorted(set(boards))) if boards is not None else None
+        cached = self._cand_cache.get(key)
+        if cached is not None:
+            return cached
+        wanted = set(boards) if boards is not None else None
+        rows = [i for i, b in enumerate(self.boards) if wanted is None or b in wanted]
+        from pin_dedup import get_pin_dedup
+        dedup = get_pin_dedup()
+        if dedup is not None:
+            # 대표 핀이 후보에 있으면 그것을, 없으면 (다른 보드/캐시에서 지워짐) 남은 복제본 중 첫 번째
+            rows.sort(key=lambda i: dedup.is_duplicate(self.boards[i], self.pin_ids[i]))
+            rows = sorted(r for _, _, r in dedup.filter([(self.boards[i], self.pin_ids[i], i) for i in rows]))
+        cached = self._cand_cache[key] = np.array(rows, dtype=np.int64)
+        return cached
+
+    def select(self, k: int, mode: str = None, boards=None, exclude=(), rng=None) -> list:
+        """[(pin_id, path)] k개. exclude(최근 사용 핀) 밖에서 k개가 안 되면 exclude까지 포함"""
+        np = self.np
+        mode = mode or self.cfg["selection"]
+        cand = self._candidates(boards)
+        if cand.size == 0 or k <= 0:
+            return []
+        excluded = set(exclude or ())
+        fresh = np.array([i for i in cand if self.pin_ids[i] not in excluded], dtype=np.int64)
+        pool = fresh if fresh.size >= k else cand
+        pick = int(rng.randrange(pool.size)) if rng is not None else int(np.random.randint(pool.size))
+        if mode == "diverse":
+            rows = self._farthest(pool, k, pool[pick])
+        elif mode == "coherent":
+            rows = self._nearest(pool, k, pool[pick])
+        else:
+            order = list(pool)
+            (rng or np.random).shuffle(order)
+            rows = order[:k]
+        out, seen = [], set()
+        for i in rows:
+            if self.pin_ids[i] not in seen:  # 같은 핀이 여러 보드에 있으면 한 번만
+                seen.add(self.pin_ids[i])
+                out.append((self.pin_ids[i], self.paths[i]))
+        return out
+
+    def _nearest(self, pool, k: int, seed: int) -> list:
+        np = self.np
+        sims = self.vectors[pool] @ self.vectors[seed]
+        top = pool[np.argsort(-sims, kind="stable")[:k]]
+        return [int(seed)] + [int(i) for i in top if i != seed][:k - 1]
+
+    def _farthest(self, pool, k: int, seed: int) -> list:
+        np = self.np
+        vecs = self.vectors[pool]
+        chosen = [int(seed)]
+        dist = 1.0 - vecs @ self.vectors[seed]
+        for _ in range(min(k, pool.size) - 1):
+            j = int(np.argmax(dist))
+            chosen.append(int(pool[j]))
+            dist = np.minimum(dist, 1.0 - vecs @ vecs[j])
+        return chosen
+
+    def similar(self, pin_id: str, n: int = 8) -> list:
+        """[(pin_id, board, 유사도)]"""
+        np = self.np
+        rows = [i for i, p in enumerate(self.pin_ids) if p == pin_id]
+        if not rows:
+            return []
+        sims = self.vectors @ self.vectors[rows[0]]
+        order = np.argsort(-sims)
+        return [(self.pin_ids[i], self.boards[i], round(float(sims[i]), 4)) for i in order[:n + 1] if i != rows[0]][:n]
+
+    def stats(self) -> dict:
+        boards = {}
+        for b in self.boards:
+            boards[b] = boards.get(b, 0) + 1
+        return {"pins": len(self.keys), "boards": len(boards), "bytes": int(self.vectors.nbytes),
+                "selection": self.cfg["selection"]}
+
+
+_index = None
+
+
+def get_pin_index(update: bool = True):
+    """프로세스 공용. NumPy/Pillow가 없거나 selection=random이면 None (호출 쪽은 무작위 선택)"""
+    global _index
+    if _index is None:
+        cfg = _load_pin_index_config()
+        if cfg["selection"] == "random":
+            return None
+        try:
+            _index = PinIndex(cfg=cfg)
+        except ImportError as e:
+            print(f"[WARN] 핀 인덱스 사용 불가 (numpy 필요) — 무작위 선택: {e}")
+            return None
+        if update:
+            r = _index.update()
+            if r["computed"] or r["removed"]:
+                print(f"[PIN INDEX] {r['pins']}핀 | 새로 계산 {r['computed']} | 제거 {r['removed']}")
+    return _index
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    idx = PinIndex()
+    if cmd == "update":
+        print(f"[OK] {idx.update()}")
+    elif cmd == "similar" and len(sys.argv) >= 3:
+        for pid, board, sim in idx.similar(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 8):
+            print(f"  {pid:<22} {board:<16} {sim:.3f}")
+    print(f"[INFO] {idx.stats()}")
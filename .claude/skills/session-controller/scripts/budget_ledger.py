@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+비용 예약 장부 — 동시에 돈을 쓰는 요청/프로세스가 일일·월간·세션 상한을 넘지 않게
+
+기존 방식은 "지금까지 쓴 돈 + 이번 요청 < 상한"만 보므로 진행 중인 다른 요청
+(다른 워커, scheduled_run 데몬, 서버에서 도는 배치)이 쓸 돈을 모른다.
+
+  reserve  요청 전에 최악 비용(Pro 단가 × 장수)을 예약. 확정 + 예약 합계가 상한을 넘으면 거절
+  commit   결과 비용을 cost_tracker에 기록하고 예약에서 차감 (같은 락 안에서 — 이중 계산/누락 없음)
+  release  실패/취소 시 남은 예약 해제
+
+장부: output/logs/budget-ledger.json (+ .lock, 여러 프로세스/호스트 공용)
+예약은 만료 시각이 있어 죽은 프로세스의 예약은 자동으로 풀린다.
+
+사용:
+  python budget_ledger.py        # 현재 예약 현황
+"""
+import json
+import os
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from file_lock import FileLock
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+LOGS_DIR = BASE_DIR / "output" / "logs"
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+LEDGER_FILE = LOGS_DIR / "budget-ledger.json"
+
+DEFAULT_RESERVATION_TTL = 900
+
+
+class BudgetDenied(Exception):
+    def __init__(self, reason: str, cap: float, committed: float, reserved: float, amount: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.cap = cap
+        self.committed = committed
+        self.reserved = reserved
+        self.amount = amount
+
+
+class Reservation:
+    def __init__(self, rid: str, amount: float, session_id: str = None):
+        self.id = rid
+        self.amount = amount
+        self.session_id = session_id
+        self.committed = 0.0
+
+    def __repr__(self):
+        return f"Reservation({self.id[:8]}, ${self.amount:.3f})"
+
+    def to_dict(self) -> dict:
+        """batch_state 등에 저장 — 다른 프로세스가 adopt()로 이어받음"""
+        return {"id": self.id, "amount": self.amount, "session_id": self.session_id}
+
+
+def _load_ttl() -> float:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            session = json.load(f).get("session", {})
+    except (OSError, ValueError):
+        session = {}
+    return float(session.get("reservation_ttl_seconds", DEFAULT_RESERVATION_TTL))
+
+
+def _day() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _month() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+
+class BudgetLedger:
+    def __init__(self, path=LEDGER_FILE, add_cost=None, get_daily_total=None, get_monthly_total=None,
+                 get_limits=None, ttl: float = None):
+        if add_cost is None:
+            from cost_tracker import add_cost, get_daily_total, get_monthly_total, get_limits
+        self.add_cost = add_cost
+        self.get_daily_total = get_daily_total
+        self.get_monthly_total = get_monthly_total
+        self.get_limits = get_limits
+        self.ttl = ttl or _load_ttl()
+        self.path = Path(path)
+        self._lock = FileLock(self.path.with_suffix(".lock"))
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+
+    # ── 파일 ────────────────────────────────────────────
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("reservations", {})
+        return data
+
+    def _save(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _expire(data: dict, now: float) -> int:
+        stale = [rid for rid, r in data["reservations"].items() if r.get("expires_at", 0) <= now]
+        for rid in stale:
+            del data["reservations"][rid]
+        return len(stale)
+
+    @staticmethod
+    def _outstanding(data: dict, key: str = None, value=None) -> float:
+        return sum(r["amount"] for r in data["reservations"].values() if key is None or r.get(key) == value)
+
+    # ── 예약/확정/해제 ──────────────────────────────────
+    def reserve(self, amount: float, session_id: str = None, session_cap: float = None,
+                session_spent: float = 0.0, ttl: float = None, label: str = "") -> Reservation:
+        """최악 비용 예약. 상한을 넘으면 BudgetDenied"""
+        amount = round(float(amount), 4)
+        with self._lock:
+            now = time.time()
+            data = self._load()
+            expired = self._expire(data, now)
+            limits = self.get_limits() or {}
+            day, month = _day(), _month()
+            checks = [
+                ("일일 비용 상한", limits.get("daily_cost_cap", 0), self.get_daily_total(),
+                 self._outstanding(data, "day", day)),
+                ("월간 비용 상한", limits.get("monthly_cost_cap", 0), self.get_monthly_total(),
+                 self._outstanding(data, "month", month)),
+            ]
+            if session_id and session_cap:
+                checks.append(("세션 비용 상한", session_cap, session_spent,
+                               self._outstanding(data, "session_id", session_id)))
+            for reason, cap, committed, reserved in checks:
+                if cap and cap > 0 and committed + reserved + amount > cap + 1e-9:
+                    if expired:
+                        self._save(data)
+                    raise BudgetDenied(reason, cap, committed, reserved, amount)
+            rid = uuid.uuid4().hex
+            data["reservations"][rid] = {
+                "amount": amount,
+                "session_id": session_id,
+                "worker": self.worker,
+                "label": label,
+                "day": day,
+                "month": month,
+                "created_at": now,
+                "expires_at": now + (ttl or self.ttl),
+            }
+            self._save(data)
+        return Reservation(rid, amount, session_id)
+
+    def commit(self, reservation: Reservation, cost: float, is_flash: bool = False, final: bool = True):
+        """실제 비용 기록 + 예약 차감. final=False면 남은 예약 유지 (배치 결과를 한 장씩 확정할 때)"""
+        with self._lock:
+            self.add_cost(cost, is_flash)
+            data = self._load()
+            r = data["reservations"].get(reservation.id) if reservation else None
+            if r is not None:
+                r["amount"] = round(max(0.0, r["amount"] - cost), 4)
+                if final or r["amount"] <= 0:
+                    del data["reservations"][reservation.id]
+                self._save(data)
+        if reservation:
+            reservation.committed = round(reservation.committed + cost, 4)
+            reservation.amount = 0.0 if final else max(0.0, reservation.amount - cost)
+
+    def release(self, reservation: Reservation):
+        if reservation is None:
+            return
+        with self._lock:
+            data = self._load()
+            if data["reservations"].pop(reservation.id, None) is not None:
+                self._save(data)
+        reservation.amount = 0.0
+
+    def settle(self, reservation: Reservation, result: dict = None, is_flash: bool = False):
+        """늦게 끝난 호출(deadline 초과 후 버려진 호출)의 결과로 확정 — 성공이면 비용 기록, 아니면 해제"""
+        if (result or {}).get("status") == "success":
+            self.commit(reservation, result.get("cost", 0), is_flash)
+        else:
+            self.release(reservation)
+
+    def adopt(self, saved: dict, ttl: float, label: str = "orphan batch"):
+        """저장된 예약({"id", "amount", "session_id"})을 이어받아 만료 연장 → Reservation (없으면 None).
+        이미 만료돼 지워졌으면 같은 id로 다시 등록 — 서버 배치는 계속 과금되므로 상한 검사 없이"""
+        if not saved or not saved.get("id"):
+            return None
+        with self._lock:
+            now = time.time()
+            data = self._load()
+            r = data["reservations"].get(saved["id"])
+            if r is None:
+                r = data["reservations"][saved["id"]] = {
+                    "amount": round(float(saved.get("amount", 0)), 4),
+                    "session_id": saved.get("session_id"),
+                    "label": label,
+                    "day": _day(),
+                    "month": _month(),
+                    "created_at": now,
+                }
+            r["worker"] = self.worker
+            r["expires_at"] = now + ttl
+            self._save(data)
+        return Reservation(saved["id"], r["amount"], r.get("session_id"))
+
+    def extend(self, reservation: Reservation, ttl: float):
+        """오래 걸리는 예약(배치 polling) 만료 연장"""
+        with self._lock:
+            data = self._load()
+            r = data["reservations"].get(reservation.id)
+            if r is not None:
+                r["expires_at"] = time.time() + ttl
+                self._save(data)
+
+    def headroom(self, session_id: str = None, session_cap: float = None, session_spent: float = 0.0) -> float:
+        """지금 더 예약할 수 있는 금액 (상한 없으면 inf)"""
+        with self._lock:
+            data = self._load()
+            self._expire(data, time.time())
+            limits = self.get_limits() or {}
+            room = float("inf")
+            for cap, committed, reserved in (
+                (limits.get("daily_cost_cap", 0), self.get_daily_total(), self._outstanding(data, "day", _day())),
+                (limits.get("monthly_cost_cap", 0), self.get_monthly_total(), self._outstanding(data, "month", _month())),
+                (session_cap if session_id else 0, session_spent, self._outstanding(data, "session_id", session_id)),
+            ):
+                if cap and cap > 0:
+                    room = min(room, cap - committed - reserved)
+        return max(0.0, room)
+
+    def summary(self) -> str:
+        with self._lock:
+            data = self._load()
+            self._expire(data, time.time())
+        res = data["reservations"]
+        return f"예약 {len(res)}건 ${self._outstanding(data):.2f}"
+
+
+_ledger = None
+
+
+def get_budget_ledger() -> BudgetLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = BudgetLedger()
+    return _ledger
+
+
+if __name__ == "__main__":
+    # cost_tracker는 다른 스킬 폴더에 있음
+    for scripts in Path(__file__).resolve().parents[2].glob("*/scripts"):
+        sys.path.insert(0, str(scripts))
+    ledger = BudgetLedger()
+    data = ledger._load()
+    now = time.time()
+    print(f"[INFO] {ledger.summary()} | 여유 ${ledger.headroom():.2f}")
+    for rid, r in data["reservations"].items():
+        if r.get("expires_at", 0) > now:
+            print(f"  {rid[:8]} ${r['amount']:.3f} | {r.get('label', '')} | worker {r.get('worker')} | "
+                  f"{(r['expires_at'] - now) / 60:.0f}분 후 만료")
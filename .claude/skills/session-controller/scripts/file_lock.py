@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+프로세스 간 파일 락 — fcntl.flock (Windows는 msvcrt.locking)
+
+락은 열린 파일 핸들에 걸리므로 프로세스가 죽으면 OS가 자동으로 풀어준다.
+PID 생존 확인(tasklist.exe)이나 stale lock 정리가 필요 없음.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """배타 락. 같은 프로세스 안에서는 재진입 가능 (스레드 간에는 배타)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+        self._depth = 0
+        self._owner = None
+        self._mutex = threading.RLock()
+
+    def _try_lock(self) -> bool:
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, blocking: bool = True, timeout: float = None, poll: float = 0.05) -> bool:
+        if not self._mutex.acquire(blocking, -1 if timeout is None or not blocking else timeout):
+            return False
+        if self._depth:
+            self._depth += 1
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._try_lock():
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                os.close(self._fd)
+                self._fd = None
+                self._mutex.release()
+                return False
+            time.sleep(poll)
+        self._depth = 1
+        return True
+
+    def release(self):
+        if not self._depth:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._mutex.release()
+
+    @property
+    def locked(self) -> bool:
+        return self._depth > 0
+
+    def write_holder(self, text: str):
+        """진단용 — 락 파일 안에 보유자 정보 기록 (락을 잡은 상태에서만)"""
+        if not self._fd:
+            return
+        data = text.encode("utf-8")
+        # Windows는 첫 바이트에 락이 걸려 있으므로 뒤쪽에 기록
+        offset = 0 if fcntl else 1
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        os.write(self._fd, data)
+        os.ftruncate(self._fd, offset + len(data))
+
+    def read_holder(self) -> str:
+        try:
+            return self.path.read_bytes().lstrip(b"\0").decode("utf-8", "replace").strip()
+        except OSError:
+            return ""
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
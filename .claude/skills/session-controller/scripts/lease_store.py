@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+세션 작업 분배 — 여러 프로세스(또는 같은 파일시스템을 쓰는 여러 호스트)가
+하나의 세션을 나눠서 처리할 때 같은 pair를 두 번 생성하지 않도록 TTL 리스를 건다.
+
+- claim: 세션 락 안에서 pending pair 중 리스 없는 것 하나를 점유
+- heartbeat: 생성 중에는 주기적으로 만료 시각 연장 (keepalive 스레드)
+- release: 완료/실패 기록 후 해제. 죽은 워커의 리스는 TTL 후 자동 만료
+- fence: 점유할 때마다 증가하는 번호. 만료 후 다른 워커가 다시 잡았는지 확인용
+
+세션 파일(session_manager)을 읽고 쓰는 구간도 같은 락(locked())으로 감싸야
+여러 워커의 update_session_progress가 서로 덮어쓰지 않는다.
+
+리스 파일: output/logs/leases-{session_id}.json (+ .lock)
+호스트 간 공유 시 시계가 동기화(NTP)되어 있어야 한다.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from file_lock import FileLock
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+LOGS_DIR = BASE_DIR / "output" / "logs"
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+
+DEFAULT_TTL_SECONDS = 300
+
+
+def _load_session_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return json.load(f).get("session", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def make_worker_id(name: str = "main") -> str:
+    return f"{name}@{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseStore:
+    def __init__(self, session_id: str, worker_id: str = None, ttl: float = None, lease_dir=None):
+        cfg = _load_session_config()
+        self.session_id = session_id
+        self.worker_id = worker_id or make_worker_id()
+        self.ttl = ttl or cfg.get("lease_ttl_seconds", DEFAULT_TTL_SECONDS)
+        lease_dir = Path(lease_dir) if lease_dir else LOGS_DIR
+        self.path = lease_dir / f"leases-{session_id}.json"
+        self._lock = FileLock(self.path.with_suffix(".lock"))
+        self.held = {}  # combo_id -> fence
+
+    # ── 락 + 파일 ───────────────────────────────────────
+    @contextmanager
+    def locked(self):
+        """세션 전체 배타 구간 (재진입 가능)"""
+        self._lock.acquire()
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("session_id", self.session_id)
+        data.setdefault("fence", 0)
+        data.setdefault("leases", {})
+        return data
+
+    def _save(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _expire(data: dict, now: float) -> list:
+        expired = [cid for cid, l in data["leases"].items() if l.get("expires_at", 0) <= now]
+        for cid in expired:
+            del data["leases"][cid]
+        return expired
+
+    # ── 점유/해제 ───────────────────────────────────────
+    def claim_many(self, pending: list, n: int, ttl: float = None) -> list:
+        """pending pair 중 다른 워커가 잡지 않은 것을 최대 n개 점유"""
+        ttl = ttl or self.ttl
+        claimed = []
+        with self.locked():
+            now = time.time()
+            data = self._load()
+            expired = self._expire(data, now)
+            if expired:
+                print(f"  [LEASE] 만료 리스 회수 {len(expired)}건")
+            for pair in pending:
+                if len(claimed) >= n:
+                    break
+                cid = pair["combo_id"]
+                if cid in data["leases"]:
+                    continue
+                data["fence"] += 1
+                data["leases"][cid] = {
+                    "worker": self.worker_id,
+                    "fence": data["fence"],
+                    "claimed_at": now,
+                    "expires_at": now + ttl,
+                }
+                self.held[cid] = data["fence"]
+                claimed.append(pair)
+            if claimed or expired:
+                self._save(data)
+        return claimed
+
+    def adopt(self, combo_ids, ttl: float = None) -> int:
+        """이전 워커가 남긴 리스를 이어받음 (서버에서 아직 도는 고아 배치의 pair). 이어받은 수"""
+        ttl = ttl or self.ttl
+        with self.locked():
+            now = time.time()
+            data = self._load()
+            for cid in combo_ids:
+                data["fence"] += 1
+                data["leases"][cid] = {
+                    "worker": self.worker_id,
+                    "fence": data["fence"],
+                    "claimed_at": now,
+                    "expires_at": now + ttl,
+                }
+                self.held[cid] = data["fence"]
+            self._save(data)
+        return len(combo_ids)
+
+    def claim(self, pending: list, ttl: float = None):
+        claimed = self.claim_many(pending, 1, ttl)
+        return claimed[0] if claimed else None
+
+    def heartbeat(self, combo_ids=None, ttl: float = None) -> bool:
+        """보유 리스 연장. 하나라도 다른 워커에게 넘어갔으면 False"""
+        ttl = ttl or self.ttl
+        ids = list(combo_ids) if combo_ids is not None else list(self.held)
+        if not ids:
+            return True
+        ok = True
+        with self.locked():
+            data = self._load()
+            now = time.time()
+            for cid in ids:
+                lease = data["leases"].get(cid)
+                if not lease or lease.get("fence") != self.held.get(cid):
+                    ok = False
+                    continue
+                lease["expires_at"] = now + ttl
+            self._save(data)
+        return ok
+
+    def owns(self, combo_id: str) -> bool:
+        with self.locked():
+            lease = self._load()["leases"].get(combo_id)
+        return bool(lease) and lease.get("fence") == self.held.get(combo_id)
+
+    def release(self, combo_id: str):
+        fence = self.held.pop(combo_id, None)
+        with self.locked():
+            data = self._load()
+            lease = data["leases"].get(combo_id)
+            if lease and lease.get("fence") == fence:
+                del data["leases"][combo_id]
+                self._save(data)
+
+    def release_all(self):
+        if not self.held:
+            return
+        with self.locked():
+            data = self._load()
+            for cid, fence in list(self.held.items()):
+                lease = data["leases"].get(cid)
+                if lease and lease.get("fence") == fence:
+                    del data["leases"][cid]
+            self.held.clear()
+            self._save(data)
+
+    def active_leases(self, other_workers_only: bool = False) -> dict:
+        with self.locked():
+            data = self._load()
+        now = time.time()
+        return {
+            cid: l for cid, l in data["leases"].items()
+            if l.get("expires_at", 0) > now
+            and not (other_workers_only and l.get("worker") == self.worker_id)
+        }
+
+    def unclaimed(self, pending: list) -> list:
+        """다른 워커가 잡고 있는 pair를 뺀 pending 목록"""
+        active = self.active_leases()
+        return [p for p in pending if p["combo_id"] not in active]
+
+    @contextmanager
+    def keepalive(self, combo_ids, interval: float = None, ttl: float = None):
+        """with 블록 동안 백그라운드에서 리스 연장 (생성 중 TTL 만료 방지).
+        ttl: 매번 연장할 길이 — claim 때 긴 TTL을 줬으면 같은 값을 넘겨야 줄어들지 않음 (기본 self.ttl)"""
+        ids = [combo_ids] if isinstance(combo_ids, str) else list(combo_ids)
+        ttl = ttl or self.ttl
+        interval = interval or max(1.0, ttl / 3)
+        stop = threading.Event()
+
+        def _beat():
+            while not stop.wait(interval):
+                try:
+                    if not self.heartbeat(ids, ttl):
+                        print(f"\n  [LEASE] 리스 상실: {', '.join(ids)}")
+                except OSError as e:
+                    print(f"\n  [LEASE] heartbeat 실패: {e}")
+
+        t = threading.Thread(target=_beat, name="lease-heartbeat", daemon=True)
+        t.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            t.join(timeout=interval)
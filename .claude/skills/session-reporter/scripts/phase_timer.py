@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+단계별 지연시간 계측 — 이미지 1장이 어디서 시간을 쓰는지 기록
+
+- 단계(phase)별 HDR 스타일 히스토그램 (모델/키 라벨별)
+- 이미지 1장마다 JSONL 1줄 (output/logs/latency-{session_id}.jsonl)
+- Prometheus textfile (node_exporter textfile collector 형식)
+
+사용:
+  timer = get_phase_timer()
+  timer.begin_cycle(combo_id)
+  with timer.phase("generate"):
+      result = generate_image(...)
+  timer.set_labels(model=result.get("model_used"), key=result.get("key_id"))
+  timer.end_cycle("success")
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+LOGS_DIR = BASE_DIR / "output" / "logs"
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+
+# 2^SUB_BITS 개의 하위 버킷 → 상대 오차 약 3% (값 단위: 마이크로초)
+SUB_BITS = 6
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def _bucket_index(value_us: int) -> int:
+    if value_us < (1 << SUB_BITS):
+        return value_us
+    shift = value_us.bit_length() - SUB_BITS
+    return (shift << SUB_BITS) + (value_us >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    """버킷 대표값 (구간 중앙)"""
+    shift = index >> SUB_BITS
+    if shift == 0:
+        return index
+    lower = (index & ((1 << SUB_BITS) - 1)) << shift
+    return lower + (1 << (shift - 1))
+
+
+class LatencyHistogram:
+    """로그-선형 버킷 히스토그램 (HdrHistogram 방식, 병합 가능)"""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def record(self, seconds: float):
+        value_us = max(0, int(seconds * 1_000_000))
+        idx = _bucket_index(value_us)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: "LatencyHistogram"):
+        for idx, c in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + c
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q: float) -> float:
+        """q (0~1) 분위수, 초 단위"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(q * self.count)))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= rank:
+                value = min(max(_bucket_value(idx), self.min_us), self.max_us)
+                return value / 1_000_000
+        return self.max_us / 1_000_000
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total_us / 1_000_000, 6),
+            "min": round((self.min_us or 0) / 1_000_000, 6),
+            "max": round(self.max_us / 1_000_000, 6),
+            "mean": round(self.total_us / self.count / 1_000_000, 6) if self.count else 0.0,
+            **{f"p{int(q * 100)}": round(self.percentile(q), 6) for q in QUANTILES},
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "sub_bits": SUB_BITS,
+            "counts": {str(k): v for k, v in sorted(self.counts.items())},
+            "count": self.count,
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        h = cls()
+        h.counts = {int(k): v for k, v in data.get("counts", {}).items()}
+        h.count = data.get("count", 0)
+        h.total_us = data.get("total_us", 0)
+        h.min_us = data.get("min_us")
+        h.max_us = data.get("max_us", 0)
+        return h
+
+
+def _load_metrics_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return json.load(f).get("metrics", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _label_value(value) -> str:
+    return str(value or "").replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class PhaseTimer:
+    """단계별 계측기 — 사이클(이미지 1장) 단위로 단계 시간을 모아 기록"""
+
+    def __init__(self, jsonl_path=None, prom_path=None, enabled=True):
+        self.enabled = enabled
+        self.session_id = None
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.prom_path = Path(prom_path) if prom_path else None
+        self.histograms = {}  # (phase, model, key) -> LatencyHistogram
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ── 사이클 ──────────────────────────────────────────
+    def begin_cycle(self, combo_id: str, model: str = "", key: str = ""):
+        self._local.cycle = {
+            "combo_id": combo_id,
+            "model": model,
+            "key": key,
+            "started": time.perf_counter(),
+            "phases": {},
+        }
+
+    def set_labels(self, model: str = None, key: str = None):
+        cycle = getattr(self._local, "cycle", None)
+        if cycle is None:
+            return
+        if model:
+            cycle["model"] = model
+        if key:
+            cycle["key"] = key
+
+    def end_cycle(self, status: str = "success"):
+        cycle = getattr(self._local, "cycle", None)
+        self._local.cycle = None
+        if cycle is None or not self.enabled:
+            return
+        total = time.perf_counter() - cycle["started"]
+        with self._lock:
+            for name, seconds in cycle["phases"].items():
+                self._record_locked(name, seconds, cycle["model"], cycle["key"])
+            self._record_locked("cycle", total, cycle["model"], cycle["key"])
+        self._append_jsonl({
+            "type": "cycle",
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "combo_id": cycle["combo_id"],
+            "status": status,
+            "model": cycle["model"],
+            "key": cycle["key"],
+            "total": round(total, 4),
+            "phases": {k: round(v, 4) for k, v in cycle["phases"].items()},
+        })
+
+    # ── 단계 ────────────────────────────────────────────
+    @contextmanager
+    def phase(self, name: str, model: str = "", key: str = ""):
+        """with 블록 소요 시간을 기록. 사이클 안이면 사이클 라벨로 묶어서 기록"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0, model, key)
+
+    def record(self, name: str, seconds: float, model: str = "", key: str = ""):
+        if not self.enabled:
+            return
+        cycle = getattr(self._local, "cycle", None)
+        if cycle is not None:
+            cycle["phases"][name] = cycle["phases"].get(name, 0.0) + seconds
+            return
+        with self._lock:
+            self._record_locked(name, seconds, model, key)
+
+    def _record_locked(self, name, seconds, model, key):
+        hkey = (name, model or "", key or "")
+        hist = self.histograms.get(hkey)
+        if hist is None:
+            hist = self.histograms[hkey] = LatencyHistogram()
+        hist.record(seconds)
+
+    # ── 조회/내보내기 ────────────────────────────────────
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                {"phase": p, "model": m, "key": k, **h.summary()}
+                for (p, m, k), h in sorted(self.histograms.items())
+            ]
+
+    def _append_jsonl(self, record: dict):
+        if not self.jsonl_path:
+            return
+        try:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[WARN] latency jsonl 기록 실패: {e}")
+
+    def export_histograms(self):
+        """누적 히스토그램 전체를 JSONL에 기록 (병합용 버킷 포함)"""
+        with self._lock:
+            items = sorted(self.histograms.items())
+            records = [{
+                "type": "histogram",
+                "ts": datetime.now(timezone.utc).isoformat(),
+                "phase": p, "model": m, "key": k,
+                "summary": h.summary(),
+                "histogram": h.to_dict(),
+            } for (p, m, k), h in items]
+        for r in records:
+            self._append_jsonl(r)
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP nano_banana_phase_seconds Per-phase latency of the generation loop",
+            "# TYPE nano_banana_phase_seconds summary",
+        ]
+        with self._lock:
+            for (p, m, k), h in sorted(self.histograms.items()):
+                labels = f'phase="{_label_value(p)}",model="{_label_value(m)}",key="{_label_value(k)}"'
+                for q in QUANTILES:
+                    lines.append(f'nano_banana_phase_seconds{{{labels},quantile="{q}"}} {h.percentile(q):.6f}')
+                lines.append(f"nano_banana_phase_seconds_sum{{{labels}}} {h.total_us / 1_000_000:.6f}")
+                lines.append(f"nano_banana_phase_seconds_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """textfile collector가 반쪽 파일을 읽지 않도록 임시파일 → rename"""
+        if not self.enabled or not self.prom_path:
+            return
+        try:
+            self.prom_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.prom_path.with_suffix(self.prom_path.suffix + ".tmp")
+            tmp.write_text(self.render_prometheus(), encoding="utf-8")
+            os.replace(tmp, self.prom_path)
+        except OSError as e:
+            print(f"[WARN] prometheus textfile 기록 실패: {e}")
+
+    def flush(self):
+        self.write_prometheus()
+        self.export_histograms()
+
+    def print_summary(self):
+        rows = [r for r in self.snapshot() if r["count"]]
+        if not rows:
+            return
+        print(f"\n{'=' * 55}")
+        print("[LATENCY] 단계별 소요 (p50 / p95 / max, 초)")
+        for r in rows:
+            label = "/".join(x for x in (r["model"], r["key"]) if x) or "-"
+            print(f"  {r['phase']:<14} {label:<32} n={r['count']:<4} "
+                  f"{r['p50']:.2f} / {r['p95']:.2f} / {r['max']:.2f}")
+        print(f"{'=' * 55}\n")
+
+
+_timer = None
+
+
+def get_phase_timer(session_id: str = None) -> PhaseTimer:
+    """프로세스 공용 계측기. session_id가 바뀌면 (scheduled_run 데몬의 다음 세션)
+    그 세션의 latency-{id}.jsonl과 빈 히스토그램으로 새로 만든다"""
+    global _timer
+    if _timer is None or (session_id and session_id != _timer.session_id):
+        cfg = _load_metrics_config()
+        enabled = cfg.get("enabled", True)
+        jsonl_path = None
+        if session_id and enabled:
+            jsonl_path = BASE_DIR / cfg.get("latency_dir", "output/logs") / f"latency-{session_id}.jsonl"
+        prom_path = BASE_DIR / cfg.get("prometheus_textfile", "output/logs/nano_banana.prom")
+        _timer = PhaseTimer(jsonl_path, prom_path, enabled)
+        _timer.session_id = session_id
+    return _timer
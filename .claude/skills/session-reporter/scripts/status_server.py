@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+실행 상태 HTTP 엔드포인트 — 긴 실행 중 진행 상황을 콘솔 로그 대신 JSON/Prometheus로 확인
+
+  GET /status   JSON (진행/속도/ETA/비용 소모율/키·모델 상태/대기열)
+  GET /metrics  Prometheus 텍스트 (실행 상태 gauge + phase_timer 단계별 지연)
+  GET /healthz  "ok"
+
+생성 루프는 RunStatus 속성만 갱신하고 (락 없는 대입/증가, 완료 기록만 짧은 락)
+무거운 값(브레이커/키 상태, 예약 장부)은 provider 함수로 등록해 조회할 때만 계산한다.
+조회 결과는 status_cache_seconds 동안 재사용 → 자주 긁어도 루프에 부담 없음.
+
+사용:
+  python run_batch.py 200 --status-port 8787
+  curl -s localhost:8787/status
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+
+DEFAULT_STATUS = {
+    "status_host": "127.0.0.1",
+    "status_cache_seconds": 1.0,
+}
+
+RATE_WINDOW = 20  # 최근 완료 N건으로 속도/ETA 계산
+
+
+def _load_status_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            metrics = json.load(f).get("metrics", {})
+    except (OSError, ValueError):
+        metrics = {}
+    return {k: metrics.get(k, v) for k, v in DEFAULT_STATUS.items()}
+
+
+def _label_value(value) -> str:
+    return str(value or "").replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class RunStatus:
+    """실행 1회의 상태. 쓰기는 생성 루프, 읽기는 HTTP 스레드"""
+
+    def __init__(self, clock=time):
+        self.clock = clock
+        self.providers = {}
+        self._lock = threading.Lock()
+        self.begin("idle")
+
+    def begin(self, mode: str, session_id: str = "", target: int = 0, worker: str = "", **fields):
+        self.mode = mode
+        self.session_id = session_id
+        self.worker = worker
+        self.target = target
+        self.started = self.clock.time()
+        self.stage = "running"
+        self.generated = 0
+        self.failed = 0
+        self.pro_count = 0
+        self.flash_count = 0
+        self.cost = 0.0
+        self.in_flight = 0
+        self.current = ""
+        self.pending = None
+        self.extra = dict(fields)
+        self._recent = deque(maxlen=RATE_WINDOW)  # (완료 시각, 성공 여부, 비용)
+
+    def update(self, **fields):
+        """stage/pending/current 같은 단순 값 갱신. 모르는 키는 extra로"""
+        with self._lock:
+            for k, v in fields.items():
+                if k in ("stage", "pending", "current", "in_flight", "target"):
+                    setattr(self, k, v)
+                else:
+                    self.extra[k] = v
+
+    def provide(self, name: str, fn):
+        """조회 시점에만 호출할 값 (예: 브레이커 요약). 루프는 호출하지 않음"""
+        self.providers[name] = fn
+
+    def call_started(self, combo_id: str = ""):
+        self.in_flight += 1
+        self.current = combo_id
+
+    def call_finished(self):
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def record(self, success: bool, cost: float = 0.0, is_flash: bool = False):
+        with self._lock:
+            if success:
+                self.generated += 1
+                self.cost = round(self.cost + cost, 4)
+                if is_flash:
+                    self.flash_count += 1
+                else:
+                    self.pro_count += 1
+            else:
+                self.failed += 1
+            self._recent.append((self.clock.time(), success, cost if success else 0.0))
+
+    # ── 조회 ────────────────────────────────────────────
+    def _rates(self, now: float):
+        """(장/시간, $/시간) — 최근 완료 구간 기준, 2건 미만이면 시작부터 평균"""
+        recent = list(self._recent)
+        if len(recent) >= 2 and recent[-1][0] > recent[0][0]:
+            span = recent[-1][0] - recent[0][0]
+            done = sum(1 for _, ok, _ in recent[1:] if ok)
+            spent = sum(c for _, _, c in recent[1:])
+        else:
+            span = now - self.started
+            done, spent = self.generated, self.cost
+        if span <= 0:
+            return 0.0, 0.0
+        return done * 3600 / span, spent * 3600 / span
+
+    def snapshot(self) -> dict:
+        # extra/_recent는 루프 스레드가 바꾸므로 락 안에서 복사 (provider 호출은 락 밖)
+        with self._lock:
+            data = self._snapshot_locked()
+        for name, fn in list(self.providers.items()):
+            try:
+                data[name] = fn()
+            except Exception as e:
+                data[name] = f"error: {e}"
+        return data
+
+    def _snapshot_locked(self) -> dict:
+        now = self.clock.time()
+        images_per_hour, cost_per_hour = self._rates(now)
+        remaining = max(0, self.target - self.generated - self.failed) if self.target else None
+        eta = round(remaining * 3600 / images_per_hour) if remaining and images_per_hour > 0 else None
+        return {
+            "mode": self.mode,
+            "stage": self.stage,
+            "session_id": self.session_id,
+            "worker": self.worker,
+            "uptime_seconds": round(now - self.started, 1),
+            "target": self.target,
+            "generated": self.generated,
+            "failed": self.failed,
+            "pro_count": self.pro_count,
+            "flash_count": self.flash_count,
+            "in_flight": self.in_flight,
+            "current": self.current,
+            "queue": {"pending": self.pending, "remaining": remaining},
+            "images_per_hour": round(images_per_hour, 2),
+            "cost": self.cost,
+            "cost_per_hour": round(cost_per_hour, 4),
+            "eta_seconds": eta,
+            **self.extra,
+        }
+
+    def render_prometheus(self, snap: dict = None) -> str:
+        s = snap or self.snapshot()
+        labels = (f'session="{_label_value(s["session_id"])}",mode="{_label_value(s["mode"])}",'
+                  f'worker="{_label_value(s["worker"])}"')
+        gauges = [
+            ("nano_banana_images_total", "Images finished in this run", "counter",
+             [(f'{labels},status="done"', s["generated"]), (f'{labels},status="failed"', s["failed"])]),
+            ("nano_banana_in_flight", "Generation calls in flight", "gauge", [(labels, s["in_flight"])]),
+            ("nano_banana_images_per_hour", "Recent generation rate", "gauge", [(labels, s["images_per_hour"])]),
+            ("nano_banana_cost_dollars", "Cost spent in this run", "counter", [(labels, s["cost"])]),
+            ("nano_banana_cost_per_hour", "Recent cost burn rate", "gauge", [(labels, s["cost_per_hour"])]),
+            ("nano_banana_eta_seconds", "Estimated time to target", "gauge",
+             [(labels, s["eta_seconds"])] if s["eta_seconds"] is not None else []),
+            ("nano_banana_queue_pending", "Pending pairs at the last claim", "gauge",
+             [(labels, s["queue"]["pending"])] if s["queue"]["pending"] is not None else []),
+            ("nano_banana_uptime_seconds", "Seconds since the run started", "gauge", [(labels, s["uptime_seconds"])]),
+        ]
+        keys = s.get("keys")
+        if isinstance(keys, dict):
+            if "flash_mode" in keys:
+                gauges.append(("nano_banana_flash_mode", "1 while the run is on the Flash model", "gauge",
+                               [(labels, int(bool(keys["flash_mode"])))]))
+            if "api_calls" in keys:
+                gauges.append(("nano_banana_api_calls_total", "API calls made by the rate limiter", "counter",
+                               [(labels, keys["api_calls"])]))
+        lines = []
+        for name, help_text, kind, samples in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for lab, value in samples:
+                lines.append(f"{name}{{{lab}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "nano-banana-status"
+
+    def do_GET(self):
+        srv = self.server
+        path = self.path.split("?", 1)[0].rstrip("/") or "/status"
+        if path == "/healthz":
+            body, ctype = b"ok\n", "text/plain; charset=utf-8"
+        elif path == "/status":
+            body = json.dumps(srv.cached_snapshot(), ensure_ascii=False, indent=2).encode("utf-8")
+            ctype = "application/json; charset=utf-8"
+        elif path == "/metrics":
+            body, ctype = srv.render_metrics().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass  # 콘솔 진행 출력과 섞이지 않게
+
+
+class StatusServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, status: RunStatus, port: int, host: str = None, cache_seconds: float = None, timer=None):
+        cfg = _load_status_config()
+        super().__init__((host or cfg["status_host"], port), _Handler)
+        self.status = status
+        self.timer = timer
+        self.cache_seconds = cfg["status_cache_seconds"] if cache_seconds is None else cache_seconds
+        self._cache = (0.0, None)
+        self._cache_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def cached_snapshot(self) -> dict:
+        with self._cache_lock:
+            at, snap = self._cache
+            now = time.monotonic()
+            if snap is None or now - at >= self.cache_seconds:
+                snap = self.status.snapshot()
+                self._cache = (now, snap)
+            return snap
+
+    def render_metrics(self) -> str:
+        text = self.status.render_prometheus(self.cached_snapshot())
+        timer = self.timer
+        if timer is None:
+            from phase_timer import get_phase_timer
+            timer = get_phase_timer()
+        return text + timer.render_prometheus()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="status-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+_status = None
+
+
+def get_run_status() -> RunStatus:
+    global _status
+    if _status is None:
+        _status = RunStatus()
+    return _status
+
+
+def start_status_server(port: int, status: RunStatus = None, host: str = None, timer=None) -> StatusServer:
+    """백그라운드 스레드로 상태 서버 시작. 포트를 못 열면 경고만 (생성은 계속)"""
+    try:
+        server = StatusServer(status or get_run_status(), port, host, timer=timer).start()
+    except OSError as e:
+        print(f"[WARN] 상태 서버 시작 실패 (포트 {port}): {e}")
+        return None
+    host, port = server.server_address[:2]
+    print(f"[STATUS] http://{host}:{port}/status | /metrics")
+    return server
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+좋아요 기반 조합 선택 — Thompson sampling으로 좋아요/달러가 높을 조합에 예산을 먼저 쓴다
+
+세션 pair 순서와 템플릿은 지금까지 무작위/순환이라 좋아요가 잘 나오는 단어·템플릿을 알아도
+다음 세션에 반영되지 않았다. 여기서는 축(family)별로 Beta 사후분포를 두고
+  word1 / word2 / template / style  (style은 기록에 style_id가 있을 때만)
+생성된 이미지 = 시행, 좋아요(output/likes, 인덱스 liked) = 성공으로 센다.
+
+  - 사전분포: 전체 좋아요율을 중심으로 prior_strength만큼의 가상 시행
+    word1은 같은 카테고리(vocab_store)의 좋아요율을 중심으로 → 처음 보는 단어도 카테고리 덕을 봄
+    style은 settings.style_weights 비율로 사전 좋아요율을 기울임
+  - 점수: 축별 표본의 상승률(θ/전체율)을 곱한 좋아요 확률 ÷ 예상 비용 (cost_aware)
+  - 표본을 매번 새로 뽑으므로 덜 본 단어/템플릿도 계속 조금씩 시도됨 (탐색)
+
+상태는 output/logs/bandit-state.json — 반영한 combo_id별 좋아요 여부를 같이 저장해
+update()는 새 이미지와 좋아요가 바뀐 이미지만 반영한다 (나중에 좋아요를 눌러도 차이만 더함).
+
+사용:
+  python bandit_selector.py stats
+  python bandit_selector.py rebuild
+  python bandit_selector.py top word1 20
+  python bandit_selector.py style          # settings.style_weights 조정 제안 (보고용)
+"""
+import glob
+import json
+import os
+import random
+import sqlite3
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+CONFIG_DIR = BASE_DIR / "config"
+SETTINGS_FILE = CONFIG_DIR / "settings.json"
+TEMPLATES_FILE = CONFIG_DIR / "prompt-templates.json"
+STATE_FILE = BASE_DIR / "output" / "logs" / "bandit-state.json"
+INDEX_FILE = BASE_DIR / "output" / "images" / "index.sqlite3"
+METADATA_DIR = BASE_DIR / "output" / "images" / "metadata"
+LIKES_DIR = BASE_DIR / "output" / "likes"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "pin-tracker" / "scripts"))
+
+DEFAULT_BANDIT = {
+    "enabled": True,
+    "prior_strength": 10,   # 사전분포 가상 시행 수 (클수록 데이터가 많이 쌓여야 움직임)
+    "cost_aware": True,     # 좋아요 확률 ÷ 예상 비용으로 순서 결정
+}
+
+FAMILIES = ("word1", "word2", "template", "style")
+STYLE_FIELDS = ("style_id", "style")
+
+
+def _load_bandit_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    cfg = {**DEFAULT_BANDIT, **settings.get("bandit", {})}
+    cfg["style_weights"] = settings.get("style_weights", {})
+    return cfg
+
+
+def _load_template_ids() -> list:
+    try:
+        with open(TEMPLATES_FILE, encoding="utf-8") as f:
+            return [t["id"] for t in json.load(f).get("templates", [])]
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def liked_from_files(likes_dir=LIKES_DIR) -> set:
+    """output/likes/{date}_{seq}_*.png 파일명 → combo_id"""
+    liked = set()
+    for f in glob.glob(os.path.join(str(likes_dir), "*.png")):
+        parts = os.path.basename(f).replace(".png", "").split("_")
+        if len(parts) >= 2:
+            liked.add(parts[0] + "_" + parts[1])
+    return liked
+
+
+def arms_of(record: dict) -> dict:
+    """기록 1건 → {축: 팔 이름}. 값이 없는 축은 빠짐"""
+    arms = {
+        "word1": record.get("word1"),
+        "word2": record.get("word2"),
+        "template": record.get("template_id"),
+        "style": next((record[k] for k in STYLE_FIELDS if record.get(k)), None),
+    }
+    return {f: str(a) for f, a in arms.items() if a}
+
+
+class BanditSelector:
+    def __init__(self, path=STATE_FILE, cfg: dict = None, rng=None, category_of=None):
+        self.cfg = cfg or _load_bandit_config()
+        self.path = Path(path)
+        self.rng = rng or random.Random()
+        self._category_of = category_of
+        self.arms = {f: {} for f in FAMILIES}  # 축 → 팔 → [시행, 좋아요, 비용 합]
+        self.categories = {}                    # word1 카테고리 → [시행, 좋아요]
+        self.total = [0, 0, 0.0]
+        self.seen = {}                          # combo_id → 반영한 좋아요 여부 (0/1)
+        self.sources = {}                       # metadata 날짜 → 파일 [mtime, size, ...]
+        self._dirty = False
+        self._load()
+
+    # ── 저장/로드 ───────────────────────────────────────
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != 1:
+            return
+        self.arms = {f: data.get("arms", {}).get(f, {}) for f in FAMILIES}
+        self.categories = data.get("categories", {})
+        self.total = data.get("total", self.total)
+        self.seen = data.get("seen", {})
+        self.sources = data.get("sources", {})
+
+    def save(self):
+        """원자적 저장. 다른 워커가 덮어써도 seen과 집계가 같이 저장되므로 다음 update에서 다시 맞춰짐"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "arms": self.arms, "categories": self.categories, "total": self.total,
+                       "seen": self.seen, "sources": self.sources}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    # ── 관측 반영 ───────────────────────────────────────
+    def category_of(self, word1: str):
+        if self._category_of is None:
+            try:
+                from vocab_store import get_vocab
+                self._category_of = get_vocab().category
+            except Exception:
+                self._category_of = lambda word, default=None: default
+        return self._category_of(word1, None)
+
+    def observe(self, record: dict, liked: bool) -> bool:
+        """이미지 1건 반영. 이미 반영한 건 좋아요 여부가 바뀐 경우만 차이를 더함 → 바뀌었으면 True"""
+        cid = record.get("combo_id")
+        liked = int(bool(liked))
+        prev = self.seen.get(cid) if cid else None
+        if prev == liked:
+            return False
+        if prev is None:
+            trials, cost = 1, float(record.get("cost") or 0)
+        else:
+            trials, cost = 0, 0.0
+        delta = liked - (prev or 0)
+        for family, arm in arms_of(record).items():
+            stat = self.arms[family].setdefault(arm, [0, 0, 0.0])
+            stat[0] += trials
+            stat[1] += delta
+            stat[2] = round(stat[2] + cost, 4)
+        cat = self.category_of(record.get("word1", ""))
+        if cat:
+            stat = self.categories.setdefault(cat, [0, 0])
+            stat[0] += trials
+            stat[1] += delta
+        self.total = [self.total[0] + trials, self.total[1] + delta, round(self.total[2] + cost, 4)]
+        if cid:
+            self.seen[cid] = liked
+        self._dirty = True
+        return True
+
+    def _index_records(self):
+        """image_store 인덱스 (있을 때만, 읽기 전용)"""
+        if not INDEX_FILE.exists():
+            return None
+        conn = sqlite3.connect(f"file:{INDEX_FILE}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute("SELECT combo_id, word1, word2, template_id, cost, liked, extra FROM images").fetchall()
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        records = []
+        for r in rows:
+            d = dict(r)
+            extra = d.pop("extra", None)
+            if extra:
+                d = {**{k: v for k, v in json.loads(extra).items() if k in STYLE_FIELDS}, **d}
+            records.append(d)
+        return records
+
+    def _metadata_records(self):
+        """인덱스가 없을 때 — 바뀐 날짜별 metadata(JSON/JSONL)만"""
+        from metadata_log import all_dates, iter_entries
+        records = []
+        for date in all_dates(METADATA_DIR):
+            sig = []
+            for f in sorted(glob.glob(str(METADATA_DIR / f"{date}_metadata.json*"))):
+                st = os.stat(f)
+                sig += [int(st.st_mtime), st.st_size]
+            if self.sources.get(date) == sig:
+                continue
+            records.extend(m for m in iter_entries(date, METADATA_DIR) if m.get("word1") and m.get("combo_id"))
+            self.sources[date] = sig
+        return records
+
+    def update(self, likes_dir=LIKES_DIR) -> int:
+        """새 이미지/좋아요만 반영해 저장 → 바뀐 건수"""
+        liked_files = liked_from_files(likes_dir)
+        records = self._index_records()
+        if records is None:
+            records = self._metadata_records()
+            # metadata가 안 바뀌어도 좋아요 파일은 새로 생길 수 있음 → 이미 본 이미지의 좋아요만 갱신
+            flips = [cid for cid in liked_files if self.seen.get(cid) == 0]
+            records += [{"combo_id": cid, **self._arms_hint(cid)} for cid in flips]
+        changed = 0
+        for r in records:
+            cid = r.get("combo_id")
+            if not cid:
+                continue
+            liked = bool(r.get("liked")) or cid in liked_files
+            if self.observe(r, liked):
+                changed += 1
+        if self._dirty:
+            self.save()
+        return changed
+
+    def _arms_hint(self, cid: str) -> dict:
+        """metadata를 다시 읽지 않고 좋아요만 바뀐 이미지의 단어/템플릿 — 날짜 파일 하나만 찾아봄"""
+        from metadata_log import iter_entries
+        for m in iter_entries(cid.split("_")[0], METADATA_DIR):
+            if m.get("combo_id") == cid:
+                return {k: v for k, v in m.items() if k != "liked"}
+        return {}
+
+    def rebuild(self, likes_dir=LIKES_DIR) -> int:
+        self.arms = {f: {} for f in FAMILIES}
+        self.categories = {}
+        self.total = [0, 0, 0.0]
+        self.seen = {}
+        self.sources = {}
+        return self.update(likes_dir)
+
+    # ── 사후분포 ────────────────────────────────────────
+    def base_rate(self) -> float:
+        n, likes = self.total[0], self.total[1]
+        return (likes + 1) / (n + 2)
+
+    def mean_cost(self) -> float:
+        return self.total[2] / self.total[0] if self.total[0] else 0.0
+
+    def _prior_mean(self, family: str, arm: str, base: float) -> float:
+        if family == "word1":
+            cat = self.category_of(arm)
+            stat = self.categories.get(cat) if cat else None
+            if stat:
+                s = self.cfg["prior_strength"]
+                return (s * base + stat[1]) / (s + stat[0])
+        elif family == "style":
+            weights = self.cfg.get("style_weights") or {}
+            if arm in weights and weights:
+                avg = sum(weights.values()) / len(weights)
+                return min(0.95, base * weights[arm] / avg) if avg else base
+        return base
+
+    def posterior(self, family: str, arm: str, base: float = None) -> tuple:
+        """(alpha, beta)"""
+        base = self.base_rate() if base is None else base
+        m = self._prior_mean(family, arm, base)
+        s = self.cfg["prior_strength"]
+        n, likes = self.arms[family].get(arm, (0, 0))[:2]
+        return s * m + likes, s * (1 - m) + max(0, n - likes)
+
+    def mean(self, family: str, arm: str) -> float:
+        a, b = self.posterior(family, arm)
+        return a / (a + b)
+
+    def _sampler(self):
+        """한 번의 결정 안에서는 같은 팔은 같은 표본 (Thompson)"""
+        base = self.base_rate()
+        drawn = {}
+
+        def draw(family, arm):
+            key = (family, arm)
+            if key not in drawn:
+                a, b = self.posterior(family, arm, base)
+                drawn[key] = self.rng.betavariate(a, b)
+            return drawn[key]
+        return base, draw
+
+    def _cost(self, arms: dict) -> float:
+        stat = self.arms["template"].get(arms.get("template"))
+        if stat and stat[0]:
+            return stat[2] / stat[0] or self.mean_cost()
+        return self.mean_cost()
+
+    def score(self, record: dict, draw=None, base: float = None) -> float:
+        """좋아요 확률(축별 상승률 곱) — cost_aware면 달러당"""
+        if draw is None:
+            base, draw = self._sampler()
+        arms = arms_of(record)
+        p = base
+        for family, arm in arms.items():
+            p *= draw(family, arm) / base
+        p = min(p, 1.0)
+        cost = self._cost(arms) if self.cfg["cost_aware"] else 0.0
+        return p / cost if cost > 0 else p
+
+    # ── 선택 ────────────────────────────────────────────
+    def order(self, pairs: list) -> list:
+        """pending pair를 표본 점수 순으로 (앞에서부터 생성/점유). 비활성이면 그대로"""
+        if not self.cfg["enabled"] or len(pairs) < 2:
+            return pairs
+        base, draw = self._sampler()
+        scored = [(self.score(p, draw, base), i, p) for i, p in enumerate(pairs)]
+        scored.sort(key=lambda t: (-t[0], t[1]))
+        return [p for _, _, p in scored]
+
+    def choose(self, family: str, candidates, rng=None):
+        """후보 중 표본이 가장 큰 팔 하나"""
+        candidates = list(candidates)
+        if not candidates:
+            return None
+        rng = rng or self.rng
+        if not self.cfg["enabled"]:
+            return rng.choice(candidates)
+        base = self.base_rate()
+        best, best_theta = None, -1.0
+        for arm in candidates:
+            a, b = self.posterior(family, str(arm), base)
+            theta = rng.betavariate(a, b)
+            if theta > best_theta:
+                best, best_theta = arm, theta
+        return best
+
+    def choose_template(self, template_ids=None, rng=None):
+        return self.choose("template", template_ids if template_ids is not None else _load_template_ids(), rng)
+
+    def template_index(self, fallback: int = 0, rng=None) -> int:
+        """generate_image(template_index=)용 — prompt-templates.json 순서의 위치. 비활성이면 fallback(순환)"""
+        ids = _load_template_ids()
+        if not self.cfg["enabled"] or not ids:
+            return fallback
+        return ids.index(self.choose_template(ids, rng))
+
+    def style_weights(self) -> dict:
+        """settings.style_weights를 사후 평균 좋아요율 비율로 조정한 값 (합은 원래 합과 같게).
+        스타일은 generate가 settings.style_weights로 고르므로 여기서는 제안만 — `style` 명령으로 출력"""
+        weights = self.cfg.get("style_weights") or {}
+        if not weights:
+            return {}
+        means = {k: self.mean("style", k) for k in weights}
+        scale = sum(weights.values()) / (sum(means.values()) or 1)
+        return {k: round(v * scale, 3) for k, v in means.items()}
+
+    # ── 요약 ────────────────────────────────────────────
+    def top(self, family: str, n: int = 10, min_trials: int = 1) -> list:
+        rows = [(arm, s[0], s[1], self.mean(family, arm)) for arm, s in self.arms[family].items() if s[0] >= min_trials]
+        rows.sort(key=lambda r: -r[3])
+        return rows[:n]
+
+    def stats(self) -> dict:
+        n, likes, cost = self.total
+        return {
+            "images": n, "liked": likes, "cost": round(cost, 2),
+            "like_rate": round(likes / n, 4) if n else 0.0,
+            "liked_per_dollar": round(likes / cost, 3) if cost else 0.0,
+            **{f"{f}_arms": len(self.arms[f]) for f in FAMILIES},
+        }
+
+    def describe(self) -> str:
+        s = self.stats()
+        return (f"bandit {s['images']}장 / 좋아요 {s['liked']} ({s['like_rate'] * 100:.1f}%, "
+                f"{s['liked_per_dollar']:.2f}/$) | word1 {s['word1_arms']} · word2 {s['word2_arms']} · "
+                f"템플릿 {s['template_arms']} · 스타일 {s['style_arms']}")
+
+
+_bandit = None
+
+
+def get_bandit() -> BanditSelector:
+    """프로세스 공용. 처음 부를 때 새 이미지/좋아요만 반영"""
+    global _bandit
+    if _bandit is None:
+        _bandit = BanditSelector()
+        try:
+            _bandit.update()
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"[WARN] bandit 갱신 실패 — 기존 상태로 계속: {e}")
+    return _bandit
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    b = BanditSelector()
+    if cmd == "rebuild":
+        print(f"[OK] {b.rebuild()}건 반영")
+    else:
+        b.update()
+    if cmd == "top" and len(sys.argv) >= 3:
+        family = sys.argv[2]
+        for arm, n, likes, mean in b.top(family, int(sys.argv[3]) if len(sys.argv) > 3 else 20):
+            print(f"  {arm:<24} {likes:>4}/{n:<5} 사후 {mean * 100:5.1f}%")
+    if cmd == "style":
+        current = b.cfg.get("style_weights") or {}
+        for arm, weight in b.style_weights().items():
+            n, likes = b.arms["style"].get(arm, (0, 0))[:2]
+            print(f"  {arm:<12} {current[arm]:>5} → {weight:<6} ({likes}/{n}, 사후 {b.mean('style', arm) * 100:5.1f}%)")
+    print(f"[INFO] {b.describe()}")
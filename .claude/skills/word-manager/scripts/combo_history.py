@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+세션 간 조합 이력 — Bloom filter로 이미 생성한 word1×word2를 O(1) 확인
+
+같은 조합을 다시 생성하면 Pro 기준 $0.134를 내고 새 정보는 거의 없다.
+과거 세션 파일(output/logs/session-*.json, status=done)과 날짜별 metadata(JSON/JSONL)에서
+조합을 모아 output/logs/combo-history.bin에 저장하고, 바뀐 파일만 다시 읽어 갱신한다.
+
+- 오탐(false positive): 새 조합을 "이미 생성"으로 잘못 볼 확률. 목표 fp_rate(기본 0.1%)로 크기 결정
+- 미탐 없음: 생성한 조합은 항상 걸러짐
+- 여러 워커가 저장해도 비트 OR로 합쳐짐
+
+사용:
+  python combo_history.py stats
+  python combo_history.py rebuild
+  python combo_history.py check 지우개 커피
+"""
+import glob
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+SETTINGS_FILE = BASE_DIR / "config" / "settings.json"
+LOGS_DIR = BASE_DIR / "output" / "logs"
+METADATA_DIR = BASE_DIR / "output" / "images" / "metadata"
+HISTORY_FILE = LOGS_DIR / "combo-history.bin"
+
+DEFAULT_HISTORY = {
+    "capacity": 100000,
+    "fp_rate": 0.001,
+}
+
+MAGIC = b"NBCH1"
+
+
+def _load_history_config() -> dict:
+    try:
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            return {**DEFAULT_HISTORY, **json.load(f).get("combo_history", {})}
+    except (OSError, ValueError):
+        return dict(DEFAULT_HISTORY)
+
+
+def combo_key(word1: str, word2: str) -> bytes:
+    return f"{(word1 or '').strip()}\x1f{(word2 or '').strip()}".encode("utf-8")
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float, bits: bytearray = None, count: int = 0):
+        self.capacity = int(capacity)
+        self.fp_rate = float(fp_rate)
+        self.m = max(64, int(math.ceil(-self.capacity * math.log(self.fp_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.m / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.m + 7) // 8)
+        self.count = count
+
+    def _positions(self, key: bytes):
+        # double hashing: h1 + i*h2
+        d = hashlib.blake2b(key, digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", d)
+        h2 |= 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def add(self, key: bytes) -> bool:
+        """추가. 새로 켜진 비트가 있으면 True (이미 있던 것으로 보이면 False)"""
+        new = False
+        for p in self._positions(key):
+            byte, bit = divmod(p, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def merge(self, other: "BloomFilter"):
+        if (other.m, other.k) != (self.m, self.k):
+            raise ValueError("Bloom filter 크기가 다름")
+        n = len(self.bits)
+        merged = int.from_bytes(self.bits, "little") | int.from_bytes(other.bits, "little")
+        self.bits = bytearray(merged.to_bytes(n, "little"))
+        self.count = max(self.count, other.count)
+
+    def estimated_fp_rate(self) -> float:
+        """현재 항목 수 기준 오탐 확률"""
+        return (1 - math.exp(-self.k * self.count / self.m)) ** self.k
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+
+class ComboHistory:
+    def __init__(self, path=HISTORY_FILE, capacity: int = None, fp_rate: float = None):
+        cfg = _load_history_config()
+        self.path = Path(path)
+        self.capacity = capacity or cfg["capacity"]
+        self.fp_rate = fp_rate or cfg["fp_rate"]
+        self.sources = {}  # 파일 경로 → [mtime, size]
+        self.bloom = BloomFilter(self.capacity, self.fp_rate)
+        self._dirty = 0
+        self._load()
+
+    # ── 저장/로드 ───────────────────────────────────────
+    def _read(self):
+        """디스크의 (header, BloomFilter) 또는 None"""
+        try:
+            raw = self.path.read_bytes()
+        except OSError:
+            return None
+        if not raw.startswith(MAGIC):
+            return None
+        hlen = struct.unpack("<I", raw[len(MAGIC):len(MAGIC) + 4])[0]
+        start = len(MAGIC) + 4
+        header = json.loads(raw[start:start + hlen].decode("utf-8"))
+        bloom = BloomFilter(header["capacity"], header["fp_rate"], bytearray(raw[start + hlen:]), header["count"])
+        if len(bloom.bits) != (bloom.m + 7) // 8:
+            return None
+        return header, bloom
+
+    def _load(self):
+        # update()가 2배로 키운 파일은 설정 용량보다 큼 — 그대로 씀 (작을 때만 버리고 다시 만듦)
+        data = self._read()
+        if data and data[0]["fp_rate"] == self.fp_rate and data[0]["capacity"] >= self.capacity:
+            self.capacity = data[0]["capacity"]
+            self.sources = data[0].get("sources", {})
+            self.bloom = data[1]
+
+    def save(self):
+        """디스크 내용과 OR로 합쳐서 원자적 저장 (다른 워커가 추가한 조합 보존)"""
+        data = self._read()
+        if data and (data[1].m, data[1].k) == (self.bloom.m, self.bloom.k):
+            self.bloom.merge(data[1])
+            self.sources = {**data[0].get("sources", {}), **self.sources}
+        header = json.dumps({
+            "capacity": self.capacity, "fp_rate": self.fp_rate,
+            "count": self.bloom.count, "sources": self.sources,
+        }, ensure_ascii=False).encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(self.bloom.bits)
+        os.replace(tmp, self.path)
+        self._dirty = 0
+
+    # ── 조회/추가 ───────────────────────────────────────
+    def seen(self, word1: str, word2: str) -> bool:
+        return combo_key(word1, word2) in self.bloom
+
+    def add(self, word1: str, word2: str, autosave_every: int = 10):
+        self.bloom.add(combo_key(word1, word2))
+        self._dirty += 1
+        if autosave_every and self._dirty >= autosave_every:
+            self.save()
+
+    def filter_new(self, pairs: list) -> tuple:
+        """(새 조합, 이미 생성한 조합)"""
+        new, repeats = [], []
+        for p in pairs:
+            (repeats if self.seen(p["word1"], p["word2"]) else new).append(p)
+        return new, repeats
+
+    # ── 이력 파일에서 갱신 ──────────────────────────────
+    def _source_files(self) -> list:
+        files = glob.glob(str(LOGS_DIR / "session-*.json"))
+        files += glob.glob(str(METADATA_DIR / "26*_metadata.json"))
+        files += glob.glob(str(METADATA_DIR / "26*_metadata.jsonl"))
+        return sorted(f for f in files if "backup" not in f and "bak" not in f)
+
+    @staticmethod
+    def _combos_in(path: str):
+        if path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        m = json.loads(line)
+                    except ValueError:
+                        continue
+                    if m.get("word1") and not m.get("_patch"):
+                        yield m["word1"], m.get("word2", "")
+            return
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):  # 세션 파일 — 실제로 생성된 것만
+            for p in data.get("word_pairs", []):
+                if p.get("status") == "done":
+                    yield p["word1"], p["word2"]
+        else:
+            for m in data:
+                if m.get("word1"):
+                    yield m["word1"], m.get("word2", "")
+
+    def update(self) -> int:
+        """새로 생기거나 바뀐 이력 파일만 읽어 추가 → 읽은 파일 수"""
+        changed = 0
+        for path in self._source_files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            sig = [int(st.st_mtime), st.st_size]
+            rel = os.path.relpath(path, BASE_DIR)
+            if self.sources.get(rel) == sig:
+                continue
+            try:
+                for w1, w2 in self._combos_in(path):
+                    self.bloom.add(combo_key(w1, w2))
+            except (OSError, ValueError):
+                continue
+            self.sources[rel] = sig
+            changed += 1
+        if self.bloom.count > self.capacity:
+            # 용량 초과 → 오탐률이 목표보다 커짐. 2배 크기로 처음부터 다시
+            print(f"[INFO] 조합 이력 {self.bloom.count}개 > 용량 {self.capacity} — 2배로 재구축")
+            self.rebuild(self.capacity * 2)
+            return changed
+        if changed:
+            self.save()
+        return changed
+
+    def rebuild(self, capacity: int = None):
+        self.capacity = capacity or self.capacity
+        self.bloom = BloomFilter(self.capacity, self.fp_rate)
+        self.sources = {}
+        if self.path.exists():
+            self.path.unlink()
+        self.update()
+        self.save()
+
+    def stats(self) -> dict:
+        return {
+            "combos": self.bloom.count,
+            "capacity": self.capacity,
+            "bits": self.bloom.m,
+            "hashes": self.bloom.k,
+            "memory_kb": round(self.bloom.memory_bytes / 1024, 1),
+            "fp_rate": self.bloom.estimated_fp_rate(),
+            "target_fp_rate": self.fp_rate,
+        }
+
+    def describe(self) -> str:
+        s = self.stats()
+        return (f"조합 이력 {s['combos']}개 | {s['memory_kb']}KB (k={s['hashes']}) | "
+                f"오탐률 {s['fp_rate'] * 100:.4f}% (목표 {s['target_fp_rate'] * 100:.2f}%)")
+
+
+_history = None
+
+
+def get_combo_history() -> ComboHistory:
+    """프로세스 공용. 처음 부를 때 바뀐 이력 파일만 반영"""
+    global _history
+    if _history is None:
+        _history = ComboHistory()
+        _history.update()
+    return _history
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    h = ComboHistory()
+    if cmd == "rebuild":
+        h.rebuild()
+    elif cmd == "check" and len(sys.argv) >= 4:
+        h.update()
+        print("이미 생성" if h.seen(sys.argv[2], sys.argv[3]) else "새 조합")
+        sys.exit(0)
+    else:
+        h.update()
+    print(f"[INFO] {h.describe()}")
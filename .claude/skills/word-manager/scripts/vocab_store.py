@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+단어 사전 컴파일본 — word1-db / word2-pool / exclude-words를 한 파일로 (mmap으로 바로 사용)
+
+세 JSON을 각자 읽고 word→카테고리 맵을 따로 만들던 것을
+output/logs/vocab.bin 하나로 합친다. 원본이 바뀌었을 때(mtime/size)만 다시 만든다.
+
+  단어 ID     모든 단어(word1/word2/제외 목록)를 한 번씩만 저장 (같은 단어는 같은 ID)
+  카테고리    word1 카테고리 표 + 카테고리별 단어 ID 목록 (원본 순서)
+  영어 설명   en 문자열 (word1/word2 양쪽에 있는 단어는 역할별로 따로)
+  플래그      word1 / word2 / 제외(word1) / 제외(word2)
+  조회        단어 → ID 해시 표 (열린 주소법) — 파일 전체를 파싱하지 않고 mmap에서 O(1)
+
+word1-db 레코드는 {"word", "en"} / [word, en] / "word" 세 형태 모두 허용.
+
+사용:
+  python vocab_store.py stats
+  python vocab_store.py rebuild
+  python vocab_store.py lookup 우산
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[4]
+CONFIG_DIR = BASE_DIR / "config"
+WORD1_FILE = CONFIG_DIR / "word1-db.json"
+WORD2_FILE = CONFIG_DIR / "word2-pool.json"
+EXCLUDE_FILE = CONFIG_DIR / "exclude-words.json"
+VOCAB_FILE = BASE_DIR / "output" / "logs" / "vocab.bin"
+
+MAGIC = b"NBVS1"
+# magic | header_len | header JSON | 본문 (offset은 본문 시작 기준)
+WORD_REC = struct.Struct("<IHIHIHHB")  # word_off, word_len, en1_off, en1_len, en2_off, en2_len, category, flags
+CAT_REC = struct.Struct("<IHII")      # name_off, name_len, first_member, count
+NO_CATEGORY = 0xFFFF
+EMPTY_SLOT = 0xFFFFFFFF
+
+WORD1 = 1
+WORD2 = 2
+EXCLUDED_WORD1 = 4
+EXCLUDED_WORD2 = 8
+
+
+def _hash(word: bytes) -> int:
+    return struct.unpack("<Q", hashlib.blake2b(word, digest_size=8).digest())[0]
+
+
+def _record(w):
+    """word1-db 레코드 3가지 형태 → (word, en)"""
+    if isinstance(w, dict):
+        return w.get("word", ""), w.get("en", "")
+    if isinstance(w, list) and w:
+        return w[0], (w[1] if len(w) > 1 else "")
+    if isinstance(w, str):
+        return w, ""
+    return "", ""
+
+
+def _sources() -> dict:
+    out = {}
+    for p in (WORD1_FILE, WORD2_FILE, EXCLUDE_FILE):
+        try:
+            st = p.stat()
+            out[p.name] = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            out[p.name] = None
+    return out
+
+
+def _load_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+# ── 컴파일 ──────────────────────────────────────────────
+def compile_vocab(path=VOCAB_FILE) -> Path:
+    """원본 JSON → vocab.bin (임시파일 → rename)"""
+    sources = _sources()
+    word1_db = _load_json(WORD1_FILE, {})
+    word2_pool = _load_json(WORD2_FILE, [])
+    exclude = _load_json(EXCLUDE_FILE, {})
+
+    pool = bytearray()
+    interned = {}
+
+    def intern(s: str):
+        b = (s or "").encode("utf-8")
+        if b not in interned:
+            interned[b] = (len(pool), len(b))
+            pool.extend(b)
+        return interned[b]
+
+    ids = {}
+    words = []  # [word, en1, en2, category, flags]
+
+    def word_id(word: str) -> int:
+        i = ids.get(word)
+        if i is None:
+            i = ids[word] = len(words)
+            words.append([word, "", "", NO_CATEGORY, 0])
+        return i
+
+    categories, members = [], []
+    for cat, entries in word1_db.items():
+        first = len(members)
+        for entry in entries:
+            word, en = _record(entry)
+            if not word:
+                continue
+            i = word_id(word)
+            words[i][1] = words[i][1] or en
+            words[i][4] |= WORD1
+            if words[i][3] == NO_CATEGORY:
+                words[i][3] = len(categories)
+            members.append(i)
+        categories.append((cat, first, len(members) - first))
+    word2_ids = []
+    for entry in word2_pool:
+        word, en = _record(entry)
+        if not word:
+            continue
+        i = word_id(word)
+        words[i][2] = words[i][2] or en
+        words[i][4] |= WORD2
+        word2_ids.append(i)
+    for role, flag in (("word1", EXCLUDED_WORD1), ("word2", EXCLUDED_WORD2)):
+        for word in exclude.get(role, []):
+            words[word_id(word)][4] |= flag
+
+    word_table = bytearray()
+    for word, en1, en2, cat, flags in words:
+        word_table += WORD_REC.pack(*intern(word), *intern(en1), *intern(en2), cat, flags)
+    cat_table = bytearray()
+    for name, first, count in categories:
+        n_off, n_len = intern(name)
+        cat_table += CAT_REC.pack(n_off, n_len, first, count)
+
+    slots = 1
+    while slots < max(8, len(words) * 2):
+        slots <<= 1
+    table = [EMPTY_SLOT] * slots
+    for i, (word, *_rest) in enumerate(words):
+        s = _hash(word.encode("utf-8")) & (slots - 1)
+        while table[s] != EMPTY_SLOT:
+            s = (s + 1) & (slots - 1)
+        table[s] = i
+
+    sections = [
+        ("pool", bytes(pool)),
+        ("words", bytes(word_table)),
+        ("categories", bytes(cat_table)),
+        ("members", struct.pack(f"<{len(members)}I", *members)),
+        ("word2", struct.pack(f"<{len(word2_ids)}I", *word2_ids)),
+        ("index", struct.pack(f"<{slots}I", *table)),
+    ]
+    layout, offset = {}, 0
+    for name, data in sections:
+        layout[name] = [offset, len(data)]
+        offset += len(data)
+    header = json.dumps({
+        "sources": sources, "words": len(words), "categories": len(categories),
+        "members": len(members), "word2": len(word2_ids), "slots": slots, "layout": layout,
+    }, ensure_ascii=False).encode("utf-8")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for _, data in sections:
+            f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+# ── 조회 (mmap) ─────────────────────────────────────────
+class Vocab:
+    def __init__(self, path=VOCAB_FILE):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"vocab 파일 형식이 아님: {self.path}")
+        hlen = struct.unpack_from("<I", self._mm, len(MAGIC))[0]
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._mm[start:start + hlen].decode("utf-8"))
+        self._base = start + hlen
+        self._sec = {k: self._base + v[0] for k, v in self.header["layout"].items()}
+        self._mask = self.header["slots"] - 1
+        self.size = self.header["words"]
+
+    def __len__(self):
+        return self.size
+
+    def _str(self, off: int, length: int) -> str:
+        p = self._sec["pool"] + off
+        return self._mm[p:p + length].decode("utf-8")
+
+    def _rec(self, i: int):
+        return WORD_REC.unpack_from(self._mm, self._sec["words"] + i * WORD_REC.size)
+
+    def _u32(self, section: str, i: int) -> int:
+        return struct.unpack_from("<I", self._mm, self._sec[section] + 4 * i)[0]
+
+    # 단어
+    def lookup(self, word: str):
+        """단어 → ID (없으면 None)"""
+        b = (word or "").encode("utf-8")
+        s = _hash(b) & self._mask
+        while True:
+            i = self._u32("index", s)
+            if i == EMPTY_SLOT:
+                return None
+            w_off, w_len = self._rec(i)[:2]
+            p = self._sec["pool"] + w_off
+            if w_len == len(b) and self._mm[p:p + w_len] == b:
+                return i
+            s = (s + 1) & self._mask
+
+    def __contains__(self, word: str) -> bool:
+        return self.lookup(word) is not None
+
+    def word(self, i: int) -> str:
+        w_off, w_len = self._rec(i)[:2]
+        return self._str(w_off, w_len)
+
+    def gloss(self, word_or_id, role: str = "word1", fallback: bool = True) -> str:
+        """영어 설명 ("" = 없음). fallback이면 해당 역할의 설명이 없을 때 다른 역할 것"""
+        i = self.lookup(word_or_id) if isinstance(word_or_id, str) else word_or_id
+        if i is None:
+            return ""
+        _, _, e1_off, e1_len, e2_off, e2_len, _, _ = self._rec(i)
+        first, second = ((e2_off, e2_len), (e1_off, e1_len)) if role == "word2" else ((e1_off, e1_len), (e2_off, e2_len))
+        return self._str(*first) or (self._str(*second) if fallback else "")
+
+    def flags(self, word_or_id) -> int:
+        i = self.lookup(word_or_id) if isinstance(word_or_id, str) else word_or_id
+        return 0 if i is None else self._rec(i)[7]
+
+    def is_excluded(self, word: str, role: str = "word1") -> bool:
+        return bool(self.flags(word) & (EXCLUDED_WORD1 if role == "word1" else EXCLUDED_WORD2))
+
+    def category(self, word_or_id, default: str = None):
+        """word1 카테고리 이름 (word1이 아니면 default)"""
+        i = self.lookup(word_or_id) if isinstance(word_or_id, str) else word_or_id
+        if i is None:
+            return default
+        cat = self._rec(i)[6]
+        return default if cat == NO_CATEGORY else self.category_name(cat)
+
+    # 카테고리
+    def category_name(self, c: int) -> str:
+        n_off, n_len, _, _ = CAT_REC.unpack_from(self._mm, self._sec["categories"] + c * CAT_REC.size)
+        return self._str(n_off, n_len)
+
+    def categories(self) -> list:
+        return [self.category_name(c) for c in range(self.header["categories"])]
+
+    def category_members(self, c: int) -> list:
+        _, _, first, count = CAT_REC.unpack_from(self._mm, self._sec["categories"] + c * CAT_REC.size)
+        return [self._u32("members", first + k) for k in range(count)]
+
+    # 목록 (세션 생성용 — 원본 순서)
+    def word1_entries(self, include_excluded: bool = True) -> list:
+        """[{"word", "en", "category"}] — word1-db 순서"""
+        out = []
+        for c in range(self.header["categories"]):
+            name = self.category_name(c)
+            for i in self.category_members(c):
+                if include_excluded or not self.flags(i) & EXCLUDED_WORD1:
+                    out.append({"word": self.word(i), "en": self.gloss(i, "word1", False), "category": name})
+        return out
+
+    def word2_entries(self, include_excluded: bool = True) -> list:
+        out = []
+        for k in range(self.header["word2"]):
+            i = self._u32("word2", k)
+            if include_excluded or not self.flags(i) & EXCLUDED_WORD2:
+                out.append({"word": self.word(i), "en": self.gloss(i, "word2", False)})
+        return out
+
+    def word_to_category(self) -> dict:
+        """{word1: 카테고리} (enhance_phase2.load_word1_db와 같은 모양)"""
+        return {e["word"]: e["category"] for e in self.word1_entries()}
+
+    def close(self):
+        self._mm.close()
+
+
+def _stale(path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(len(MAGIC) + 4)
+            if not head.startswith(MAGIC):
+                return True
+            header = json.loads(f.read(struct.unpack("<I", head[len(MAGIC):])[0]).decode("utf-8"))
+    except (OSError, ValueError, struct.error):
+        return True
+    return header.get("sources") != _sources()
+
+
+_vocab = None
+
+
+def get_vocab(path=VOCAB_FILE) -> Vocab:
+    """프로세스 공용 사전. 원본 JSON이 바뀌었으면 다시 컴파일"""
+    global _vocab
+    if _vocab is not None and _vocab.header.get("sources") == _sources():
+        return _vocab
+    if _vocab is not None:
+        _vocab.close()
+        _vocab = None
+    if _stale(path):
+        try:
+            compile_vocab(path)
+        except OSError as e:
+            # Windows: 다른 프로세스가 mmap 중이면 교체 불가 — 기존 사전으로 계속
+            if not Path(path).exists():
+                raise
+            print(f"[WARN] vocab 재컴파일 실패, 기존 사전 사용: {e}")
+    _vocab = Vocab(path)
+    return _vocab
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "rebuild":
+        compile_vocab()
+    v = get_vocab()
+    if cmd == "lookup" and len(sys.argv) > 2:
+        for w in sys.argv[2:]:
+            i = v.lookup(w)
+            if i is None:
+                print(f"  {w}: 없음")
+                continue
+            f = v.flags(i)
+            roles = [n for n, bit in (("word1", WORD1), ("word2", WORD2),
+                                      ("제외1", EXCLUDED_WORD1), ("제외2", EXCLUDED_WORD2)) if f & bit]
+            print(f"  {w}: id {i} | {v.category(i, '-')} | {v.gloss(i) or '-'} | {', '.join(roles)}")
+    else:
+        print(f"[VOCAB] {v.path} ({v.path.stat().st_size / 1024:.1f} KB) | 단어 {len(v)}개 | "
+              f"카테고리 {v.header['categories']}개 | word1 {v.header['members']} | word2 {v.header['word2']}")
@@ -4,11 +4,15 @@
 사용:
   python run_batch.py [장수]            # 일반모드 (1장씩 순차)
   python run_batch.py [장수] --batch    # Gemini Batch API 모드 (50% 할인)
+  python run_batch.py [장수] --status-port 8787   # 진행 상황 http://127.0.0.1:8787/status, /metrics
 """
 import argparse
 import json
+import os
 import random
+import signal
 import sys
+import threading
 import time
 import atexit
 from collections import deque
@@ -24,10 +28,11 @@ for skill in ["session-controller", "word-manager", "image-generator",
 
 from session_manager import create_new_session, get_pending_pairs, update_session_progress, close_session, check_resume, get_current_session
 from generate import generate_image
-from cost_tracker import add_cost, get_daily_total, get_monthly_total, get_limits, get_status_summary
+from cost_tracker import get_daily_total, get_monthly_total, get_limits, get_status_summary
 from stop_checker import check_stop_conditions
-from track_pins import append_entry
-from slack_notify import (
+from metadata_log import append_entry, compact as compact_metadata
+# Slack은 큐로 보내고 바로 반환 (느린 웹훅/연속 실패 알림이 루프를 막지 않게)
+from slack_queue import (
     notify_consecutive_errors, notify_model_switch, notify_cost_limit,
     notify_session_complete, notify_batch_submitted, notify_batch_complete
 )
@@ -38,40 +43,57 @@ from batch_generator import (
     download_batch_results, save_batch_state, load_batch_state, clear_batch_state,
     _load_batch_config
 )
+from phase_timer import get_phase_timer
+from status_server import get_run_status, start_status_server
+from model_probe import get_model_health, format_health
+from circuit_breaker import get_breaker_board
+from deadline import CancelToken, Watchdog
+from retry_policy import classify_failure, get_retry_engine
+from file_lock import FileLock
+from lease_store import LeaseStore, make_worker_id
+from budget_ledger import BudgetDenied, get_budget_ledger
+from image_store import get_image_store
+from combo_history import get_combo_history
+from bandit_selector import get_bandit
+from reference_media import get_reference_cache, externalize_references
+from image_io import describe_image_file, save_image_bytes
+from batch_builder import build_batch_requests, clear_build_state, pending_build
+from batch_recovery import (
+    adopt_saved_state, clear_reservation, get_batch_job, job_state, owner_lock, poll_adaptive, save_reservation,
+    start_orphan_recovery, SUCCEEDED
+)
 
 
 LOCK_FILE = Path(__file__).parent / "output" / "logs" / "batch.lock"
+SESSION_LOCK_FILE = Path(__file__).parent / "output" / "logs" / "session.lock"
 
+_process_lock = None
+_orphan_threads = []
+_status_server = None
+_pin_cache = None
+_ingest_lock = threading.Lock()
+_repeat_skipped = 0  # 이 프로세스에서 이력 중복으로 건너뛴 pair 수 (목표 미달 보고용)
 
-def acquire_lock():
-    """프로세스 락 — 동시 실행 방지 (lock 파일 + PID 생존 확인)"""
-    import os
 
-    if LOCK_FILE.exists():
-        try:
-            old_pid = int(LOCK_FILE.read_text().strip())
-            import subprocess
-            result = subprocess.run(
-                ['tasklist.exe', '/FI', f'PID eq {old_pid}', '/NH'],
-                capture_output=True, text=True, timeout=10
-            )
-            if f" {old_pid} " in result.stdout:
-                print(f"[ERROR] 이미 실행 중인 배치가 있습니다 (PID {old_pid})")
-                sys.exit(1)
-            else:
-                print(f"[INFO] stale lock 정리 (PID {old_pid} 이미 종료됨)")
-                LOCK_FILE.unlink(missing_ok=True)
-        except Exception:
-            print(f"[INFO] 깨진 lock 파일 정리")
-            LOCK_FILE.unlink(missing_ok=True)
-
-    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
-    LOCK_FILE.write_text(str(os.getpid()))
+def acquire_lock(worker_name="main"):
+    """프로세스 락 — 같은 워커 이름의 동시 실행 방지 (파일 락, 프로세스 종료 시 OS가 자동 해제)"""
+    global _process_lock
+    if _process_lock and _process_lock.locked:
+        return
+    lock_file = LOCK_FILE if worker_name == "main" else LOCK_FILE.with_name(f"batch-{worker_name}.lock")
+    _process_lock = FileLock(lock_file)
+    if not _process_lock.acquire(blocking=False):
+        holder = _process_lock.read_holder() or "?"
+        print(f"[ERROR] 이미 실행 중인 배치가 있습니다 ({holder})")
+        print(f"  다른 워커로 같은 세션을 나눠 처리하려면 --worker-id 를 지정하세요.")
+        sys.exit(1)
+    _process_lock.write_holder(f"PID {os.getpid()}")
     atexit.register(release_lock)
 
 
 def release_lock():
-    LOCK_FILE.unlink(missing_ok=True)
+    if _process_lock:
+        _process_lock.release()
 
 
 def print_report(report_type, session_id, generated, failed_count, pro_count, flash_count, session_cost, start_time, target):
@@ -92,14 +114,60 @@ def print_report(report_type, session_id, generated, failed_count, pro_count, fl
 
     print(f"  세션: {session_id}")
     print(f"  진행: {generated}/{target} 완료 | {failed_count} 실패 | {pending} 남음")
+    if report_type == "complete" and _repeat_skipped and pending > 0:
+        # 세션의 조합 목록은 session_manager가 만들고 여기서 다시 채울 수 없음 → 부족분을 알림
+        print(f"  미달: 이미 생성한 조합 {_repeat_skipped}개 건너뜀 → 목표보다 {pending}장 적음 (새 세션에서 새 조합으로)")
     from stop_checker import PRICE_PRO, PRICE_FLASH
     print(f"  모델: Pro {pro_count}장 (${pro_count * PRICE_PRO:.2f}) | Flash {flash_count}장 (${flash_count * PRICE_FLASH:.2f})")
     print(f"  API 호출: 총 {pro_count + flash_count + failed_count}회 (성공 {generated}, 실패 {failed_count})")
     print(f"  비용: ${session_cost:.2f} (세션) | {get_status_summary()}")
     print(f"  시간: {hours}h {mins}m 경과")
+    breakers = get_breaker_board().summary()
+    if breakers:
+        print(f"  브레이커: {breakers}")
     print(f"{'=' * 55}\n", flush=True)
 
 
+def skip_repeat_combos(pending):
+    """이전 세션에서 이미 생성한 조합은 API 호출 없이 skipped 처리 (세션 락 안에서 호출)"""
+    global _repeat_skipped
+    new, repeats = get_combo_history().filter_new(pending)
+    _repeat_skipped += len(repeats)
+    for p in repeats:
+        update_session_progress(p["combo_id"], "skipped", 0, False, error="이미 생성한 조합")
+    if repeats:
+        from stop_checker import PRICE_PRO
+        print(f"\n[HISTORY] 이미 생성한 조합 {len(repeats)}개 건너뜀 (예상 절약 ${len(repeats) * PRICE_PRO:.2f})")
+    return new
+
+
+def finish_image(result):
+    """생성 결과의 이미지 정보 채우기 (image_io) — Drive/저장소/metadata 전에.
+    이미지 bytes를 넘겨받았으면(image_bytes) memoryview로 바로 저장, 이미 파일이면 헤더만 파싱하고 해시는 한 번 읽으며.
+    sha256이 있으면 image_store가 파일을 다시 읽지 않음"""
+    data = result.pop("image_bytes", None)
+    path = result.get("file_path")
+    if not path or (data is None and (result.get("sha256") or not os.path.exists(path))):
+        return result
+    try:
+        info = save_image_bytes(data, path) if data is not None else describe_image_file(path)
+    except OSError as e:
+        print(f" [WARN] image io: {e}", end="")
+        return result
+    if info["resolution"] == "?":
+        info.pop("resolution")
+    result.update({k: info[k] for k in ("file_path", "resolution", "bytes", "sha256") if k in info})
+    return result
+
+
+def store_result(result, today_date):
+    """해시 저장소 + SQLite 인덱스에 기록. 실패해도 생성은 계속 (날짜별 metadata가 원본)"""
+    try:
+        get_image_store().add_result(result, today_date)
+    except Exception as e:
+        print(f" [WARN] image store: {e}", end="")
+
+
 def deploy_to_github_pages(html_path):
     """뷰어 HTML을 docs/index.html로 복사 후 GitHub에 push"""
     import shutil, subprocess
@@ -197,10 +265,141 @@ def refresh_pins():
     print("=" * 55)
     refresh_savee()
     refresh_pinterest()
+    refresh_pin_index()
     print("\n[REFRESH] 갱신 완료\n")
 
 
-def run_batch_mode(target, board_names, session, global_start_time=None):
+def refresh_pin_index():
+    """갱신된 보드의 새/바뀐 캐시 핀만 중복 해시 + 스타일 벡터 계산 (레퍼런스 세트 선택용)"""
+    try:
+        from pin_dedup import get_pin_dedup
+        dedup = get_pin_dedup()
+        if dedup is not None:
+            r = dedup.update()
+            print(f"[PIN DEDUP] {r['pins']}핀 | 새로 해시 {r['hashed']} | 중복 {r['duplicates']}개 "
+                  f"({r['duplicate_bytes'] / 1e6:.1f} MB)")
+    except Exception as e:
+        print(f"  [WARN] 핀 중복 해시 갱신 실패 (기존 유지): {e}")
+    try:
+        from pin_index import get_pin_index
+        index = get_pin_index(update=False)
+        if index is None:
+            return
+        r = index.update()
+        print(f"[PIN INDEX] {r['pins']}핀 | 새로 계산 {r['computed']} | 제거 {r['removed']}"
+              + (f" | 실패 {r['errors']}" if r["errors"] else ""))
+    except Exception as e:
+        print(f"  [WARN] 핀 인덱스 갱신 실패 (기존 인덱스 유지): {e}")
+
+
+def ingest_batch_results(results, leases, timer, model, cost_per_image, today_date, reservation=None, status=None):
+    """배치 결과 저장 (비용/세션/Drive/저장소/메타데이터) → (성공, 실패, Drive 업로드, 비용)
+    run_batch_mode와 고아 배치 수거 스레드가 같이 사용. 비용은 제출 때 잡은 예약에서 한 장씩 확정"""
+    ledger = get_budget_ledger()
+    generated = 0
+    failed_count = 0
+    drive_ok = 0
+    session_cost = 0.0
+
+    for r in results:
+        timer.begin_cycle(r.get("combo_id", ""), model=r.get("model_used") or model)
+        if r.get("status") == "success":
+            cost = r.get("cost", cost_per_image)
+            ledger.commit(reservation, cost, False, final=False)
+            session_cost = round(session_cost + cost, 4)
+            generated += 1
+            if status:
+                status.record(True, cost)
+            with timer.phase("session_write"), leases.locked():
+                update_session_progress(r["combo_id"], "done", cost, False)
+                leases.release(r["combo_id"])
+
+            finish_image(r)
+            # Drive 업로드
+            with timer.phase("drive_upload"):
+                drive_id = upload_single_image(r.get("file_path", ""), r, today_date)
+            if drive_id:
+                r["drive_uploaded"] = True
+                r["drive_file_id"] = drive_id
+                drive_ok += 1
+
+            with timer.phase("store_write"):
+                store_result(r, today_date)
+                get_combo_history().add(r.get("word1", ""), r.get("word2", ""))
+            with timer.phase("metadata_write"):
+                append_entry(r, today_date)
+            print(f"  [OK] {r.get('word1', '')} x {r.get('word2', '')} — ${cost:.3f} ({r.get('resolution', '?')})"
+                  + (" [DRIVE]" if r.get("drive_uploaded") else ""))
+            timer.end_cycle("success")
+        else:
+            failed_count += 1
+            if status:
+                status.record(False)
+            with timer.phase("session_write"), leases.locked():
+                update_session_progress(r.get("combo_id", ""), "failed", 0, False, error=r.get("error", "unknown"))
+                leases.release(r.get("combo_id", ""))
+            print(f"  [FAIL] {r.get('combo_id', '')} — {r.get('error', 'unknown')[:60]}")
+            timer.end_cycle("failed")
+
+    return generated, failed_count, drive_ok, session_cost
+
+
+def _job_getter(client=None):
+    """batch job 조회 — 데몬이 넘긴 warm client가 있으면 조회마다 클라이언트를 새로 만들지 않음"""
+    if client is None:
+        return get_batch_job
+    return lambda name: client.batches.get(name=name)
+
+
+def recover_orphaned_batches(session, client=None):
+    """이전 실행에서 polling이 끊긴 배치(batch_state.json)를 백그라운드에서 이어서 수거 → 스레드 목록"""
+    with FileLock(SESSION_LOCK_FILE):
+        orphan = adopt_saved_state(load_batch_state())
+        if orphan:
+            clear_batch_state()
+            print(f"[ORPHAN] 이전 배치 {orphan['batch_job_name']} ({len(orphan['request_map'])}건) "
+                  f"— 백그라운드에서 이어서 수거")
+
+    with open(BASE_DIR / "config" / "settings.json", encoding="utf-8") as f:
+        settings = json.load(f)
+    cost_per_image = settings.get("price_pro_batch", 0.067)
+    leases = LeaseStore(session["session_id"], make_worker_id("orphan"))
+    timer = get_phase_timer(session["session_id"])
+    ledger = get_budget_ledger()
+
+    def _claim(o, ttl):
+        # 수거가 끝날 때까지 새 작업이 같은 pair를 다시 생성하지 않게
+        leases.adopt([p["combo_id"] for p in o["request_map"].values()], ttl=ttl)
+        # 서버 배치는 계속 과금 — 제출 때 잡은 예약을 이어받아 수거까지 유지 (다른 워커가 상한까지 쓰지 않게)
+        o["_reservation"] = ledger.adopt(o.get("reservation"), ttl)
+
+    def _ingest(job, o):
+        name = o["batch_job_name"]
+        reservation = o.get("_reservation")
+        model = o.get("model") or settings.get("model_pro", "gemini-3-pro-image-preview")
+        if job is None or job_state(job) not in SUCCEEDED:
+            print(f"[ORPHAN] {name}: {job_state(job) if job else 'timeout'} — pair를 다시 대기열로")
+            ledger.release(reservation)
+            clear_reservation(name)
+            leases.release_all()
+            return
+        today_date = datetime.now().strftime("%y%m%d")
+        results = download_batch_results(job, o["request_map"], model, is_batch=True)
+        with _ingest_lock:
+            generated, failed_count, _, cost = ingest_batch_results(
+                results, leases, timer, model, cost_per_image, today_date, reservation
+            )
+        ledger.release(reservation)
+        clear_reservation(name)
+        leases.release_all()
+        get_combo_history().save()
+        compact_metadata(today_date)
+        print(f"[ORPHAN] {name} 수거 완료 — 성공 {generated} / 실패 {failed_count} / ${cost:.2f}")
+
+    return start_orphan_recovery(_ingest, _claim, get_job=_job_getter(client))
+
+
+def run_batch_mode(target, board_names, session, global_start_time=None, leases=None, client=None):
     """Gemini Batch API 모드 — 50% 할인"""
     from stop_checker import PRICE_PRO_BATCH
     start_time = global_start_time or time.time()
@@ -212,110 +411,148 @@ def run_batch_mode(target, board_names, session, global_start_time=None):
     model = settings.get("model_pro", "gemini-3-pro-image-preview")
     batch_cfg = _load_batch_config()
     cost_per_image = settings.get("price_pro_batch", 0.067)
+    leases = leases or LeaseStore(session["session_id"])
+    poll_interval = batch_cfg.get("poll_interval_seconds", 30)
+    poll_timeout = batch_cfg.get("poll_timeout_seconds", 7200)
 
-    # pending pairs 가져오기
-    pending = get_pending_pairs()
-    if not pending:
-        print("[BATCH] 처리할 항목이 없습니다.")
-        close_session("no pending pairs", 0)
+    # pending pairs 가져오기 — 다른 워커가 처리 중인 pair는 제외하고 배치 완료까지 점유
+    with leases.locked():
+        pending = get_bandit().order(skip_repeat_combos(get_pending_pairs()))
+        # 중단된 스트리밍 빌드가 있으면 그 pair들을 먼저 (bandit 표본이 달라도 같은 집합 → 이어서 빌드)
+        resume = set(pending_build()) if batch_cfg.get("streaming_build", False) else set()
+        if resume:
+            pending = ([p for p in pending if p["combo_id"] in resume]
+                       + [p for p in pending if p["combo_id"] not in resume])
+        if not pending:
+            print("[BATCH] 처리할 항목이 없습니다.")
+            if not leases.active_leases():
+                close_session("no pending pairs", 0)
+            return
+        pairs = leases.claim_many(pending, target, ttl=poll_timeout + 600)
+    if not pairs:
+        print("[BATCH] 남은 항목을 모두 다른 워커가 처리 중입니다.")
         return
-
-    pairs = pending[:target]
+    status = get_run_status()
+    status.begin("batch", session["session_id"], len(pairs), leases.worker_id, model=model)
+    status.update(stage="request_build", pending=len(pending))
     print(f"\n[Nano-Banana] Gemini Batch API Mode (50% 할인)")
     print(f"  요청: {len(pairs)}장")
     print(f"  모델: {model}")
     print(f"  예상 비용: ${len(pairs) * cost_per_image:.2f}")
     print("=" * 50)
 
-    # 비용 상한 사전 체크
+    # 비용 상한 사전 체크 — 배치 전체 비용을 예약 (다른 워커/데몬이 진행 중인 요청 예약까지 합산)
+    # 서버에서 도는 동안 유지, 결과가 오면 한 장씩 확정하고 남은 예약은 해제
     estimated_cost = len(pairs) * cost_per_image
-    limits = get_limits()
-    daily_total = get_daily_total()
-    monthly_total = get_monthly_total()
-
-    if limits.get("daily_cost_cap", 0) > 0 and daily_total + estimated_cost > limits["daily_cost_cap"]:
-        print(f"[STOP] 일일 비용 상한 초과 예상 (현재 ${daily_total:.2f} + 예상 ${estimated_cost:.2f} > 한도 ${limits['daily_cost_cap']:.2f})")
-        close_session("일일 비용 상한 (배치 사전 체크)", 0)
+    ledger = get_budget_ledger()
+    try:
+        reservation = ledger.reserve(estimated_cost, session["session_id"], ttl=poll_timeout + 1800,
+                                     label=f"batch {len(pairs)}")
+    except BudgetDenied as e:
+        print(f"[STOP] {e.reason} 초과 예상 (확정 ${e.committed:.2f} + 진행 중 ${e.reserved:.2f} "
+              f"+ 예상 ${e.amount:.2f} > 한도 ${e.cap:.2f})")
+        leases.release_all()
+        close_session(f"{e.reason} (배치 사전 체크)", 0)
         return
 
-    if limits.get("monthly_cost_cap", 0) > 0 and monthly_total + estimated_cost > limits["monthly_cost_cap"]:
-        print(f"[STOP] 월간 비용 상한 초과 예상")
-        close_session("월간 비용 상한 (배치 사전 체크)", 0)
-        return
+    timer = get_phase_timer(session["session_id"])
 
     # JSONL 생성
     recent_pins = deque(maxlen=50)
-    jsonl_path, request_map = prepare_batch_requests(
-        pairs, board_names, list(recent_pins), model
-    )
+    # streaming_build: 레퍼런스 인코딩은 프로세스 풀, JSONL/request map은 조금씩 기록 (빌드 중 중단 시 이어서)
+    build = build_batch_requests if batch_cfg.get("streaming_build", False) else prepare_batch_requests
+    with timer.phase("request_build", model=model):
+        jsonl_path, request_map = build(
+            pairs, board_names, list(recent_pins), model
+        )
+
+    # 레퍼런스 inline base64 → Files API URI (고유 핀만 업로드, 만료 전 URI 재사용)
+    if batch_cfg.get("reference_upload", "files_api") == "files_api" and request_map:
+        with timer.phase("reference_upload", model=model):
+            try:
+                cache = get_reference_cache()
+                ref = externalize_references(jsonl_path, cache)
+                jsonl_path = ref["path"]
+                print(f"[BATCH] 레퍼런스 {ref['parts']}개 (고유 {ref['unique']}) → URI | {cache.summary()} | "
+                      f"JSONL {ref['before_bytes'] / 1e6:.1f} MB → {ref['after_bytes'] / 1e6:.2f} MB")
+            except Exception as e:
+                print(f"[WARN] 레퍼런스 업로드 실패, inline JSONL로 제출: {e}")
 
     if not request_map:
         print("[BATCH] 유효한 요청이 없습니다.")
+        ledger.release(reservation)
+        leases.release_all()
         close_session("no valid requests", 0)
         return
 
     # 배치 제출
-    batch_job_name = submit_batch(jsonl_path, model)
-    save_batch_state(batch_job_name, request_map, model)
-    notify_batch_submitted(len(request_map), len(request_map) * cost_per_image, model)
-
-    # polling
-    poll_interval = batch_cfg.get("poll_interval_seconds", 30)
-    poll_timeout = batch_cfg.get("poll_timeout_seconds", 7200)
-
+    status.update(stage="batch_submit", requests=len(request_map))
+    with timer.phase("batch_submit", model=model):
+        batch_job_name = submit_batch(jsonl_path, model)
+    status.update(stage="batch_poll", in_flight=len(request_map), batch_job=batch_job_name)
+    # 수거가 끝날 때까지 소유 락 — 다른 워커/데몬의 고아 복구가 이 배치를 가져가 중복 수거하지 않게
+    owner = owner_lock(batch_job_name)
+    owner.acquire()
     try:
-        batch_job = poll_batch(batch_job_name, poll_interval, poll_timeout)
-    except KeyboardInterrupt:
-        print(f"\n[BATCH] Ctrl+C — 배치 작업은 계속 실행 중입니다.")
-        print(f"  batch_job_name: {batch_job_name}")
-        print(f"  나중에 결과를 수거하려면 batch_state.json을 참고하세요.")
-        return
-
-    if batch_job is None:
-        print("[BATCH] polling 타임아웃. batch_state.json에 상태 저장됨.")
-        return
+        save_batch_state(batch_job_name, request_map, model)
+        save_reservation(batch_job_name, reservation.to_dict())
+        clear_build_state()
+        notify_batch_submitted(len(request_map), len(request_map) * cost_per_image, model)
 
-    state = batch_job.state.name if hasattr(batch_job.state, 'name') else str(batch_job.state)
-    if state not in ("JOB_STATE_SUCCEEDED", "SUCCEEDED"):
-        print(f"[BATCH] 배치 실패/취소: {state}")
-        close_session(f"batch {state}", 0)
-        clear_batch_state()
-        return
-
-    # 결과 다운로드 + 이미지 저장
-    results = download_batch_results(batch_job, request_map, model, is_batch=True)
-    clear_batch_state()
-
-    # 결과 처리
-    generated = 0
-    failed_count = 0
-    drive_ok = 0
-    session_cost = 0.0
+        # polling — 서버에서 도는 동안 리스 유지. 중단/타임아웃 시에는 리스를 남겨 다른 워커가 재생성하지 않게 함
+        # adaptive_poll: 경과 시간에 따라 간격을 늘리고 예상 완료 구간에서는 촘촘히 (batch_recovery)
+        try:
+            # claim_many와 같은 TTL로 연장 — 기본 TTL로 연장하면 긴 TTL이 오히려 줄어듦
+            keep = leases.keepalive(list(leases.held), ttl=poll_timeout + 600)
+            with timer.phase("batch_poll", model=model), keep:
+                if batch_cfg.get("adaptive_poll", False):
+                    batch_job = poll_adaptive(batch_job_name, poll_timeout, get_job=_job_getter(client), clock=time)
+                else:
+                    batch_job = poll_batch(batch_job_name, poll_interval, poll_timeout)
+        except KeyboardInterrupt:
+            print(f"\n[BATCH] Ctrl+C — 배치 작업은 계속 실행 중입니다.")
+            print(f"  batch_job_name: {batch_job_name}")
+            print(f"  다음 실행 때 batch_state.json에서 자동으로 이어서 수거합니다.")
+            return
 
-    for r in results:
-        if r.get("status") == "success":
-            cost = r.get("cost", cost_per_image)
-            add_cost(cost, False)
-            session_cost = round(session_cost + cost, 4)
-            generated += 1
-            update_session_progress(r["combo_id"], "done", cost, False)
+        if batch_job is None:
+            print("[BATCH] polling 타임아웃. 다음 실행 때 batch_state.json에서 자동으로 이어서 수거합니다.")
+            return
 
-            # Drive 업로드
-            drive_id = upload_single_image(r.get("file_path", ""), r, today_date)
-            if drive_id:
-                r["drive_uploaded"] = True
-                r["drive_file_id"] = drive_id
-                drive_ok += 1
+        state = job_state(batch_job)
+        if state not in SUCCEEDED:
+            print(f"[BATCH] 배치 실패/취소: {state}")
+            ledger.release(reservation)
+            leases.release_all()
+            close_session(f"batch {state}", 0)
+            clear_batch_state()
+            clear_reservation(batch_job_name)
+            return
 
-            append_entry(r, today_date)
-            print(f"  [OK] {r.get('word1', '')} x {r.get('word2', '')} — ${cost:.3f} ({r.get('resolution', '?')})"
-                  + (" [DRIVE]" if r.get("drive_uploaded") else ""))
-        else:
-            failed_count += 1
-            update_session_progress(r.get("combo_id", ""), "failed", 0, False, error=r.get("error", "unknown"))
-            print(f"  [FAIL] {r.get('combo_id', '')} — {r.get('error', 'unknown')[:60]}")
+        # 결과 다운로드 + 이미지 저장
+        status.update(stage="batch_download", batch_state=state)
+        with timer.phase("batch_download", model=model):
+            results = download_batch_results(batch_job, request_map, model, is_batch=True)
+        clear_batch_state()
+        status.update(stage="ingest", in_flight=0)
 
-    close_session("batch complete", len(request_map))
+        # 결과 처리 (고아 배치 수거 스레드와 동시에 쓰지 않게)
+        with _ingest_lock:
+            generated, failed_count, drive_ok, session_cost = ingest_batch_results(
+                results, leases, timer, model, cost_per_image, today_date, reservation, status
+            )
+    finally:
+        owner.release()
+    ledger.release(reservation)
+    clear_reservation(batch_job_name)
+    status.update(stage="done")
+
+    leases.release_all()
+    get_combo_history().save()
+    if not leases.active_leases():
+        close_session("batch complete", len(request_map))
+    timer.flush()
+    timer.print_summary()
 
     # 보고
     elapsed = time.time() - start_time
@@ -328,6 +565,9 @@ def run_batch_mode(target, board_names, session, global_start_time=None):
     print(f"  소요: {elapsed_min}분")
     print(f"{'=' * 55}\n")
 
+    # JSONL 메타데이터 → 기존 JSON 배열 (뷰어/Drive 업로드용)
+    compact_metadata(today_date)
+
     # HTML viewer + GitHub Pages
     try:
         from generate_viewer import generate_viewer
@@ -351,11 +591,80 @@ def run_batch_mode(target, board_names, session, global_start_time=None):
     notify_batch_complete(generated, failed_count, session_cost, drive_ok, elapsed_min)
 
 
-def run_normal_mode(target, board_names, session, global_start_time=None):
-    """기존 일반모드 — 1장씩 순차 API 호출"""
-    start_time = global_start_time or time.time()
+def _on_breaker_change(breaker, prev, new):
+    print(f"\n  [BREAKER] {breaker.key}/{breaker.model}: {prev} → {new}"
+          + (f" ({breaker.last_error[:60]})" if breaker.last_error and new != "closed" else ""), end="")
+
+
+def _route_to_pro(rl, board, model):
+    """half_open Pro 브레이커 시험 — rate limiter의 Flash 고정 상태를 해제하고
+    지금 키의 Pro 브레이커가 열려 있으면 요청 가능한 키로 넘김"""
+    try:
+        rl.is_flash_mode = False
+    except AttributeError:
+        return False
+    _rotate_key(rl, board, model, force=False)
+    return True
+
+
+def _rotate_key(rl, board=None, model=None, force=True):
+    """다음 키로 — rate_limiter에 키 순환이 있으면 사용.
+    board가 있으면 model 브레이커가 열린 키는 건너뜀 (모든 키가 열려 있으면 한 바퀴 돌고 멈춤).
+    force=False면 지금 키가 열려 있을 때만 돌림"""
+    rotate = getattr(rl, "rotate_key", None)
+    if not rotate:
+        return
+    current = lambda: getattr(rl, "current_key_id", None)
+    if not force and (board is None or current() is None or board.allows(current(), model)):
+        return
+    rotate()
+    if board is None or current() is None:
+        return
+    for _ in range(len(getattr(rl, "keys", ())) - 1):
+        if board.allows(current(), model):
+            break
+        rotate()
+
+
+def _install_cancel_handler(token):
+    """SIGTERM → 진행 중 요청 취소 + 루프 종료 (세션은 닫지 않고 resume 가능 상태로 둠)"""
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: token.cancel("SIGTERM"))
 
-    rl = get_rate_limiter()
+
+def _sleep(seconds, token):
+    """취소되면 바로 깨어나는 대기"""
+    end = time.time() + seconds
+    while not token.cancelled and time.time() < end:
+        time.sleep(min(1.0, end - time.time()))
+
+
+def run_normal_mode(target, board_names, session, global_start_time=None, leases=None, rl=None):
+    """기존 일반모드 — 1장씩 순차 API 호출 (리스로 다른 워커와 pair 분배).
+    끝나거나 예외로 빠져도 이 워커의 리스를 반환 (데몬에서 실행마다 atexit이 쌓이지 않게)"""
+    leases = leases or LeaseStore(session["session_id"])
+    try:
+        return _run_normal_mode(target, board_names, session, global_start_time, leases, rl)
+    finally:
+        leases.release_all()
+
+
+def _run_normal_mode(target, board_names, session, global_start_time, leases, rl):
+    start_time = global_start_time or time.time()
+    rl = rl or get_rate_limiter()
+    with open(BASE_DIR / "config" / "settings.json", encoding="utf-8") as f:
+        settings = json.load(f)
+    model_pro = settings.get("model_pro", "gemini-3-pro-image-preview")
+    model_flash = settings.get("model_flash", "gemini-2.5-flash-image")
+    board = get_breaker_board()
+    if _on_breaker_change not in board.listeners:
+        board.listeners.append(_on_breaker_change)
+    cancel = CancelToken()
+    _install_cancel_handler(cancel)
+    current_model = lambda: model_flash if rl.is_flash_mode else model_pro
+    watchdog = Watchdog(cancel, on_stall=lambda attempt: _rotate_key(rl, board, current_model()),
+                        key_of=lambda: getattr(rl, "current_key_id", None))
+    retries = get_retry_engine()
     consecutive_errors = 0
     template_index = 0
     recent_pins = deque(maxlen=50)
@@ -369,17 +678,40 @@ def run_normal_mode(target, board_names, session, global_start_time=None):
     last_report_time = time.time()
 
     stop_reason = "batch complete"
+    timer = get_phase_timer(session["session_id"])
+    # 요청마다 최악 비용(Pro 단가)을 먼저 예약 — 다른 워커/데몬과 동시에 돌아도 상한 유지
+    from stop_checker import PRICE_PRO
+    ledger = get_budget_ledger()
+    # 좋아요/달러가 높을 조합·템플릿부터 (Thompson sampling, 지난 좋아요로 갱신)
+    bandit = get_bandit()
+    # --status-port 조회용. 키/브레이커/예약 현황은 조회할 때만 계산
+    status = get_run_status()
+    status.begin("normal", session["session_id"], target, leases.worker_id)
+    status.provide("keys", lambda: {"flash_mode": rl.is_flash_mode, "api_calls": rl.get_total_api_calls(),
+                                    "all_rate_limited": rl.all_keys_rate_limited()})
+    status.provide("breakers", board.summary)
+    status.provide("budget", ledger.summary)
 
     print(f"\n[START] session {session['session_id']}")
     print_report("start", session["session_id"], generated, failed_count, pro_count, flash_count, session_cost, start_time, target)
 
     while True:
-        pending = get_pending_pairs()
+        with leases.locked():
+            pending = bandit.order(skip_repeat_combos(get_pending_pairs()))
+            pair = leases.claim(pending) if pending else None
+        status.pending = len(pending)
         if not pending:
-            close_session("batch complete", rl.get_total_api_calls())
+            if leases.active_leases():
+                print(f"\n[WORKER] 남은 pair는 다른 워커가 처리 중 — 이 워커만 종료합니다.")
+                stop_reason = "worker drained"
+            else:
+                close_session("batch complete", rl.get_total_api_calls())
             break
+        if pair is None:
+            # 남은 pair를 모두 다른 워커가 점유 — 완료되거나 (죽은 워커의) 리스가 만료될 때까지 대기
+            time.sleep(30)
+            continue
 
-        pair = pending[0]
         limits = get_limits()
         daily_total = get_daily_total()
         monthly_total = get_monthly_total()
@@ -400,30 +732,116 @@ def run_normal_mode(target, board_names, session, global_start_time=None):
             next_is_flash=rl.is_flash_mode
         )
 
+        if cancel.cancelled:
+            print(f"\n[STOP] 취소됨 ({cancel.reason}) — 세션은 resume 가능 상태로 유지")
+            stop_reason = f"cancelled ({cancel.reason})"
+            leases.release(pair["combo_id"])
+            break
+
         if should_stop:
             print(f"\n[STOP] {reason}")
             stop_reason = reason
             if "cost" in reason.lower() or "비용" in reason:
                 notify_cost_limit(reason, limits.get("daily_cost_cap", 0), daily_total)
+            leases.release(pair["combo_id"])
             close_session(reason, rl.get_total_api_calls())
             break
 
-        print(f"\n[{generated+1}/{target}] {pair['word1']} x {pair['word2']}", end="", flush=True)
+        try:
+            # 예약이 호출 도중 만료되지 않게 watchdog 최악 소요로 TTL을 잡고, 재시도마다 다시 연장
+            reservation = ledger.reserve(PRICE_PRO, session["session_id"], label=pair["combo_id"],
+                                         ttl=max(ledger.ttl, watchdog.max_call_seconds))
+        except BudgetDenied as e:
+            leases.release(pair["combo_id"])
+            if e.reserved > 0 and e.committed + e.amount <= e.cap:
+                # 다른 요청의 예약 때문 — 그 결과(실패면 예약 해제)를 보고 다시 시도
+                print(f"\n  [BUDGET] {e.reason}: 진행 중 예약 ${e.reserved:.2f} 정리 대기", end="", flush=True)
+                _sleep(30, cancel)
+                continue
+            reason = f"{e.reason} (확정 ${e.committed:.2f} / 한도 ${e.cap:.2f})"
+            print(f"\n[STOP] {reason}")
+            stop_reason = reason
+            notify_cost_limit(reason, e.cap, e.committed)
+            close_session(reason, rl.get_total_api_calls())
+            break
 
-        result = generate_image(
-            word1=pair["word1"], word1_en=pair["word1_en"],
-            word2=pair["word2"], word2_en=pair["word2_en"],
-            board_names=board_names,
-            combo_id=pair["combo_id"],
-            template_index=template_index,
-            recent_pins=recent_pins
-        )
+        # Flash로 내려간 뒤 Pro 브레이커가 half_open이 되면 다음 요청은 Pro로 시험
+        if rl.is_flash_mode and board.retry_due(model_pro) and _route_to_pro(rl, board, model_pro):
+            print(f"\n  [BREAKER] Pro 재시도 — {board.summary()}", end="")
+
+        # 브레이커가 열린 (키, 모델)로는 보내지 않음
+        _rotate_key(rl, board, current_model(), force=False)
+
+        print(f"\n[{generated+1}/{target}] {pair['word1']} x {pair['word2']}", end="", flush=True)
+        was_flash = rl.is_flash_mode
+
+        # generate_image 내부(레퍼런스 선택/요청 생성/API/이미지 저장)는 같은 timer로 세부 단계 기록
+        timer.begin_cycle(pair["combo_id"])
+        # 요청 deadline 초과 시 watchdog이 stalls.jsonl에 기록하고 기다리지 않고 다른 키로 재시도.
+        # timeout이 아닌 실패는 분류별 재시도 정책 + 재시도 예산 안에서만 같은 pair를 다시 요청
+        status.call_started(pair["combo_id"])
+        with leases.keepalive(pair["combo_id"]):
+            attempt = 0
+            while True:
+                with timer.phase("generate"):
+                    result = watchdog.call(
+                        generate_image, label=pair["combo_id"],
+                        word1=pair["word1"], word1_en=pair["word1_en"],
+                        word2=pair["word2"], word2_en=pair["word2_en"],
+                        board_names=board_names,
+                        combo_id=pair["combo_id"],
+                        template_index=bandit.template_index(template_index),
+                        recent_pins=recent_pins
+                    )
+                if result.get("busy"):
+                    break  # 보낼 키가 없어 호출하지 않음 — 브레이커/재시도 예산에 반영하지 않음
+
+                # 브레이커 갱신: 결과는 실제 사용한 (키, 모델)에, rate limiter가 Flash로 넘어갔으면 Pro 쪽도 차단
+                key_id = result.get("key_id")
+                model_used = result.get("model_used") or (model_flash if rl.is_flash_mode else model_pro)
+                board.record(key_id, model_used, result.get("status") == "success", result.get("error", ""))
+                if rl.is_flash_mode and model_used != model_pro:
+                    board.force_open(key_id, model_pro, "rate limiter → Flash")
+
+                if result.get("status") == "success":
+                    retries.on_success()
+                    break
+                if result.get("abandoned"):
+                    break  # 버린 호출이 아직 돌고 있음 — 같은 pair를 또 보내지 않음
+                if classify_failure(result.get("error", "")) == "timeout":
+                    break  # timeout 재시도는 watchdog만 (키를 바꿔 stall_retries회) — 여기서 또 보내지 않음
+                decision = retries.decide(result.get("error", ""), attempt)
+                if not decision.retry or cancel.cancelled:
+                    break
+                print(f" [RETRY] {decision.cls} {attempt + 1}/{decision.max_retries} ({decision.delay:.0f}s 후)", end="", flush=True)
+                ledger.extend(reservation, max(ledger.ttl, decision.delay + watchdog.max_call_seconds))
+                with timer.phase("retry_wait"):  # 백오프 대기는 generate 지연에 넣지 않음
+                    _sleep(decision.delay, cancel)
+                attempt += 1
+        status.call_finished()
         template_index += 1
+        timer.set_labels(model=result.get("model_used"), key=result.get("key_id"))
+
+        if was_flash != rl.is_flash_mode:
+            from_model, to_model = (model_flash, model_pro) if was_flash else (model_pro, model_flash)
+            notify_model_switch(from_model=from_model, to_model=to_model, reason=board.summary())
+
+        if result.get("busy"):
+            # generate_image를 부르지도 못함 — 실패로 세지 않고 pair는 pending으로 남겨 다음에 다시 시도
+            ledger.release(reservation)
+            leases.release(pair["combo_id"])
+            print(f" [BUSY] {result.get('error', '')[:50]}")
+            timer.end_cycle("busy")
+            continue
 
         if result.get("status") == "success":
             cost = result.get("cost", 0)
             is_flash = rl.is_flash_mode
-            add_cost(cost, is_flash)
+            ledger.commit(reservation, cost, is_flash)
+            if watchdog.late_calls():
+                # 재시도가 성공해도 먼저 버린 호출이 늦게 과금될 수 있음 — 끝날 때 실제 비용 기록
+                watchdog.after_abandoned(lambda late, f=is_flash: ledger.settle(None, late, f))
+            status.record(True, cost, is_flash)
             session_cost = round(session_cost + cost, 4)
             generated += 1
             if is_flash:
@@ -431,10 +849,16 @@ def run_normal_mode(target, board_names, session, global_start_time=None):
             else:
                 pro_count += 1
             consecutive_errors = 0
-            update_session_progress(pair["combo_id"], "done", cost, is_flash)
+            with timer.phase("session_write"), leases.locked():
+                if not leases.owns(pair["combo_id"]):
+                    print(f" [LEASE] 리스 만료 후 완료 — 다른 워커와 중복 생성됐을 수 있음", end="")
+                update_session_progress(pair["combo_id"], "done", cost, is_flash)
+                leases.release(pair["combo_id"])
 
+            finish_image(result)
             # Drive 업로드
-            drive_id = upload_single_image(result.get("file_path", ""), result, today_date)
+            with timer.phase("drive_upload"):
+                drive_id = upload_single_image(result.get("file_path", ""), result, today_date)
             if drive_id:
                 result["drive_uploaded"] = True
                 result["drive_file_id"] = drive_id
@@ -443,12 +867,25 @@ def run_normal_mode(target, board_names, session, global_start_time=None):
             else:
                 print(f" [OK] ${cost:.3f} ({result.get('resolution', '?')})")
 
-            append_entry(result, today_date)
+            with timer.phase("store_write"):
+                store_result(result, today_date)
+                get_combo_history().add(pair["word1"], pair["word2"])
+            with timer.phase("metadata_write"):
+                append_entry(result, today_date)
             recent_pins.append(result.get("file_path", ""))
         else:
+            if result.get("abandoned"):
+                # 버린 호출이 끝까지 돌아 과금될 수 있음 — 끝날 때까지 예약 유지 후 실제 결과로 확정/해제
+                ledger.extend(reservation, watchdog.abandon_wait + watchdog.deadline)
+                watchdog.after_abandoned(lambda late, r=reservation, f=rl.is_flash_mode: ledger.settle(r, late, f))
+            else:
+                ledger.release(reservation)
+            status.record(False)
             failed_count += 1
             consecutive_errors += 1
-            update_session_progress(pair["combo_id"], "failed", 0, False, error=result.get("error", "unknown"))
+            with timer.phase("session_write"), leases.locked():
+                update_session_progress(pair["combo_id"], "failed", 0, False, error=result.get("error", "unknown"))
+                leases.release(pair["combo_id"])
             print(f" [FAIL] {result.get('error', 'unknown')[:50]}")
 
             if consecutive_errors >= 5:
@@ -456,9 +893,11 @@ def run_normal_mode(target, board_names, session, global_start_time=None):
                 print(f"\n  [EMERGENCY] 연속 {consecutive_errors}회 실패 - 프로세스를 자동 중단합니다.")
                 stop_reason = f"연속 {consecutive_errors}회 실패 자동 중단"
                 close_session(stop_reason, rl.get_total_api_calls())
+                timer.end_cycle("failed")
                 break
 
         # API 과사용 실시간 감지 (10장 이상 시도 후부터 체크)
+        # 재시도는 retry_policy 예산으로 미리 제한되므로 여기는 generate 내부 재시도까지 포함한 최후 안전장치
         total_attempts = generated + failed_count
         if total_attempts >= 10:
             total_api_calls = rl.get_total_api_calls()
@@ -468,21 +907,37 @@ def run_normal_mode(target, board_names, session, global_start_time=None):
                 print(f"  프로세스를 자동 중단합니다.")
                 stop_reason = f"API 과사용 자동 중단 (초과 {overhead}회/{total_attempts}회)"
                 close_session(stop_reason, rl.get_total_api_calls())
+                timer.end_cycle(result.get("status", "failed"))
                 break
 
         # random delay 30~60s
         wait_sec = random.randint(30, 60)
         print(f"  [WAIT] {wait_sec}s ...", end="", flush=True)
-        time.sleep(wait_sec)
+        with timer.phase("sleep"):
+            _sleep(wait_sec, cancel)
         print(" OK")
+        timer.end_cycle(result.get("status", "failed"))
+        timer.write_prometheus()
+        board.tick()
 
         # 1시간마다 진행 보고
         if time.time() - last_report_time >= 3600:
             print_report("hourly", session["session_id"], generated, failed_count, pro_count, flash_count, session_cost, start_time, target)
             last_report_time = time.time()
 
+    status.update(stage="done", current="")
+
     # 완료 보고
     print_report("complete", session["session_id"], generated, failed_count, pro_count, flash_count, session_cost, start_time, target)
+    if watchdog.stalls:
+        print(f"[WATCHDOG] deadline 초과 {watchdog.stalls}건 — output/logs/stalls.jsonl")
+    print(f"[RETRY] {retries.summary()}")
+    get_combo_history().save()
+    timer.flush()
+    timer.print_summary()
+
+    # JSONL 메타데이터 → 기존 JSON 배열 (뷰어/Drive 업로드용)
+    compact_metadata(today_date)
 
     # HTML viewer 생성 + Drive 업로드 + GitHub Pages 배포
     try:
@@ -528,24 +983,58 @@ def run_normal_mode(target, board_names, session, global_start_time=None):
         print(f"  [OK] 정상 범위")
     print(f"{'=' * 55}\n")
 
+    return generated, failed_count, stop_reason
 
-def main():
+
+def check_model_health(batch, client=None, rate_limiter=None):
+    """시작 전 모델 상태 확인 (model-health.json 캐시, 만료 시 저비용 probe). 진행 가능하면 True"""
+    with open(BASE_DIR / "config" / "settings.json", encoding="utf-8") as f:
+        settings = json.load(f)
+    pro = get_model_health(settings.get("model_pro", "gemini-3-pro-image-preview"), client=client)
+    print(f"[HEALTH] {format_health(pro)}")
+    if pro["ok"]:
+        return True
+    if batch:
+        print("[STOP] Pro 모델 비정상 — Batch API 제출하지 않습니다.")
+        return False
+    flash = get_model_health(settings.get("model_flash", "gemini-2.5-flash-image"), client=client)
+    print(f"[HEALTH] {format_health(flash)}")
+    if flash["ok"]:
+        # rate limiter를 Flash로 고정하고 Pro 브레이커를 열어 둠 — retry_interval 사이클 뒤 half_open에서 Pro 재시도
+        print("[WARN] Pro 비정상 — Flash로 시작합니다.")
+        (rate_limiter or get_rate_limiter()).is_flash_mode = True
+        get_breaker_board().force_open("default", pro["model"], f"health {pro['status']}")
+        return True
+    print("[STOP] Pro/Flash 모두 비정상 — 실행하지 않습니다.")
+    return False
+
+
+def run(target, batch=False, refresh=True, worker_name="main", health_check=True, status_port=None,
+        client=None, rate_limiter=None):
+    """배치 1회 실행 — CLI(main)와 scheduled_run 데몬(프로세스 내 호출)이 공용으로 사용.
+    데몬은 warm client(모델 probe/batch 조회)와 rate limiter를 넘겨 매 실행 다시 만들지 않음"""
+    global _status_server, _pin_cache
     global_start_time = time.time()  # 전체 시작 시점 (Slack 알림용)
 
-    parser = argparse.ArgumentParser(description="나노바나나 — 이미지 생성 배치 실행")
-    parser.add_argument("count", nargs="?", type=int, default=999, help="생성할 이미지 수 (기본 999)")
-    parser.add_argument("--batch", action="store_true", help="Gemini Batch API 사용 (50%% 할인)")
-    parser.add_argument("--no-refresh", action="store_true", help="Pinterest 핀 갱신 건너뛰기")
-    args = parser.parse_args()
+    acquire_lock(worker_name)
+    if status_port is not None and _status_server is None:
+        _status_server = start_status_server(status_port)
 
-    acquire_lock()
-    target = args.count
+    if health_check and not check_model_health(batch, client, rate_limiter):
+        return None
 
     # 배치 시작 전 핀 갱신
-    if args.no_refresh:
+    if not refresh:
         print("\n[PIN REFRESH] --no-refresh: 건너뜀 (기존 캐시 사용)")
     else:
         refresh_pins()
+    # tmp/pins 용량 관리 — 백그라운드에서 조금씩 (대기 중인 배치가 참조하는 핀은 남김)
+    if _pin_cache is None:
+        try:
+            from pin_cache import start_pin_cache
+            _pin_cache = start_pin_cache(pending=lambda: [load_batch_state()])
+        except Exception as e:
+            print(f"  [WARN] 핀 캐시 정리 시작 실패: {e}")
 
     # 모든 보드 사용 (Pinterest + Savee)
     boards_file = BASE_DIR / "config" / "pinterest-boards.json"
@@ -558,30 +1047,58 @@ def main():
     if savee_board.exists() and "savee" not in board_names:
         board_names.append("savee")
 
-    mode_label = "Gemini Batch API (50% 할인)" if args.batch else "일반 (순차)"
+    mode_label = "Gemini Batch API (50% 할인)" if batch else "일반 (순차)"
     print(f"\n[Nano-Banana] {mode_label}")
     print(f"  target: {target}")
     print(f"  boards: {len(board_names)}")
     print("=" * 50)
 
-    # 기존 세션 resume 또는 새 세션 생성
-    existing = check_resume()
-    if existing:
-        session = existing
-        done = sum(1 for p in session["word_pairs"] if p["status"] == "done")
-        print(f"[RESUME] session {session['session_id']} ({done} done, resuming...)")
-    else:
-        settings = {
-            "target_count": target,
-            "max_duration_hours": -1,
-            "session_cost_cap": None
-        }
-        session = create_new_session(board_names, settings)
-
-    if args.batch:
-        run_batch_mode(target, board_names, session, global_start_time)
-    else:
-        run_normal_mode(target, board_names, session, global_start_time)
+    # 기존 세션 resume 또는 새 세션 생성 (여러 워커가 동시에 시작해도 세션은 하나만 생성)
+    with FileLock(SESSION_LOCK_FILE):
+        existing = check_resume()
+        if existing:
+            session = existing
+            done = sum(1 for p in session["word_pairs"] if p["status"] == "done")
+            print(f"[RESUME] session {session['session_id']} ({done} done, resuming...)")
+        else:
+            settings = {
+                "target_count": target,
+                "max_duration_hours": -1,
+                "session_cost_cap": None
+            }
+            session = create_new_session(board_names, settings)
+
+    leases = LeaseStore(session["session_id"], make_worker_id(worker_name))
+    print(f"  worker: {leases.worker_id}")
+    _orphan_threads.extend(recover_orphaned_batches(session, client))
+    get_run_status().provide("orphan_batches", lambda: sum(t.is_alive() for t in _orphan_threads))
+    print(f"  {get_combo_history().describe()}")
+
+    if batch:
+        return run_batch_mode(target, board_names, session, global_start_time, leases, client)
+    return run_normal_mode(target, board_names, session, global_start_time, leases, rate_limiter)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="나노바나나 — 이미지 생성 배치 실행")
+    parser.add_argument("count", nargs="?", type=int, default=999, help="생성할 이미지 수 (기본 999)")
+    parser.add_argument("--batch", action="store_true", help="Gemini Batch API 사용 (50%% 할인)")
+    parser.add_argument("--no-refresh", action="store_true", help="Pinterest 핀 갱신 건너뛰기")
+    parser.add_argument("--worker-id", default="main",
+                        help="워커 이름 — 다른 이름으로 여러 프로세스/호스트가 같은 세션을 나눠 처리")
+    parser.add_argument("--skip-health", action="store_true", help="시작 전 모델 상태 확인 건너뛰기")
+    parser.add_argument("--status-port", type=int, default=None,
+                        help="실행 상태 HTTP 포트 (/status JSON, /metrics Prometheus)")
+    args = parser.parse_args()
+
+    run(args.count, batch=args.batch, refresh=not args.no_refresh, worker_name=args.worker_id,
+        health_check=not args.skip_health, status_port=args.status_port)
+
+    pending = [t for t in _orphan_threads if t.is_alive()]
+    if pending:
+        print(f"\n[ORPHAN] 이전 배치 {len(pending)}개 수거 대기 중... (Ctrl+C로 멈춰도 다음 실행 때 이어서)")
+        for t in pending:
+            t.join()
 
 
 if __name__ == "__main__":
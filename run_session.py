@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 """
 나노바나나 에이전트 — 메인 실행 스크립트
-사용: python run_session.py
+사용: python run_session.py [--status-port 8787]
 """
+import argparse
 import json
 import random
 import sys
@@ -111,19 +112,31 @@ def run_generation_session(session: dict, start_time: float):
     """이미지 생성 세션 루프"""
     from session_manager import get_pending_pairs, update_session_progress, close_session
     from generate import generate_image
-    from cost_tracker import add_cost, get_daily_total, get_monthly_total, get_limits
+    from cost_tracker import get_daily_total, get_monthly_total, get_limits
     from stop_checker import check_stop_conditions, format_elapsed
-    from track_pins import append_entry
-    from slack_notify import notify_consecutive_errors, notify_model_switch, notify_cost_limit
+    from metadata_log import append_entry
+    from slack_queue import notify_consecutive_errors, notify_model_switch, notify_cost_limit
     from rate_limiter import get_rate_limiter
+    from deadline import CancelToken, Watchdog
+    from combo_history import get_combo_history
+    from budget_ledger import BudgetDenied, get_budget_ledger
+    from status_server import get_run_status
+    from bandit_selector import get_bandit
 
     settings = session["settings"]
     boards = session["boards_used"]
 
     rl = get_rate_limiter()
+    history = get_combo_history()
+    bandit = get_bandit()
+    cancel = CancelToken()
+    # stall 재시도 전 다음 키로 — rate_limiter에 키 순환이 있으면 사용 (버린 호출이 남은 키는 건너뜀)
+    watchdog = Watchdog(cancel, on_stall=lambda attempt: getattr(rl, "rotate_key", lambda: None)(),
+                        key_of=lambda: getattr(rl, "current_key_id", None))
     consecutive_errors = 0
     template_index = 0
     recent_pins = []
+    ledger = get_budget_ledger()
 
     print(f"\n[시작] 세션 {session['session_id']}")
     print(f"  보드: {', '.join(boards)}")
@@ -134,14 +147,27 @@ def run_generation_session(session: dict, start_time: float):
     generated = prog.get("generated", 0)
     failed_count = prog.get("failed", 0)
     session_cost = prog.get("session_cost", 0.0)
+    skipped = 0  # 이력 중복으로 건너뛴 조합 수 (완료 보고용)
+
+    status = get_run_status()
+    status.begin("session", session["session_id"], max(0, settings.get("target_count", 0) or 0))
+    status.provide("keys", lambda: {"api_calls": rl.get_total_api_calls(),
+                                    "all_rate_limited": rl.all_keys_rate_limited()})
+    status.provide("budget", ledger.summary)
 
     while True:
-        pending = get_pending_pairs()
+        # 이전 세션에서 이미 생성한 조합은 API 호출 없이 건너뜀
+        pending, repeats = history.filter_new(get_pending_pairs())
+        skipped += len(repeats)
+        for p in repeats:
+            update_session_progress(p["combo_id"], "skipped", 0, False)
         if not pending:
             close_session("완료 — 모든 조합 생성")
             break
 
-        pair = pending[0]
+        # 좋아요/달러가 높을 조합부터 (비용 상한에 먼저 닿아도 예산이 좋은 조합에 쓰이게)
+        pair = bandit.order(pending)[0]
+        status.pending = len(pending)
         limits = get_limits()
         daily_total = get_daily_total()
         monthly_total = get_monthly_total()
@@ -169,29 +195,68 @@ def run_generation_session(session: dict, start_time: float):
             close_session(reason)
             break
 
+        # 최악 비용(Pro 단가) 예약 — 동시에 도는 다른 프로세스의 진행 중 요청까지 합산해 상한 확인
+        from stop_checker import PRICE_PRO
+        try:
+            reservation = ledger.reserve(PRICE_PRO, session["session_id"],
+                                         session_cap=settings.get("session_cost_cap"),
+                                         session_spent=session_cost, label=pair["combo_id"],
+                                         ttl=max(ledger.ttl, watchdog.max_call_seconds))
+        except BudgetDenied as e:
+            if e.reserved > 0 and e.committed + e.amount <= e.cap:
+                print(f"\n  [예산] {e.reason}: 진행 중 예약 ${e.reserved:.2f} 정리 대기")
+                time.sleep(30)
+                continue
+            reason = f"{e.reason} (확정 ${e.committed:.2f} / 한도 ${e.cap:.2f})"
+            print(f"\n[정지] {reason}")
+            notify_cost_limit(reason, e.cap, e.committed)
+            close_session(reason)
+            break
+
         print(f"\n[{generated+1}] {pair['word1']} × {pair['word2']}", end="", flush=True)
 
-        result = generate_image(
+        status.call_started(pair["combo_id"])
+        result = watchdog.call(
+            generate_image, label=pair["combo_id"],
             word1=pair["word1"], word1_en=pair["word1_en"],
             word2=pair["word2"], word2_en=pair["word2_en"],
             board_names=boards,
             combo_id=pair["combo_id"],
-            template_index=template_index,
+            template_index=bandit.template_index(template_index),
             recent_pins=recent_pins
         )
+        status.call_finished()
         template_index += 1
 
+        if result.get("busy"):
+            # generate_image를 부르지도 못함 — 실패로 세지 않고 pair는 pending으로 남김
+            ledger.release(reservation)
+            print(f" [BUSY] {result.get('error', '')[:50]}")
+            continue
+
         if result.get("status") == "success":
             cost = result.get("cost", 0)
-            add_cost(cost, False)
+            ledger.commit(reservation, cost, False)
+            if watchdog.late_calls():
+                # 먼저 버린 호출도 늦게 과금될 수 있음 — 끝날 때 실제 비용 기록
+                watchdog.after_abandoned(lambda late: ledger.settle(None, late))
+            status.record(True, cost)
             session_cost = round(session_cost + cost, 4)
             generated += 1
             consecutive_errors = 0
             update_session_progress(pair["combo_id"], "done", cost, False)
             append_entry(result, today_date)
+            history.add(pair["word1"], pair["word2"])
             print(f" [OK] ${cost:.3f} ({result.get('resolution', '?')})")
             recent_pins.append(result.get("file_path", ""))
         else:
+            if result.get("abandoned"):
+                # 버린 호출이 끝까지 돌아 과금될 수 있음 — 끝날 때까지 예약 유지
+                ledger.extend(reservation, watchdog.abandon_wait + watchdog.deadline)
+                watchdog.after_abandoned(lambda late, r=reservation: ledger.settle(r, late))
+            else:
+                ledger.release(reservation)
+            status.record(False)
             failed_count += 1
             consecutive_errors += 1
             update_session_progress(pair["combo_id"], "failed", 0, False)
@@ -209,7 +274,8 @@ def run_generation_session(session: dict, start_time: float):
         time.sleep(wait_sec)
         print(" OK")
 
-    return generated, failed_count, session_cost
+    history.save()
+    return generated, failed_count, session_cost, skipped
 
 
 def main():
@@ -218,7 +284,15 @@ def main():
     from track_pins import get_pin_usage_stats
     from generate_viewer import generate_viewer
     from report import print_and_save_report
-    from slack_notify import notify_session_complete
+    from slack_queue import notify_session_complete
+    from status_server import start_status_server
+
+    parser = argparse.ArgumentParser(description="나노바나나 — 대화형 세션 실행")
+    parser.add_argument("--status-port", type=int, default=None,
+                        help="실행 상태 HTTP 포트 (/status JSON, /metrics Prometheus)")
+    args = parser.parse_args()
+    if args.status_port is not None:
+        start_status_server(args.status_port)
 
     print("\n[Nano-Banana] Pro Inspiration Generator Agent")
     print("=" * 50)
@@ -263,14 +337,21 @@ def main():
         start_time = time.time()
 
     # 생성 루프
-    generated, failed, session_cost = run_generation_session(session, start_time)
+    generated, failed, session_cost, skipped = run_generation_session(session, start_time)
 
     # 세션 완료 처리
     today_date = __import__("datetime").datetime.now().strftime("%y%m%d")
     print(f"\n[완료] 생성 {generated}장, 실패 {failed}장, 비용 ${session_cost:.2f}")
+    if skipped:
+        from stop_checker import PRICE_PRO
+        print(f"  이미 생성한 조합 {skipped}개 건너뜀 (예상 절약 ${skipped * PRICE_PRO:.2f})")
     print("\n[Cost]:")
     print(get_status_summary())
 
+    # JSONL 메타데이터 → 기존 JSON 배열 (뷰어/Drive 업로드용)
+    from metadata_log import compact
+    compact(today_date)
+
     # HTML 뷰어 생성
     print("\n[HTML 뷰어 생성 중...]")
     generate_viewer(session["session_id"], today_date)
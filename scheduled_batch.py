@@ -1,51 +1,31 @@
 #!/usr/bin/env python3
-"""예약 배치: Pro 이미지 1장 테스트 → 성공 시 200장 배치 실행, 실패 시 중단"""
+"""예약 배치: Pro 모델 상태 probe (이미지 생성 없음) → 정상 시 200장 배치 실행, 비정상 시 중단"""
 import json
 import subprocess
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent / ".claude" / "skills" / "notifier" / "scripts"))
-from slack_notify import send_slack
+sys.path.insert(0, str(Path(__file__).parent / ".claude" / "skills" / "image-generator" / "scripts"))
+from slack_queue import send_slack
+from model_probe import get_model_health, format_health
 
 CONFIG_DIR = Path(__file__).parent / "config"
-API_KEYS_FILE = CONFIG_DIR / "api-keys.json"
 SETTINGS_FILE = CONFIG_DIR / "settings.json"
 
 
 def test_pro_image():
-    """Pro 모델로 이미지 1장 테스트 생성"""
-    with open(API_KEYS_FILE, encoding="utf-8") as f:
-        keys = json.load(f)["keys"]
+    """Pro 모델 상태 확인 — 메타데이터/토큰 카운트/최소 요청 probe (유료 테스트 이미지 대신)"""
     with open(SETTINGS_FILE, encoding="utf-8") as f:
         settings = json.load(f)
-
-    api_key = keys[0]["api_key"]
     model = settings.get("model_pro", "gemini-3-pro-image-preview")
 
     print(f"[TEST] 모델: {model}")
-    print(f"[TEST] Pro 이미지 1장 테스트 중...")
+    print(f"[TEST] Pro 상태 probe 중...")
 
-    try:
-        from google import genai
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model=model,
-            contents="a cute cat, simple illustration",
-            config=genai.types.GenerateContentConfig(
-                response_modalities=["TEXT", "IMAGE"]
-            ),
-        )
-        for part in response.candidates[0].content.parts:
-            if part.inline_data:
-                size = len(part.inline_data.data)
-                print(f"[TEST] 성공! 이미지 생성됨 ({size:,} bytes)")
-                return True
-        print("[TEST] 실패 — 응답에 이미지 없음")
-        return False
-    except Exception as e:
-        print(f"[TEST] 실패 — {e}")
-        return False
+    entry = get_model_health(model, max_age=0)
+    print(f"[TEST] {'성공' if entry['ok'] else '실패'} — {format_health(entry)}")
+    return entry["ok"]
 
 
 def kill_existing_batch():
@@ -1,85 +1,219 @@
 #!/usr/bin/env python3
-"""예약 실행: 3시/5시/7시 테스트 후 200장 배치"""
-import subprocess
+"""예약 실행 데몬: 모델 가용성 probe(지수 백오프) → 정상이 되는 즉시 200장 배치
+
+- 고정 3시/5시/7시 대신, 실행 창(window) 안에서 과거 가용성이 좋았던 시간대부터 probe
+- 실패하면 백오프(60s → 2배 … 최대 30분)로 창이 끝날 때까지 재시도
+- 배치는 subprocess가 아니라 같은 프로세스에서 run_batch.run() 호출 (클라이언트/설정 재사용)
+- 시간대별 probe 결과를 output/logs/availability.json에 누적
+
+사용:
+  python scheduled_run.py            # 매일 반복
+  python scheduled_run.py --once     # 하룻밤만
+  python scheduled_run.py --now      # 창 무시하고 바로 probe 시작
+"""
+import argparse
+import json
+import random
 import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
-BASE_CMD = [sys.executable, "run_batch.py"]
-WORK_DIR = "d:/01/nano-banana-agent"
-
-# Slack 알림용 import
-sys.path.insert(0, str(Path(WORK_DIR) / ".claude" / "skills" / "notifier" / "scripts"))
-from slack_notify import send_slack
-
-
-def wait_until(hour):
-    """지정 시각까지 대기"""
-    now = datetime.now()
-    target = now.replace(hour=hour, minute=0, second=0, microsecond=0)
-    if now >= target:
+BASE_DIR = Path(__file__).parent
+CONFIG_DIR = BASE_DIR / "config"
+SETTINGS_FILE = CONFIG_DIR / "settings.json"
+AVAILABILITY_FILE = BASE_DIR / "output" / "logs" / "availability.json"
+
+# Slack 알림 / 모델 probe import
+sys.path.insert(0, str(BASE_DIR / ".claude" / "skills" / "notifier" / "scripts"))
+sys.path.insert(0, str(BASE_DIR / ".claude" / "skills" / "image-generator" / "scripts"))
+from slack_queue import send_slack
+from model_probe import get_model_health
+from deadline import make_http_options
+from reference_media import batch_api_key
+
+DEFAULT_SCHEDULER = {
+    "window_start_hour": 3,
+    "window_end_hour": 9,
+    "target": 200,
+    "probe_backoff_initial_seconds": 60,
+    "probe_backoff_max_seconds": 1800,
+    "min_success_rate": 0.5,
+}
+
+
+class AvailabilityHistory:
+    """시간대(0~23시)별 probe 성공/실패 누적"""
+
+    def __init__(self, path=AVAILABILITY_FILE):
+        self.path = path
+        self.data = {"hours": {}, "recent": []}
+        if path.exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def record(self, ok, when=None, detail=""):
+        when = when or datetime.now()
+        h = self.data["hours"].setdefault(f"{when.hour:02d}", {"ok": 0, "fail": 0})
+        h["ok" if ok else "fail"] += 1
+        self.data["recent"] = (self.data.get("recent", []) + [{
+            "at": when.isoformat(timespec="seconds"), "ok": ok, "detail": detail[:120]
+        }])[-200:]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+    def success_rate(self, hour):
+        """라플라스 보정 성공률 — 기록 없는 시간대는 0.5"""
+        h = self.data["hours"].get(f"{hour:02d}", {"ok": 0, "fail": 0})
+        return (h["ok"] + 1) / (h["ok"] + h["fail"] + 2)
+
+
+class WarmRunner:
+    """설정/API 클라이언트/스킬 모듈을 한 번만 로드해서 매일 재사용"""
+
+    def __init__(self):
+        with open(SETTINGS_FILE, encoding="utf-8") as f:
+            self.settings = json.load(f)
+        self.scheduler = {**DEFAULT_SCHEDULER, **self.settings.get("scheduler", {})}
+        self.model = self.settings.get("model_pro", "gemini-3-pro-image-preview")
+        self._client = None
+        self._run_batch = None
+        self._rate_limiter = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            # 배치 제출/조회 키 — run()에 넘겨 batch polling에도 이 클라이언트를 씀
+            self._client = genai.Client(api_key=batch_api_key()["api_key"], http_options=make_http_options())
+        return self._client
+
+    def probe(self):
+        """Pro 모델 가용성 확인 (저비용 probe, 결과는 model-health.json에 공유) — (성공 여부, 상세)"""
+        try:
+            client = self.client
+        except Exception as e:
+            return False, str(e)
+        entry = get_model_health(self.model, max_age=0, client=client)
+        return entry["ok"], entry["detail"] or f"{entry['status']} ({entry['latency']:.1f}s)"
+
+    def run_batch(self, target):
+        if self._run_batch is None:
+            import run_batch
+            self._run_batch = run_batch
+            self._rate_limiter = run_batch.get_rate_limiter()
+        # 방금 probe 결과가 model-health.json에 있으므로 run()의 시작 확인은 캐시로 통과
+        return self._run_batch.run(target, refresh=False, client=self.client, rate_limiter=self._rate_limiter)
+
+
+def next_window(now, cfg):
+    """현재 또는 다음 실행 창 (start, end). 자정을 넘는 창(예: 23시~5시)도 지원"""
+    start_h, end_h = cfg["window_start_hour"], cfg["window_end_hour"]
+    length = timedelta(hours=(end_h - start_h) % 24 or 24)
+    today_start = now.replace(hour=start_h, minute=0, second=0, microsecond=0)
+    for start in (today_start - timedelta(days=1), today_start, today_start + timedelta(days=1)):
+        if now < start + length:
+            return start, start + length
+    return today_start + timedelta(days=1), today_start + timedelta(days=1) + length
+
+
+def pick_start(now, window_start, window_end, history, min_rate):
+    """창 안에서 과거 성공률이 min_rate 이상인 첫 시간대. 없으면 창 시작(또는 지금)"""
+    slot = window_start
+    while slot < window_end:
+        if slot + timedelta(hours=1) > now and history.success_rate(slot.hour) >= min_rate:
+            return max(slot, now)
+        slot += timedelta(hours=1)
+    return max(window_start, now)
+
+
+def sleep_until(target_dt, label):
+    diff = (target_dt - datetime.now()).total_seconds()
+    if diff <= 0:
         return
-    diff = (target - now).total_seconds()
-    print(f"[WAIT] {hour}시까지 대기 ({int(diff//60)}분 남음)...")
-    send_slack(f"{hour}시까지 대기 중 ({int(diff//60)}분 남음)", "⏰")
+    print(f"[WAIT] {target_dt:%m/%d %H:%M}까지 대기 ({int(diff // 60)}분 남음) — {label}")
+    send_slack(f"{target_dt:%H:%M}까지 대기 중 ({int(diff // 60)}분 남음) — {label}", "⏰")
     time.sleep(diff)
 
 
-def run_test():
-    """1장 테스트. 성공=True, 실패=False"""
-    now_str = datetime.now().strftime('%H:%M:%S')
-    print(f"\n[TEST] 1장 테스트 시작 ({now_str})")
-    send_slack(f"1장 테스트 시작 ({now_str})", "🧪")
-
-    result = subprocess.run(
-        BASE_CMD + ["1", "--no-refresh"],
-        cwd=WORK_DIR, capture_output=True, text=True, encoding="utf-8", errors="replace",
-        timeout=300
-    )
-    output = result.stdout + result.stderr
-
-    if result.returncode == 0 and "[OK]" in output and "0/1" not in output:
-        print("[TEST] 성공!")
-        send_slack("1장 테스트 성공! 200장 배치를 시작합니다.", "✅")
-        return True
-    else:
-        print("[TEST] 실패")
-        send_slack("1장 테스트 실패 (503/API 에러). 다음 시간에 재시도합니다.", "❌")
+def probe_until_healthy(runner, history, deadline):
+    """지수 백오프 probe. deadline 전에 정상이면 True"""
+    cfg = runner.scheduler
+    delay = cfg["probe_backoff_initial_seconds"]
+    attempt = 0
+    while True:
+        attempt += 1
+        now = datetime.now()
+        ok, detail = runner.probe()
+        history.record(ok, now, detail)
+        print(f"[PROBE] #{attempt} {now:%H:%M:%S} {'OK' if ok else 'FAIL'} — {detail[:80]}")
+        if ok:
+            return True
+        if attempt == 1:
+            send_slack(f"Pro probe 실패 ({detail[:60]}). 백오프로 재시도합니다.", "❌")
+
+        wait = min(delay, cfg["probe_backoff_max_seconds"]) * random.uniform(0.8, 1.2)
+        if datetime.now() + timedelta(seconds=wait) >= deadline:
+            return False
+        time.sleep(wait)
+        delay *= 2
+
+
+def run_night(runner, history, ignore_window=False):
+    cfg = runner.scheduler
+    now = datetime.now()
+    window_start, window_end = next_window(now, cfg)
+    if ignore_window:
+        window_start, window_end = now, now + (window_end - window_start)
+    start = pick_start(now, window_start, window_end, history, cfg["min_success_rate"])
+    sleep_until(start, f"시간대 성공률 {history.success_rate(start.hour) * 100:.0f}%")
+
+    if not probe_until_healthy(runner, history, window_end):
+        send_slack(f"{window_start:%H}시~{window_end:%H}시 창 동안 모델이 회복되지 않았습니다. 다음 창에 재시도합니다.", "🛑")
+        print(f"\n[STOP] {window_end:%H:%M}까지 모델 비정상 — 이번 창 건너뜀")
         return False
 
-
-def run_batch_200():
-    """200장 배치 실행"""
+    target = cfg["target"]
     now_str = datetime.now().strftime('%H:%M:%S')
-    print(f"\n[BATCH] 200장 배치 시작 ({now_str})")
-    send_slack(f"200장 배치 시작 ({now_str})", "🚀")
-
-    result = subprocess.run(
-        BASE_CMD + ["200", "--no-refresh"],
-        cwd=WORK_DIR, encoding="utf-8", errors="replace",
-        timeout=600 * 60
-    )
-    print(f"[BATCH] 완료 (exit code: {result.returncode})")
+    print(f"\n[BATCH] {target}장 배치 시작 ({now_str})")
+    send_slack(f"Pro 정상 — {target}장 배치 시작 ({now_str})", "🚀")
+    try:
+        summary = runner.run_batch(target)
+        print(f"[BATCH] 완료: {summary}")
+    except SystemExit as e:
+        print(f"[BATCH] 종료 (exit {e.code})")
+    except Exception as e:
+        send_slack(f"배치 실행 중 오류: {str(e)[:200]}", "🔴")
+        print(f"[ERROR] 배치 실행 실패: {e}")
+    return True
 
 
 def main():
-    schedule = [3, 5, 7]
-    send_slack(f"예약 실행 시작 - 스케줄: {schedule[0]}시/{schedule[1]}시/{schedule[2]}시", "📋")
-
-    for i, hour in enumerate(schedule):
-        wait_until(hour)
-        if run_test():
-            run_batch_200()
-            return
-        else:
-            remaining = schedule[i+1:] if i+1 < len(schedule) else []
-            if remaining:
-                send_slack(f"다음 시도: {remaining[0]}시", "⏭️")
-            print(f"[INFO] {hour}시 테스트 실패. 다음 시도로 넘어갑니다.")
-
-    send_slack("3시/5시/7시 모두 실패. 예약 실행을 중단합니다.", "🛑")
-    print("\n[STOP] 3시/5시/7시 모두 실패. 중단합니다.")
+    parser = argparse.ArgumentParser(description="나노바나나 — 가용성 기반 예약 실행 데몬")
+    parser.add_argument("--once", action="store_true", help="하룻밤(창 1개)만 실행하고 종료")
+    parser.add_argument("--now", action="store_true", help="실행 창을 무시하고 바로 probe 시작")
+    args = parser.parse_args()
+
+    runner = WarmRunner()
+    history = AvailabilityHistory()
+    cfg = runner.scheduler
+    send_slack(f"예약 실행 데몬 시작 — 창 {cfg['window_start_hour']}시~{cfg['window_end_hour']}시, "
+               f"목표 {cfg['target']}장", "📋")
+
+    first = True
+    while True:
+        run_night(runner, history, ignore_window=args.now and first)
+        first = False
+        if args.once:
+            break
+        # 같은 창에서 다시 돌지 않도록 현재 창이 끝날 때까지 대기
+        window_start, window_end = next_window(datetime.now(), cfg)
+        if window_start <= datetime.now():
+            sleep_until(window_end, "이번 창 종료")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+bandit 오프라인 재생 평가 — 기존 metadata/좋아요 로그를 날짜순으로 다시 돌려 좋아요/달러 비교
+
+날짜 하루치 생성 기록 = 그날 세션의 pending pair라고 보고, 예산이 그중 --budget 비율만 허락할 때
+  random  지금처럼 무작위 순서 (기댓값 = 그날 평균 좋아요율)
+  bandit  전날까지의 기록/좋아요만으로 학습한 bandit_selector 순서로 앞에서부터
+두 방식이 고른 이미지의 실제 좋아요와 실제 비용으로 좋아요/달러를 계산한다.
+(좋아요는 세션이 끝난 뒤에 눌리므로 같은 날 안에서는 학습하지 않음 — 실제 운영과 같은 조건)
+
+로그에서만 고르므로 반사실 추정이 필요 없다. 기록이 --min-records보다 적으면 (또는 --synthetic)
+실제 단어 사전/템플릿으로 숨은 좋아요율을 가진 가상 로그를 만들어 같은 방식으로 재생한다.
+
+사용:
+  python tools/bench_bandit.py
+  python tools/bench_bandit.py --budget 0.3 --runs 10
+  python tools/bench_bandit.py --synthetic --days 30 --per-day 200
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'word-manager', 'scripts'))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'pin-tracker', 'scripts'))
+
+from bandit_selector import BanditSelector, _load_bandit_config, _load_template_ids, liked_from_files
+from vocab_store import Vocab, compile_vocab
+
+INDEX_PATH = os.path.join(BASE, 'output', 'images', 'index.sqlite3')
+METADATA_DIR = os.path.join(BASE, 'output', 'images', 'metadata')
+
+
+def load_log():
+    """(기록 목록, 좋아요 combo_id) — 인덱스가 있으면 인덱스, 없으면 날짜별 metadata"""
+    liked = liked_from_files()
+    if os.path.exists(INDEX_PATH):
+        conn = sqlite3.connect(f'file:{INDEX_PATH}?mode=ro', uri=True)
+        conn.row_factory = sqlite3.Row
+        rows = [dict(r) for r in conn.execute('SELECT * FROM images ORDER BY date, created_at')]
+        conn.close()
+        if rows:
+            liked |= {r['combo_id'] for r in rows if r['liked']}
+            return rows, liked
+    from metadata_log import all_dates, iter_entries
+    rows = []
+    for date in all_dates(METADATA_DIR):
+        for m in iter_entries(date, METADATA_DIR):
+            if m.get('word1') and m.get('combo_id'):
+                rows.append({**m, 'date': m.get('date') or date})
+    return rows, liked
+
+
+def synthetic_log(vocab, args):
+    """숨은 좋아요율: 전체율 × 카테고리/word1/word2/템플릿 상승(로그 정규)"""
+    rng = random.Random(args.seed)
+    word1s = [w['word'] for w in vocab.word1_entries(include_excluded=False)]
+    word2s = [w['word'] for w in vocab.word2_entries(include_excluded=False)]
+    templates = _load_template_ids() or ['core_01']
+    lift = defaultdict(lambda: math.exp(rng.gauss(0, args.spread)))
+    rows, liked = [], set()
+    for day in range(args.days):
+        date = f'26{1 + day // 28:02d}{1 + day % 28:02d}'
+        for i in range(args.per_day):
+            w1, w2, t = rng.choice(word1s), rng.choice(word2s), rng.choice(templates)
+            cat = vocab.category(w1, '')
+            p = args.base_rate * lift['c', cat] * lift['w1', w1] * lift['w2', w2] * lift['t', t]
+            flash = rng.random() < args.flash_share
+            r = {'combo_id': f'{date}_{i + 1:04d}', 'date': date, 'word1': w1, 'word2': w2,
+                 'template_id': t, 'cost': 0.039 if flash else 0.134}
+            rows.append(r)
+            if rng.random() < min(p, 1.0):
+                liked.add(r['combo_id'])
+    return rows, liked
+
+
+def replay(rows, liked, vocab, args, seed, state_dir):
+    days = defaultdict(list)
+    for r in rows:
+        days[r.get('date') or r['combo_id'].split('_')[0]].append(r)
+    order = sorted(days)
+    cfg = {**_load_bandit_config(), 'enabled': True}
+    bandit = BanditSelector(path=Path(state_dir) / f'bandit-{seed}.json', cfg=cfg,
+                            rng=random.Random(seed), category_of=vocab.category)
+    totals = {'random': [0.0, 0.0, 0], 'bandit': [0.0, 0.0, 0]}  # 좋아요, 비용, 장수
+    for i, date in enumerate(order):
+        pending = days[date]
+        if i >= args.warmup:
+            k = max(1, int(round(len(pending) * args.budget)))
+            day_likes = sum(1 for r in pending if r['combo_id'] in liked)
+            day_cost = sum(float(r.get('cost') or 0) for r in pending)
+            t = totals['random']
+            t[0] += day_likes * k / len(pending)
+            t[1] += day_cost * k / len(pending)
+            t[2] += k
+            chosen = bandit.order([{k2: r.get(k2) for k2 in ('combo_id', 'word1', 'word2', 'template_id',
+                                                             'style_id', 'cost')} for r in pending])[:k]
+            t = totals['bandit']
+            t[0] += sum(1 for r in chosen if r['combo_id'] in liked)
+            t[1] += sum(float(r.get('cost') or 0) for r in chosen)
+            t[2] += k
+        # 그날 세션이 끝난 뒤 좋아요 반영 (전체 기록 — 실제 로그에는 전부 생성됐으므로)
+        for r in pending:
+            bandit.observe(r, r['combo_id'] in liked)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='bandit 오프라인 재생 평가')
+    parser.add_argument('--budget', type=float, default=0.5, help='하루 pending 중 생성할 비율')
+    parser.add_argument('--warmup', type=int, default=3, help='평가 없이 학습만 하는 앞쪽 날짜 수')
+    parser.add_argument('--runs', type=int, default=5, help='Thompson 표본 시드 수')
+    parser.add_argument('--min-records', type=int, default=500, help='실제 로그가 이보다 적으면 가상 로그')
+    parser.add_argument('--synthetic', action='store_true', help='실제 로그 대신 가상 로그')
+    parser.add_argument('--days', type=int, default=20)
+    parser.add_argument('--per-day', type=int, default=200)
+    parser.add_argument('--base-rate', type=float, default=0.08, help='가상 로그 전체 좋아요율')
+    parser.add_argument('--spread', type=float, default=0.5, help='가상 로그 상승률의 로그 표준편차')
+    parser.add_argument('--flash-share', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_bandit_') as tmp:
+        vocab = Vocab(compile_vocab(Path(tmp) / 'vocab.bin'))
+        rows, liked = ([], set()) if args.synthetic else load_log()
+        source = 'metadata'
+        if len(rows) < args.min_records:
+            if not args.synthetic:
+                print(f'[INFO] 실제 로그 {len(rows)}건 < {args.min_records} — 가상 로그로 재생')
+            rows, liked = synthetic_log(vocab, args)
+            source = 'synthetic'
+        runs = [replay(rows, liked, vocab, args, args.seed + i, tmp) for i in range(args.runs)]
+        vocab.close()
+
+    def per_dollar(t):
+        return t[0] / t[1] if t[1] else 0.0
+
+    rand = runs[0]['random']
+    bandit_lpd = [per_dollar(r['bandit']) for r in runs]
+    bandit_likes = [r['bandit'][0] for r in runs]
+    gain = statistics.mean(bandit_lpd) / per_dollar(rand) - 1 if per_dollar(rand) else 0.0
+    result = {
+        'source': source, 'records': len(rows), 'liked': len(liked), 'images': rand[2],
+        'random': {'liked': round(rand[0], 1), 'cost': round(rand[1], 2), 'liked_per_dollar': round(per_dollar(rand), 3)},
+        'bandit': {'liked': round(statistics.mean(bandit_likes), 1), 'cost': round(statistics.mean(r['bandit'][1] for r in runs), 2),
+                   'liked_per_dollar': round(statistics.mean(bandit_lpd), 3),
+                   'liked_per_dollar_sd': round(statistics.pstdev(bandit_lpd), 3)},
+        'gain': round(gain, 4),
+    }
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] bandit 재생 | {source} {len(rows)}건 (좋아요 {len(liked)}) | 예산 {args.budget * 100:.0f}%, "
+          f"학습 {args.warmup}일 뒤 평가, 시드 {args.runs}개")
+    for name in ('random', 'bandit'):
+        r = result[name]
+        sd = f" ± {r['liked_per_dollar_sd']:.3f}" if name == 'bandit' else ''
+        print(f"  {name:<6} {rand[2]}장 → 좋아요 {r['liked']:.1f} | ${r['cost']:.2f} | {r['liked_per_dollar']:.3f}/${sd}")
+    print(f"  좋아요/달러 {gain * 100:+.1f}%")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'result': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
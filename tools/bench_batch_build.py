@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Batch JSONL 빌드 벤치마크 — 메모리에서 전부 만든 뒤 쓰기(기존) vs batch_builder 스트리밍 빌드
+
+임시 폴더에 가짜 핀 이미지(랜덤 바이트)를 만들고 요청 수를 늘려 가며
+빌드 시간과 메인 프로세스 최대 할당량(tracemalloc)을 비교한다.
+--crash-at N 이면 스트리밍 빌드를 N건째에서 중단시킨 뒤 다시 불러 이어서 만드는지 확인한다.
+
+사용:
+  python tools/bench_batch_build.py
+  python tools/bench_batch_build.py --sizes 100,200,400 --workers 4 --compress --crash-at 70
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'image-generator', 'scripts'))
+
+from batch_builder import RequestPlanner, _encode_request, _load_build_config, build_batch_requests
+
+
+class BenchPlanner(RequestPlanner):
+    """config/boards 대신 임시 핀 폴더에서 고름"""
+
+    def __init__(self, pin_paths, cfg, seed, crash_at=None):
+        super().__init__([], [], cfg, random.Random(seed), pin_index=False)
+        self.pins = [(os.path.basename(p).split('.')[0], p) for p in pin_paths]
+        self.crash_at = crash_at
+        self.planned = 0
+
+    def plan(self, pair):
+        self.planned += 1
+        if self.crash_at and self.planned > self.crash_at:
+            raise KeyboardInterrupt('crash')
+        return super().plan(pair)
+
+
+def make_pairs(n):
+    return [{'combo_id': f'bench_{i:05d}', 'word1': '바다', 'word1_en': 'sea',
+             'word2': '열쇠', 'word2_en': 'key'} for i in range(n)]
+
+
+def legacy_build(pairs, planner, cfg, path):
+    """기존 방식 재현 — 전체 줄을 메모리에 만든 뒤 한 번에 쓰기"""
+    max_inline = int(cfg['max_inline_mb'] * 1024 * 1024)
+    lines, request_map = [], {}
+    for i, p in enumerate(pairs):
+        plan = planner.plan(p)
+        key = f'req_{i:04d}_{p["combo_id"]}'
+        _, line, _, _ = _encode_request((key, plan['prompt'], plan['ref_paths'], max_inline, cfg['min_ref_images'], False))
+        if line:
+            lines.append(line)
+            request_map[key] = p
+    with open(path, 'wb') as f:
+        f.write(b''.join(lines))
+    return path, request_map
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def count_lines(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    keys = []
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            keys.append(json.loads(line)['key'])
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch JSONL 빌드 벤치마크')
+    parser.add_argument('--sizes', default='50,100,200,400', help='요청 수 목록')
+    parser.add_argument('--pins', type=int, default=60)
+    parser.add_argument('--pin-kb', type=int, default=250)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--compress', action='store_true')
+    parser.add_argument('--crash-at', type=int, default=0, help='스트리밍 빌드를 이 건수에서 중단 후 재개')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    cfg = {**_load_build_config(), 'build_workers': args.workers, 'build_compress': args.compress}
+    tmp = tempfile.mkdtemp(prefix='bench_build_')
+    rng = random.Random(args.seed)
+    pin_paths = []
+    for i in range(args.pins):
+        p = os.path.join(tmp, f'{900000 + i}.jpg')
+        with open(p, 'wb') as f:
+            f.write(rng.randbytes(int(args.pin_kb * 1024 * rng.uniform(0.6, 1.4))))
+        pin_paths.append(p)
+
+    results = []
+    try:
+        for n in [int(x) for x in args.sizes.split(',')]:
+            pairs = make_pairs(n)
+            out = os.path.join(tmp, f'stream_{n}')
+            (_, legacy_map), legacy_s, legacy_peak = measure(
+                lambda: legacy_build(pairs, BenchPlanner(pin_paths, cfg, args.seed), cfg,
+                                     os.path.join(tmp, f'legacy_{n}.jsonl')))
+            (path, stream_map), stream_s, stream_peak = measure(
+                lambda: build_batch_requests(pairs, [], [], 'bench-model', out_dir=out,
+                                             planner=BenchPlanner(pin_paths, cfg, args.seed), cfg=cfg))
+            results.append({
+                'requests': n, 'jsonl_mb': os.path.getsize(path) / 1e6,
+                'legacy_s': legacy_s, 'legacy_peak_mb': legacy_peak / 1e6,
+                'stream_s': stream_s, 'stream_peak_mb': stream_peak / 1e6,
+                'ok': len(stream_map) == len(legacy_map) == len(count_lines(path)),
+            })
+
+        resume = None
+        if args.crash_at:
+            n = max(int(x) for x in args.sizes.split(','))
+            pairs = make_pairs(n)
+            out = os.path.join(tmp, 'resume')
+            try:
+                build_batch_requests(pairs, [], [], 'bench-model', out_dir=out,
+                                     planner=BenchPlanner(pin_paths, cfg, args.seed, crash_at=args.crash_at), cfg=cfg)
+            except KeyboardInterrupt:
+                pass
+            path, rmap = build_batch_requests(pairs, [], [], 'bench-model', out_dir=out,
+                                              planner=BenchPlanner(pin_paths, cfg, args.seed), cfg=cfg)
+            keys = count_lines(path)
+            resume = {'requests': n, 'crash_at': args.crash_at, 'lines': len(keys),
+                      'unique': len(set(keys)), 'map': len(rmap),
+                      'ok': len(keys) == len(set(keys)) == len(rmap) == n}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] Batch JSONL 빌드 | 핀 {args.pins}장 × ~{args.pin_kb}KB"
+          f"{' | gzip' if args.compress else ''}")
+    for r in results:
+        print(f"  {r['requests']:>4}건 {r['jsonl_mb']:6.1f} MB | 기존 {r['legacy_s']:.2f}s peak {r['legacy_peak_mb']:6.1f} MB"
+              f" | 스트리밍 {r['stream_s']:.2f}s peak {r['stream_peak_mb']:5.1f} MB{'' if r['ok'] else ' [불일치]'}")
+    if resume:
+        print(f"  재개: {resume['crash_at']}건에서 중단 → {resume['lines']}줄 (고유 {resume['unique']}, "
+              f"map {resume['map']}) {'OK' if resume['ok'] else '[실패]'}")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results, 'resume': resume}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Batch polling 벤치마크 — 고정 간격 vs batch_recovery.poll_adaptive
+
+fake_gemini 배치 대역으로 배치 N개를 순서대로 제출/polling 하고 (가상 시계, 실제 대기 없음)
+완료 → 발견까지 지연과 상태 조회 횟수를 비교한다.
+adaptive는 앞 배치들의 소요 시간이 쌓일수록 예상 완료 구간을 촘촘히 본다.
+
+사용:
+  python tools/bench_batch_poll.py
+  python tools/bench_batch_poll.py --jobs 50 --batch-latency lognormal:1500,0.3 --interval 30
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'image-generator', 'scripts'))
+
+from fake_gemini import FakeGemini, VirtualClock
+from batch_recovery import AdaptivePoller, _load_poll_config, poll_adaptive
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q * len(s))) - 1))
+    return s[idx]
+
+
+def run(mode, args, durations_file):
+    clock = VirtualClock()
+    fake = FakeGemini(clock, batch_latency=args.batch_latency, seed=args.seed)
+    poller = AdaptivePoller(_load_poll_config(), durations_file)
+    for _ in range(args.jobs):
+        name = fake.submit_batch('', 'bench')
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == 'fixed':
+                fake.poll_batch(name, args.interval, args.timeout)
+            else:
+                poll_adaptive(name, args.timeout, get_job=fake.get_batch, clock=clock, poller=poller)
+    lags = fake.ingest_lags
+    return {
+        'mode': mode,
+        'jobs': args.jobs,
+        'lag_mean_s': round(sum(lags) / len(lags), 1) if lags else 0.0,
+        'lag_p95_s': round(percentile(lags, 0.95), 1),
+        'polls_per_job': round(fake.batch_polls / args.jobs, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch polling 벤치마크')
+    parser.add_argument('--jobs', type=int, default=40)
+    parser.add_argument('--batch-latency', default='lognormal:1500,0.3', help='배치 완료까지 걸리는 시간 분포 (초)')
+    parser.add_argument('--interval', type=float, default=30, help='고정 polling 간격')
+    parser.add_argument('--timeout', type=float, default=7200)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_poll_') as tmp:
+        results = [run('fixed', args, None), run('adaptive', args, os.path.join(tmp, 'batch-durations.json'))]
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] Batch polling | 배치 {args.jobs}개, 소요 {args.batch_latency}")
+    for r in results:
+        label = f"fixed {args.interval:.0f}s" if r['mode'] == 'fixed' else 'adaptive'
+        print(f"  {label:<10} 완료→수거 평균 {r['lag_mean_s']}s / p95 {r['lag_p95_s']}s | "
+              f"조회 {r['polls_per_job']}회/배치")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
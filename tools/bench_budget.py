@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+비용 상한 동시성 벤치마크 — "쓴 돈 + 이번 요청 < 상한" 체크(기존) vs budget_ledger 예약
+
+워커 스레드 N개가 같은 일일 상한을 두고 동시에 요청을 보낸다 (요청 시간은 랜덤 sleep).
+기존 방식은 진행 중인 다른 요청을 모르므로 상한을 넘고, 예약 방식은 넘지 않아야 한다.
+
+사용:
+  python tools/bench_budget.py
+  python tools/bench_budget.py --workers 16 --cap 5 --latency 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'session-controller', 'scripts'))
+
+from budget_ledger import BudgetDenied, BudgetLedger
+
+
+class Spend:
+    """cost_tracker 대역 (메모리)"""
+
+    def __init__(self, cap):
+        self.total = 0.0
+        self.cap = cap
+        self.lock = threading.Lock()
+
+    def add_cost(self, cost, is_flash=False):
+        with self.lock:
+            self.total = round(self.total + cost, 4)
+
+    def limits(self):
+        return {'daily_cost_cap': self.cap, 'monthly_cost_cap': 0}
+
+
+def call(args, rng):
+    """가짜 API 호출 → 실제 비용 (최악 비용 이하, 가끔 실패해서 0)"""
+    time.sleep(rng.uniform(0, args.latency))
+    if rng.random() < args.fail_rate:
+        return None
+    return rng.choice([args.price * 0.5, args.price])
+
+
+def naive(args, spend):
+    def worker(seed):
+        rng = random.Random(seed)
+        while spend.total + args.price <= args.cap:
+            cost = call(args, rng)
+            if cost is not None:
+                spend.add_cost(cost)
+    return worker
+
+
+def reserved(args, spend, ledger):
+    def worker(seed):
+        rng = random.Random(seed)
+        while True:
+            try:
+                r = ledger.reserve(args.price, 'bench')
+            except BudgetDenied as e:
+                if e.reserved > 0 and e.committed + e.amount <= e.cap:
+                    time.sleep(args.latency / 4)
+                    continue
+                return
+            cost = call(args, rng)
+            if cost is None:
+                ledger.release(r)
+            else:
+                ledger.commit(r, cost)
+    return worker
+
+
+def run(mode, args, tmp):
+    spend = Spend(args.cap)
+    if mode == 'naive':
+        target = naive(args, spend)
+    else:
+        ledger = BudgetLedger(path=os.path.join(tmp, 'budget-ledger.json'), add_cost=spend.add_cost,
+                              get_daily_total=lambda: spend.total, get_monthly_total=lambda: spend.total,
+                              get_limits=spend.limits)
+        target = reserved(args, spend, ledger)
+    threads = [threading.Thread(target=target, args=(args.seed + i,)) for i in range(args.workers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {'mode': mode, 'spent': spend.total, 'overshoot': round(max(0.0, spend.total - args.cap), 4),
+            'utilization': round(spend.total / args.cap, 3), 'seconds': round(time.perf_counter() - t0, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='비용 상한 동시성 벤치마크')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--cap', type=float, default=3.0)
+    parser.add_argument('--price', type=float, default=0.134, help='요청당 최악 비용')
+    parser.add_argument('--latency', type=float, default=0.05, help='요청 시간 최대값 (초)')
+    parser.add_argument('--fail-rate', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_budget_') as tmp:
+        results = [run('naive', args, tmp), run('ledger', args, tmp)]
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] 비용 상한 | 워커 {args.workers}개, 상한 ${args.cap:.2f}, 최악 ${args.price:.3f}/건")
+    for r in results:
+        label = '기존 체크' if r['mode'] == 'naive' else '예약 장부'
+        print(f"  {label:<6} 사용 ${r['spent']:.3f} | 초과 ${r['overshoot']:.3f} | "
+              f"상한 대비 {r['utilization'] * 100:.0f}% | {r['seconds']}s")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+deadline/watchdog 벤치마크 — 장애 주입 서버(fault_server)에 실제 HTTP 요청을 보내
+소켓 timeout만 쓸 때와 요청 deadline + watchdog을 쓸 때의 호출 시간 분포 비교
+
+사용:
+  python tools/bench_deadlines.py
+  python tools/bench_deadlines.py --requests 100 --hang 0.05 --drip 0.05 --deadline 2
+
+보고: 호출 시간 p50/p95/p99/max, stall 기록 수, 동시 호출 최대 (버린 호출 포함), 결과 분류
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'image-generator', 'scripts'))
+
+from fault_server import FAULTS, FaultConfig, start_server
+from deadline import Watchdog, check_cancelled
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q * len(s))) - 1))
+    return s[idx]
+
+
+def fetch(url, connect_timeout, read_timeout, key=0):
+    """generate_image 대역 — 요청 1건. 결과 dict는 generate_image와 같은 모양"""
+    u = urlparse(url)
+    conn = http.client.HTTPConnection(u.hostname, u.port, timeout=connect_timeout)
+    try:
+        conn.connect()
+        conn.sock.settimeout(read_timeout)
+        check_cancelled()
+        conn.request('POST', u.path, body=json.dumps({'key': key}), headers={'Content-Type': 'application/json'})
+        resp = conn.getresponse()
+        body = resp.read()
+        check_cancelled()
+        if resp.status != 200:
+            return {'status': 'failed', 'error': f'{resp.status} {body[:60]!r}', 'key_id': f'key{key}'}
+        return {'status': 'success', 'key_id': f'key{key}'}
+    except TimeoutError:
+        return {'status': 'failed', 'error': 'timeout (socket)', 'key_id': f'key{key}'}
+    except (ConnectionError, http.client.HTTPException, OSError) as e:
+        return {'status': 'failed', 'error': f'connection: {e}', 'key_id': f'key{key}'}
+    finally:
+        conn.close()
+
+
+def run_case(url, n, cfg, use_watchdog, keys=3):
+    state = {'key': 0, 'inflight': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def tracked(**kwargs):
+        # 버려진 호출까지 포함한 동시 실행 수 (겹치면 이중 과금/상태 공유)
+        with lock:
+            state['inflight'] += 1
+            state['peak'] = max(state['peak'], state['inflight'])
+        try:
+            # generate_image처럼 보내는 시점의 rate limiter 키를 씀
+            return fetch(key=state['key'], **kwargs)
+        finally:
+            with lock:
+                state['inflight'] -= 1
+
+    def rotate(attempt):
+        state['key'] = (state['key'] + 1) % keys
+
+    log_path = os.path.join(tempfile.mkdtemp(prefix='bench_deadlines_'), 'stalls.jsonl')
+    watchdog = Watchdog(cfg=cfg, on_stall=rotate, log_path=log_path, key_of=lambda: state['key'])
+    times, outcomes = [], {}
+    for i in range(n):
+        t0 = time.perf_counter()
+        kwargs = dict(url=url, connect_timeout=cfg['connect_timeout_seconds'],
+                      read_timeout=cfg['read_timeout_seconds'])
+        if use_watchdog:
+            result = watchdog.call(tracked, label=f'req_{i:04d}', **kwargs)
+        else:
+            result = tracked(**kwargs)
+        times.append(time.perf_counter() - t0)
+        kind = 'ok' if result.get('status') == 'success' else result.get('error', '?').split(':')[0].split(' ')[0]
+        outcomes[kind] = outcomes.get(kind, 0) + 1
+    return {
+        'mode': 'watchdog' if use_watchdog else 'socket timeout only',
+        'requests': n,
+        'p50': percentile(times, 0.50),
+        'p95': percentile(times, 0.95),
+        'p99': percentile(times, 0.99),
+        'max': max(times) if times else 0.0,
+        'total': sum(times),
+        'stalls': watchdog.stalls,
+        'peak_inflight': state['peak'],
+        'outcomes': outcomes,
+    }
+
+
+def print_result(r):
+    print(f"[BENCH] {r['mode']} | {r['requests']}건")
+    print(f"  호출 시간: p50 {r['p50']:.2f}s / p95 {r['p95']:.2f}s / p99 {r['p99']:.2f}s / max {r['max']:.2f}s")
+    print(f"  총 {r['total']:.1f}s | stall 기록 {r['stalls']}건 | 동시 호출 최대 {r['peak_inflight']} | {r['outcomes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='deadline/watchdog 벤치마크 (장애 주입 로컬 서버)')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--hang', type=float, default=0.05, help='응답 없이 대기하는 비율')
+    parser.add_argument('--drip', type=float, default=0.05, help='본문을 천천히 흘리는 비율')
+    parser.add_argument('--reset', type=float, default=0.02)
+    parser.add_argument('--rate-503', type=float, default=0.02)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--hang-seconds', type=float, default=8.0)
+    parser.add_argument('--drip-seconds', type=float, default=8.0)
+    parser.add_argument('--connect-timeout', type=float, default=1.0)
+    parser.add_argument('--read-timeout', type=float, default=3.0)
+    parser.add_argument('--deadline', type=float, default=1.5)
+    parser.add_argument('--stall-retries', type=int, default=1)
+    parser.add_argument('--keys', type=int, default=3, help='돌려 쓸 API 키 수')
+    parser.add_argument('--abandon-wait', type=float, default=30.0,
+                        help='모든 키에 버린 호출이 남았을 때 기다리는 최대 초')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    rates = {'hang': args.hang, 'drip': args.drip, 'reset': args.reset, '503': args.rate_503, '429': args.rate_429}
+    cfg = {
+        'connect_timeout_seconds': args.connect_timeout,
+        'read_timeout_seconds': args.read_timeout,
+        'request_deadline_seconds': args.deadline,
+        'stall_retries': args.stall_retries,
+        'abandon_wait_seconds': args.abandon_wait,
+    }
+    results = []
+    for use_watchdog in (False, True):
+        # 두 경우 모두 같은 장애 순서를 받도록 seed 고정 서버를 새로 띄움
+        server, url = start_server(FaultConfig(args.latency, args.hang_seconds, args.drip_seconds, args.seed,
+                                               **{k: rates[k] for k in FAULTS}))
+        try:
+            results.append(run_case(url, args.requests, cfg, use_watchdog, args.keys))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print(f"\n{'=' * 55}")
+    for r in results:
+        print_result(r)
+    base, wd = results
+    if wd['p99'] > 0:
+        # 버린 호출은 기다리지 않고 다른 키로 바로 재시도 — 버린 호출만큼 동시 호출이 겹침 (키당 1건)
+        print(f"  p99 {base['p99']:.2f}s → {wd['p99']:.2f}s | 동시 호출 최대 {wd['peak_inflight']} "
+              f"(키 {args.keys}개, 다른 키로 바로 재시도)")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': cfg, 'rates': rates, 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
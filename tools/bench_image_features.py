@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+이미지 특징 로컬 추출 벤치마크 — 직렬 vs 프로세스 풀 vs 캐시 재실행
+
+생성 이미지 크기(928x1152 등)의 가상 PNG를 만들어 image_features.extract_batch로
+처리량(장/초)을 잰다. 두 번째 실행은 (mtime, size) 캐시로 파일을 다시 읽지 않아야 한다.
+
+사용:
+  python tools/bench_image_features.py
+  python tools/bench_image_features.py --images 200 --workers 8 --size 928x1152
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'pin-tracker', 'scripts'))
+
+import numpy as np
+from PIL import Image
+
+from image_features import FeatureCache, _load_features_config, extract_batch
+
+
+def make_images(out_dir, n, size, seed):
+    """그라디언트 + 도형 + 노이즈 (색온도/대비/선명도가 장마다 다르게)"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+    paths = []
+    for i in range(n):
+        base = rng.uniform(0, 1, 3).astype(np.float32)
+        tint = rng.uniform(-0.3, 0.3, 3).astype(np.float32)
+        img = base + tint * (xs / w)[..., None] + rng.normal(0, rng.uniform(0, 0.08), (h, w, 3)).astype(np.float32)
+        cy, cx, rad = rng.uniform(0.3, 0.7) * h, rng.uniform(0.3, 0.7) * w, rng.uniform(0.1, 0.3) * min(w, h)
+        disk = ((ys - cy) ** 2 + (xs - cx) ** 2) < rad ** 2
+        img[disk] = rng.uniform(0, 1, 3)
+        path = os.path.join(out_dir, f'260301_{i + 1:04d}_bench.png')
+        Image.fromarray((np.clip(img, 0, 1) * 255).astype(np.uint8)).save(path, compress_level=1)
+        paths.append(path)
+    return paths
+
+
+def run(label, paths, cache_path, workers, cfg):
+    cache = FeatureCache(cache_path)
+    t0 = time.perf_counter()
+    out = extract_batch(paths, cache=cache, workers=workers, cfg=cfg)
+    dt = time.perf_counter() - t0
+    return {'mode': label, 'seconds': round(dt, 3), 'per_second': round(len(paths) / dt, 1) if dt else 0.0,
+            'extracted': len(out), 'labels': Counter(a['color_temperature'] for a in out.values())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='이미지 특징 로컬 추출 벤치마크')
+    parser.add_argument('--images', type=int, default=60)
+    parser.add_argument('--size', default='928x1152')
+    parser.add_argument('--workers', type=int, default=0, help='0 = CPU 수')
+    parser.add_argument('--seed', type=int, default=5)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split('x'))
+    cfg = _load_features_config()
+    workers = args.workers or os.cpu_count() or 2
+    with tempfile.TemporaryDirectory(prefix='bench_features_') as tmp:
+        paths = make_images(tmp, args.images, (w, h), args.seed)
+        results = [
+            run('serial', paths, os.path.join(tmp, 'serial.json'), 1, cfg),
+            run(f'pool×{workers}', paths, os.path.join(tmp, 'pool.json'), workers, cfg),
+            run('cached', paths, os.path.join(tmp, 'pool.json'), workers, cfg),
+        ]
+        sample = FeatureCache(os.path.join(tmp, 'pool.json')).features
+        sample = next(iter(sample.values())) if sample else {}
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] 이미지 특징 로컬 추출 | {args.images}장 {w}x{h} PNG, 썸네일 {cfg['thumb_size']}px")
+    for r in results:
+        print(f"  {r['mode']:<8} {r['seconds']:7.3f}s | {r['per_second']:7.1f}장/s | {r['extracted']}장 "
+              f"| 색온도 {dict(r['labels'])}")
+    print(f"  API 비용 $0 | 예: {json.dumps({k: sample.get(k) for k in ('color_temperature', 'cct_kelvin', 'depth_of_field', 'edge_density')})}")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        for r in results:
+            r['labels'] = dict(r['labels'])
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
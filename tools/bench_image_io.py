@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+이미지 저장 벤치마크 — image_io.save_image_bytes(memoryview 직접 기록 + 헤더 파싱 + 동시 해시)와
+기존 방식(bytes 복사 → BytesIO → 저장 → 파일 다시 읽어 해시) 비교
+
+대역 PNG(fake_gemini.png_payload)는 본문이 랜덤 바이트라 디코드할 수 없으므로
+기존 방식의 전체 디코드/재인코딩 비용은 포함하지 않는다 (실제 차이는 이보다 큼).
+
+사용:
+  python tools/bench_image_io.py
+  python tools/bench_image_io.py --images 100 --bytes-per-pixel 1.6 --json output/logs/bench_image_io.json
+
+보고: 이미지당 쓰기 지연 p50/p95, 이미지당 추가 메모리 할당 peak (tracemalloc)
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'image-generator', 'scripts'))
+
+from fake_gemini import DEFAULT_SIZES, png_payload
+from image_io import parse_image_header, save_image_bytes
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q * len(s))) - 1))
+    return s[idx]
+
+
+def legacy_save(data, path):
+    """기존 방식 재현 (디코드 제외)"""
+    buf = io.BytesIO(bytes(data))
+    _, w, h = parse_image_header(buf.getvalue())
+    resolution = f'{w}x{h}'
+    with open(path, 'wb') as f:
+        f.write(buf.getvalue())
+    with open(path, 'rb') as f:
+        sha = hashlib.sha256(f.read()).hexdigest()
+    return {'file_path': path, 'resolution': resolution, 'sha256': sha}
+
+
+def zero_copy_save(data, path):
+    return save_image_bytes(data, path)
+
+
+def run_case(name, fn, buffers, out_dir):
+    latencies, peaks = [], []
+    for i, data in enumerate(buffers):
+        path = os.path.join(out_dir, f'{name}_{i:04d}.png')
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        fn(data, path)
+        latencies.append(time.perf_counter() - t0)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        'name': name,
+        'images': len(buffers),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'peak_alloc_mb': sum(peaks) / len(peaks) / 1e6 if peaks else 0.0,
+        'mean_image_mb': sum(len(b) for b in buffers) / len(buffers) / 1e6 if buffers else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='이미지 저장 경로 벤치마크')
+    parser.add_argument('--images', type=int, default=50)
+    parser.add_argument('--bytes-per-pixel', type=float, default=1.6)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out-dir', help='저장 위치 (기본: 임시 폴더, 끝나면 삭제)')
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    buffers = []
+    for _ in range(args.images):
+        w, h = rng.choice(DEFAULT_SIZES)
+        buffers.append(png_payload(w, h, int(w * h * args.bytes_per_pixel)))
+
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix='bench_image_io_')
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        results = [
+            run_case('legacy', legacy_save, buffers, out_dir),
+            run_case('zero_copy', zero_copy_save, buffers, out_dir),
+        ]
+    finally:
+        if not args.out_dir:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] 이미지 저장 | {args.images}장, 평균 {results[0]['mean_image_mb']:.2f} MB")
+    for r in results:
+        print(f"  {r['name']:<10} 쓰기 p50 {r['p50_ms']:.2f}ms / p95 {r['p95_ms']:.2f}ms | "
+              f"추가 할당 peak {r['peak_alloc_mb']:.2f} MB/장")
+    legacy, zc = results
+    if zc['peak_alloc_mb'] > 0:
+        print(f"  할당 {legacy['peak_alloc_mb'] / zc['peak_alloc_mb']:.0f}배 감소, "
+              f"p50 {legacy['p50_ms'] / max(zc['p50_ms'], 1e-9):.2f}배")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'images': args.images, 'bytes_per_pixel': args.bytes_per_pixel, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+핀 캐시 축출 벤치마크 — 예산 안으로 줄인 뒤 다음 선택들이 캐시에 남아 있는 비율
+
+임시 tmp/pins에 보드별 가상 핀 파일(sparse)을 만들고
+  과거 선택   Zipf 인기도로 뽑은 요청 기록 → PinUsage (선택 시각/횟수)
+  대기 배치   batch-requests.map.jsonl에 ref_pin_ids (인기 없는 핀 위주 — 보호 확인용)
+  보드 밖     보드 JSON에서 빠진 핀 파일 (먼저 지워져야 함)
+예산을 전체의 --budget 비율로 잡고 pin_cache.step()을 끝까지 돌린 뒤, 같은 인기도로 뽑은
+다음 선택들의 캐시 적중률을 mtime 오래된 순(FIFO) / 무작위 축출과 비교한다.
+step() 한 번의 최대 시간 = 생성 루프가 한 번에 기다릴 수 있는 최대 I/O.
+
+사용:
+  python tools/bench_pin_cache.py
+  python tools/bench_pin_cache.py --boards 27 --pins 120 --budget 0.4
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'pin-tracker', 'scripts'))
+
+import pin_index
+from pin_cache import PinCache, PinUsage, _load_pin_cache_config, pending_pin_ids
+
+
+def make_cache(root, n_boards, n_pins, orphan_rate, rng, now):
+    """→ (보드 핀 id 목록, {id: (경로, 크기, mtime)})"""
+    pins_dir, boards_dir = Path(root) / 'tmp' / 'pins', Path(root) / 'boards'
+    boards_dir.mkdir(parents=True)
+    on_board, files = [], {}
+    for b in range(n_boards):
+        name = f'board{b:02d}'
+        (pins_dir / name).mkdir(parents=True)
+        listed = []
+        for i in range(n_pins):
+            pin_id = f'{b:02d}{i:05d}'
+            path = pins_dir / name / f'{pin_id}.jpg'
+            size = int(min(2_000_000, rng.lognormvariate(12.2, 0.6)))  # 중앙값 ~200KB
+            with open(path, 'wb') as f:
+                f.truncate(size)
+            mtime = now - rng.uniform(0, 60) * 86400
+            os.utime(path, (mtime, mtime))
+            files[pin_id] = (path, size, mtime)
+            if rng.random() >= orphan_rate:
+                listed.append({'pin_id': pin_id})
+                on_board.append(pin_id)
+        with open(boards_dir / f'{name}.json', 'w', encoding='utf-8') as f:
+            json.dump({'board_name': name, 'pins': listed}, f)
+    return on_board, files
+
+
+def zipf_stream(ids, n, k, s, rng):
+    weights = [1 / (r + 1) ** s for r in range(len(ids))]
+    return [rng.choices(ids, weights, k=k) for _ in range(n)]
+
+
+def hit_rate(stream, cached):
+    picks = [pid for req in stream for pid in req]
+    return sum(pid in cached for pid in picks) / len(picks)
+
+
+def baseline_keep(files, budget, order):
+    """order 순으로 지워 budget 이하로 → 남은 id 집합"""
+    total = sum(v[1] for v in files.values())
+    keep = set(files)
+    for pid in order:
+        if total <= budget:
+            break
+        keep.discard(pid)
+        total -= files[pid][1]
+    return keep
+
+
+def main():
+    parser = argparse.ArgumentParser(description='핀 캐시 축출 벤치마크')
+    parser.add_argument('--boards', type=int, default=27)
+    parser.add_argument('--pins', type=int, default=120, help='보드당 캐시 파일 수')
+    parser.add_argument('--orphan-rate', type=float, default=0.1, help='보드 JSON에서 빠진 핀 비율')
+    parser.add_argument('--budget', type=float, default=0.5, help='예산 = 전체 크기 × 이 비율')
+    parser.add_argument('--history', type=int, default=3000, help='과거 요청 수 (요청당 5핀)')
+    parser.add_argument('--future', type=int, default=1000, help='평가용 다음 요청 수')
+    parser.add_argument('--zipf', type=float, default=0.9)
+    parser.add_argument('--pending', type=int, default=150, help='대기 배치가 참조하는 핀 수')
+    parser.add_argument('--seed', type=int, default=23)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    with tempfile.TemporaryDirectory(prefix='bench_pin_cache_') as tmp:
+        on_board, files = make_cache(tmp, args.boards, args.pins, args.orphan_rate, rng, now)
+        pin_index.BOARDS_DIR = Path(tmp) / 'boards'
+        popularity = on_board[:]
+        rng.shuffle(popularity)
+        history = zipf_stream(popularity, args.history, 5, args.zipf, rng)
+        future = zipf_stream(popularity, args.future, 5, args.zipf, rng)
+
+        usage = PinUsage(path=Path(tmp) / 'pin-usage.json')
+        for i, req in enumerate(history):  # 30일 → 3시간 전까지 고르게
+            usage.touch(req, now=now - 3 * 3600 - (len(history) - i) / len(history) * 30 * 86400)
+        batch_dir = Path(tmp) / 'batch'
+        batch_dir.mkdir()
+        pending = popularity[-args.pending:]  # 인기 없는 핀 — 보호가 없으면 먼저 지워질 것들
+        with open(batch_dir / 'batch-requests.map.jsonl', 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'build_id': 'bench'}) + '\n')
+            for j in range(0, len(pending), 5):
+                f.write(json.dumps({'combo_id': f'c{j}', 'key': f'req_{j}',
+                                    'pair': {'ref_pin_ids': pending[j:j + 5]}}) + '\n')
+
+        total = sum(v[1] for v in files.values())
+        cfg = {**_load_pin_cache_config(), 'max_gb': total * args.budget / 1024 ** 3}
+        budget = int(cfg['max_gb'] * 1024 ** 3)
+        cache = PinCache(root=Path(tmp) / 'tmp' / 'pins', usage=usage, cfg=cfg, batch_dir=batch_dir)
+        steps, worst, spent, kinds = 0, 0.0, 0.0, {}
+        while True:
+            t0 = time.perf_counter()
+            state = cache.step()
+            dt = time.perf_counter() - t0
+            steps, worst, spent = steps + 1, max(worst, dt), spent + dt
+            kinds[state] = kinds.get(state, 0) + 1
+            if state == 'idle':
+                break
+        kept = {Path(k).stem for k in cache.files}
+        protected = pending_pin_ids(batch_dir)
+
+        target = int(budget * cfg['low_watermark'])
+        results = {
+            'lru_lfu': hit_rate(future, kept),
+            'fifo_mtime': hit_rate(future, baseline_keep(files, target, sorted(files, key=lambda p: files[p][2]))),
+            'random': hit_rate(future, baseline_keep(files, target, rng.sample(list(files), len(files)))),
+        }
+        orphans = set(files) - set(on_board)
+        result = {
+            'files': len(files), 'total_bytes': total, 'budget_bytes': budget, 'after_bytes': cache.total,
+            'evicted': cache.stats['evicted'], 'orphans_left': len(orphans & kept),
+            'pending_evicted': len(protected - kept), 'steps': kinds, 'worst_step_ms': round(worst * 1000, 2),
+            'total_ms': round(spent * 1000, 1), 'hit_rate': {k: round(v, 4) for k, v in results.items()},
+        }
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] 핀 캐시 축출 | {result['files']}파일 {total / 1e6:.0f} MB → 예산 {budget / 1e6:.0f} MB "
+          f"({args.budget * 100:.0f}%)")
+    print(f"  축출     {result['evicted']}파일 → {result['after_bytes'] / 1e6:.0f} MB | "
+          f"보드 밖 핀 남음 {result['orphans_left']}/{len(orphans)} | 대기 배치 핀 지움 {result['pending_evicted']}")
+    print(f"  단계     {kinds} | 최대 {result['worst_step_ms']:.1f}ms / 합계 {result['total_ms']:.0f}ms")
+    print(f"  적중률   LRU/LFU {results['lru_lfu'] * 100:.1f}% | mtime 순 {results['fifo_mtime'] * 100:.1f}% | "
+          f"무작위 {results['random'] * 100:.1f}%")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'result': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
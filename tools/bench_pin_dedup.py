@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+레퍼런스 핀 중복 제거 벤치마크 — 해시 속도, BK-tree 조회, 정확도, 낭비되는 레퍼런스 칸
+
+가상 보드를 임시 폴더에 만들고 일부 핀을 다른 보드에 다시 넣는다:
+  copy       같은 파일 그대로 (같은 URL)
+  resized    축소본 (다른 URL — 다른 크기로 저장된 핀)
+  jpeg       저화질 재압축 (다른 URL)
+그 다음 pin_dedup으로
+  hash       전체 dHash 시간 / 변경 없는 재실행 시간
+  query      BK-tree vs 전체 비교 조회 시간
+  정확도     정답 그룹 대비 precision / recall
+  레퍼런스   무작위 k장 세트 중 같은 그림이 두 장 이상 든 비율 (중복 제거 전/후)
+를 잰다.
+
+사용:
+  python tools/bench_pin_dedup.py
+  python tools/bench_pin_dedup.py --boards 12 --pins 150 --dup-rate 0.15
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'pin-tracker', 'scripts'))
+
+import numpy as np
+from PIL import Image
+
+import pin_index
+from pin_dedup import BKTree, PinDedup, _load_dedup_config
+
+
+def make_image(rng):
+    """저주파 노이즈 + 원 몇 개 (이미지마다 구도가 다름)"""
+    low = rng.uniform(0, 1, (6, 5, 3))
+    img = Image.fromarray((low * 255).astype(np.uint8)).resize((256, 320), Image.BICUBIC)
+    arr = np.asarray(img).astype(np.float32) / 255
+    ys, xs = np.mgrid[0:320, 0:256]
+    for _ in range(3):
+        cy, cx, r = rng.uniform(0, 320), rng.uniform(0, 256), rng.uniform(20, 70)
+        arr[((ys - cy) ** 2 + (xs - cx) ** 2) < r ** 2] = rng.uniform(0, 1, 3)
+    arr += rng.normal(0, 0.02, arr.shape)
+    return Image.fromarray((np.clip(arr, 0, 1) * 255).astype(np.uint8))
+
+
+def url_for(tag):
+    h = hashlib.md5(tag.encode()).hexdigest()
+    return f'https://i.pinimg.com/originals/{h[:2]}/{h[2:4]}/{h[4:6]}/{h}.jpg'
+
+
+def build_boards(root, n_boards, n_pins, dup_rate, rng):
+    """→ {key: 원본 id}, 보드 JSON 저장"""
+    truth, boards, originals = {}, {}, []
+    pins_dir = Path(root) / 'tmp' / 'pins'
+    for b in range(n_boards):
+        name = f'board{b:02d}'
+        (pins_dir / name).mkdir(parents=True, exist_ok=True)
+        boards[name] = []
+        for i in range(n_pins):
+            pin_id = f'{name}{i:05d}'
+            path = pins_dir / name / f'{pin_id}.jpg'
+            make_image(rng).save(path, quality=88)
+            boards[name].append({'pin_id': pin_id, 'image_url': url_for(pin_id),
+                                 'added_at': f'2026-01-{b + 1:02d}T00:00:{i % 60:02d}', 'local_cache': str(path)})
+            truth[f'{name}/{pin_id}'] = pin_id
+            originals.append((name, pin_id, path))
+
+    kinds = {'copy': 0, 'resized': 0, 'jpeg': 0}
+    n_dups = int(len(originals) * dup_rate)
+    picks = rng.choice(len(originals), n_dups, replace=False)
+    for j, (src_board, src_id, src_path) in enumerate(originals[k] for k in picks):
+        target = f'board{(int(src_board[5:]) + 1 + j % (n_boards - 1)) % n_boards:02d}'
+        kind = ('copy', 'resized', 'jpeg')[j % 3]
+        pin_id = f'dup{j:05d}'
+        path = pins_dir / target / f'{pin_id}.jpg'
+        with Image.open(src_path) as im:
+            if kind == 'copy':
+                im.save(path, quality=88)
+            elif kind == 'resized':
+                im.resize((180, 225), Image.LANCZOS).save(path, quality=85)
+            else:
+                im.save(path, quality=40)
+        kinds[kind] += 1
+        boards[target].append({'pin_id': pin_id, 'image_url': url_for(src_id) if kind == 'copy' else url_for(pin_id),
+                               'added_at': '2026-02-01T00:00:00', 'local_cache': str(path)})
+        truth[f'{target}/{pin_id}'] = src_id
+
+    (Path(root) / 'boards').mkdir()
+    for name, pins in boards.items():
+        with open(Path(root) / 'boards' / f'{name}.json', 'w', encoding='utf-8') as f:
+            json.dump({'board_name': name, 'pins': pins}, f)
+    return truth, kinds
+
+
+def accuracy(dedup, truth):
+    """같은 원본인 쌍 기준 precision / recall"""
+    tp = fp = 0
+    for key, src in truth.items():
+        rep = dedup.canonical.get(key, key)
+        if rep == key:
+            continue
+        if truth.get(rep) == src:
+            tp += 1
+        else:
+            fp += 1
+    groups = {}
+    for key, src in truth.items():
+        groups.setdefault(src, []).append(key)
+    expected = sum(len(v) - 1 for v in groups.values())
+    fn = expected - tp
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / expected if expected else 1.0
+    return precision, recall, fn
+
+
+def wasted_slots(pool, truth, k, trials, rng):
+    """무작위 k장 세트 중 같은 원본이 두 장 이상인 비율"""
+    bad = 0
+    for _ in range(trials):
+        chosen = rng.sample(pool, min(k, len(pool)))
+        srcs = [truth[f'{b}/{p}'] for b, p, _ in chosen]
+        bad += len(set(srcs)) < len(srcs)
+    return bad / trials
+
+
+def main():
+    parser = argparse.ArgumentParser(description='레퍼런스 핀 중복 제거 벤치마크')
+    parser.add_argument('--boards', type=int, default=8)
+    parser.add_argument('--pins', type=int, default=60, help='보드당 원본 핀 수')
+    parser.add_argument('--dup-rate', type=float, default=0.2, help='다른 보드에 다시 넣을 비율')
+    parser.add_argument('--k', type=int, default=5, help='요청당 레퍼런스 수')
+    parser.add_argument('--trials', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=0, help='0 = CPU 수')
+    parser.add_argument('--seed', type=int, default=17)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    cfg = _load_dedup_config()
+    with tempfile.TemporaryDirectory(prefix='bench_pin_dedup_') as tmp:
+        truth, kinds = build_boards(tmp, args.boards, args.pins, args.dup_rate, rng)
+        pin_index.BOARDS_DIR = Path(tmp) / 'boards'
+        pin_index.PIN_CACHE_DIR = Path(tmp) / 'tmp' / 'pins'
+
+        dedup = PinDedup(path=Path(tmp) / 'pin-dedup.json', cfg=cfg)
+        t0 = time.perf_counter()
+        first = dedup.update(workers=args.workers or None)
+        hash_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        again = PinDedup(path=Path(tmp) / 'pin-dedup.json', cfg=cfg).update()
+        noop_s = time.perf_counter() - t0
+
+        hashes = [(int(e['hash'], 16), key) for key, e in dedup.pins.items() if e['hash']]
+        tree = BKTree()
+        for h, key in hashes:
+            tree.add(h, key)
+        r = random.Random(args.seed)
+        probes = [r.choice(hashes)[0] for _ in range(args.queries)]
+        radius = int(cfg['max_distance'])
+        t0 = time.perf_counter()
+        for h in probes:
+            tree.query(h, radius)
+        tree_us = (time.perf_counter() - t0) / args.queries * 1e6
+        t0 = time.perf_counter()
+        for h in probes:
+            [(bin(h ^ o).count('1'), key) for o, key in hashes if bin(h ^ o).count('1') <= radius]
+        linear_us = (time.perf_counter() - t0) / args.queries * 1e6
+
+        precision, recall, missed = accuracy(dedup, truth)
+        pool = [(b, p['pin_id'], p['local_cache']) for b, p in pin_index.iter_board_pins()]
+        before = wasted_slots(pool, truth, args.k, args.trials, random.Random(args.seed))
+        after = wasted_slots(dedup.filter(pool), truth, args.k, args.trials, random.Random(args.seed))
+        prune = dedup.prune(apply=False)
+
+    result = {'pins': first['pins'], 'kinds': kinds, 'hash_seconds': round(hash_s, 3),
+              'hash_per_second': round(first['hashed'] / hash_s, 1), 'noop_seconds': round(noop_s, 3),
+              'rehashed_noop': again['hashed'], 'bktree_us': round(tree_us, 1), 'linear_us': round(linear_us, 1),
+              'precision': round(precision, 4), 'recall': round(recall, 4), 'missed': missed,
+              'duplicates': first['duplicates'], 'reclaimable_bytes': prune['bytes'],
+              'sets_with_repeat_before': round(before, 4), 'sets_with_repeat_after': round(after, 4)}
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] 핀 중복 제거 | 보드 {args.boards}개, 핀 {result['pins']} (복제 {kinds})")
+    print(f"  해시     {result['hash_seconds']:.2f}s ({result['hash_per_second']:.0f}핀/s) | "
+          f"변경 없음 {result['noop_seconds'] * 1000:.0f}ms, 다시 해시 {result['rehashed_noop']}")
+    print(f"  조회     BK-tree {result['bktree_us']:.1f}µs vs 전체 비교 {result['linear_us']:.1f}µs "
+          f"(거리 ≤ {radius})")
+    print(f"  정확도   precision {result['precision']:.3f} | recall {result['recall']:.3f} | 놓침 {missed}")
+    print(f"  중복     {result['duplicates']}핀 | 지울 수 있는 캐시 {result['reclaimable_bytes'] / 1e6:.1f} MB")
+    print(f"  레퍼런스 {args.k}장 세트에 같은 그림 2장+ : {before * 100:.1f}% → {after * 100:.1f}%")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'result': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+레퍼런스 핀 인덱스 벤치마크 — 인덱스 구축/증분 갱신 시간, 선택 지연, 세트 일관성
+
+스타일(색감/배치)이 다른 가상 보드를 임시 폴더에 만들고 pin_index로
+  build        전체 핀 벡터 계산 (프로세스 풀)
+  incremental  보드 하나 추가 + 핀 일부 교체 후 update() — 바뀐 것만 계산해야 함
+  select       random / coherent / diverse 한 세트 고르는 시간과
+               세트 안 평균 코사인 유사도 (높을수록 일관), 같은 보드 비율
+을 잰다.
+
+사용:
+  python tools/bench_pin_index.py
+  python tools/bench_pin_index.py --boards 12 --pins 150 --k 5
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'pin-tracker', 'scripts'))
+
+import numpy as np
+from PIL import Image
+
+import pin_dedup
+import pin_index
+from pin_index import PinIndex, _load_pin_index_config
+
+
+def make_board(root, name, n, rng):
+    """보드마다 기본 색조 + 배치(밝은 쪽 방향)가 있고 핀마다 조금씩 다름"""
+    base = rng.uniform(0, 1, 3)
+    direction = rng.choice(['x', 'y'])
+    pins = []
+    folder = Path(root) / 'tmp' / 'pins' / name
+    folder.mkdir(parents=True, exist_ok=True)
+    h, w = 320, 256
+    ramp = np.linspace(0, 1, w if direction == 'x' else h, dtype=np.float32)
+    ramp = ramp[None, :, None] if direction == 'x' else ramp[:, None, None]
+    for i in range(n):
+        color = np.clip(base + rng.normal(0, 0.08, 3), 0, 1).astype(np.float32)
+        img = color * (0.5 + 0.5 * ramp) + rng.normal(0, 0.04, (h, w, 3)).astype(np.float32)
+        pin_id = f'{name}{i:05d}'
+        path = folder / f'{pin_id}.jpg'
+        Image.fromarray((np.clip(img, 0, 1) * 255).astype(np.uint8)).save(path, quality=85)
+        # board JSON의 local_cache는 다른 PC 경로 — tmp/pins/<board>/에서 찾는 경로를 같이 검증
+        pins.append({'pin_id': pin_id, 'local_cache': f'D:\\\\nano\\\\tmp\\\\pins\\\\{name}\\\\{pin_id}.jpg'})
+    with open(Path(root) / 'boards' / f'{name}.json', 'w', encoding='utf-8') as f:
+        json.dump({'board_name': name, 'pins': pins}, f)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def set_quality(index, picks):
+    pos = {pid: i for i, pid in enumerate(index.pin_ids)}
+    sims, purity = [], []
+    for chosen in picks:
+        rows = [pos[pid] for pid, _ in chosen]
+        v = index.vectors[rows]
+        s = v @ v.T
+        n = len(rows)
+        sims.append(float((s.sum() - np.trace(s)) / (n * (n - 1))) if n > 1 else 1.0)
+        boards = [index.boards[r] for r in rows]
+        purity.append(max(boards.count(b) for b in set(boards)) / n)
+    return statistics.mean(sims), statistics.mean(purity)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='레퍼런스 핀 인덱스 벤치마크')
+    parser.add_argument('--boards', type=int, default=8)
+    parser.add_argument('--pins', type=int, default=80, help='보드당 핀 수')
+    parser.add_argument('--k', type=int, default=5, help='요청당 레퍼런스 수')
+    parser.add_argument('--selects', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=0, help='0 = CPU 수')
+    parser.add_argument('--seed', type=int, default=11)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory(prefix='bench_pin_index_') as tmp:
+        (Path(tmp) / 'boards').mkdir()
+        names = [f'board{i:02d}' for i in range(args.boards)]
+        for name in names:
+            make_board(tmp, name, args.pins, rng)
+        pin_index.BOARDS_DIR = Path(tmp) / 'boards'
+        pin_index.PIN_CACHE_DIR = Path(tmp) / 'tmp' / 'pins'
+        pin_dedup.get_pin_dedup = lambda update=False: None  # 가상 보드는 서로 겹치지 않음
+        cfg = _load_pin_index_config()
+        index = PinIndex(path=Path(tmp) / 'pin-index.npz', cfg=cfg)
+        build, build_s = timed(lambda: index.update(workers=args.workers or None))
+
+        # 증분: 보드 하나 추가 + 기존 보드 핀 5개 다시 저장
+        make_board(tmp, 'board_new', args.pins, rng)
+        for i in range(5):
+            p = Path(tmp) / 'tmp' / 'pins' / names[0] / f'{names[0]}{i:05d}.jpg'
+            Image.open(p).rotate(90).save(p)
+            os.utime(p, (time.time() + 5, time.time() + 5))
+        reloaded = PinIndex(path=Path(tmp) / 'pin-index.npz', cfg=cfg)
+        incr, incr_s = timed(lambda: reloaded.update(workers=args.workers or None))
+        noop, noop_s = timed(lambda: reloaded.update())
+
+        results = {}
+        for mode in ('random', 'coherent', 'diverse'):
+            r = random.Random(args.seed)
+            picks, dt = timed(lambda: [reloaded.select(args.k, mode, exclude=(), rng=r) for _ in range(args.selects)])
+            sim, purity = set_quality(reloaded, picks)
+            results[mode] = {'us_per_select': round(dt / args.selects * 1e6, 1), 'mean_cosine': round(sim, 4),
+                             'same_board': round(purity, 3)}
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] 핀 인덱스 | 보드 {args.boards}개 × {args.pins}핀, 레퍼런스 {args.k}장/요청")
+    print(f"  구축   {build['pins']}핀 {build_s:.2f}s ({build['computed'] / build_s:.0f}핀/s)")
+    print(f"  증분   +1 보드, 5핀 교체 → 계산 {incr['computed']} / 전체 {incr['pins']} | {incr_s:.2f}s"
+          f" | 변경 없음 {noop_s * 1000:.1f}ms")
+    for mode, r in results.items():
+        print(f"  {mode:<8} {r['us_per_select']:8.1f}µs/세트 | 세트 내 코사인 {r['mean_cosine']:.3f}"
+              f" | 같은 보드 {r['same_board'] * 100:.0f}%")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'build': build, 'incremental': incr, 'select': results},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
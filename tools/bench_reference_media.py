@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Batch 레퍼런스 업로드 벤치마크 — inline base64 JSONL vs Files API URI JSONL
+
+prepare_batch_requests와 같은 모양(요청마다 프롬프트 + 레퍼런스 N장 inline_data)의 JSONL을 만들고
+reference_media.externalize_references로 URI 참조 JSONL로 바꾼다.
+레퍼런스는 핀 풀에서 인기 편향(Zipf)으로 뽑아 실제처럼 인기 핀이 여러 번 나오게 한다.
+업로드는 fake_files_api 대역 (대역폭/요청 오버헤드 모델, 실제 sleep 없음).
+
+제출 시간 = JSONL 업로드 + (URI 모드) 새 레퍼런스 업로드 — 같은 대역폭 기준.
+두 번째 배치는 같은 캐시로 다시 돌려 만료 전 URI 재사용 효과를 본다.
+
+사용:
+  python tools/bench_reference_media.py
+  python tools/bench_reference_media.py --requests 200 --refs 5 --pins 150 --json output/logs/bench_ref.json
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'image-generator', 'scripts'))
+
+from fake_files_api import FakeFilesClient
+from fake_gemini import VirtualClock
+from reference_media import ReferenceCache, externalize_references
+
+
+def build_inline_jsonl(path, pins, n_requests, refs, rng, zipf_s):
+    weights = [1.0 / (i + 1) ** zipf_s for i in range(len(pins))]
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n_requests):
+            chosen = set()
+            while len(chosen) < min(refs, len(pins)):
+                chosen.add(rng.choices(range(len(pins)), weights)[0])
+            parts = [{'text': f'prompt {i}'}]
+            parts += [{'inline_data': {'mime_type': 'image/jpeg', 'data': pins[j]}} for j in sorted(chosen)]
+            f.write(json.dumps({'key': f'req_{i:04d}', 'request': {'contents': [{'parts': parts}]}}) + '\n')
+
+
+def run_batch(tmp, name, pins, args, rng, cache, client):
+    src = os.path.join(tmp, f'{name}.jsonl')
+    build_inline_jsonl(src, pins, args.requests, args.refs, rng, args.zipf)
+    before_uploads, before_busy = client.uploads, client.busy_seconds
+    t0 = time.perf_counter()
+    r = externalize_references(src, cache)
+    rewrite = time.perf_counter() - t0
+    inline_submit = client.transfer_seconds(r['before_bytes'])
+    uri_submit = (client.busy_seconds - before_busy) + client.transfer_seconds(r['after_bytes'])
+    return {
+        'batch': name,
+        'inline_mb': r['before_bytes'] / 1e6,
+        'uri_mb': r['after_bytes'] / 1e6,
+        'parts': r['parts'],
+        'unique': r['unique'],
+        'uploads': client.uploads - before_uploads,
+        'inline_submit_s': inline_submit,
+        'uri_submit_s': uri_submit,
+        'rewrite_s': rewrite,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch 레퍼런스 업로드 벤치마크')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--refs', type=int, default=5, help='요청당 레퍼런스 수')
+    parser.add_argument('--pins', type=int, default=150, help='핀 풀 크기')
+    parser.add_argument('--pin-kb', type=int, default=180, help='핀 1장 평균 크기 (KB)')
+    parser.add_argument('--zipf', type=float, default=1.0, help='인기 편향 (0 = 균등)')
+    parser.add_argument('--bandwidth-mbps', type=float, default=20.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pins = []
+    for _ in range(args.pins):
+        size = int(args.pin_kb * 1024 * rng.uniform(0.6, 1.4))
+        pins.append(base64.b64encode(rng.randbytes(size)).decode('ascii'))
+
+    tmp = tempfile.mkdtemp(prefix='bench_ref_')
+    try:
+        client = FakeFilesClient(bandwidth_mbps=args.bandwidth_mbps, clock=VirtualClock())
+        cache = ReferenceCache(client=client, cache_file=Path(tmp) / 'reference-files.json')
+        results = [
+            run_batch(tmp, 'first', pins, args, rng, cache, client),
+            run_batch(tmp, 'second', pins, args, rng, cache, client),
+        ]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] 레퍼런스 업로드 | 요청 {args.requests} × {args.refs}장, 핀 풀 {args.pins}, "
+          f"{args.bandwidth_mbps:.0f} Mbps")
+    for r in results:
+        print(f"  {r['batch']:<7} JSONL {r['inline_mb']:.1f} MB → {r['uri_mb']:.2f} MB | "
+              f"part {r['parts']}개 (고유 {r['unique']}) | 새 업로드 {r['uploads']}")
+        print(f"          제출 {r['inline_submit_s']:.1f}s → {r['uri_submit_s']:.1f}s | "
+              f"JSONL 변환 {r['rewrite_s'] * 1000:.0f}ms")
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
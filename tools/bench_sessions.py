@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+세션 관리 재생(replay) 벤치마크 — session_manager 연산별 시간/메모리 측정
+
+- 기록된 세션(output/logs/session-ses_*.json)의 진행 순서(done/failed/pending)를 그대로 재생
+- 가장 큰 기록 세션 패턴으로 10k / 100k 쌍 합성 세션 재생
+- 연산: create_new_session, get_pending_pairs, update_session_progress, check_resume, close_session
+- 기준선(baseline) 저장 → 이후 실행에서 회귀 감지 (999장 배치 전에 확인)
+
+실제 config/·output/을 건드리지 않도록 임시 디렉토리에 복사한 뒤 모듈 경로를 옮겨서 실행.
+
+사용:
+  python tools/bench_sessions.py                    # 재생 + 10k/100k, 기준선과 비교
+  python tools/bench_sessions.py --save-baseline    # 현재 결과를 기준선으로 저장
+  python tools/bench_sessions.py --scales 10000 --ops 500
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKILLS_DIR = os.path.join(BASE, '.claude', 'skills')
+BASELINE_PATH = os.path.join(BASE, 'tools', 'bench_sessions_baseline.json')
+OPS = ['create_new_session', 'get_pending_pairs', 'update_session_progress', 'check_resume', 'close_session']
+
+for skill in ['session-controller', 'word-manager', 'notifier']:
+    sys.path.insert(0, os.path.join(SKILLS_DIR, skill, 'scripts'))
+
+
+def load_recorded_sessions():
+    sessions = []
+    for f in sorted(glob.glob(os.path.join(BASE, 'output', 'logs', 'session-ses_*.json'))):
+        with open(f, 'r', encoding='utf-8') as fh:
+            sessions.append(json.load(fh))
+    return sessions
+
+
+def replay_script(session, scale=None):
+    """기록 세션 → [(status, is_flash)] 재생 순서. scale이 있으면 같은 비율로 늘림"""
+    prog = session.get('progress', {})
+    flash_left = prog.get('flash_count', 0)
+    pro_left = prog.get('pro_count', prog.get('generated', 0) - flash_left)
+    steps = []
+    for p in session.get('word_pairs', []):
+        status = p.get('status')
+        if status == 'done':
+            is_flash = pro_left <= 0 and flash_left > 0
+            if is_flash:
+                flash_left -= 1
+            else:
+                pro_left -= 1
+            steps.append(('done', is_flash))
+        elif status == 'failed':
+            steps.append(('failed', False))
+        else:
+            steps.append(('pending', False))
+    if scale and steps:
+        steps = [steps[i % len(steps)] for i in range(scale)]
+    return steps
+
+
+# ── 샌드박스 ──────────────────────────────────────────────
+def _rebase(value, root):
+    try:
+        if isinstance(value, Path):
+            return Path(root) / value.resolve().relative_to(BASE)
+        if isinstance(value, str) and os.path.isabs(value):
+            return os.path.join(root, os.path.relpath(value, BASE)) if value.startswith(BASE) else value
+    except ValueError:
+        pass
+    return value
+
+
+def sandbox_modules(root):
+    """이미 import된 스킬 모듈의 전역 경로(BASE_DIR, *_FILE 등)를 임시 디렉토리로 이동"""
+    for mod in list(sys.modules.values()):
+        mfile = getattr(mod, '__file__', None) or ''
+        if not mfile.startswith(SKILLS_DIR):
+            continue
+        for name, value in list(vars(mod).items()):
+            if name.startswith('__'):
+                continue
+            new = _rebase(value, root)
+            if new is not value:
+                setattr(mod, name, new)
+
+
+def make_sandbox():
+    root = tempfile.mkdtemp(prefix='bench_sessions_')
+    shutil.copytree(os.path.join(BASE, 'config'), os.path.join(root, 'config'))
+    os.makedirs(os.path.join(root, 'output', 'logs'), exist_ok=True)
+    return root
+
+
+# ── 측정 ──────────────────────────────────────────────────
+class OpStats:
+    def __init__(self):
+        self.times = {op: [] for op in OPS}
+        self.peaks = {op: [] for op in OPS}
+
+    def measure(self, op, fn, *args, trace_mem=False, **kwargs):
+        if trace_mem:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.times[op].append(time.perf_counter() - t0)
+            if trace_mem:
+                self.peaks[op].append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+    def summary(self):
+        out = {}
+        for op in OPS:
+            t = sorted(self.times[op])
+            if not t:
+                continue
+            out[op] = {
+                'n': len(t),
+                'p50_ms': round(t[len(t) // 2] * 1000, 3),
+                'p95_ms': round(t[min(len(t) - 1, int(len(t) * 0.95))] * 1000, 3),
+                'total_ms': round(sum(t) * 1000, 1),
+                'peak_kb': round(max(self.peaks[op]) / 1024, 1) if self.peaks[op] else None,
+            }
+        return out
+
+
+def run_replay(sm, name, session, steps, max_ops, mem_every):
+    """실제 루프와 같은 순서: get_pending_pairs → update_session_progress, 중간중간 check_resume"""
+    stats = OpStats()
+    settings = {
+        'target_count': len(steps),
+        'max_duration_hours': -1,
+        'session_cost_cap': None,
+    }
+    created = stats.measure('create_new_session', sm.create_new_session,
+                            session.get('boards_used', []), settings, trace_mem=True)
+    n_pairs = len(created.get('word_pairs', [])) if isinstance(created, dict) else 0
+
+    ops = 0
+    for i, (status, is_flash) in enumerate(steps):
+        if status == 'pending' or ops >= max_ops:
+            continue
+        trace = mem_every > 0 and ops % mem_every == 0
+        pending = stats.measure('get_pending_pairs', sm.get_pending_pairs, trace_mem=trace)
+        if not pending:
+            break
+        cost = 0 if status == 'failed' else (0.039 if is_flash else 0.134)
+        kwargs = {'error': 'replay'} if status == 'failed' else {}
+        stats.measure('update_session_progress', sm.update_session_progress,
+                      pending[0]['combo_id'], status, cost, is_flash, trace_mem=trace, **kwargs)
+        if ops % 50 == 0:
+            stats.measure('check_resume', sm.check_resume, trace_mem=trace)
+        ops += 1
+
+    stats.measure('close_session', sm.close_session,
+                  session.get('stop_reason') or 'replay', ops, trace_mem=True)
+    return {'name': name, 'pairs': n_pairs, 'replayed_ops': ops, 'ops': stats.summary()}
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """p50이 기준선보다 tolerance 비율 이상, 그리고 min_ms 이상 느려진 연산만 회귀로 판정"""
+    regressions = []
+    base_by_name = {r['name']: r for r in baseline.get('results', [])}
+    for r in results:
+        b = base_by_name.get(r['name'])
+        if not b:
+            continue
+        for op, s in r['ops'].items():
+            bs = b['ops'].get(op)
+            if not bs or not bs['p50_ms']:
+                continue
+            ratio = s['p50_ms'] / bs['p50_ms']
+            if ratio > 1 + tolerance and s['p50_ms'] - bs['p50_ms'] >= min_ms:
+                regressions.append(f"{r['name']}.{op}: p50 {bs['p50_ms']}ms → {s['p50_ms']}ms (x{ratio:.2f})")
+            if s.get('peak_kb') and bs.get('peak_kb') and s['peak_kb'] > bs['peak_kb'] * (1 + tolerance):
+                regressions.append(f"{r['name']}.{op}: peak {bs['peak_kb']}KB → {s['peak_kb']}KB")
+    return regressions
+
+
+def print_results(results):
+    for r in results:
+        print(f"\n[{r['name']}] pairs={r['pairs']} replayed={r['replayed_ops']}")
+        print(f"  {'op':<26}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'total ms':>11}{'peak KB':>10}")
+        for op, s in r['ops'].items():
+            peak = '-' if s['peak_kb'] is None else s['peak_kb']
+            print(f"  {op:<26}{s['n']:>6}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['total_ms']:>11}{peak:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='세션 관리 재생 벤치마크')
+    parser.add_argument('--scales', default='10000,100000', help='합성 세션 크기 (쉼표 구분, 빈 값이면 생략)')
+    parser.add_argument('--ops', type=int, default=300, help='합성 세션에서 재생할 최대 연산 수')
+    parser.add_argument('--mem-every', type=int, default=25, help='N번째 연산마다 tracemalloc으로 메모리 측정')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='회귀 판정 허용 비율')
+    parser.add_argument('--min-ms', type=float, default=2.0, help='이보다 작은 차이는 측정 잡음으로 무시')
+    args = parser.parse_args()
+
+    recorded = load_recorded_sessions()
+    if not recorded:
+        print('[ERROR] output/logs/session-ses_*.json 없음')
+        sys.exit(1)
+
+    root = make_sandbox()
+    try:
+        import session_manager as sm
+        # session_manager가 내부에서 쓰는 모듈도 미리 올려서 경로를 함께 옮김
+        for name in ('cost_tracker', 'stop_checker'):
+            try:
+                __import__(name)
+            except ImportError:
+                pass
+        sandbox_modules(root)
+
+        results = []
+        for s in recorded:
+            steps = replay_script(s)
+            results.append(run_replay(sm, s['session_id'], s, steps, len(steps), args.mem_every))
+
+        largest = max(recorded, key=lambda s: len(s.get('word_pairs', [])))
+        for scale in [int(x) for x in args.scales.split(',') if x.strip()]:
+            steps = replay_script(largest, scale)
+            results.append(run_replay(sm, f'synthetic_{scale}', largest, steps, args.ops, args.mem_every))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print_results(results)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\n  Saved baseline: {args.baseline}')
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_ms)
+        if regressions:
+            print(f'\n[REGRESSION] 기준선 대비 {len(regressions)}건')
+            for line in regressions:
+                print(f'  - {line}')
+            sys.exit(1)
+        print(f"\n[OK] 기준선({baseline.get('created_at', '?')}) 대비 회귀 없음")
+    else:
+        print('\n[INFO] 기준선 없음 — --save-baseline 으로 저장하세요.')
+
+
+if __name__ == '__main__':
+    main()
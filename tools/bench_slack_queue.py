@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Slack 알림 벤치마크 — 동기 호출(기존) vs slack_queue
+
+느린/가끔 실패하는 웹훅 대역으로 연속 실패 구간을 흉내낸다:
+루프가 이미지마다 notify_consecutive_errors / send_slack을 부르고,
+호출 쪽이 막힌 시간, 실제 전송 수, 종료 flush 시간, 재시작 후 spool 재전송을 비교한다.
+
+사용:
+  python tools/bench_slack_queue.py
+  python tools/bench_slack_queue.py --events 200 --latency 0.5 --fail-rate 0.3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'notifier', 'scripts'))
+
+from slack_queue import SlackQueue, _load_queue_config
+
+
+class FakeWebhook:
+    """slack_notify 대역 — latency초 걸리고 fail_rate 비율로 예외"""
+
+    def __init__(self, latency, fail_rate, seed):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.delivered = []
+
+    def resolve(self, kind):
+        def send(*args, **kwargs):
+            time.sleep(self.latency)
+            with self.lock:
+                if self.rng.random() < self.fail_rate:
+                    raise ConnectionError('webhook 503')
+                self.delivered.append(kind)
+        return send
+
+
+def workload(n):
+    """연속 실패 구간 — 실패마다 연속 실패 알림, 가끔 모델 전환/상태 메시지"""
+    for i in range(n):
+        yield 'notify_consecutive_errors', (5 + i, 'RESOURCE_EXHAUSTED')
+        if i % 10 == 0:
+            yield 'notify_model_switch', ('pro', 'flash', 'breaker open')
+        if i % 25 == 0:
+            yield 'send_slack', (f'Pro probe 실패 #{i}', '❌')
+
+
+def run_sync(args):
+    hook = FakeWebhook(args.latency, args.fail_rate, args.seed)
+    blocked = 0.0
+    for kind, a in workload(args.events):
+        t0 = time.perf_counter()
+        try:
+            hook.resolve(kind)(*a)
+        except ConnectionError:
+            pass
+        blocked += time.perf_counter() - t0
+    return {'mode': 'sync', 'blocked_s': blocked, 'delivered': len(hook.delivered), 'flush_s': 0.0, 'left': 0}
+
+
+def run_queue(args, spool):
+    hook = FakeWebhook(args.latency, args.fail_rate, args.seed)
+    cfg = {**_load_queue_config(), 'retry_base_seconds': args.latency, 'flush_timeout_seconds': args.flush_timeout}
+    with contextlib.redirect_stdout(io.StringIO()):
+        q = SlackQueue(cfg, resolve=hook.resolve, spool_file=spool)
+        blocked = 0.0
+        for kind, a in workload(args.events):
+            t0 = time.perf_counter()
+            q.post(kind, *a)
+            blocked += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        left = q.close()
+        flush_s = time.perf_counter() - t0
+        # 재시작: spool에 남은 알림을 새 큐가 이어서 전송
+        resent = 0
+        if left:
+            hook.fail_rate = 0.0
+            before = len(hook.delivered)
+            SlackQueue(cfg, resolve=hook.resolve, spool_file=spool).close()
+            resent = len(hook.delivered) - before
+    return {'mode': 'queue', 'blocked_s': blocked, 'delivered': len(hook.delivered), 'flush_s': flush_s,
+            'left': left, 'resent': resent, 'stats': q.stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Slack 알림 벤치마크')
+    parser.add_argument('--events', type=int, default=100, help='연속 실패 알림 수')
+    parser.add_argument('--latency', type=float, default=0.3, help='웹훅 응답 시간 (초)')
+    parser.add_argument('--fail-rate', type=float, default=0.2)
+    parser.add_argument('--flush-timeout', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=3)
+    parser.add_argument('--json', help='결과 저장 경로')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_slack_') as tmp:
+        results = [run_sync(args), run_queue(args, os.path.join(tmp, 'slack-spool.json'))]
+
+    sent = sum(1 for _ in workload(args.events))
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] Slack 알림 | 호출 {sent}회, 웹훅 {args.latency}s, 실패율 {args.fail_rate * 100:.0f}%")
+    for r in results:
+        line = f"  {r['mode']:<6} 호출 쪽 대기 {r['blocked_s']:7.3f}s | 전송 {r['delivered']}건"
+        if r['mode'] == 'queue':
+            s = r['stats']
+            line += (f" (묶음 {s['coalesced']}, 재시도 {s['retried']}) | flush {r['flush_s']:.2f}s"
+                     f" → 남음 {r['left']}, 재시작 후 재전송 {r['resent']}")
+        print(line)
+    print(f"{'=' * 55}\n")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
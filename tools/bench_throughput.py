@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+오프라인 처리량 벤치마크 — run_batch.py의 실제 루프를 Gemini 대역(fake_gemini)으로 실행
+
+비용 0원, 실시간 대기 없음 (가상 시계). 스케줄링 변경 전후 비교용.
+
+사용:
+  python tools/bench_throughput.py                      # 일반모드 200장
+  python tools/bench_throughput.py --mode batch
+  python tools/bench_throughput.py --rate-503 0.1 --empty-rate 0.005 --latency lognormal:30,0.5
+  python tools/bench_throughput.py --json output/logs/bench_throughput.json
+  python tools/bench_throughput.py --scrape-hz 50       # 실행 중 /status, /metrics를 계속 조회 (오버헤드 비교)
+
+보고: 시간당 이미지 수, 사이클 p50/p95 (가상 시간), 이미지당 오버헤드 (실제 CPU/IO 시간)
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import types
+import urllib.request
+from pathlib import Path
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE)
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'session-reporter', 'scripts'))
+sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'word-manager', 'scripts'))
+
+from fake_gemini import FakeGemini, VirtualClock, parse_sizes
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(q * len(s))) - 1))
+    return s[idx]
+
+
+class MemorySessionStore:
+    """session_manager 대역 — 디스크의 active-session.json을 건드리지 않음"""
+
+    def __init__(self, count, seed=None, vocab_path=None):
+        rng = random.Random(seed)
+        # 단어는 컴파일된 사전에서 (세션 생성과 같은 경로, 사전 파일은 임시 폴더)
+        from vocab_store import Vocab, compile_vocab, get_vocab
+        vocab = self.vocab = Vocab(compile_vocab(vocab_path)) if vocab_path else get_vocab()
+        word1s = vocab.word1_entries()
+        w2pool = vocab.word2_entries()
+        pairs = []
+        for i in range(count):
+            w1 = rng.choice(word1s)
+            w2 = rng.choice(w2pool)
+            pairs.append({
+                'word1': w1['word'], 'word1_en': w1.get('en', ''),
+                'word2': w2['word'], 'word2_en': w2.get('en', ''),
+                'combo_id': f'bench_{i:05d}', 'template_id': None, 'status': 'pending',
+            })
+        self.session = {
+            'session_id': 'ses_bench',
+            'boards_used': [],
+            'settings': {'target_count': count, 'max_duration_hours': -1, 'session_cost_cap': None},
+            'word_pairs': pairs,
+            'progress': {'generated': 0, 'failed': 0, 'pro_count': 0, 'flash_count': 0, 'session_cost': 0.0},
+        }
+        self.stop_reason = None
+
+    def get_pending_pairs(self):
+        return [p for p in self.session['word_pairs'] if p['status'] == 'pending']
+
+    def update_session_progress(self, combo_id, status, cost=0, is_flash=False, error=None):
+        for p in self.session['word_pairs']:
+            if p['combo_id'] == combo_id:
+                p['status'] = status
+                break
+        prog = self.session['progress']
+        if status == 'done':
+            prog['generated'] += 1
+            prog['session_cost'] = round(prog['session_cost'] + cost, 4)
+        else:
+            prog['failed'] += 1
+
+    def close_session(self, reason, total_api_calls=None):
+        self.stop_reason = reason
+
+    def module(self):
+        m = types.ModuleType('session_manager')
+        m.get_pending_pairs = self.get_pending_pairs
+        m.update_session_progress = self.update_session_progress
+        m.close_session = self.close_session
+        m.create_new_session = lambda boards, settings: self.session
+        m.check_resume = lambda: None
+        m.get_current_session = lambda: self.session
+        return m
+
+
+def _module(name, **attrs):
+    m = types.ModuleType(name)
+    for k, v in attrs.items():
+        setattr(m, k, v)
+    return m
+
+
+def install_fakes(fake, store, adaptive_poll=True):
+    """run_batch가 import하는 스킬 모듈 중 부작용(API/비용/Drive/Slack/디스크)이 있는 것만 대역으로 교체"""
+    spent = {'total': 0.0}
+
+    def add_cost(cost, is_flash=False):
+        spent['total'] += cost
+
+    noop = lambda *a, **k: None
+    sys.modules['session_manager'] = store.module()
+    sys.modules['generate'] = _module('generate', generate_image=fake.generate_image)
+    sys.modules['cost_tracker'] = _module(
+        'cost_tracker', add_cost=add_cost,
+        get_daily_total=lambda: spent['total'], get_monthly_total=lambda: spent['total'],
+        get_limits=lambda: {'daily_cost_cap': 0, 'monthly_cost_cap': 0},
+        get_status_summary=lambda: f"bench ${spent['total']:.2f}",
+    )
+    sys.modules['track_pins'] = _module(
+        'track_pins',
+        get_metadata_file=lambda date: Path(fake.out_dir) / f'{date}_metadata.json',
+    )
+    sys.modules['slack_notify'] = _module(
+        'slack_notify', send_slack=noop,
+        notify_consecutive_errors=noop, notify_model_switch=noop, notify_cost_limit=noop,
+        notify_session_complete=noop, notify_batch_submitted=noop, notify_batch_complete=noop,
+    )
+    sys.modules['rate_limiter'] = _module('rate_limiter', get_rate_limiter=lambda: fake.rate_limiter)
+    sys.modules['upload'] = _module(
+        'upload', upload_single_image=lambda *a, **k: None,
+        upload_metadata_file=noop, upload_html_file=noop,
+    )
+    sys.modules['batch_generator'] = _module(
+        'batch_generator',
+        prepare_batch_requests=fake.prepare_batch_requests,
+        submit_batch=fake.submit_batch,
+        poll_batch=fake.poll_batch,
+        download_batch_results=fake.download_batch_results,
+        save_batch_state=noop, load_batch_state=lambda: None, clear_batch_state=noop,
+        _load_batch_config=lambda: {'poll_interval_seconds': 30, 'poll_timeout_seconds': 7200,
+                                    'adaptive_poll': adaptive_poll},
+    )
+    sys.modules['generate_viewer'] = _module('generate_viewer', generate_viewer=lambda *a, **k: None)
+    return spent
+
+
+def run_benchmark(args):
+    clock = VirtualClock()
+    fake = FakeGemini(
+        clock, latency=args.latency, rate_429=args.rate_429, rate_503=args.rate_503,
+        empty_rate=args.empty_rate, sizes=parse_sizes(args.sizes),
+        bytes_per_pixel=args.bytes_per_pixel, batch_latency=args.batch_latency,
+        keys=[f'key_{i + 1}' for i in range(args.keys)], seed=args.seed,
+    )
+    store = MemorySessionStore(args.count, seed=args.seed, vocab_path=Path(fake.out_dir) / 'vocab.bin')
+    install_fakes(fake, store, adaptive_poll=args.poll == 'adaptive')
+    random.seed(args.seed)
+
+    import phase_timer
+    timer = phase_timer.PhaseTimer(enabled=True)
+
+    import run_batch
+    from lease_store import LeaseStore
+    leases = LeaseStore(store.session['session_id'], lease_dir=fake.out_dir)
+    run_batch.time = clock
+    run_batch.get_phase_timer = lambda session_id=None: timer
+    run_batch.deploy_to_github_pages = lambda *a, **k: None
+    # 이미지 저장소/인덱스도 임시 폴더로 (output/images를 건드리지 않음)
+    from image_store import ImageStore
+    image_store = ImageStore(root=Path(fake.out_dir) / 'store', index_path=Path(fake.out_dir) / 'index.sqlite3')
+    run_batch.get_image_store = lambda: image_store
+    # 메타데이터 JSONL도 실제 append 경로 그대로, 위치만 임시 폴더
+    import metadata_log
+    meta_logs = {}
+    run_batch.append_entry = lambda r, d: meta_logs.setdefault(
+        d, metadata_log.MetadataLog(d, metadata_dir=fake.out_dir)).append(r)
+    run_batch.compact_metadata = lambda d: metadata_log.compact(d, metadata_dir=fake.out_dir)
+    # 조합 이력은 빈 상태로 (실제 output/logs 이력과 무관하게 같은 조건으로 비교)
+    from combo_history import ComboHistory
+    history = ComboHistory(path=Path(fake.out_dir) / 'combo-history.bin')
+    run_batch.get_combo_history = lambda: history
+    # 좋아요 bandit도 빈 상태 + 고정 시드 (batch_builder 템플릿 선택도 같은 인스턴스)
+    import bandit_selector
+    bandit = bandit_selector.BanditSelector(path=Path(fake.out_dir) / 'bandit-state.json',
+                                            rng=random.Random(args.seed), category_of=store.vocab.category)
+    bandit_selector._bandit = bandit
+    run_batch.get_bandit = lambda: bandit
+    # 레퍼런스 핀 인덱스/중복 해시는 쓰지 않음 (실제 보드 캐시를 색인하지 않게, 기존 무작위 선택)
+    import pin_dedup
+    import pin_index
+    pin_index.get_pin_index = lambda update=True: None
+    pin_dedup.get_pin_dedup = lambda update=False: None
+    # 레퍼런스 선택 기록(캐시 축출 순서)도 임시 폴더로
+    import pin_cache
+    pin_cache._usage = pin_cache.PinUsage(path=Path(fake.out_dir) / 'pin-usage.json')
+    # 레퍼런스 URI 캐시도 임시 폴더로
+    from reference_media import ReferenceCache
+    ref_cache = ReferenceCache(cache_file=Path(fake.out_dir) / 'reference-files.json')
+    run_batch.get_reference_cache = lambda: ref_cache
+    # 배치 상태 조회는 가상 시계 기준 대역, 소요 시간 기록도 임시 폴더로
+    import batch_recovery
+    batch_recovery.DURATIONS_FILE = Path(fake.out_dir) / 'batch-durations.json'
+    batch_recovery.OWNER_DIR = Path(fake.out_dir) / 'owners'
+    run_batch.get_batch_job = fake.get_batch
+    # 비용 예약 장부도 임시 폴더로 (cost_tracker 대역에 기록)
+    from budget_ledger import BudgetLedger
+    ledger = BudgetLedger(path=Path(fake.out_dir) / 'budget-ledger.json')
+    run_batch.get_budget_ledger = lambda: ledger
+    # Slack 큐의 재전송 spool도 임시 폴더로
+    import slack_queue
+    slack_queue.SPOOL_FILE = Path(fake.out_dir) / 'slack-spool.json'
+    # 실행 상태는 가상 시계 기준. --scrape-hz면 임시 포트로 상태 서버를 열고 실행 내내 조회
+    from status_server import RunStatus, StatusServer
+    status = RunStatus(clock=clock)
+    run_batch.get_run_status = lambda: status
+    scrapes = {'count': 0}
+    stop_scrape = threading.Event()
+    server = scraper = None
+    if args.scrape_hz > 0:
+        server = StatusServer(status, 0, '127.0.0.1', cache_seconds=0, timer=timer).start()
+
+        def scrape():
+            base = f'http://127.0.0.1:{server.port}'
+            while not stop_scrape.wait(1 / args.scrape_hz):
+                for path in ('/status', '/metrics'):
+                    with urllib.request.urlopen(base + path, timeout=5) as resp:
+                        resp.read()
+                scrapes['count'] += 1
+
+        scraper = threading.Thread(target=scrape, daemon=True)
+        scraper.start()
+
+    # 사이클 = generate_image 호출 시작 간격 (가상 시간)
+    starts = []
+    inner = fake.generate_image
+
+    def timed_generate(**kwargs):
+        starts.append(clock.time())
+        return inner(**kwargs)
+
+    run_batch.generate_image = timed_generate
+
+    out = sys.stdout if args.verbose else open(os.devnull, 'w', encoding='utf-8')
+    virtual_start = clock.time()
+    real_start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        if args.mode == 'batch':
+            run_batch.run_batch_mode(args.count, [], store.session, virtual_start, leases)
+        else:
+            run_batch.run_normal_mode(args.count, [], store.session, virtual_start, leases)
+    real_elapsed = time.perf_counter() - real_start
+    virtual_elapsed = clock.time() - virtual_start
+    if server:
+        stop_scrape.set()
+        scraper.join()
+        server.stop()
+    if out is not sys.stdout:
+        out.close()
+
+    prog = store.session['progress']
+    attempts = prog['generated'] + prog['failed']
+    cycles = [b - a for a, b in zip(starts, starts[1:] + [clock.time()])]
+    outcomes = {}
+    for _, outcome, _ in fake.calls:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    return {
+        'mode': args.mode,
+        'count': args.count,
+        'generated': prog['generated'],
+        'failed': prog['failed'],
+        'api_calls': fake.rate_limiter.get_total_api_calls(),
+        'call_outcomes': outcomes,
+        'stop_reason': store.stop_reason,
+        'virtual_hours': round(virtual_elapsed / 3600, 3),
+        'images_per_hour': round(prog['generated'] / (virtual_elapsed / 3600), 2) if virtual_elapsed else 0.0,
+        'cycle_p50_s': round(percentile(cycles, 0.50), 2),
+        'cycle_p95_s': round(percentile(cycles, 0.95), 2),
+        'sleep_share': round(clock.slept / virtual_elapsed, 3) if virtual_elapsed else 0.0,
+        'overhead_ms_per_image': round(real_elapsed / attempts * 1000, 3) if attempts else 0.0,
+        'cost': prog['session_cost'],
+        'status_scrapes': scrapes['count'],
+        'status': status.snapshot(),
+        'batch_polls': fake.batch_polls,
+        'ingest_lag_s': round(sum(fake.ingest_lags) / len(fake.ingest_lags), 1) if fake.ingest_lags else None,
+        'phases': timer.snapshot(),
+    }
+
+
+def print_result(r):
+    print(f"\n{'=' * 55}")
+    print(f"[BENCH] {r['mode']} mode | {r['count']} requested")
+    print(f"  성공 {r['generated']} / 실패 {r['failed']} | API 호출 {r['api_calls']}회 {r['call_outcomes']}")
+    print(f"  종료 사유: {r['stop_reason']}")
+    print(f"  가상 소요: {r['virtual_hours']}h | {r['images_per_hour']} images/hour")
+    if r['mode'] == 'normal':
+        print(f"  사이클: p50 {r['cycle_p50_s']}s / p95 {r['cycle_p95_s']}s | 대기 비중 {r['sleep_share'] * 100:.1f}%")
+    if r['ingest_lag_s'] is not None:
+        print(f"  배치 완료 → 수거: {r['ingest_lag_s']}s | 상태 조회 {r['batch_polls']}회")
+    print(f"  오버헤드: {r['overhead_ms_per_image']} ms/image (실제 시간)"
+          + (f" | 상태 조회 {r['status_scrapes']}회" if r['status_scrapes'] else ''))
+    print(f"  비용(가상): ${r['cost']:.2f}")
+    print(f"{'=' * 55}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='오프라인 처리량 벤치마크 (Gemini 대역)')
+    parser.add_argument('--mode', choices=['normal', 'batch'], default='normal')
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--latency', default='lognormal:25,0.35', help='API 지연 분포 (초)')
+    parser.add_argument('--batch-latency', default='uniform:600,3600', help='배치 완료까지 걸리는 시간 분포 (초)')
+    parser.add_argument('--poll', choices=['fixed', 'adaptive'], default='adaptive', help='batch 모드 polling 방식')
+    parser.add_argument('--rate-429', type=float, default=0.02)
+    parser.add_argument('--rate-503', type=float, default=0.02)
+    parser.add_argument('--empty-rate', type=float, default=0.005, help='응답에 이미지 없음 비율')
+    parser.add_argument('--sizes', default='', help='해상도 목록 (예: 928x1152,1024x1024). 기본: 로그 관찰값')
+    parser.add_argument('--bytes-per-pixel', type=float, default=1.6, help='PNG 파일 크기 추정')
+    parser.add_argument('--keys', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='결과 JSON 저장 경로')
+    parser.add_argument('--verbose', action='store_true', help='루프 출력 표시')
+    parser.add_argument('--scrape-hz', type=float, default=0, help='실행 중 상태 서버 조회 빈도 (초당)')
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_result(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'  Saved: {args.json}')
+
+
+if __name__ == '__main__':
+    main()
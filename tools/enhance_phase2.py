@@ -12,41 +12,133 @@ import os
 import glob
 import re
 import math
+import sys
 from collections import Counter, defaultdict
 
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 HTML_PATH = os.path.join(BASE, 'docs', 'analysis.html')
 
-def load_metadata():
-    all_meta = []
-    for f in sorted(glob.glob(os.path.join(BASE, 'output', 'images', 'metadata', '26*_metadata.json'))):
+INDEX_PATH = os.path.join(BASE, 'output', 'images', 'index.sqlite3')
+
+
+def _open_index():
+    """image_store 인덱스가 있으면 sqlite 연결, 없으면 None (기존 JSON/파일 스캔)"""
+    if not os.path.exists(INDEX_PATH):
+        return None
+    import sqlite3
+    conn = sqlite3.connect(INDEX_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _iter_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # 비정상 종료로 반쯤 쓰인 마지막 줄
+
+def iter_metadata():
+    """날짜별 metadata 스트림 — {date}_metadata.jsonl(append-only)은 한 줄씩,
+    JSONL이 없는 예전 날짜는 JSON 배열. 둘 다 있으면 combo_id 기준으로 합침 (patch 줄 반영)"""
+    meta_dir = os.path.join(BASE, 'output', 'images', 'metadata')
+    dates = set()
+    for f in glob.glob(os.path.join(meta_dir, '26*_metadata.json*')):
         if 'backup' in f or 'bak' in f:
             continue
-        with open(f, 'r', encoding='utf-8') as fh:
-            all_meta.extend(json.load(fh))
-    return all_meta
+        dates.add(os.path.basename(f).split('_')[0])
+    for date in sorted(dates):
+        legacy = os.path.join(meta_dir, f'{date}_metadata.json')
+        jsonl = os.path.join(meta_dir, f'{date}_metadata.jsonl')
+        if not os.path.exists(jsonl):
+            with open(legacy, 'r', encoding='utf-8') as fh:
+                yield from json.load(fh)
+            continue
+        if not os.path.exists(legacy):
+            # 1차: patch 줄만 모음 (드묾), 2차: 항목을 한 줄씩 내보내며 patch 적용
+            patches = defaultdict(dict)
+            for m in _iter_jsonl(jsonl):
+                if m.get('_patch'):
+                    patches[m.get('combo_id')].update({k: v for k, v in m.items() if k != '_patch'})
+            for m in _iter_jsonl(jsonl):
+                if not m.get('_patch'):
+                    yield {**m, **patches.get(m.get('combo_id'), {})}
+            continue
+        merged = {}
+        with open(legacy, 'r', encoding='utf-8') as fh:
+            for m in json.load(fh):
+                merged[m.get('combo_id') or id(m)] = m
+        for m in _iter_jsonl(jsonl):
+            key = m.get('combo_id')
+            if m.get('_patch'):
+                if key in merged:
+                    merged[key].update({k: v for k, v in m.items() if k != '_patch'})
+            else:
+                merged.setdefault(key, {}).update(m)
+        yield from merged.values()
+
+def load_metadata():
+    """날짜별 JSON/JSONL 이력 + image_store 인덱스 (같은 combo_id는 인덱스 행이 우선).
+    import_legacy를 안 돌린 예전 날짜도, 인덱스에만 있는 항목도 빠지지 않게 합침"""
+    merged, extra = {}, []
+    for m in iter_metadata():
+        if m.get('combo_id'):
+            merged[m['combo_id']] = m
+        else:
+            extra.append(m)
+    conn = _open_index()
+    if conn is not None:
+        with conn:
+            rows = conn.execute('SELECT * FROM images ORDER BY date, created_at').fetchall()
+        conn.close()
+        for r in rows:
+            row = {**json.loads(r['extra'] or '{}'), **dict(r), 'file_path': r['path']}
+            merged[row['combo_id']] = {**merged.get(row['combo_id'], {}), **row}
+    return list(merged.values()) + extra
 
 def load_liked_ids():
+    """인덱스의 liked + output/likes 폴더 (인덱싱 뒤에 넣은 좋아요 포함)"""
     liked_ids = set()
+    conn = _open_index()
+    if conn is not None:
+        liked_ids.update(r[0] for r in conn.execute('SELECT combo_id FROM images WHERE liked=1'))
+        conn.close()
     for f in glob.glob(os.path.join(BASE, 'output', 'likes', '*.png')):
         parts = os.path.basename(f).replace('.png', '').split('_')
         if len(parts) >= 2:
             liked_ids.add(parts[0] + '_' + parts[1])
     return liked_ids
 
+_local_extracted = None
+
+
+def load_extracted(name, local=True):
+    """→ (항목, 출처). 유료 LLM 추출 결과가 있으면 ('llm'), 없으면 로컬 CPU 추출 ('local', local=False면 빈 목록).
+    로컬은 매번 write_extracted로 새로 씀 — 특징은 캐시돼서 새 좋아요만 계산"""
+    global _local_extracted
+    path = os.path.join(BASE, 'output', 'likes_analysis', name)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f), 'llm'
+    if not local:
+        return [], None
+    if _local_extracted is None:
+        sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'pin-tracker', 'scripts'))
+        from image_features import write_extracted
+        r = write_extracted(liked_only=True)
+        print(f"  로컬 특징 추출: {r['extracted']}/{r['images']}장 → {r['path']}")
+        with open(r['path'], 'r', encoding='utf-8') as f:
+            _local_extracted = json.load(f)
+    return _local_extracted, 'local'
+
 def load_word1_db():
-    with open(os.path.join(BASE, 'config', 'word1-db.json'), 'r', encoding='utf-8') as f:
-        w1db = json.load(f)
-    word_to_cat = {}
-    for cat, words in w1db.items():
-        for w in words:
-            if isinstance(w, dict):
-                word_to_cat[w.get('word', '')] = cat
-            elif isinstance(w, list) and len(w) >= 1:
-                word_to_cat[w[0]] = cat
-            elif isinstance(w, str):
-                word_to_cat[w] = cat
-    return word_to_cat
+    """word1 → 카테고리 (컴파일된 단어 사전, word1-db.json이 바뀌었을 때만 다시 만듦)"""
+    sys.path.insert(0, os.path.join(BASE, '.claude', 'skills', 'word-manager', 'scripts'))
+    from vocab_store import get_vocab
+    return get_vocab().word_to_category()
 
 def compute_all():
     all_meta = load_metadata()
@@ -198,12 +290,9 @@ def compute_all():
     # ===== Phase 4 #9-10: Simplified Clustering =====
     print("\n=== Phase 4 #9-10: Clustering (simplified) ===")
 
-    gpt_path = os.path.join(BASE, 'output', 'likes_analysis', 'extracted_gpt4o.json')
-    gem_path = os.path.join(BASE, 'output', 'likes_analysis', 'extracted_gemini.json')
-    with open(gpt_path, 'r', encoding='utf-8') as f:
-        gpt_data = json.load(f)
-    with open(gem_path, 'r', encoding='utf-8') as f:
-        gem_data = json.load(f)
+    # GPT-4o 결과가 없으면 로컬 CPU 추출로 대신하고, Gemini 비교는 결과가 있을 때만
+    gpt_data, gpt_source = load_extracted('extracted_gpt4o.json')
+    gem_data, _ = load_extracted('extracted_gemini.json', local=False)
 
     # Instead of full K-means (needs numpy/sklearn), do manual "taste profile" clustering
     # based on dominant attributes
@@ -302,19 +391,28 @@ def compute_all():
         'gem_clusters': gem_cluster_data[:15],
         'gpt_total': len(gpt_data),
         'gem_total': len(gem_data),
+        'source': gpt_source,
     }
-    print(f"  GPT clusters: {len(cluster_data)}, top: {cluster_data[0]}")
-    print(f"  GEM clusters: {len(gem_cluster_data)}, top: {gem_cluster_data[0]}")
+    print(f"  {'GPT' if gpt_source == 'llm' else 'Local'} clusters: {len(cluster_data)}, "
+          f"top: {cluster_data[0] if cluster_data else None}")
+    if gem_cluster_data:
+        print(f"  GEM clusters: {len(gem_cluster_data)}, top: {gem_cluster_data[0]}")
 
     # ===== Improved Design Patterns insight =====
     # Count dimension, depth_of_field, has_nature distributions
     dim_counts = Counter(str(e.get('analysis', e).get('dimension', '')).lower() for e in gpt_data)
     dof_counts = Counter(str(e.get('analysis', e).get('depth_of_field', '')).lower() for e in gpt_data)
-    nature_count = sum(1 for e in gpt_data if str(e.get('analysis', e).get('has_nature', '')).lower() == 'true')
-    arch_count = sum(1 for e in gpt_data if str(e.get('analysis', e).get('has_architecture', '')).lower() == 'true')
-    char_count = sum(1 for e in gpt_data if str(e.get('analysis', e).get('has_character', '')).lower() == 'true')
+    # has_* 는 LLM만 판단 가능 (로컬 추출은 None) — 로컬이면 비움
+    if gpt_source == 'llm':
+        nature_count = sum(1 for e in gpt_data if str(e.get('analysis', e).get('has_nature', '')).lower() == 'true')
+        arch_count = sum(1 for e in gpt_data if str(e.get('analysis', e).get('has_architecture', '')).lower() == 'true')
+        char_count = sum(1 for e in gpt_data if str(e.get('analysis', e).get('has_character', '')).lower() == 'true')
+    else:
+        nature_count = arch_count = char_count = None
+    total = len(gpt_data) or 1
 
     result['design_extra'] = {
+        'source': gpt_source,
         'dim_3d': dim_counts.get('3d', 0),
         'dim_total': len(gpt_data),
         'dof_deep': sum(v for k, v in dof_counts.items() if 'deep' in k),
@@ -322,8 +420,8 @@ def compute_all():
         'nature_count': nature_count,
         'arch_count': arch_count,
         'char_count': char_count,
-        'nature_pct': round(nature_count / len(gpt_data) * 100, 1),
-        'char_pct': round(char_count / len(gpt_data) * 100, 1),
+        'nature_pct': round(nature_count / total * 100, 1) if nature_count is not None else None,
+        'char_pct': round(char_count / total * 100, 1) if char_count is not None else None,
     }
 
     return result
@@ -375,8 +473,8 @@ def inject_html(data):
   <h2>취향 클러스터 분석 <span class="sub-note">(Phase 4 #9-10)</span></h2>
   <p class="insight" id="cluster-insight"></p>
   <div class="chart-row">
-    <div class="chart-box"><h3>GPT-4o 기반 클러스터</h3><canvas id="chart-cluster-gpt"></canvas></div>
-    <div class="chart-box"><h3>Gemini 기반 클러스터</h3><canvas id="chart-cluster-gem"></canvas></div>
+    <div class="chart-box"><h3 id="cluster-gpt-title">GPT-4o 기반 클러스터</h3><canvas id="chart-cluster-gpt"></canvas></div>
+    <div class="chart-box" id="cluster-gem-box"><h3>Gemini 기반 클러스터</h3><canvas id="chart-cluster-gem"></canvas></div>
   </div>
   <h3 style="margin-top:16px">클러스터 상세 비교</h3>
   <table id="cluster-table"></table>
@@ -488,10 +586,13 @@ var P2 = {p2_data};
   var cl = P2.clusters;
   var gTop = cl.gpt_clusters[0];
   var gemTop = cl.gem_clusters[0];
+  var src = cl.source === 'local' ? '로컬 CPU 추출' : 'GPT-4o';
+  document.getElementById('cluster-gpt-title').textContent = src + ' 기반 클러스터';
+  if (!gemTop) document.getElementById('cluster-gem-box').style.display = 'none';
   document.getElementById('cluster-insight').innerHTML =
     '좋아요 이미지를 <strong>Render × Color Temp × Emotion</strong> 3축으로 클러스터링. ' +
-    'GPT-4o 기준 최대 클러스터: <strong>'+gTop.render+' / '+gTop.temp+' / '+gTop.emotion+'</strong> ('+gTop.count+'개, '+gTop.pct+'%). ' +
-    'Gemini 기준: <strong>'+gemTop.render+' / '+gemTop.temp+' / '+gemTop.emotion+'</strong> ('+gemTop.count+'개, '+gemTop.pct+'%).';
+    (gTop ? src+' 기준 최대 클러스터: <strong>'+gTop.render+' / '+gTop.temp+' / '+gTop.emotion+'</strong> ('+gTop.count+'개, '+gTop.pct+'%). ' : '') +
+    (gemTop ? 'Gemini 기준: <strong>'+gemTop.render+' / '+gemTop.temp+' / '+gemTop.emotion+'</strong> ('+gemTop.count+'개, '+gemTop.pct+'%).' : '');
 
   function clusterChart(id,data,colors){{
     var labels = data.map(function(x){{return x.render+'/'+x.temp+'/'+x.emotion}});
@@ -509,7 +610,7 @@ var P2 = {p2_data};
     }});
   }}
   clusterChart('chart-cluster-gpt',cl.gpt_clusters.slice(0,12),[GOLD,BLUE,GREEN,PURPLE,RED,ORANGE,'#00bcd4','#e91e63','#8bc34a','#ff9800','#9c27b0','#03a9f4']);
-  clusterChart('chart-cluster-gem',cl.gem_clusters.slice(0,12),[PURPLE,GREEN,BLUE,GOLD,RED,ORANGE,'#00bcd4','#e91e63','#8bc34a','#ff9800','#9c27b0','#03a9f4']);
+  if (gemTop) clusterChart('chart-cluster-gem',cl.gem_clusters.slice(0,12),[PURPLE,GREEN,BLUE,GOLD,RED,ORANGE,'#00bcd4','#e91e63','#8bc34a','#ff9800','#9c27b0','#03a9f4']);
 
   // Cluster comparison table
   var allKeys = {{}};
@@ -520,21 +621,25 @@ var P2 = {p2_data};
     var gpt = cl.gpt_clusters.find(function(x){{return x.render+'/'+x.temp+'/'+x.emotion===k}});
     var gem = cl.gem_clusters.find(function(x){{return x.render+'/'+x.temp+'/'+x.emotion===k}});
     var gC = gpt?gpt.count:0;
+    if (!gemTop) return '<tr><td style="font-size:0.73rem">'+k+'</td><td>'+gC+'</td></tr>';
     var eC = gem?gem.count:0;
     var diff = gC-eC;
     var diffStr = diff>0?'+'+diff:(diff<0?''+diff:'=');
     return '<tr><td style="font-size:0.73rem">'+k+'</td><td>'+gC+'</td><td>'+eC+'</td><td style="color:'+(diff>2?GREEN:(diff<-2?RED:'#888'))+'">'+diffStr+'</td></tr>';
   }}).join('');
+  var head = gemTop ? '<th>Cluster</th><th>GPT</th><th>Gemini</th><th>Diff</th>'
+                    : '<th>Cluster</th><th>'+(cl.source === 'local' ? 'Local' : 'GPT')+'</th>';
   document.getElementById('cluster-table').innerHTML =
-    '<thead><tr><th>Cluster</th><th>GPT</th><th>Gemini</th><th>Diff</th></tr></thead><tbody>'+rows+'</tbody>';
+    '<thead><tr>'+head+'</tr></thead><tbody>'+rows+'</tbody>';
 }})();
 
 // Improved Design Patterns insight
 (function(){{
   var de = P2.design_extra;
-  var di = D.design.total + '개 좋아요 이미지 GPT-4o 분석: ';
+  var di = D.design.total + '개 좋아요 이미지 ' + (de.source === 'local' ? '로컬 CPU' : 'GPT-4o') + ' 분석: ';
   di += '<strong>3D</strong> '+Math.round(de.dim_3d/de.dim_total*100)+'% 압도적 — 2D는 거의 선호하지 않음. ';
-  di += '자연 요소 <strong>'+de.nature_pct+'%</strong>, 건축 요소 <strong>'+Math.round(de.arch_count/de.dim_total*100)+'%</strong>, 캐릭터 <strong>'+de.char_pct+'%</strong>. ';
+  if (de.source !== 'local')
+    di += '자연 요소 <strong>'+de.nature_pct+'%</strong>, 건축 요소 <strong>'+Math.round(de.arch_count/de.dim_total*100)+'%</strong>, 캐릭터 <strong>'+de.char_pct+'%</strong>. ';
   di += 'DOF: deep focus <strong>'+de.dof_deep+'</strong>개 vs shallow bokeh <strong>'+de.dof_shallow+'</strong>개 — 전체가 또렷한 deep focus 선호. ';
   di += '결론: <strong>3D 포토리얼 + soft lighting + 자연 요소 포함 + deep focus</strong>가 핵심 레시피.';
   document.getElementById('design-insight').innerHTML = di;
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Gemini Files API 로컬 대역 — reference_media를 실제 업로드/비용 없이 돌려보기
+
+client.files.upload(file=..., config={...}) / client.files.get(name=...) 모양만 흉내내고
+업로드 바이트 수에 비례해 지연(bandwidth_mbps)을 가상 시계 또는 실제 sleep으로 반영한다.
+파일은 ttl_hours 후 만료 (실제 API는 48시간).
+
+사용:
+  from fake_files_api import FakeFilesClient
+  client = FakeFilesClient(bandwidth_mbps=20)
+  ReferenceCache(client=client, cache_file=...)
+"""
+
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class FakeFile:
+    def __init__(self, name, uri, mime_type, size_bytes, expiration_time, sha256_hash):
+        self.name = name
+        self.uri = uri
+        self.mime_type = mime_type
+        self.size_bytes = size_bytes
+        self.expiration_time = expiration_time
+        self.sha256_hash = sha256_hash
+        self.state = 'ACTIVE'
+
+
+class _FakeFiles:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def upload(self, file, config=None):
+        config = config or {}
+        data = file.read() if hasattr(file, 'read') else open(file, 'rb').read()
+        return self.owner._store(data, config.get('mime_type', 'application/octet-stream'))
+
+    def get(self, name):
+        f = self.owner.files_by_name.get(name)
+        if f is None or f.expiration_time.timestamp() <= self.owner._now():
+            raise KeyError(f'404 NOT_FOUND: {name}')
+        return f
+
+
+class FakeFilesClient:
+    def __init__(self, bandwidth_mbps=20.0, request_overhead=0.15, ttl_hours=48, clock=None):
+        self.bandwidth = bandwidth_mbps * 1e6 / 8  # bytes/s
+        self.request_overhead = request_overhead
+        self.ttl = ttl_hours * 3600
+        self.clock = clock
+        self.files = _FakeFiles(self)
+        self.files_by_name = {}
+        self.uploads = 0
+        self.upload_bytes = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return self.clock.time() if self.clock else time.time()
+
+    def transfer_seconds(self, nbytes):
+        return self.request_overhead + nbytes / self.bandwidth
+
+    def _store(self, data, mime_type):
+        cost = self.transfer_seconds(len(data))
+        if self.clock:
+            self.clock.advance(cost)
+        else:
+            time.sleep(cost)
+        with self._lock:
+            self.uploads += 1
+            self.upload_bytes += len(data)
+            self.busy_seconds += cost
+            name = f'files/fake{self.uploads:06d}'
+        expires = datetime.fromtimestamp(self._now() + self.ttl, tz=timezone.utc)
+        f = FakeFile(name, f'https://generativelanguage.googleapis.com/v1beta/{name}', mime_type,
+                     len(data), expires, hashlib.sha256(data).hexdigest())
+        self.files_by_name[name] = f
+        return f
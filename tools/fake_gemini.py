@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Gemini 로컬 대역 (benchmark/오프라인 테스트용) — 실제 API 호출/비용 없음
+
+- generate_image() 대역: 지연시간 분포, 429/503 비율, 이미지 없음 응답, 이미지 크기
+- Batch API 대역: prepare/submit/poll/download
+- 가상 시계(VirtualClock): 30~60s 대기나 API 지연을 실제로 기다리지 않고 시간만 전진
+
+지연 분포 표기:
+  fixed:25            항상 25초
+  uniform:15,45       15~45초 균등
+  lognormal:25,0.35   중앙값 25초, sigma 0.35
+"""
+
+import json
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                '.claude', 'skills', 'image-generator', 'scripts'))
+from image_io import PNG_SIGNATURE, save_image_bytes
+
+# batch_200.log 등에서 실제 관찰된 해상도
+DEFAULT_SIZES = [
+    (928, 1152), (1200, 896), (992, 1072), (768, 1392), (848, 1264),
+    (1376, 768), (1024, 1024), (944, 1136), (768, 1376), (1152, 928),
+    (1392, 768), (800, 1312), (1056, 1008),
+]
+
+EMPTY_IMAGE_ERROR = '응답에 이미지 없음'
+
+
+def png_payload(w, h, size):
+    """PNG 시그니처 + IHDR(w, h) + 랜덤 바이트 — 헤더 파싱은 되고 디코드는 안 되는 대역 이미지"""
+    ihdr = struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0)
+    head = PNG_SIGNATURE + struct.pack('>I', 13) + b'IHDR' + ihdr + struct.pack('>I', zlib.crc32(b'IHDR' + ihdr))
+    return head + os.urandom(max(0, size - len(head)))
+
+
+def parse_distribution(spec):
+    """'lognormal:25,0.35' → rng를 받아 초 단위 값을 돌려주는 함수"""
+    kind, _, args = spec.partition(':')
+    params = [float(x) for x in args.split(',') if x.strip()]
+    if kind == 'fixed':
+        return lambda rng: params[0]
+    if kind == 'uniform':
+        lo, hi = params
+        return lambda rng: rng.uniform(lo, hi)
+    if kind == 'lognormal':
+        median, sigma = params
+        mu = math.log(median)
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f'unknown distribution: {spec}')
+
+
+def parse_sizes(spec):
+    if not spec:
+        return list(DEFAULT_SIZES)
+    sizes = []
+    for part in spec.split(','):
+        w, _, h = part.strip().lower().partition('x')
+        sizes.append((int(w), int(h)))
+    return sizes
+
+
+class VirtualClock:
+    """time 모듈 대역 — time()/sleep()만 가상 시간으로 동작"""
+
+    def __init__(self, start=None):
+        self.now = start if start is not None else time.time()
+        self.slept = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+        self.slept += max(0.0, seconds)
+
+    def advance(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def __getattr__(self, name):
+        # perf_counter 등 나머지는 실제 time 모듈
+        return getattr(time, name)
+
+
+class FakeRateLimiter:
+    """rate_limiter 대역 — API 호출 수만 집계"""
+
+    def __init__(self):
+        self.total_api_calls = 0
+        self.is_flash_mode = False
+
+    def get_total_api_calls(self):
+        return self.total_api_calls
+
+    def all_keys_rate_limited(self):
+        return False
+
+
+class FakeGemini:
+    """generate_image / Batch API 대역"""
+
+    def __init__(self, clock, latency='lognormal:25,0.35', rate_429=0.0, rate_503=0.0,
+                 empty_rate=0.0, sizes=None, bytes_per_pixel=1.6, max_retry=3,
+                 retry_backoff=20.0, batch_latency='uniform:600,3600',
+                 price=0.134, price_batch=0.067, keys=('key_1',), model='gemini-3-pro-image-preview',
+                 seed=None, out_dir=None):
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.latency = parse_distribution(latency)
+        self.batch_latency = parse_distribution(batch_latency)
+        self.rate_429 = rate_429
+        self.rate_503 = rate_503
+        self.empty_rate = empty_rate
+        self.sizes = sizes or list(DEFAULT_SIZES)
+        self.bytes_per_pixel = bytes_per_pixel
+        self.max_retry = max_retry
+        self.retry_backoff = retry_backoff
+        self.price = price
+        self.price_batch = price_batch
+        self.keys = list(keys)
+        self.model = model
+        self.rate_limiter = FakeRateLimiter()
+        self.out_dir = out_dir or tempfile.mkdtemp(prefix='fake_gemini_')
+        self._key_index = 0
+        self._payload = bytearray()
+        self.calls = []  # (combo_id, outcome, latency)
+        self.batches = {}  # batch_job_name -> 서버에서 완료되는 가상 시각
+        self.batch_polls = 0
+        self.ingest_lags = []  # 완료 → 발견까지 (초)
+        self._seen_done = set()
+
+    # ── 공통 ────────────────────────────────────────────
+    def _next_key(self):
+        key = self.keys[self._key_index % len(self.keys)]
+        self._key_index += 1
+        return key
+
+    def _image_bytes(self, w, h):
+        """응답 inline_data 대역 — 헤더만 (w, h)로 바꾸고 본문 버퍼는 재사용"""
+        size = int(w * h * self.bytes_per_pixel)
+        if len(self._payload) < size:
+            self._payload = bytearray(png_payload(w, h, size))
+        struct.pack_into('>II', self._payload, 16, w, h)
+        return memoryview(self._payload)[:size]
+
+    def _write_image(self, combo_id, w, h):
+        """image_io 저장 경로 그대로 사용 → 결과 dict에 넣을 file_path/resolution/sha256"""
+        info = save_image_bytes(self._image_bytes(w, h), os.path.join(self.out_dir, f'{combo_id}.png'))
+        return {k: info[k] for k in ('file_path', 'resolution', 'sha256')}
+
+    def _one_call(self):
+        """API 1회 — (outcome, latency)"""
+        self.rate_limiter.total_api_calls += 1
+        r = self.rng.random()
+        if r < self.rate_429:
+            return '429', self.rng.uniform(0.2, 1.0)
+        if r < self.rate_429 + self.rate_503:
+            return '503', self.rng.uniform(1.0, 5.0)
+        latency = self.latency(self.rng)
+        if self.rng.random() < self.empty_rate:
+            return 'empty', latency
+        return 'ok', latency
+
+    # ── generate_image 대역 ─────────────────────────────
+    def generate_image(self, word1, word1_en, word2, word2_en, board_names, combo_id,
+                       template_index=0, recent_pins=None, **kwargs):
+        key = self._next_key()
+        for attempt in range(self.max_retry + 1):
+            outcome, latency = self._one_call()
+            self.clock.advance(latency)
+            self.calls.append((combo_id, outcome, latency))
+            if outcome in ('429', '503') and attempt < self.max_retry:
+                self.clock.advance(self.retry_backoff * (2 ** attempt))
+                continue
+            break
+
+        base = {
+            'combo_id': combo_id, 'word1': word1, 'word2': word2,
+            'word1_en': word1_en, 'word2_en': word2_en,
+            'model_used': self.model, 'key_id': key,
+            'template_id': f'core_{template_index % 10 + 1:02d}',
+        }
+        if outcome == 'ok':
+            w, h = self.rng.choice(self.sizes)
+            return {**base, 'status': 'success', 'cost': self.price, **self._write_image(combo_id, w, h)}
+        if outcome == 'empty':
+            return {**base, 'status': 'failed', 'error': EMPTY_IMAGE_ERROR}
+        code = '429 RESOURCE_EXHAUSTED' if outcome == '429' else '503 UNAVAILABLE'
+        return {**base, 'status': 'failed', 'error': code}
+
+    # ── Batch API 대역 ──────────────────────────────────
+    def prepare_batch_requests(self, pairs, board_names, recent_pins, model):
+        request_map = {}
+        path = os.path.join(self.out_dir, 'batch_requests.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i, p in enumerate(pairs):
+                key = f'req_{i:04d}'
+                request_map[key] = p
+                f.write(json.dumps({'key': key, 'request': {'contents': p['word1_en']}}, ensure_ascii=False) + '\n')
+        return path, request_map
+
+    def submit_batch(self, jsonl_path, model):
+        self.rate_limiter.total_api_calls += 1
+        self.clock.advance(self.rng.uniform(2.0, 10.0))
+        name = f'batches/fake-{self.rng.randrange(1 << 32):08x}'
+        self.batches[name] = self.clock.time() + self.batch_latency(self.rng)
+        return name
+
+    def get_batch(self, batch_job_name):
+        """client.batches.get 대역 — 가상 시각 기준 상태"""
+        self.batch_polls += 1
+        done_at = self.batches[batch_job_name]
+        now = self.clock.time()
+        if now < done_at:
+            return _FakeBatchJob(batch_job_name, 'JOB_STATE_RUNNING')
+        if batch_job_name not in self._seen_done:
+            self._seen_done.add(batch_job_name)
+            self.ingest_lags.append(now - done_at)
+        return _FakeBatchJob(batch_job_name)
+
+    def poll_batch(self, batch_job_name, poll_interval, poll_timeout):
+        """기존 고정 간격 polling"""
+        start = self.clock.time()
+        while True:
+            job = self.get_batch(batch_job_name)
+            if job.state.name == 'JOB_STATE_SUCCEEDED':
+                return job
+            if self.clock.time() - start >= poll_timeout:
+                return None
+            self.clock.advance(min(poll_interval, poll_timeout - (self.clock.time() - start)))
+
+    def download_batch_results(self, batch_job, request_map, model, is_batch=True):
+        results = []
+        for key, p in request_map.items():
+            base = {**p, 'model_used': model, 'key_id': 'batch'}
+            if self.rng.random() < self.empty_rate:
+                results.append({**base, 'status': 'failed', 'error': EMPTY_IMAGE_ERROR})
+                continue
+            w, h = self.rng.choice(self.sizes)
+            results.append({**base, 'status': 'success', 'cost': self.price_batch,
+                            **self._write_image(p['combo_id'], w, h)})
+        return results
+
+
+class _FakeState:
+    def __init__(self, name):
+        self.name = name
+
+
+class _FakeBatchJob:
+    def __init__(self, name, state='JOB_STATE_SUCCEEDED'):
+        self.name = name
+        self.state = _FakeState(state)
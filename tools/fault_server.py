@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+장애 주입 로컬 서버 — 네트워크 장애 상황에서 deadline/watchdog 동작 확인용
+
+요청마다 비율에 따라 하나를 골라 응답:
+  ok     latency 후 200 JSON
+  hang   응답 없이 hang초 대기 (read timeout에 걸림)
+  drip   헤더 후 본문을 1바이트씩 천천히 (소켓 read timeout으로는 못 끊음)
+  reset  본문 없이 연결 끊기
+  503    503 UNAVAILABLE
+  429    429 RESOURCE_EXHAUSTED
+
+사용:
+  python tools/fault_server.py --port 8089 --hang 0.1 --drip 0.1
+"""
+
+import argparse
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAULTS = ('hang', 'drip', 'reset', '503', '429')
+
+
+class FaultConfig:
+    def __init__(self, latency=0.05, hang_seconds=30.0, drip_seconds=30.0, seed=None, **rates):
+        self.latency = latency
+        self.hang_seconds = hang_seconds
+        self.drip_seconds = drip_seconds
+        self.rates = {k: float(rates.get(k, 0.0)) for k in FAULTS}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def pick(self):
+        with self.lock:
+            r = self.rng.random()
+            fault = 'ok'
+            for k in FAULTS:
+                if r < self.rates[k]:
+                    fault = k
+                    break
+                r -= self.rates[k]
+            self.counts[fault] = self.counts.get(fault, 0) + 1
+        return fault
+
+
+class FaultHandler(BaseHTTPRequestHandler):
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        cfg = self.config
+        fault = cfg.pick()
+        try:
+            if fault == 'hang':
+                time.sleep(cfg.hang_seconds)
+                self._body(200, {'status': 'late'})
+            elif fault == 'drip':
+                payload = b'{"status": "ok", "pad": "' + b'x' * 64 + b'"}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                step = cfg.drip_seconds / len(payload)
+                for i in range(len(payload)):
+                    self.wfile.write(payload[i:i + 1])
+                    self.wfile.flush()
+                    time.sleep(step)
+            elif fault == 'reset':
+                self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+                self.close_connection = True
+                self.connection.close()
+            elif fault == '503':
+                self._body(503, {'error': {'code': 503, 'status': 'UNAVAILABLE'}})
+            elif fault == '429':
+                self._body(429, {'error': {'code': 429, 'status': 'RESOURCE_EXHAUSTED'}})
+            else:
+                time.sleep(cfg.latency)
+                self._body(200, {'status': 'ok'})
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+def start_server(config, host='127.0.0.1', port=0):
+    """백그라운드 스레드로 서버 시작 → (server, url)"""
+    handler = type('Handler', (FaultHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, name='fault-server', daemon=True)
+    t.start()
+    return server, f'http://{host}:{server.server_address[1]}/'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='장애 주입 로컬 서버')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    parser.add_argument('--drip-seconds', type=float, default=30.0)
+    for k in FAULTS:
+        parser.add_argument(f'--{k}' if not k.isdigit() else f'--rate-{k}', dest=f'rate_{k}', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config = FaultConfig(args.latency, args.hang_seconds, args.drip_seconds, args.seed,
+                         **{k: getattr(args, f'rate_{k}') for k in FAULTS})
+    server, url = start_server(config, port=args.port)
+    print(f'[FAULT] {url} — {config.rates}')
+    try:
+        while True:
+            time.sleep(10)
+            print(f'[FAULT] {config.counts}')
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()